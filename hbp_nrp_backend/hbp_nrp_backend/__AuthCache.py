@@ -0,0 +1,146 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+A cache of the answers of the storage server to the authentication requests of the backend
+"""
+
+import time
+import logging
+import threading
+import collections
+
+logger = logging.getLogger(__name__)
+
+
+class _Lookup(object):
+    """
+    A lookup in progress, awaited by the requests for the same key
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+
+
+class AuthCache(object):
+    """
+    A bounded cache whose entries expire after a time to live.
+
+    Concurrent requests for a key which is not cached share a single lookup: the first one
+    calls the storage server, the others wait for its answer. A failed lookup is answered with a
+    default value, which is cached for a shorter time so that the storage server is not flooded
+    while it is down but recovers quickly. The least recently used entries are evicted first.
+    """
+
+    def __init__(self, name, ttl, negative_ttl, max_size):
+        """
+        :param name: the name of the cache, used in the logs
+        :param ttl: the time to live of the entries, in seconds
+        :param negative_ttl: the time to live of the entries of failed lookups, in seconds
+        :param max_size: the maximum number of entries
+        """
+        self.__name = name
+        self.__ttl = ttl
+        self.__negative_ttl = negative_ttl
+        self.__max_size = max(1, max_size)
+        self.__lock = threading.Lock()
+        self.__entries = collections.OrderedDict()
+        self.__lookups = {}
+        self.__stats = collections.Counter()
+
+    @property
+    def stats(self):
+        """
+        Returns the number of hits, misses, coalesced requests, failed lookups and evictions,
+        and the total time spent in lookups, in seconds
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+        for key in ('hits', 'misses', 'coalesced', 'failures', 'evictions'):
+            stats.setdefault(key, 0)
+        stats.setdefault('lookup_seconds', 0.)
+        return stats
+
+    def clear(self):
+        """
+        Forgets all the entries and the statistics, the lookups in progress still complete
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__stats.clear()
+
+    def get(self, key, lookup, default=None):
+        """
+        Gets the value of a key, looking it up if it is not cached or has expired
+
+        :param key: the key
+        :param lookup: the function looking the value up, called without arguments
+        :param default: the value of the key if the lookup fails
+        :return: the value of the key
+        """
+        with self.__lock:
+            entry = self.__entries.pop(key, None)
+            if entry is not None and entry[1] > time.time():
+                # re-inserted as the most recently used entry
+                self.__entries[key] = entry
+                self.__stats['hits'] += 1
+                return entry[0]
+            pending = self.__lookups.get(key)
+            if pending is None:
+                pending = self.__lookups[key] = _Lookup()
+                self.__stats['misses'] += 1
+                leader = True
+            else:
+                self.__stats['coalesced'] += 1
+                leader = False
+
+        if not leader:
+            pending.done.wait()
+            return pending.value
+
+        start = time.time()
+        failed = False
+        # pylint: disable=broad-except
+        try:
+            value = lookup()
+        except Exception:
+            logger.warning("%s lookup failed", self.__name, exc_info=True)
+            value = default
+            failed = True
+        elapsed = time.time() - start
+        logger.debug("%s lookup took %.3fs", self.__name, elapsed)
+
+        with self.__lock:
+            self.__stats['failures'] += failed
+            self.__stats['lookup_seconds'] += elapsed
+            ttl = self.__negative_ttl if failed else self.__ttl
+            if ttl > 0:
+                self.__entries[key] = (value, time.time() + ttl)
+                while len(self.__entries) > self.__max_size:
+                    self.__entries.popitem(last=False)
+                    self.__stats['evictions'] += 1
+            del self.__lookups[key]
+        pending.value = value
+        pending.done.set()
+        return value
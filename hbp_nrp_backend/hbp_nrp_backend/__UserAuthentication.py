@@ -31,8 +31,9 @@ __author__ = 'Oliver Denninger'
 from flask_restful import reqparse
 from flask import request
 import logging
-from backports.functools_lru_cache import lru_cache
 from hbp_nrp_backend.storage_client_api.StorageClient import StorageClient
+from hbp_nrp_backend.__AuthCache import AuthCache
+from hbp_nrp_commons.workspace.Settings import Settings
 
 logger = logging.getLogger("__main__")
 
@@ -49,6 +50,10 @@ class UserAuthentication(object):
     DEFAULT_OWNER = "default-owner"
     NO_TOKEN = "no_token"
     client = StorageClient()
+    token_owners = AuthCache("Token owner", Settings.auth_cache_ttl,
+                             Settings.auth_cache_negative_ttl, Settings.auth_cache_size)
+    experiment_access = AuthCache("Experiment access", Settings.auth_cache_ttl,
+                                  Settings.auth_cache_negative_ttl, Settings.auth_cache_size)
 
     @staticmethod
     def get_header(header_name, default_value):
@@ -89,19 +94,20 @@ class UserAuthentication(object):
             return token_field
 
     @staticmethod
-    @lru_cache()
     def get_token_owner(token):
         """
         Gets the owner of an authentication token
         :param token: The authentication token
         :return: The user's id
         """
-        try:
+        def get_owner():
+            """
+            Asks the storage server for the owner of the token
+            """
             user = UserAuthentication.client.get_user(token)
             return user['id'] if user else None
-        # pylint: disable=broad-except
-        except Exception:
-            return None
+
+        return UserAuthentication.token_owners.get(token, get_owner)
 
     @staticmethod
     def get_user():
@@ -122,7 +128,6 @@ class UserAuthentication(object):
         return token_owner if token_owner else username
 
     @staticmethod
-    @lru_cache()
     def __user_can_access_experiment(token, context_id, experiment_id):
         """
         Checkis if a user can access a simulation.
@@ -135,11 +140,14 @@ class UserAuthentication(object):
         if token == UserAuthentication.NO_TOKEN:
             return False
 
-        try:
+        def can_access():
+            """
+            Asks the storage server whether the user can access the experiment
+            """
             return UserAuthentication.client.can_acess_experiment(token, context_id, experiment_id)
-        # pylint: disable=broad-except
-        except Exception:
-            return False
+
+        return UserAuthentication.experiment_access.get((token, context_id, experiment_id),
+                                                        can_access, default=False)
 
     @staticmethod
     def can_view(simulation):
@@ -25,12 +25,16 @@
 Takes care of making the appropriate ROS call(s) to control a simulation.
 On the other side of ROS, the calls are handled by ROSCLEServer.py
 """
+import json
 import logging
+import threading
+import time
 import rospy
 # This package comes from the catkin package ROSCLEServicesDefinitions
 # in the GazeboRosPackages repository.
 from cle_ros_msgs import srv, msg
-from hbp_nrp_backend.cle_interface import SERVICE_SIM_RESET_ID, \
+from std_msgs.msg import String
+from hbp_nrp_backend.cle_interface import TOPIC_STATUS, SERVICE_SIM_RESET_ID, \
     SERVICE_GET_TRANSFER_FUNCTIONS, SERVICE_EDIT_TRANSFER_FUNCTION, \
     SERVICE_ACTIVATE_TRANSFER_FUNCTION, SERVICE_ADD_TRANSFER_FUNCTION, \
     SERVICE_DELETE_TRANSFER_FUNCTION, SERVICE_SET_BRAIN, SERVICE_GET_BRAIN, \
@@ -39,7 +43,7 @@ from hbp_nrp_backend.cle_interface import SERVICE_SIM_RESET_ID, \
     SERVICE_SIMULATION_RECORDER, \
     SERVICE_CONVERT_TRANSFER_FUNCTION_RAW_TO_STRUCTURED, \
     SERVICE_ADD_ROBOT, SERVICE_GET_ROBOTS, SERVICE_DEL_ROBOT, SERVICE_SET_EXC_ROBOT_POSE, \
-    SERVICE_PREPARE_CUSTOM_MODEL
+    SERVICE_PREPARE_CUSTOM_MODEL, SERVICE_APPLY_TRANSFER_FUNCTIONS
 
 import hbp_nrp_commons
 
@@ -88,27 +92,52 @@ class ROSCLEServiceWrapper(object):
     """
     ROS_SERVICE_TIMEOUT = 180
 
-    def __init__(self, service_name, service_class, ros_cle_client, invalidate_on_failure=True):
+    # pylint: disable=too-many-arguments
+    def __init__(self, service_name, service_class, ros_cle_client, invalidate_on_failure=True,
+                 wait=True):
         """
         :param service_name: the name of the ROS service.
         :param service_class: the class of the ROS service parameter.
         :param ros_cle_client: the ROSCLEClient instance creating the wrapper.
         :param invalidate_on_failure (default=False): a boolean value deciding whether the
             ROSCLEClient should be invalidated in case of failure (True) or not (False).
+        :param wait (default=True): whether to wait for the service to be available, otherwise
+            the caller is responsible for calling wait_for_service.
         """
         self.__handler = None
+        self.__service_name = service_name
         self.__ros_cle_client = ros_cle_client
         self.__invalidate_on_failure = invalidate_on_failure
+        logger.info("Connecting to ROS service " + service_name)
         try:
-            logger.info("Connecting to ROS service " + service_name)
             self.__handler = rospy.ServiceProxy(service_name, service_class)
-            self.__handler.wait_for_service(timeout=self.ROS_SERVICE_TIMEOUT)
+        except rospy.ROSException:
+            self.__timeout()
+        if wait:
+            self.wait_for_service(self.ROS_SERVICE_TIMEOUT)
+
+    def wait_for_service(self, timeout):
+        """
+        Waits for the service to be available
+
+        :param timeout: the maximum time to wait, in seconds
+        :raise ROSCLEClientException: if the service is not available in time
+        """
+        try:
+            self.__handler.wait_for_service(timeout=timeout)
         except rospy.ROSException:
             # According to the documentation, only a timeout will raise a generic 'ROSException'.
             # http://docs.ros.org/api/rospy/html/rospy-module.html#wait_for_service
-            message = "Timeout while connecting to the CLE (waiting on {0}).".format(service_name)
-            logger.error(message)
-            raise ROSCLEClientException(message)
+            self.__timeout()
+
+    def __timeout(self):
+        """
+        Reports a timeout while connecting to the service
+        """
+        message = "Timeout while connecting to the CLE (waiting on {0}).".format(
+            self.__service_name)
+        logger.error(message)
+        raise ROSCLEClientException(message)
 
     def __call__(self, *args, **kwargs):
         try:
@@ -152,6 +181,9 @@ class ROSCLEClient(object):
     Client around the ROS controlled Closed Loop Engine.
     """
 
+    # overall deadline for all the CLE services to be available, in seconds
+    SERVICES_TIMEOUT = ROSCLEServiceWrapper.ROS_SERVICE_TIMEOUT
+
     def __init__(self, sim_id):
         """
         Create the wrapper client
@@ -160,57 +192,113 @@ class ROSCLEClient(object):
         """
 
         self.valid = True
+        self.__services = []
 
-        self.__cle_reset = ROSCLEServiceWrapper(
-            SERVICE_SIM_RESET_ID(sim_id), srv.ResetSimulation, self)
+        self.__cle_reset = self.__connect(
+            SERVICE_SIM_RESET_ID(sim_id), srv.ResetSimulation)
 
-        self.__cle_extend_timeout = ROSCLEServiceWrapper(
-            SERVICE_SIM_EXTEND_TIMEOUT_ID(sim_id), srv.ExtendTimeout, self)
+        self.__cle_extend_timeout = self.__connect(
+            SERVICE_SIM_EXTEND_TIMEOUT_ID(sim_id), srv.ExtendTimeout)
 
-        self.__cle_get_transfer_functions = ROSCLEServiceWrapper(
-            SERVICE_GET_TRANSFER_FUNCTIONS(sim_id), srv.GetTransferFunctions, self)
+        self.__cle_get_transfer_functions = self.__connect(
+            SERVICE_GET_TRANSFER_FUNCTIONS(sim_id), srv.GetTransferFunctions)
 
-        self.__cle_add_transfer_function = ROSCLEServiceWrapper(
-            SERVICE_ADD_TRANSFER_FUNCTION(sim_id), srv.AddTransferFunction, self)
+        self.__cle_add_transfer_function = self.__connect(
+            SERVICE_ADD_TRANSFER_FUNCTION(sim_id), srv.AddTransferFunction)
 
-        self.__cle_activate_transfer_function = ROSCLEServiceWrapper(
-            SERVICE_ACTIVATE_TRANSFER_FUNCTION(sim_id), srv.ActivateTransferFunction, self)
+        self.__cle_activate_transfer_function = self.__connect(
+            SERVICE_ACTIVATE_TRANSFER_FUNCTION(sim_id), srv.ActivateTransferFunction)
 
-        self.__cle_edit_transfer_function = ROSCLEServiceWrapper(
-            SERVICE_EDIT_TRANSFER_FUNCTION(sim_id), srv.EditTransferFunction, self)
+        self.__cle_edit_transfer_function = self.__connect(
+            SERVICE_EDIT_TRANSFER_FUNCTION(sim_id), srv.EditTransferFunction)
 
-        self.__cle_convert_transfer_function_raw_to_structured = ROSCLEServiceWrapper(
+        self.__cle_convert_transfer_function_raw_to_structured = self.__connect(
             SERVICE_CONVERT_TRANSFER_FUNCTION_RAW_TO_STRUCTURED(sim_id),
-            srv.ConvertTransferFunctionRawToStructured, self)
-
-        self.__cle_delete_transfer_function = ROSCLEServiceWrapper(
-            SERVICE_DELETE_TRANSFER_FUNCTION(sim_id), srv.DeleteTransferFunction, self)
-
-        self.__cle_get_brain = ROSCLEServiceWrapper(SERVICE_GET_BRAIN(sim_id), srv.GetBrain, self)
-        self.__cle_set_brain = ROSCLEServiceWrapper(SERVICE_SET_BRAIN(sim_id), srv.SetBrain, self)
-        self.__cle_get_populations = ROSCLEServiceWrapper(SERVICE_GET_POPULATIONS(sim_id),
-                                                          srv.GetPopulations, self)
-        self.__cle_set_populations = ROSCLEServiceWrapper(SERVICE_SET_POPULATIONS(sim_id),
-                                                          srv.SetPopulations, self)
-        self.__cle_get_CSV_recorders_files = ROSCLEServiceWrapper(
-            SERVICE_GET_CSV_RECORDERS_FILES(sim_id), srv.GetCSVRecordersFiles, self)
-
-        self.__simulation_recorder = ROSCLEServiceWrapper(
-            SERVICE_SIMULATION_RECORDER(sim_id), srv.SimulationRecorder, self)
-
-        self.__cle_get_robots = ROSCLEServiceWrapper(
-            SERVICE_GET_ROBOTS(sim_id), srv.GetRobots, self)
-        self.__cle_add_robot = ROSCLEServiceWrapper(SERVICE_ADD_ROBOT(sim_id), srv.AddRobot, self)
-        self.__cle_del_robot = ROSCLEServiceWrapper(
-            SERVICE_DEL_ROBOT(sim_id), srv.DeleteRobot, self)
-        self.__cle_set_robot_init_pose = ROSCLEServiceWrapper(
-            SERVICE_SET_EXC_ROBOT_POSE(sim_id), srv.ChangePose, self)
-
-        self.__cle_prepare_custom_model = ROSCLEServiceWrapper(
-            SERVICE_PREPARE_CUSTOM_MODEL(sim_id), srv.Resource, self)
+            srv.ConvertTransferFunctionRawToStructured)
+
+        self.__cle_delete_transfer_function = self.__connect(
+            SERVICE_DELETE_TRANSFER_FUNCTION(sim_id), srv.DeleteTransferFunction)
+
+        # the set of transfer functions and the errors are sent as JSON in the fields of the
+        # AddTransferFunction service
+        self.__cle_apply_transfer_functions = self.__connect(
+            SERVICE_APPLY_TRANSFER_FUNCTIONS(sim_id), srv.AddTransferFunction)
+
+        self.__cle_get_brain = self.__connect(SERVICE_GET_BRAIN(sim_id), srv.GetBrain)
+        self.__cle_set_brain = self.__connect(SERVICE_SET_BRAIN(sim_id), srv.SetBrain)
+        self.__cle_get_populations = self.__connect(SERVICE_GET_POPULATIONS(sim_id),
+                                                    srv.GetPopulations)
+        self.__cle_set_populations = self.__connect(SERVICE_SET_POPULATIONS(sim_id),
+                                                    srv.SetPopulations)
+        self.__cle_get_CSV_recorders_files = self.__connect(
+            SERVICE_GET_CSV_RECORDERS_FILES(sim_id), srv.GetCSVRecordersFiles)
+
+        self.__simulation_recorder = self.__connect(
+            SERVICE_SIMULATION_RECORDER(sim_id), srv.SimulationRecorder)
+
+        self.__cle_get_robots = self.__connect(
+            SERVICE_GET_ROBOTS(sim_id), srv.GetRobots)
+        self.__cle_add_robot = self.__connect(SERVICE_ADD_ROBOT(sim_id), srv.AddRobot)
+        self.__cle_del_robot = self.__connect(
+            SERVICE_DEL_ROBOT(sim_id), srv.DeleteRobot)
+        self.__cle_set_robot_init_pose = self.__connect(
+            SERVICE_SET_EXC_ROBOT_POSE(sim_id), srv.ChangePose)
+
+        self.__cle_prepare_custom_model = self.__connect(
+            SERVICE_PREPARE_CUSTOM_MODEL(sim_id), srv.Resource)
+
+        self.__wait_for_services()
+
+        # the progress of the tasks run by the backend for the simulation, e.g. the upload of
+        # a recording, is published with the status messages of the CLE server
+        self.__status_pub = rospy.Publisher(TOPIC_STATUS, String, queue_size=10)
 
         self.__stop_reason = None
 
+    def __connect(self, service_name, service_class):
+        """
+        Creates the wrapper of a CLE service, without waiting for the service to be available
+
+        :param service_name: the name of the ROS service
+        :param service_class: the class of the ROS service parameter
+        """
+        service = ROSCLEServiceWrapper(service_name, service_class, self, wait=False)
+        self.__services.append((service_name, service))
+        return service
+
+    def __wait_for_services(self):
+        """
+        Waits concurrently for all the CLE services to be available, so that the construction of
+        the client takes as long as the slowest service rather than the sum of all of them.
+
+        :raise ROSCLEClientException: if some services are still missing after
+                                      SERVICES_TIMEOUT seconds, listing all of them
+        """
+        deadline = time.time() + self.SERVICES_TIMEOUT
+        missing = []
+
+        def wait(service_name, service):
+            """
+            Waits for a single service until the common deadline
+            """
+            try:
+                service.wait_for_service(max(0., deadline - time.time()))
+            except ROSCLEClientException:
+                missing.append(service_name)
+
+        threads = [threading.Thread(target=wait, args=service) for service in self.__services]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if missing:
+            message = "Timeout while connecting to the CLE (waiting on {0}).".format(
+                ", ".join(sorted(missing)))
+            logger.error(message)
+            raise ROSCLEClientException(message)
+
     def stop_communication(self, reason):
         """
         Tells the client to stop all communication to the simulation server because of the given
@@ -220,6 +308,33 @@ class ROSCLEClient(object):
         """
         self.__stop_reason = reason
 
+    def publish_task_progress(self, task, subtask, subtask_index, number_of_subtasks,
+                              block_ui=False):
+        """
+        Notifies the frontend of the progress of a task, in the format used by the
+        ROSNotificator of the CLE server
+
+        :param task: the title of the task
+        :param subtask: the title of the current subtask
+        :param subtask_index: the index of the current subtask
+        :param number_of_subtasks: the number of subtasks of the task
+        :param block_ui: whether the frontend should block any user interaction
+        """
+        self.__status_pub.publish(json.dumps(
+            {'progress': {'task': task,
+                          'subtask': subtask,
+                          'number_of_subtasks': number_of_subtasks,
+                          'subtask_index': subtask_index,
+                          'block_ui': block_ui}}))
+
+    def publish_task_done(self, task):
+        """
+        Notifies the frontend that a task is finished
+
+        :param task: the title of the task
+        """
+        self.__status_pub.publish(json.dumps({'progress': {'task': task, 'done': True}}))
+
     def reset(self, reset_type, world_sdf=None, brain_path=None, populations=None):
         """
         Reset the simulation.
@@ -365,6 +480,22 @@ class ROSCLEClient(object):
             raise ROSCLEClientException(self.__stop_reason)
         return self.__cle_add_transfer_function(transfer_function_source).error_message
 
+    def apply_simulation_transfer_functions(self, transfer_functions):
+        """
+        Adds or modifies a set of transfer functions at once. If any of them fails, none is
+        applied.
+
+        :param transfer_functions: a dictionary mapping the names of the transfer functions to
+                                   modify, or of the new ones, to their source code
+        :returns: an empty list if the call to ROS is successful, otherwise the list of errors,
+                  each a dictionary with the name of the transfer function and a message
+        """
+        if self.__stop_reason is not None:
+            raise ROSCLEClientException(self.__stop_reason)
+        error_message = self.__cle_apply_transfer_functions(
+            json.dumps(transfer_functions)).error_message
+        return json.loads(error_message) if error_message else []
+
     def activate_simulation_transfer_function(self, transfer_function_name,
                                               activate_transfer_function):  # pragma: no cover
         """
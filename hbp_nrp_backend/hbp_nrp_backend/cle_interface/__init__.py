@@ -24,6 +24,8 @@ SERVICE_EDIT_TRANSFER_FUNCTION = lambda sim_id: \
     '/%s/%d/edit_transfer_function' % (ROS_CLE_NODE_NAME, sim_id)
 SERVICE_DELETE_TRANSFER_FUNCTION = lambda sim_id: \
     '/%s/%d/delete_transfer_function' % (ROS_CLE_NODE_NAME, sim_id)
+SERVICE_APPLY_TRANSFER_FUNCTIONS = lambda sim_id: \
+    '/%s/%d/apply_transfer_functions' % (ROS_CLE_NODE_NAME, sim_id)
 
 SERVICE_GET_BRAIN = lambda sim_id: '/%s/%d/get_brain' % (ROS_CLE_NODE_NAME, sim_id)
 SERVICE_SET_BRAIN = lambda sim_id: '/%s/%d/set_brain' % (ROS_CLE_NODE_NAME, sim_id)
@@ -40,6 +40,8 @@ from cle_ros_msgs.srv import GetTransferFunctions, EditTransferFunction, \
 from hbp_nrp_backend.cle_interface.ROSCLEClient import ROSCLEClientException
 from mock import patch, MagicMock, Mock, call
 from cle_ros_msgs.msg import PopulationInfo, NeuronParameter, CSVRecordedFile
+import json
+import time
 import unittest
 
 __author__ = 'Lorenzo Vannucci, Daniel peppicelli, Georg Hinkel'
@@ -85,6 +87,43 @@ class TestROSCLEClient(unittest.TestCase):
         self.assertRaises(ROSCLEClient.ROSCLEClientException,
             ROSCLEClient.ROSCLEServiceWrapper, 'service_name', Empty, None)
 
+    @patch('hbp_nrp_backend.cle_interface.ROSCLEClient.rospy.ServiceProxy')
+    def test_roscleclient_waits_for_services_concurrently(self, service_proxy_mock):
+        def slow_service(service_name, service_class):
+            service = MagicMock()
+            service.wait_for_service.side_effect = lambda timeout: time.sleep(0.05)
+            return service
+        service_proxy_mock.side_effect = slow_service
+
+        start = time.time()
+        ROSCLEClient.ROSCLEClient(0)
+        # about 20 services waiting 50ms each
+        self.assertLess(time.time() - start, 0.5)
+
+    @patch('hbp_nrp_backend.cle_interface.ROSCLEClient.rospy.ServiceProxy')
+    def test_roscleclient_reports_missing_services(self, service_proxy_mock):
+        missing = [SERVICE_GET_BRAIN(0), SERVICE_SET_BRAIN(0)]
+        timeouts = []
+
+        def service(service_name, service_class):
+            service = MagicMock()
+            if service_name in missing:
+                def wait_for_service(timeout):
+                    timeouts.append(timeout)
+                    raise rospy.ROSException()
+                service.wait_for_service.side_effect = wait_for_service
+            return service
+        service_proxy_mock.side_effect = service
+
+        with self.assertRaises(ROSCLEClientException) as context:
+            ROSCLEClient.ROSCLEClient(0)
+        for service_name in missing:
+            self.assertIn(service_name, str(context.exception))
+        # all the services share the same deadline
+        for timeout in timeouts:
+            self.assertLessEqual(timeout, ROSCLEClient.ROSCLEClient.SERVICES_TIMEOUT)
+            self.assertGreater(timeout, ROSCLEClient.ROSCLEClient.SERVICES_TIMEOUT - 5)
+
     @patch('hbp_nrp_backend.cle_interface.ROSCLEClient.rospy.ServiceProxy')
     def test_rosservicewrapper_call(self, service_proxy_mock):
         client = ROSCLEClient.ROSCLEClient(0)
@@ -145,6 +184,27 @@ class TestROSCLEClient(unittest.TestCase):
         with self.assertRaises(ROSCLEClientException):
             client.add_simulation_transfer_function("def tf_1(): \n return 1")
 
+    @patch('hbp_nrp_backend.cle_interface.ROSCLEClient.rospy.ServiceProxy')
+    def test_apply_simulation_transfer_functions(self, service_proxy_mock):
+        msg = AddTransferFunction()
+        client = ROSCLEClient.ROSCLEClient(0)
+        tfs = {'tf_1': "def tf_1(): \n return 1"}
+
+        client._ROSCLEClient__cle_apply_transfer_functions = MagicMock(
+            return_value=msg._response_class(error_message=""))
+        self.assertEqual(client.apply_simulation_transfer_functions(tfs), [])
+        client._ROSCLEClient__cle_apply_transfer_functions.assert_called_once_with(
+            json.dumps(tfs))
+
+        errors = [{'name': 'tf_1', 'message': "duplicate Transfer Function name"}]
+        client._ROSCLEClient__cle_apply_transfer_functions = MagicMock(
+            return_value=msg._response_class(error_message=json.dumps(errors)))
+        self.assertEqual(client.apply_simulation_transfer_functions(tfs), errors)
+
+        client.stop_communication("Test stop")
+        with self.assertRaises(ROSCLEClientException):
+            client.apply_simulation_transfer_functions(tfs)
+
     @patch('hbp_nrp_backend.cle_interface.ROSCLEClient.rospy.ServiceProxy')
     def test_edit_simulation_transfer_function(self, service_proxy_mock):
         msg = EditTransferFunction()
@@ -323,6 +383,23 @@ class TestROSCLEClient(unittest.TestCase):
         with self.assertRaises(ROSCLEClientException):
             client.command_simulation_recorder(0)
 
+    @patch('hbp_nrp_backend.cle_interface.ROSCLEClient.rospy.Publisher')
+    @patch('hbp_nrp_backend.cle_interface.ROSCLEClient.rospy.ServiceProxy')
+    def test_publish_task_progress(self, service_proxy_mock, publisher_mock):
+        client = ROSCLEClient.ROSCLEClient(0)
+        self.assertEqual(publisher_mock.call_args[0][0], '/ros_cle_simulation/status')
+        status_pub = publisher_mock.return_value
+
+        client.publish_task_progress('Saving', 'Uploading (50%)', 5, 10)
+        self.assertEqual(json.loads(status_pub.publish.call_args[0][0]),
+                         {'progress': {'task': 'Saving', 'subtask': 'Uploading (50%)',
+                                       'subtask_index': 5, 'number_of_subtasks': 10,
+                                       'block_ui': False}})
+
+        client.publish_task_done('Saving')
+        self.assertEqual(json.loads(status_pub.publish.call_args[0][0]),
+                         {'progress': {'task': 'Saving', 'done': True}})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -27,22 +27,92 @@ By default, all rest requests are considered not thread safe and are therefore s
 Requests that are known to be thread-safe, are executed concurrently.
 To mark a rest request as thread-safe, decorate the Resource function handling the request
 (get, post, delete, put) with the decorator @RestSyncMiddleware.threadsafe
+
+Requests are only synchronized with the requests targeting the same simulation (i.e. with the
+same sim_id). The creation of simulations and the requests that do not target a simulation
+are synchronized separately. GET requests only take a read lock, so that they run concurrently
+with each other and are only excluded by the requests modifying the same simulation.
 """
-from threading import Lock
+from threading import Lock, Condition
+import contextlib
 import logging
+import time
+import weakref
 
 logger = logging.getLogger(__name__)
 
 
+class ReadWriteLock(object):
+    """
+    Lock held either by any number of readers or by a single writer. Waiting writers have
+    priority over new readers, so that a stream of reads cannot starve a write.
+    """
+
+    def __init__(self):
+        self.__condition = Condition(Lock())
+        self.__readers = 0
+        self.__writer = False
+        self.__waiting_writers = 0
+
+    def acquire_read(self):
+        """
+        Acquires the lock for reading
+        """
+        with self.__condition:
+            while self.__writer or self.__waiting_writers:
+                self.__condition.wait()
+            self.__readers += 1
+
+    def release_read(self):
+        """
+        Releases the lock acquired for reading
+        """
+        with self.__condition:
+            self.__readers -= 1
+            if not self.__readers:
+                self.__condition.notify_all()
+
+    def acquire_write(self):
+        """
+        Acquires the lock for writing
+        """
+        with self.__condition:
+            self.__waiting_writers += 1
+            try:
+                while self.__writer or self.__readers:
+                    self.__condition.wait()
+            finally:
+                self.__waiting_writers -= 1
+            self.__writer = True
+
+    def release_write(self):
+        """
+        Releases the lock acquired for writing
+        """
+        with self.__condition:
+            self.__writer = False
+            self.__condition.notify_all()
+
+
 class RestSyncMiddleware(object):
     """
     Middleware that allows thread-safe requests to be executed concurrently
     """
 
+    CREATION_LOCK = 'creation'
+    GLOBAL_LOCK = 'global'
+    READ_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+    # waiting longer than this for a lock is logged as a warning, in seconds
+    SLOW_WAIT = 5.
+
     def __init__(self, wsgi_app, app):
         self.wsgi_app = wsgi_app
         self.app = app
-        self.threadLock = Lock()
+        # locks only live while requests use them, so that they do not pile up with the ids
+        # of the simulations which have ended
+        self.__locks = weakref.WeakValueDictionary()
+        self.__metrics = {}
+        self.__locks_lock = Lock()
 
     @staticmethod
     def threadsafe(func):
@@ -52,17 +122,93 @@ class RestSyncMiddleware(object):
         func.is_threadsafe = True
         return func
 
+    @staticmethod
+    def lock_key(pathinfo, view_args):
+        """
+        Returns the key of the lock synchronizing a request
+
+        :param pathinfo: the path of the request
+        :param view_args: the arguments extracted from the path by the url map
+        """
+        if view_args and 'sim_id' in view_args:
+            return 'simulation/{0}'.format(view_args['sim_id'])
+        if pathinfo.rstrip('/') == '/simulation':
+            return RestSyncMiddleware.CREATION_LOCK
+        return RestSyncMiddleware.GLOBAL_LOCK
+
+    def get_lock(self, key):
+        """
+        Returns the lock for the given key, creating it if needed. The lock is dropped once
+        nobody references it anymore, the callers have to keep it until they release it.
+
+        :param key: a key returned by lock_key
+        """
+        with self.__locks_lock:
+            lock = self.__locks.get(key)
+            if lock is None:
+                lock = self.__locks[key] = ReadWriteLock()
+            return lock
+
+    @contextlib.contextmanager
+    def hold(self, key):
+        """
+        Holds the write lock of the given key outside of a request, e.g. while a simulation is
+        initialized in the background, so that the requests to the simulation wait for it
+
+        :param key: a key returned by lock_key
+        """
+        # the reference keeps the lock registered while it is held
+        lock = self.get_lock(key)
+        start = time.time()
+        lock.acquire_write()
+        self.__record_wait(key, False, time.time() - start)
+        try:
+            yield
+        finally:
+            lock.release_write()
+
+    def lock_wait_metrics(self):
+        """
+        Returns the time spent waiting for the locks, per kind of lock (simulation, creation
+        and global) and access (read or write). Every entry is a dictionary with the number of
+        acquisitions, and the total and maximum wait time in seconds.
+        """
+        with self.__locks_lock:
+            return {kind: dict(metrics) for kind, metrics in self.__metrics.iteritems()}
+
+    def __record_wait(self, key, read, wait):
+        """
+        Accounts the time spent waiting for a lock
+        """
+        kind = '{0}:{1}'.format(key.split('/')[0], 'read' if read else 'write')
+        with self.__locks_lock:
+            metrics = self.__metrics.setdefault(kind, {'count': 0, 'total': 0., 'max': 0.})
+            metrics['count'] += 1
+            metrics['total'] += wait
+            metrics['max'] = max(metrics['max'], wait)
+        if wait > self.SLOW_WAIT:
+            logger.warning("Request waited %.1f s for the %s lock", wait, key)
+
     def __call__(self, environ, start_response):
         pathinfo = environ.get("PATH_INFO")
         method = environ.get("REQUEST_METHOD")
 
-        viewfunction, _ = self.app.url_map.bind(
+        viewfunction, view_args = self.app.url_map.bind(
             'localhost', default_method=method).match(pathinfo)
         viewclass = self.app.view_functions[viewfunction].view_class
         viewfn = getattr(viewclass, method.lower())
 
+        lock = None
+        read = method in self.READ_METHODS
         if not hasattr(viewfn, "is_threadsafe"):
-            self.threadLock.acquire()
+            key = self.lock_key(pathinfo, view_args)
+            lock = self.get_lock(key)
+            start = time.time()
+            if read:
+                lock.acquire_read()
+            else:
+                lock.acquire_write()
+            self.__record_wait(key, read, time.time() - start)
 
         try:
             res = self.wsgi_app(environ, start_response)
@@ -71,7 +217,10 @@ class RestSyncMiddleware(object):
             logger.exception(e)
             res = None
         finally:
-            if not hasattr(viewfn, "is_threadsafe"):
-                self.threadLock.release()
+            if lock is not None:
+                if read:
+                    lock.release_read()
+                else:
+                    lock.release_write()
 
         return res
@@ -29,11 +29,9 @@ health of the servers (by a nagios compatible system).
 import logging
 import string
 from flask_restful_swagger import swagger
-from datetime import datetime, timedelta
 from hbp_nrp_backend.simulation_control import simulations
 from hbp_nrp_backend.rest_server.RestSyncMiddleware import RestSyncMiddleware
 from flask_restful import Resource
-from pytz import timezone
 
 # pylint: disable=R0201
 
@@ -73,11 +71,7 @@ class Last24HoursErrorCheck(Resource):
         """
         Get a nagios status regarding the number of errors that happened in the last 24 hours.
         """
-        has_simulation_been_run_in_the_last_24h = lambda simulation: (datetime.now(
-                tz=timezone('Europe/Zurich')) - simulation.creation_datetime) < timedelta(1)
-        filtered_simulations = filter(has_simulation_been_run_in_the_last_24h, simulations)
-        number_of_errors = sum(simulation.errors for simulation in filtered_simulations)
-        number_of_simulations = len(filtered_simulations)
+        number_of_errors, number_of_simulations = simulations.errors(recent=True)
         status = {'state': _get_level(number_of_errors, number_of_simulations),
                   'errors': number_of_errors,
                   'simulations': number_of_simulations}
@@ -105,8 +99,7 @@ class TotalErrorCheck(Resource):
         """
         Get a nagios status regarding the number of errors that happened since the server started.
         """
-        number_of_errors = sum(simulation.errors for simulation in simulations)
-        number_of_simulation = len(simulations)
+        number_of_errors, number_of_simulation = simulations.errors()
         status = {'state': _get_level(number_of_errors, number_of_simulation),
                   'errors': number_of_errors,
                   'simulations': number_of_simulation}
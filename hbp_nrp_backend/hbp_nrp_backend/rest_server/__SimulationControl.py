@@ -53,9 +53,10 @@ def _get_simulation_or_abort(sim_id):
 
     :param sim_id: The simulation id
     """
-    if sim_id < 0 or sim_id >= len(simulations):
+    simulation = simulations.get(sim_id)
+    if simulation is None:
         abort(404)
-    return simulations[sim_id]
+    return simulation
 
 
 class SimulationControl(Resource):
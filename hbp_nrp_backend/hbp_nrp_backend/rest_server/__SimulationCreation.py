@@ -0,0 +1,152 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains the REST implementation returning the progress of the asynchronous
+creation of a simulation
+"""
+
+from flask_restful import Resource, fields
+from flask_restful_swagger import swagger
+
+from hbp_nrp_backend import NRPServicesClientErrorException, NRPServicesWrongUserException
+from hbp_nrp_backend.rest_server import ErrorMessages
+from hbp_nrp_backend.rest_server.RestSyncMiddleware import RestSyncMiddleware
+from hbp_nrp_backend.rest_server.__SimulationControl import _get_simulation_or_abort
+from hbp_nrp_backend.simulation_control import creation_jobs
+from hbp_nrp_backend.__UserAuthentication import UserAuthentication
+
+from hbp_nrp_commons.bibi_functions import docstring_parameter
+from hbp_nrp_commons.SpanTracer import SpanTracer
+
+# pylint: disable=no-self-use
+
+
+class SimulationCreation(Resource):
+    """
+    REST service polled for the progress of a simulation created asynchronously
+    """
+
+    @swagger.model
+    class _CreationJob(object):
+        """
+        Represents the creation job of a simulation. Only used for swagger documentation
+        """
+
+        resource_fields = {
+            'simulationID': fields.Integer,
+            'state': fields.String,
+            'simulationState': fields.String,
+            'error': fields.String,
+            'queuedSeconds': fields.Float,
+            'runningSeconds': fields.Float,
+            'phases': fields.List(fields.Raw)
+        }
+        required = ['simulationID', 'state', 'simulationState', 'queuedSeconds', 'phases']
+
+    @swagger.operation(
+        notes='Gets the progress of the initialization of a simulation created asynchronously',
+        responseClass=_CreationJob.__name__,
+        parameters=[
+            {
+                "name": "sim_id",
+                "required": True,
+                "description": "The ID of the simulation whose creation shall be returned",
+                "paramType": "path",
+                "dataType": int.__name__
+            }
+        ],
+        responseMessages=[
+            {
+                "code": 404,
+                "message": ErrorMessages.SIMULATION_NOT_FOUND_404
+            },
+            {
+                "code": 401,
+                "message": ErrorMessages.SIMULATION_PERMISSION_401_VIEW
+            },
+            {
+                "code": 200,
+                "message": "Success. The progress of the creation is retrieved"
+            }
+        ]
+    )
+    @docstring_parameter(ErrorMessages.SIMULATION_NOT_FOUND_404,
+                         ErrorMessages.SIMULATION_PERMISSION_401_VIEW)
+    @RestSyncMiddleware.threadsafe
+    def get(self, sim_id):
+        """
+        Gets the progress of the initialization of a simulation created asynchronously
+
+        :param sim_id: The simulation id
+
+        :> json int simulationID: The id of the simulation
+        :> json string state: The state of the creation: queued, running, done or failed
+        :> json string simulationState: The current state of the simulation
+        :> json string error: The reason of the failure, if the creation failed
+        :> json float queuedSeconds: The time the creation waited to be started
+        :> json float runningSeconds: The time the creation has been running
+        :> json array phases: The completed phases of the creation, with their start and
+                              duration in milliseconds
+
+        :status 404: {0}
+        :status 401: {1}
+        :status 200: Success. The progress of the creation is retrieved
+        """
+        simulation = _get_simulation_or_abort(sim_id)
+
+        if not UserAuthentication.can_view(simulation):
+            raise NRPServicesWrongUserException()
+
+        job = creation_jobs.get(sim_id)
+        if job is None:
+            raise NRPServicesClientErrorException(
+                "The simulation {0} was not created asynchronously".format(sim_id),
+                error_code=404)
+
+        return {
+            'simulationID': sim_id,
+            'state': job.state,
+            'simulationState': simulation.state,
+            'error': job.error,
+            'queuedSeconds': job.queued_seconds,
+            'runningSeconds': job.running_seconds,
+            'phases': _get_phases(sim_id)
+        }, 200
+
+
+def _get_phases(sim_id):
+    """
+    Gets the completed spans of the launch of a simulation, relative to the first one
+
+    :param sim_id: The simulation id
+    :return: A list of phases, with their name, start and duration in milliseconds
+    """
+    timeline = SpanTracer.timeline(sim_id)
+    if timeline is None:
+        return []
+    spans = [event for event in timeline['traceEvents'] if event.get('ph') == 'X']
+    origin = min(span['ts'] for span in spans) if spans else 0
+    return [{'name': span['name'],
+             'start': (span['ts'] - origin) / 1000.,
+             'duration': span['dur'] / 1000.} for span in spans]
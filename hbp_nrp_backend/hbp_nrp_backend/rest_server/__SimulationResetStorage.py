@@ -29,8 +29,13 @@ Using the storage
 __author__ = "Alessandro Ambrosano, Ugo Albanese, Georg Hinkel, Manos Angelidis"
 
 import os
-import logging
+import time
 import json
+import logging
+import hashlib
+import weakref
+import collections
+from contextlib import contextmanager
 
 from cle_ros_msgs import srv, msg
 from cle_ros_msgs.msg import ExperimentPopulationInfo
@@ -55,9 +60,29 @@ from hbp_nrp_commons.workspace.SimUtil import SimUtil
 
 logger = logging.getLogger(__name__)
 
+# the digest of the world every simulation is reset to when it is not sent a world, None if it is
+# unknown
+_reset_worlds = weakref.WeakKeyDictionary()
+
 # pylint: disable=no-self-use
 
 
+@contextmanager
+def _timed(timings, phase):
+    """
+    Records the duration of a phase of a reset
+
+    :param timings: an ordered dictionary of the durations in seconds, None not to record them
+    :param phase: the name of the phase
+    """
+    start = time.time()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[phase] = round(time.time() - start, 3)
+
+
 class SimulationResetStorage(Resource):
     """
     This resource handles the reset of a simulation, forwarding all the reset requests to the
@@ -133,6 +158,8 @@ class SimulationResetStorage(Resource):
                           values are given in
                           GazeboRosPackages/src/cle_ros_msgs/srv/ResetSimulation.srv
 
+        :< json object timings: for a full reset, the duration of every phase in seconds
+
         :status 500: {0}
         :status 404: {1}
         :status 401: {2}
@@ -164,16 +191,26 @@ class SimulationResetStorage(Resource):
                 sim.cle.reset(reset_type,
                               world_sdf=self._get_sdf_world_from_storage(experiment_id, context_id))
             elif reset_type == rsr.RESET_FULL:
-                brain_path, populations, _ = \
-                    self._get_brain_info_from_storage(experiment_id, context_id)
-
+                timings = collections.OrderedDict()
                 if sim.playback_path is None:
-                    self.reset_from_storage_all(sim, experiment_id, context_id)
-
-                sim.cle.reset(reset_type,
-                              world_sdf=self._get_sdf_world_from_storage(experiment_id, context_id),
-                              brain_path=brain_path,
-                              populations=populations)
+                    world_sdf, brain_path, populations = \
+                        self.reset_from_storage_all(sim, experiment_id, context_id, timings)
+                else:
+                    with _timed(timings, 'fetch'):
+                        brain_path, populations, _ = \
+                            self._get_brain_info_from_storage(experiment_id, context_id)
+                        world_sdf = self._get_sdf_world_from_storage(experiment_id, context_id)
+
+                with _timed(timings, 'cle_reset'):
+                    # without a world the simulation is reset to the world it has loaded. The brain
+                    # is always sent, the CLE would otherwise reload the brain it was launched
+                    # with instead of the one set from the storage
+                    sim.cle.reset(reset_type, world_sdf=world_sdf, brain_path=brain_path,
+                                  populations=populations)
+
+                logger.info("Full reset of simulation %s: %s", sim_id, ', '.join(
+                    '{0} {1:.3f}s'.format(*timing) for timing in timings.iteritems()))
+                return {'timings': timings}, 200
             else:
                 return {}, 400  # Other reset modes are unsupported
 
@@ -183,65 +220,115 @@ class SimulationResetStorage(Resource):
         return {}, 200
 
     @classmethod
-    def reset_from_storage_all(cls, simulation, experiment_id, context_id):
+    def reset_from_storage_all(cls, simulation, experiment_id, context_id, timings=None):
         """
-        Reset states machines and transfer functions
-
-        :param: the simulation id
-        :param: the experiment id
-        :param: the context_id for collab based simulations
+        Reset states machines and transfer functions, and the brain if it has changed.
+        The experiment files are cloned from the storage once, then compared with what the
+        simulation has loaded so that only the differences are applied.
+
+        :param simulation: the simulation
+        :param experiment_id: the experiment id
+        :param context_id: the context_id for collab based simulations
+        :param timings: (optional) an ordered dictionary receiving the duration of every phase
+        :return: a tuple with the world sdf, None if the simulation can be reset to the world it
+                 has loaded, the path to the brain file and the populations, which the reset of
+                 the CLE must load in any case
         """
+        if simulation not in _reset_worlds:
+            # the world the simulation was launched with, read before the clone replaces it
+            _reset_worlds[simulation] = cls._get_world_digest(simulation.lifecycle.experiment_path)
+
+        with _timed(timings, 'fetch'):
+            SimUtil.clear_dir(simulation.lifecycle.sim_dir)
+
+            token = UserAuthentication.get_header_token()
+            cls.storage_client.clone_all_experiment_files(
+                token, experiment_id, destination_dir=simulation.lifecycle.sim_dir)
 
-        SimUtil.clear_dir(simulation.lifecycle.sim_dir)
+            with open(simulation.lifecycle.experiment_path) as exc_file:
+                exc = exp_conf_api_gen.CreateFromDocument(exc_file.read())
 
-        token = UserAuthentication.get_header_token()
-        cls.storage_client.clone_all_experiment_files(
-            token, experiment_id, destination_dir=simulation.lifecycle.sim_dir)
+            base_path = os.path.dirname(simulation.lifecycle.experiment_path)
+            with open(os.path.join(base_path, exc.bibiConf.src)) as bibi_file:
+                bibi = bibi_api_gen.CreateFromDocument(bibi_file.read())
 
-        with open(simulation.lifecycle.experiment_path) as exc_file:
-            exc = exp_conf_api_gen.CreateFromDocument(exc_file.read())
+            brain_info = cls._get_brain_info_from_bibi(bibi, base_path)
+            world_sdf = cls._get_world(exc, base_path, token, experiment_id)
 
-        bibi_path = os.path.join(os.path.dirname(simulation.lifecycle.experiment_path),
-                                 exc.bibiConf.src)
-        with open(bibi_path) as bibi_file:
-            bibi = bibi_api_gen.CreateFromDocument(bibi_file.read())
+        with _timed(timings, 'brain'):
+            cls.reset_brain(simulation, experiment_id, context_id, brain_info)
+        with _timed(timings, 'transfer_functions'):
+            cls.reset_transfer_functions(simulation, bibi, simulation.lifecycle.sim_dir)
+        with _timed(timings, 'state_machines'):
+            cls.reset_state_machines(simulation, exc, simulation.lifecycle.sim_dir)
 
-        cls.reset_brain(simulation, experiment_id, context_id)
-        cls.reset_transfer_functions(simulation, bibi, simulation.lifecycle.sim_dir)
-        cls.reset_state_machines(simulation, exc, simulation.lifecycle.sim_dir)
+        if _reset_worlds[simulation] == hashlib.sha1(world_sdf).hexdigest():
+            return None, brain_info[0], brain_info[1]
+        # the world the simulation is reset to without being sent one is not known anymore
+        _reset_worlds[simulation] = None
+        return world_sdf, brain_info[0], brain_info[1]
 
     @classmethod
-    def reset_brain(cls, simulation, experiment_id, context_id):
+    def reset_brain(cls, simulation, experiment_id, context_id, brain_info=None):
         """
-        Reset brain
+        Reset brain, unless the simulation already runs the same brain with the same populations
 
         :param simulation: simulation object
         :param experiment_id: the related experiment id
         :param context_id: the context ID for collab based simulations
+        :param brain_info: (optional) the brain information of the experiment, fetched from the
+                           storage if not given
         """
-        brain_path, _, neurons_config = cls._get_brain_info_from_storage(experiment_id, context_id)
+        if brain_info is None:
+            brain_info = cls._get_brain_info_from_storage(experiment_id, context_id)
+        brain_path, _, neurons_config = brain_info
 
         # Convert the populations to a JSON dictionary
+        populations = dict(neurons_config)
         for name, s in neurons_config.iteritems():
             # Convert slice to a dictionary for Non-Spinnaker brains
             experiment_population = SimulationResetStorage._get_experiment_population(name, s)
             if (experiment_population.type != ExperimentPopulationInfo.TYPE_POPULATION_SPINNAKER):
-                neurons_config[name] = {
+                populations[name] = {
                     'from': s.start,
                     'to': s.stop,
                     'step': s.step if s.step > 0 else 1}
 
         with open(brain_path, 'r') as brain_file:
-            result_set_brain = simulation.cle.set_simulation_brain(
-                brain_type='py',
-                data_type='text',
-                data=brain_file.read(),
-                brain_populations=json.dumps(neurons_config))
+            brain_data = brain_file.read()
 
-            if result_set_brain is not None and result_set_brain.error_message:
-                # Error in given brain
-                raise ROSCLEClientException('{err}, column: {col}'.format(
-                    err=result_set_brain.error_message, col=result_set_brain.error_column))
+        if cls._is_brain_loaded(simulation, brain_data, populations):
+            logger.info("The brain of simulation %s is unchanged", simulation.sim_id)
+            return
+
+        result_set_brain = simulation.cle.set_simulation_brain(
+            brain_type='py',
+            data_type='text',
+            data=brain_data,
+            brain_populations=json.dumps(populations))
+
+        if result_set_brain is not None and result_set_brain.error_message:
+            # Error in given brain
+            raise ROSCLEClientException('{err}, column: {col}'.format(
+                err=result_set_brain.error_message, col=result_set_brain.error_column))
+
+    @staticmethod
+    def _is_brain_loaded(simulation, brain_data, populations):
+        """
+        Checks whether the simulation runs a brain script with the given populations
+
+        :param simulation: simulation object
+        :param brain_data: the source of the brain script
+        :param populations: the populations, as sent to the CLE
+        :return: True if the brain is loaded already, False if it is not or cannot be checked
+        """
+        # pylint: disable=broad-except
+        try:
+            loaded = simulation.cle.get_simulation_brain()
+            return (loaded.brain_data == brain_data and
+                    json.loads(loaded.brain_populations) == populations)
+        except Exception:
+            return False
 
     @staticmethod
     def reset_state_machines(sim, experiment, sm_base_path):
@@ -274,27 +361,47 @@ class SimulationResetStorage(Resource):
     @staticmethod
     def reset_transfer_functions(simulation, bibi_conf, base_path):
         """
-        Reset transfer functions
+        Reset transfer functions. Only the transfer functions which differ from those of the BIBI
+        configuration are deleted, edited, added or activated again.
 
         :param simulation: simulation object
         :param bibi_conf: BIBI conf
         :param base_path: base path of the experiment
         """
-        old_tfs, _ = simulation.cle.get_simulation_transfer_functions()
+        old_tfs, old_active = simulation.cle.get_simulation_transfer_functions()
 
-        for old_tf_name in (get_tf_name(old_tf) for old_tf in old_tfs):
+        loaded = collections.OrderedDict()
+        for index, old_tf in enumerate(old_tfs):
+            old_tf_name = get_tf_name(old_tf)
             if old_tf_name is not None:  # ignore broken TFs
-                simulation.cle.delete_simulation_transfer_function(old_tf_name)
+                active = old_active[index] if index < len(old_active) else True
+                loaded[old_tf_name] = (old_tf.strip(), active)
 
+        tfs = collections.OrderedDict()
         for tf in bibi_conf.transferFunction:
             tf_code = '{}\n'.format(correct_indentation(generate_tf(tf, base_path), 0).strip())
+            tfs[get_tf_name(tf_code) or tf_code] = tf_code
+
+        for old_tf_name in loaded:
+            if old_tf_name not in tfs:
+                simulation.cle.delete_simulation_transfer_function(old_tf_name)
 
-            logger.debug(" RESET TF: {tf_name}\n{tf_code}\n"
-                         .format(tf_name=get_tf_name(tf_code), tf_code=tf_code))
-            # adding original TFs from the bibi
+        for tf_name, tf_code in tfs.iteritems():
             # do not check the error message.
             # CLE will handle also invalid TFs
-            simulation.cle.add_simulation_transfer_function(str(tf_code))
+            if tf_name not in loaded:
+                logger.debug(" RESET TF: {tf_name}\n{tf_code}\n"
+                             .format(tf_name=tf_name, tf_code=tf_code))
+                # adding original TFs from the bibi
+                simulation.cle.add_simulation_transfer_function(str(tf_code))
+                continue
+            old_tf, active = loaded[tf_name]
+            if old_tf != tf_code.strip():
+                logger.debug(" RESET TF: {tf_name}\n{tf_code}\n"
+                             .format(tf_name=tf_name, tf_code=tf_code))
+                simulation.cle.edit_simulation_transfer_function(tf_name, str(tf_code))
+            if not active:
+                simulation.cle.activate_simulation_transfer_function(tf_name, True)
 
     @classmethod
     def _get_brain_info_from_storage(cls, experiment_id, context_id):
@@ -324,7 +431,23 @@ class SimulationResetStorage(Resource):
 
         brain_filepath = cls.storage_client.clone_file(brain_filename, request_token, experiment_id)
 
-        neurons_config = get_all_neurons_as_dict(bibi_file_obj.brainModel.populations)
+        return cls._get_brain_info_from_bibi(bibi_file_obj, None, brain_filepath)
+
+    @staticmethod
+    def _get_brain_info_from_bibi(bibi, base_path, brain_filepath=None):
+        """
+        Gathers the brain script and the populations of a BIBI configuration
+
+        :param bibi: the BIBI configuration
+        :param base_path: the directory containing the brain script
+        :param brain_filepath: (optional) the path to the brain script, overrides base_path
+        :return: A tuple with the path to the brain file, a list of populations and the
+                 dictionary of the populations
+        """
+        if brain_filepath is None:
+            brain_filepath = os.path.join(base_path, os.path.basename(bibi.brainModel.file))
+
+        neurons_config = get_all_neurons_as_dict(bibi.brainModel.populations)
 
         neurons_config_clean = \
             [SimulationResetStorage._get_experiment_population(name, v)
@@ -353,6 +476,44 @@ class SimulationResetStorage(Resource):
         return msg.ExperimentPopulationInfo(name=name, type=type_id, ids=[],
                                             start=0, stop=0, step=0)
 
+    @staticmethod
+    def _get_world_digest(experiment_path):
+        """
+        Gets the digest of the world file of an experiment cloned locally
+
+        :param experiment_path: the path to the local experiment configuration
+        :return: the SHA-1 digest of the world file, None if it cannot be read
+        """
+        # pylint: disable=broad-except
+        try:
+            with open(experiment_path) as exc_file:
+                exc = exp_conf_api_gen.CreateFromDocument(exc_file.read())
+            with open(os.path.join(os.path.dirname(experiment_path),
+                                   exc.environmentModel.src)) as world_file:
+                return hashlib.sha1(world_file.read()).hexdigest()
+        except Exception:
+            return None
+
+    @classmethod
+    def _get_world(cls, exc, base_path, token, experiment_id):
+        """
+        Gets the world of an experiment, from the local clone if it contains the world file,
+        from the storage otherwise
+
+        :param exc: the experiment configuration
+        :param base_path: the directory of the local clone
+        :param token: the request token
+        :param experiment_id: the experiment id
+        :return: The content of the world sdf file
+        """
+        world_path = os.path.join(base_path, exc.environmentModel.src)
+        if os.path.isfile(world_path):
+            with open(world_path) as world_file:
+                return world_file.read()
+        world_sdf = cls.storage_client.get_file(
+            token, experiment_id, exc.environmentModel.src, by_name=True)
+        return world_sdf.encode('utf-8') if isinstance(world_sdf, unicode) else world_sdf
+
     @classmethod
     def _get_sdf_world_from_storage(cls, experiment_id, context_id):
         """
@@ -27,25 +27,43 @@ This module contains the REST services to setup the simulation
 
 __author__ = 'GeorgHinkel'
 
-from hbp_nrp_backend.simulation_control import simulations, Simulation
+from hbp_nrp_backend.simulation_control import simulations, Simulation, creation_jobs
 from hbp_nrp_backend import NRPServicesClientErrorException
-from hbp_nrp_backend.rest_server import api
+from hbp_nrp_backend.rest_server import api, app
 from hbp_nrp_backend.rest_server.RestSyncMiddleware import RestSyncMiddleware
 from hbp_nrp_backend.rest_server.__SimulationControl import SimulationControl
+from hbp_nrp_backend.rest_server.__SimulationCreation import SimulationCreation
 from hbp_nrp_backend.__UserAuthentication import UserAuthentication
-from flask import request
+from flask import request, copy_current_request_context
 from flask_restful import Resource, fields, marshal, marshal_with
 from flask_restful_swagger import swagger
 import logging
 import time
 import random
 import threading
+import contextlib
 
 # pylint: disable=R0201
 
 logger = logging.getLogger(__name__)
 
 
+@contextlib.contextmanager
+def _hold_simulation(sim_id):
+    """
+    Holds the lock of the requests to a simulation, as a request modifying it would
+
+    :param sim_id: The simulation id
+    """
+    sync = app.wsgi_app
+    if not isinstance(sync, RestSyncMiddleware):
+        # the requests are not synchronized, e.g. in the tests
+        yield
+        return
+    with sync.hold(RestSyncMiddleware.lock_key(None, {'sim_id': sim_id})):
+        yield
+
+
 class SimulationService(Resource):
     """
     The module to setup simulations
@@ -68,7 +86,8 @@ class SimulationService(Resource):
             'state': fields.String(),
             'private': fields.Boolean,
             'playbackPath': fields.String(),
-            'ctx-id': fields.String()
+            'ctx-id': fields.String(),
+            'async': fields.Boolean
         }
         required = ['experimentID']
 
@@ -100,6 +119,14 @@ class SimulationService(Resource):
             {
                 "code": 201,
                 "message": "Simulation created successfully"
+            },
+            {
+                "code": 202,
+                "message": "Simulation created, it is initialized in the background"
+            },
+            {
+                "code": 503,
+                "message": "Too many simulations are being created"
             }
         ],
     )
@@ -118,6 +145,8 @@ class SimulationService(Resource):
         :< json string playbackPath: Path to simulation recording to play (optional)
         :< json string ctx-id: The context id of the collab if we are running a collab based
                                simulation
+        :< json boolean async: Initialize the simulation in the background and return right
+                               away, its progress is polled at the returned location
 
         :> json string owner: The simulation owner (Unified Portal user name or 'hbp-default')
         :> json integer simulationID: The id of the simulation (needed for further REST calls)
@@ -128,19 +157,23 @@ class SimulationService(Resource):
         :status 400: Experiment configuration is not valid
         :status 401: gzserverHost is not valid
         :status 402: Another simulation is already running on the server
+        :status 503: Too many simulations are being created
         :status 201: Simulation created successfully
+        :status 202: Simulation created, it is initialized in the background
         """
         # Use context manager to lock access to simulations while a new simulation is created
         with SimulationService.comm_lock:
             body = request.get_json(force=True)
-            sim_id = len(simulations)
+            sim_id = simulations.next_id
             if 'experimentID' not in body:
                 raise NRPServicesClientErrorException('Experiment ID not given.')
 
             if ('gzserverHost' in body) and (body.get('gzserverHost') not in ['local', 'lugano']):
                 raise NRPServicesClientErrorException('Invalid gazebo server host.', error_code=401)
 
-            if True in [s.state not in ['stopped', 'failed'] for s in simulations]:
+            # one simulation at a time, the simulation directory and the storage client are
+            # shared by the simulations of this host
+            if simulations.active():
                 raise NRPServicesClientErrorException(
                     'Another simulation is already running on the server.', error_code=409)
 
@@ -175,11 +208,29 @@ class SimulationService(Resource):
             # TODO: remove me. I probably am not used anywhere
             sim.creationUniqueID = body.get('creationUniqueID', str(time.time() + random.random()))
 
+            if body.get('async', False):
+                @copy_current_request_context
+                def initialize():
+                    """
+                    Initializes the simulation with the headers of the creation request
+                    """
+                    with _hold_simulation(sim_id):
+                        sim.state = "initialized"
+
+                # a full queue rejects the simulation before it is registered
+                creation_jobs.submit(sim_id, initialize)
+                simulations.append(sim)
+
+                return marshal(sim, Simulation.resource_fields), 202, {
+                    'location': api.url_for(SimulationCreation, sim_id=sim_id),
+                    'gzserverHost': sim_gzserver_host
+                }
+
             simulations.append(sim)
 
         sim.state = "initialized"
 
-        return marshal(simulations[sim_id], Simulation.resource_fields), 201, {
+        return marshal(sim, Simulation.resource_fields), 201, {
             'location': api.url_for(SimulationControl, sim_id=sim_id),
             'gzserverHost': sim_gzserver_host
         }
@@ -218,4 +269,4 @@ class SimulationService(Resource):
         """
         # Acquire lock before getting simulation
         with SimulationService.comm_lock:
-            return simulations, 200
+            return simulations.listing(), 200
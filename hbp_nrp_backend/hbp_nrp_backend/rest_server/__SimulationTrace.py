@@ -0,0 +1,102 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains the REST implementation returning the timeline of a simulation launch
+"""
+
+from flask_restful import Resource
+from flask_restful_swagger import swagger
+
+from hbp_nrp_backend import NRPServicesWrongUserException
+from hbp_nrp_backend.rest_server import ErrorMessages
+from hbp_nrp_backend.rest_server.__SimulationControl import _get_simulation_or_abort
+from hbp_nrp_backend.__UserAuthentication import UserAuthentication
+
+from hbp_nrp_commons.bibi_functions import docstring_parameter
+from hbp_nrp_commons.SpanTracer import SpanTracer
+
+# pylint: disable=no-self-use
+
+
+class SimulationTrace(Resource):
+    """
+    REST service returning the spans recorded while a simulation was launched
+    """
+
+    @swagger.operation(
+        notes='Gets the timeline of the launch of a simulation, in the Chrome trace event format',
+        parameters=[
+            {
+                "name": "sim_id",
+                "required": True,
+                "description": "The ID of the simulation whose launch timeline shall be returned",
+                "paramType": "path",
+                "dataType": int.__name__
+            }
+        ],
+        responseMessages=[
+            {
+                "code": 404,
+                "message": ErrorMessages.SIMULATION_NOT_FOUND_404
+            },
+            {
+                "code": 401,
+                "message": ErrorMessages.SIMULATION_PERMISSION_401_VIEW
+            },
+            {
+                "code": 204,
+                "message": "No span has been recorded for the simulation"
+            },
+            {
+                "code": 200,
+                "message": "Success. The timeline of the launch is retrieved"
+            }
+        ]
+    )
+    @docstring_parameter(ErrorMessages.SIMULATION_NOT_FOUND_404,
+                         ErrorMessages.SIMULATION_PERMISSION_401_VIEW)
+    def get(self, sim_id):
+        """
+        Gets the timeline of the launch of a simulation, recorded by the backend and by the CLE
+        server. It can be loaded into chrome://tracing or https://ui.perfetto.dev
+
+        :param sim_id: The simulation id
+
+        :> json array traceEvents: the spans, with their start and duration in microseconds
+
+        :status 404: {0}
+        :status 401: {1}
+        :status 204: No span has been recorded for the simulation
+        :status 200: Success. The timeline of the launch is retrieved
+        """
+        simulation = _get_simulation_or_abort(sim_id)
+
+        if not UserAuthentication.can_view(simulation):
+            raise NRPServicesWrongUserException()
+
+        timeline = SpanTracer.timeline(sim_id)
+        if timeline is None:
+            return {}, 204
+
+        return timeline, 200
@@ -32,7 +32,8 @@ from flask_restful_swagger import swagger
 from flask_restful import Resource, fields
 
 from hbp_nrp_backend import NRPServicesTransferFunctionException, \
-    NRPServicesWrongUserException, NRPServicesDuplicateNameException
+    NRPServicesWrongUserException, NRPServicesDuplicateNameException, \
+    NRPServicesClientErrorException
 from hbp_nrp_backend.rest_server import ErrorMessages
 from hbp_nrp_backend.rest_server.__SimulationControl import _get_simulation_or_abort
 from hbp_nrp_backend.__UserAuthentication import UserAuthentication
@@ -243,6 +244,91 @@ class SimulationTransferFunctions(Resource):
 
         return 200
 
+    @swagger.operation(
+        notes='Adds or modifies a set of transfer functions at once. If any of them fails, none '
+              'is applied.',
+        responseClass=int.__name__,
+        parameters=[
+            {
+                "name": "sim_id",
+                "required": True,
+                "description": "The ID of the simulation whose transfer functions will be modified",
+                "paramType": "path",
+                "dataType": int.__name__
+            },
+            {
+                "name": "body",
+                "description": "The source code of the transfer functions to modify, or to add, "
+                               "by name",
+                "required": True,
+                "paramType": "body",
+                "dataType": TransferFunctionDictionary.__name__
+            }
+        ],
+        responseMessages=[
+            {
+                "code": 404,
+                "message": ErrorMessages.SIMULATION_NOT_FOUND_404
+            },
+            {
+                "code": 403,
+                "message": ErrorMessages.DUPLICATE_NAME_403
+            },
+            {
+                "code": 401,
+                "message": ErrorMessages.SIMULATION_PERMISSION_401
+            },
+            {
+                "code": 400,
+                "message": ErrorMessages.SOURCE_CODE_ERROR_400
+            },
+            {
+                "code": 200,
+                "message": "Success. The transfer functions were successfully applied"
+            }
+        ]
+    )
+    @docstring_parameter(ErrorMessages.SIMULATION_NOT_FOUND_404,
+                         ErrorMessages.DUPLICATE_NAME_403,
+                         ErrorMessages.SIMULATION_PERMISSION_401,
+                         ErrorMessages.SOURCE_CODE_ERROR_400)
+    def put(self, sim_id):
+        """
+        Adds or modifies a set of transfer functions at once. The transfer functions are compiled
+        together and swapped in with a single pause of the simulation. If any of them fails, none
+        is applied.
+
+        :param sim_id: The simulation ID
+
+        :< json dict body: The source code of the transfer functions by name, the name of a new
+                           transfer function being the name of its definition
+
+        :status 404: {0}
+        :status 403: {1}
+        :status 401: {2}
+        :status 400: {3}
+        :status 200: Success. The transfer functions were successfully applied
+        """
+        simulation = _get_simulation_or_abort(sim_id)
+        if not UserAuthentication.can_modify(simulation):
+            raise NRPServicesWrongUserException()
+
+        transfer_functions = request.get_json(force=True)
+        if not isinstance(transfer_functions, dict):
+            raise NRPServicesClientErrorException(
+                "The transfer functions must be given as an object of sources by name")
+
+        errors = simulation.cle.apply_simulation_transfer_functions(transfer_functions)
+        if errors:
+            ex_msg = "Applying the Transfer Functions failed:\n{errors}".format(
+                errors="\n".join("{0}: {1}".format(error['name'], error['message'])
+                                 for error in errors))
+            raise NRPServicesDuplicateNameException(ex_msg) \
+                if any("duplicate" in error['message'] for error in errors) \
+                else NRPServicesTransferFunctionException(ex_msg)
+
+        return 200
+
 
 class SimulationTransferFunction(Resource):
     """
@@ -100,6 +100,8 @@ from hbp_nrp_backend.rest_server.__SimulationStructuredTransferFunctions import
     SimulationConvertRawToStructuredTransferFunction
 from hbp_nrp_backend.rest_server.__SimulationTimeout import SimulationTimeout
 from hbp_nrp_backend.rest_server.__SimulationTopics import SimulationTopics
+from hbp_nrp_backend.rest_server.__SimulationTrace import SimulationTrace
+from hbp_nrp_backend.rest_server.__SimulationCreation import SimulationCreation
 from hbp_nrp_backend.rest_server.__SimulationRecorder import SimulationRecorder
 from hbp_nrp_backend.rest_server.__SimulationResourcesCloner import SimulationResourcesCloner
 from hbp_nrp_backend.rest_server.__SimulationRobot import SimulationRobots, SimulationRobot
@@ -119,6 +121,8 @@ api.add_resource(SimulationResetStorage,
 api.add_resource(SimulationService, '/simulation')
 api.add_resource(SimulationState, '/simulation/<int:sim_id>/state')
 api.add_resource(SimulationTimeout, '/simulation/<int:sim_id>/extend_timeout')
+api.add_resource(SimulationTrace, '/simulation/<int:sim_id>/trace')
+api.add_resource(SimulationCreation, '/simulation/<int:sim_id>/creation')
 api.add_resource(SimulationStateMachine,
                  '/simulation/<int:sim_id>/state-machines/<string:state_machine_name>')
 api.add_resource(SimulationStateMachines,
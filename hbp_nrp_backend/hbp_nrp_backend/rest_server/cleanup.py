@@ -54,7 +54,7 @@ def remove_old_simulations():
     """
     logger.info("Start cleanup")
     current_time = datetime.datetime.now(timezone)
-    for sim in simulations:
+    for sim in simulations.active():
         kill_time_reached = sim.kill_datetime is not None and sim.kill_datetime < current_time
         max_simtime_reached = (
                 sim.creation_datetime
@@ -0,0 +1,99 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Unit tests for the cache of the authentication requests
+"""
+
+import time
+import threading
+import unittest
+from mock import MagicMock
+from hbp_nrp_backend.__AuthCache import AuthCache
+
+
+class TestAuthCache(unittest.TestCase):
+
+    def test_hit_and_expiry(self):
+        cache = AuthCache('Test', ttl=0.1, negative_ttl=0, max_size=10)
+        lookup = MagicMock(side_effect=['first', 'second'])
+
+        self.assertEqual(cache.get('key', lookup), 'first')
+        self.assertEqual(cache.get('key', lookup), 'first')
+        time.sleep(0.15)
+        self.assertEqual(cache.get('key', lookup), 'second')
+
+        stats = cache.stats
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertGreaterEqual(stats['lookup_seconds'], 0)
+
+    def test_failed_lookup(self):
+        cache = AuthCache('Test', ttl=60, negative_ttl=0.1, max_size=10)
+        lookup = MagicMock(side_effect=[Exception('Storage down'), True])
+
+        self.assertFalse(cache.get('key', lookup, default=False))
+        self.assertFalse(cache.get('key', lookup, default=False))
+        self.assertEqual(lookup.call_count, 1)
+        time.sleep(0.15)
+        self.assertTrue(cache.get('key', lookup, default=False))
+        self.assertEqual(cache.stats['failures'], 1)
+
+    def test_eviction(self):
+        cache = AuthCache('Test', ttl=60, negative_ttl=0, max_size=2)
+        cache.get('a', lambda: 1)
+        cache.get('b', lambda: 2)
+        cache.get('a', lambda: None)
+        cache.get('c', lambda: 3)
+
+        # b is the least recently used entry
+        self.assertEqual(cache.get('a', lambda: None), 1)
+        self.assertEqual(cache.get('b', lambda: 4), 4)
+        self.assertEqual(cache.stats['evictions'], 2)
+
+        cache.clear()
+        self.assertEqual(cache.get('a', lambda: 5), 5)
+
+    def test_single_lookup(self):
+        cache = AuthCache('Test', ttl=60, negative_ttl=0, max_size=10)
+        release = threading.Event()
+        lookup = MagicMock(side_effect=lambda: release.wait(5) and 'owner')
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(cache.get('token', lookup)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        deadline = time.time() + 5
+        while cache.stats['coalesced'] < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['owner'] * 5)
+        self.assertEqual(lookup.call_count, 1)
+        self.assertEqual(cache.stats['coalesced'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -56,7 +56,7 @@ class TestCleanup(unittest.TestCase):
         sim3.creation_datetime = datetime.now(timezone) - timedelta(seconds=Settings.MAX_SIMULATION_TIMEOUT)
         sim3.state = 'running'
 
-        simulations.__iter__.return_value = [sim, sim2, sim3]
+        simulations.active.return_value = [sim, sim2, sim3]
         cleanup.remove_old_simulations()
         assert sim.state == 'stopped'
         assert sim2.state == 'running'
@@ -40,7 +40,7 @@ from hbp_nrp_backend.cle_interface.ROSCLEClient import ROSCLEClientException
 class TestErrorHandlers(RestTest):
 
     def setUp(self):
-        del simulations[:]
+        simulations.clear()
         simulations.append(Simulation(0, 'experiment1', 'default-owner', 'local', 'view', state='paused'))
 
     def test_general_500_error(self):
@@ -59,7 +59,7 @@ class TestHealth(RestTest):
         return m
 
     def setUp(self):
-        del simulations[:]
+        simulations.clear()
         simulations.append(self._create_simulation(0, 'experiment_0', 'default-owner', 'local', 'created'))
         simulations.append(self._create_simulation(1, 'experiment_1', 'untrusted-owner', 'local', 'created'))
         simulations.append(self._create_simulation(2, 'experiment_2', 'untrusted-owner', 'local', 'created'))
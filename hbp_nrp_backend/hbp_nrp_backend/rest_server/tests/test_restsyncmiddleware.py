@@ -25,9 +25,25 @@
 Tests for RestSyncMiddleware.py
 """
 
+import time
+import threading
 import unittest
+import requests
+import SocketServer
+from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+from flask import Flask
+from flask_restful import Api, Resource
 from mock import patch, MagicMock
-from hbp_nrp_backend.rest_server.RestSyncMiddleware import RestSyncMiddleware
+from hbp_nrp_backend.rest_server.RestSyncMiddleware import RestSyncMiddleware, ReadWriteLock
+
+
+class _ThreadingWSGIServer(SocketServer.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
 
 
 class TestRestSyncMiddleWare(unittest.TestCase):
@@ -58,7 +74,7 @@ class TestRestSyncMiddleWare(unittest.TestCase):
 
         self.assertTrue(new_func.is_threadsafe)
 
-    @patch('hbp_nrp_backend.rest_server.RestSyncMiddleware.Lock')
+    @patch('hbp_nrp_backend.rest_server.RestSyncMiddleware.ReadWriteLock')
     def test_call_works_correctly(self, patch_lock):
         self.create_mocks()
         # call the class
@@ -67,11 +83,13 @@ class TestRestSyncMiddleWare(unittest.TestCase):
 
         self.mock_app.url_map.bind.assert_called_with('localhost', default_method=self.env_list[1])
         self.mock_map_adapter.match.assert_called_with(self.env_list[0])
-        self.assertTrue(rest.threadLock.acquire.called)
+        lock = rest.get_lock(RestSyncMiddleware.GLOBAL_LOCK)
+        self.assertTrue(lock.acquire_write.called)
         self.mock_wsgi.assert_called_with(self.mock_env, self.mock_response)
-        self.assertTrue(rest.threadLock.release.called)
+        self.assertTrue(lock.release_write.called)
+        self.assertEqual(rest.lock_wait_metrics()['global:write']['count'], 1)
 
-    @patch('hbp_nrp_backend.rest_server.RestSyncMiddleware.Lock')
+    @patch('hbp_nrp_backend.rest_server.RestSyncMiddleware.ReadWriteLock')
     def test_call_is_threadsafe(self, patch_lock):
         mock_function = MagicMock()
         mock_function.is_threadsafe = True
@@ -82,12 +100,12 @@ class TestRestSyncMiddleWare(unittest.TestCase):
 
         self.mock_app.url_map.bind.assert_called_with('localhost', default_method=self.env_list[1])
         self.mock_map_adapter.match.assert_called_with(self.env_list[0])
-        self.assertFalse(rest.threadLock.acquire.called)
+        self.assertFalse(patch_lock.called)
         self.mock_wsgi.assert_called_with(self.mock_env, self.mock_response)
-        self.assertFalse(rest.threadLock.release.called)
+        self.assertEqual(rest.lock_wait_metrics(), {})
 
 
-    @patch('hbp_nrp_backend.rest_server.RestSyncMiddleware.Lock')
+    @patch('hbp_nrp_backend.rest_server.RestSyncMiddleware.ReadWriteLock')
     def test_call_works_with_exception(self, patch_lock):
         mock_wsgi = MagicMock(side_effect=KeyError)
         self.create_mocks()
@@ -97,9 +115,134 @@ class TestRestSyncMiddleWare(unittest.TestCase):
 
         self.mock_app.url_map.bind.assert_called_with('localhost', default_method=self.env_list[1])
         self.mock_map_adapter.match.assert_called_with(self.env_list[0])
-        self.assertTrue(rest.threadLock.acquire.called)
+        lock = rest.get_lock(RestSyncMiddleware.GLOBAL_LOCK)
+        self.assertTrue(lock.acquire_write.called)
         mock_wsgi.assert_called_with(self.mock_env, self.mock_response)
-        self.assertTrue(rest.threadLock.release.called)
+        self.assertTrue(lock.release_write.called)
+
+    def test_unused_locks_are_dropped(self):
+        rest = RestSyncMiddleware(MagicMock(), MagicMock())
+        lock = rest.get_lock('simulation/0')
+        self.assertIs(rest.get_lock('simulation/0'), lock)
+        self.assertEqual(len(rest._RestSyncMiddleware__locks), 1)
+
+        del lock
+        self.assertEqual(len(rest._RestSyncMiddleware__locks), 0)
+
+    def test_hold(self):
+        rest = RestSyncMiddleware(MagicMock(), MagicMock())
+        read = threading.Event()
+
+        def reader():
+            lock = rest.get_lock('simulation/1')
+            lock.acquire_read()
+            read.set()
+            lock.release_read()
+
+        with rest.hold('simulation/1'):
+            # the held lock stays registered, the requests to the simulation wait for it
+            thread = threading.Thread(target=reader)
+            thread.start()
+            self.assertFalse(read.wait(0.1))
+        self.assertTrue(read.wait(5))
+        thread.join()
+        self.assertEqual(rest.lock_wait_metrics()['simulation:write']['count'], 1)
+
+    def test_lock_key(self):
+        self.assertEqual(RestSyncMiddleware.lock_key('/simulation/3/brain', {'sim_id': 3}),
+                         'simulation/3')
+        self.assertEqual(RestSyncMiddleware.lock_key('/simulation', {}),
+                         RestSyncMiddleware.CREATION_LOCK)
+        self.assertEqual(RestSyncMiddleware.lock_key('/simulation/', None),
+                         RestSyncMiddleware.CREATION_LOCK)
+        self.assertEqual(RestSyncMiddleware.lock_key('/simulation/topics', {}),
+                         RestSyncMiddleware.GLOBAL_LOCK)
+
+    def test_read_write_lock(self):
+        lock = ReadWriteLock()
+        events = []
+
+        def write():
+            lock.acquire_write()
+            events.append('write')
+            lock.release_write()
+
+        lock.acquire_read()
+        # readers share the lock
+        lock.acquire_read()
+        writer = threading.Thread(target=write)
+        writer.start()
+        time.sleep(0.05)
+        self.assertEqual(events, [])
+
+        lock.release_read()
+        lock.release_read()
+        writer.join(1)
+        self.assertEqual(events, ['write'])
+
+
+class TestRestSyncMiddleWareLoad(unittest.TestCase):
+    """
+    Runs the middleware in a local WSGI server, in front of resources taking some time
+    """
+
+    DELAY = 0.2
+
+    def setUp(self):
+        delay = self.DELAY
+
+        class SlowResource(Resource):
+            def get(self, sim_id):
+                time.sleep(delay)
+                return {}, 200
+
+            def put(self, sim_id):
+                time.sleep(delay)
+                return {}, 200
+
+        app = Flask('test_restsyncmiddleware')
+        api = Api(app)
+        api.add_resource(SlowResource, '/simulation/<int:sim_id>/slow')
+        self.middleware = RestSyncMiddleware(app.wsgi_app, app)
+        app.wsgi_app = self.middleware
+
+        self.server = make_server('127.0.0.1', 0, app, _ThreadingWSGIServer, _QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{0}/simulation/'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def timed_requests(self, *calls):
+        threads = [threading.Thread(target=method, args=(self.url + path,))
+                   for method, path in calls]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.time() - start
+
+    def test_independent_simulations_do_not_contend(self):
+        elapsed = self.timed_requests(*[(requests.put, '{0}/slow'.format(i)) for i in range(4)])
+        self.assertLess(elapsed, 2 * self.DELAY)
+
+    def test_reads_are_concurrent(self):
+        elapsed = self.timed_requests(*[(requests.get, '0/slow') for _ in range(4)])
+        self.assertLess(elapsed, 2 * self.DELAY)
+
+    def test_writes_to_a_simulation_are_serialized(self):
+        elapsed = self.timed_requests((requests.put, '0/slow'), (requests.put, '0/slow'),
+                                      (requests.get, '0/slow'))
+        self.assertGreaterEqual(elapsed, 3 * self.DELAY)
+        metrics = self.middleware.lock_wait_metrics()
+        self.assertEqual(metrics['simulation:write']['count'], 2)
+        self.assertGreater(metrics['simulation:write']['max'] +
+                           metrics['simulation:read']['max'], self.DELAY)
 
 
 if __name__ == '__main__':
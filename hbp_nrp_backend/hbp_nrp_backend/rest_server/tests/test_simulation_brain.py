@@ -126,7 +126,7 @@ set_ret_popl_change_handle = DefaultDotDict(error_message="change population nam
 class TestSimulationBrain(RestTest):
 
     def setUp(self):
-        del simulations[:]
+        simulations.clear()
         simulations.append(Simulation(0, 'experiment_0', 'default-owner', 'local', 'created'))
         simulations.append(Simulation(1, 'experiment_1', 'untrusted-owner', 'local', 'created'))
 
@@ -76,7 +76,7 @@ class TestScript(RestTest):
         self.mc = MaterialControl()
         self.lc = LightControl()
 
-        del simulations[:]
+        simulations.clear()
         simulations.append(Simulation(0, 'test', 'default-owner', 'created'))
 
     # The following methods test the class hbp_nrp_backend.rest_server.__SimulationControl
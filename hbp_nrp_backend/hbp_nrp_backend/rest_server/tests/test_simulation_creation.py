@@ -0,0 +1,75 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Tests the simulation creation service
+"""
+
+import json
+from mock import patch, MagicMock
+from hbp_nrp_backend.rest_server.tests import RestTest
+from hbp_nrp_backend.simulation_control import simulations, Simulation
+
+
+@patch('hbp_nrp_backend.rest_server.__SimulationCreation.SpanTracer')
+@patch('hbp_nrp_backend.rest_server.__SimulationCreation.creation_jobs')
+class TestSimulationCreation(RestTest):
+
+    def setUp(self):
+        simulations.clear()
+        simulations.append(Simulation(0, 'experiment_0', 'default-owner', 'local', 'created'))
+
+    def tearDown(self):
+        simulations.clear()
+
+    def test_get_creation(self, mock_jobs, mock_tracer):
+        mock_jobs.get.return_value = MagicMock(state='running', error=None, queued_seconds=0.5,
+                                               running_seconds=2.0)
+        mock_tracer.timeline.return_value = {'traceEvents': [
+            {'name': 'process_name', 'ph': 'M'},
+            {'name': 'backend.initialize', 'ph': 'X', 'ts': 1000, 'dur': 3000},
+            {'name': 'storage.clone', 'ph': 'X', 'ts': 2000, 'dur': 500}
+        ]}
+        response = self.client.get('/simulation/0/creation')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), {
+            'simulationID': 0,
+            'state': 'running',
+            'simulationState': 'created',
+            'error': None,
+            'queuedSeconds': 0.5,
+            'runningSeconds': 2.0,
+            'phases': [{'name': 'backend.initialize', 'start': 0.0, 'duration': 3.0},
+                       {'name': 'storage.clone', 'start': 1.0, 'duration': 0.5}]
+        })
+        mock_jobs.get.assert_called_once_with(0)
+
+    def test_get_creation_not_async(self, mock_jobs, mock_tracer):
+        mock_jobs.get.return_value = None
+        response = self.client.get('/simulation/0/creation')
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_creation_sim_not_found(self, mock_jobs, mock_tracer):
+        response = self.client.get('/simulation/1/creation')
+        self.assertEqual(response.status_code, 404)
@@ -92,7 +92,7 @@ set_ret_error = DefaultDotDict(message="Crash boom bang")
 class TestSimulationService(RestTest):
 
     def setUp(self):
-        del simulations[:]
+        simulations.clear()
         simulations.append(Simulation(0, 'experiment1', 'default-owner', 'created'))
         simulations[0].cle = mock.MagicMock()
         simulations[0].cle.set_simulation_populations = mock.MagicMock(return_value=set_ret_ok)
@@ -39,7 +39,7 @@ class TestSimulationRecorder(RestTest):
         self.path_can_view = patch('hbp_nrp_backend.__UserAuthentication.UserAuthentication.can_view')
         self.path_can_view.start().return_value = True
 
-        del simulations[:]
+        simulations.clear()
         simulations.append(Simulation(0, 'experiment1', 'default-owner', 'created'))
         simulations.append(Simulation(1, 'experiment2', 'other-owner', 'created'))
 
@@ -35,6 +35,7 @@ from mock import patch, MagicMock
 import os
 import tempfile
 import shutil
+import hashlib
 from hbp_nrp_backend.cle_interface.ROSCLEClient import ROSCLEClientException
 from hbp_nrp_backend.rest_server.tests import RestTest
 from hbp_nrp_backend.simulation_control import simulations, Simulation
@@ -56,7 +57,7 @@ class TestSimulationResetStorage(RestTest):
         self.mock_storage_client = mock.MagicMock()
 
         SimulationResetStorage.storage_client = self.mock_storage_client
-        del simulations[:]
+        simulations.clear()
         simulations.append(Simulation(
             0, 'experiments/experiment_data/test_1.exc', 'default-owner', 'created'))
         simulations.append(Simulation(
@@ -317,8 +318,8 @@ class TestSimulationResetStorage(RestTest):
     @patch('hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage._get_sdf_world_from_storage')
     def test_full_reset_ok(self, mock_get_sdf, mock_reset_from_storage, mock_get_brain_info):
         mock_reset_from_storage.side_effect = None
-        mock_get_sdf.return_value = '<sdf></sdf>'
-        mock_get_brain_info.return_value = os.path.join(PATH, 'models/braitenberg.py'), None, None
+        brain_path = os.path.join(PATH, 'models/braitenberg.py')
+        mock_reset_from_storage.return_value = '<sdf></sdf>', brain_path, []
         simulations[0].cle = mock.MagicMock()
 
         response = self.client.put(self.correct_reset_url, data=json.dumps({
@@ -331,8 +332,61 @@ class TestSimulationResetStorage(RestTest):
             'resetType': ResetSimulationRequest.RESET_FULL,
             'contextId': None
         }))
-        simulations[0].cle.reset.assert_called()
+        simulations[0].cle.reset.assert_called_with(ResetSimulationRequest.RESET_FULL,
+                                                    world_sdf='<sdf></sdf>',
+                                                    brain_path=brain_path,
+                                                    populations=[])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('cle_reset', json.loads(response.data)['timings'])
+        # the storage is not fetched again
+        mock_get_sdf.assert_not_called()
+        mock_get_brain_info.assert_not_called()
+
+        # an unchanged world is reset in place, the brain is still sent
+        mock_reset_from_storage.return_value = None, brain_path, []
+        response = self.client.put(self.correct_reset_url, data=json.dumps({
+            'resetType': ResetSimulationRequest.RESET_FULL
+        }))
+        self.assertEqual(response.status_code, 200)
+        simulations[0].cle.reset.assert_called_with(ResetSimulationRequest.RESET_FULL,
+                                                    world_sdf=None,
+                                                    brain_path=brain_path,
+                                                    populations=[])
+
+    @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage.reset_transfer_functions")
+    @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage.reset_state_machines")
+    @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage._get_brain_info_from_bibi")
+    @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage._get_world")
+    @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage._get_world_digest")
+    @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.bibi_api_gen")
+    @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.exp_conf_api_gen")
+    @patch('hbp_nrp_backend.rest_server.__SimulationResetStorage.UserAuthentication.get_header_token')
+    @patch("__builtin__.open", new=mock_open(read_data='print "new brain"'))
+    def test_full_reset_changed_brain_unchanged_world(self, mock_get_header_token, mock_exc_gen,
+                                                      mock_bibi_gen, mock_get_world_digest,
+                                                      mock_get_world, mock_get_brain_info,
+                                                      mock_reset_sms, mock_reset_tfs):
+        populations = [mock.Mock()]
+        mock_get_brain_info.return_value = '/sim/dir/new_brain.py', populations, {}
+        mock_get_world.return_value = '<sdf>launched</sdf>'
+        mock_get_world_digest.return_value = hashlib.sha1('<sdf>launched</sdf>').hexdigest()
+        simulations[0].lifecycle.experiment_path = '/sim/dir/experiment.exc'
+        simulations[0].cle = mock.MagicMock()
+        simulations[0].cle.get_simulation_brain.return_value = mock.Mock(
+            brain_data='print "old brain"', brain_populations='{}')
+        simulations[0].cle.set_simulation_brain.return_value = mock.Mock(error_message="")
+
+        response = self.client.put(self.correct_reset_url, data=json.dumps({
+            'resetType': ResetSimulationRequest.RESET_FULL
+        }))
         self.assertEqual(response.status_code, 200)
+        simulations[0].cle.set_simulation_brain.assert_called_once_with(
+            brain_type='py', data_type='text', data='print "new brain"', brain_populations='{}')
+        # the reset keeps the world and reloads the new brain, not the one the CLE was launched with
+        simulations[0].cle.reset.assert_called_once_with(ResetSimulationRequest.RESET_FULL,
+                                                         world_sdf=None,
+                                                         brain_path='/sim/dir/new_brain.py',
+                                                         populations=populations)
 
     @patch("os.path.dirname")
     @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage.reset_brain")
@@ -355,8 +409,59 @@ class TestSimulationResetStorage(RestTest):
         simulations[0].cle = mock.MagicMock()
         simulations[0].cle.set_simulation_transfer_function.return_value = None
         simulations[0].lifecycle.experiment_path = os.path.join(PATH, 'experiments/experiment_data/test_5.exc')
+        self.mock_storage_client.get_file.return_value = u'<sdf></sdf>'
+
+        timings = {}
+        world_sdf, _, _ = SimulationResetStorage.reset_from_storage_all(
+            simulations[0], 'ExperimentId', 'fakeContextID', timings)
 
-        SimulationResetStorage.reset_from_storage_all(simulations[0], 'ExperimentId', 'fakeContextID')
+        # the world the simulation was launched with is unknown, it is sent
+        self.assertEqual(world_sdf, '<sdf></sdf>')
+        self.mock_storage_client.clone_all_experiment_files.assert_called_once()
+        self.mock_storage_client.get_file.assert_called_once_with(
+            mock_get_header_token.return_value, 'ExperimentId',
+            'storage://virtual_room/virtual_room.sdf', by_name=True)
+        self.assertEqual(set(timings), {'fetch', 'brain', 'transfer_functions', 'state_machines'})
+
+    @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage.reset_brain")
+    @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage.reset_transfer_functions")
+    @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage.reset_state_machines")
+    @patch('hbp_nrp_backend.rest_server.__SimulationResetStorage.UserAuthentication.get_header_token')
+    def test_reset_from_storage_all_unchanged_world(self, mock_get_header_token, mock_reset_sms,
+                                                    mock_reset_tfs, mock_reset_brain):
+        sim_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, sim_dir)
+        for name in ('bibi_4.bibi', 'braitenberg.py'):
+            shutil.copyfile(os.path.join(EXPERIMENT_DATA_PATH if name.endswith('bibi') else
+                                         os.path.join(PATH, 'models'), name),
+                            os.path.join(sim_dir, name))
+        experiment_path = os.path.join(sim_dir, 'experiment_configuration.exc')
+        with open(os.path.join(EXPERIMENT_DATA_PATH, 'test_5.exc')) as exc_file:
+            exc = exc_file.read().replace('storage://virtual_room/virtual_room.sdf', 'world.sdf')
+        with open(experiment_path, 'w') as exc_file:
+            exc_file.write(exc)
+        with open(os.path.join(sim_dir, 'world.sdf'), 'w') as world_file:
+            world_file.write('<sdf>launched</sdf>')
+        simulations[0].lifecycle.experiment_path = experiment_path
+        simulations[0].lifecycle._sim_dir = sim_dir
+
+        world_sdf, brain_path, _ = SimulationResetStorage.reset_from_storage_all(
+            simulations[0], 'ExperimentId', None)
+        self.assertIsNone(world_sdf)
+        self.assertEqual(brain_path, os.path.join(sim_dir, 'braitenberg.py'))
+        self.mock_storage_client.get_file.assert_not_called()
+
+        # once another world is sent, it is sent on every reset
+        with open(os.path.join(sim_dir, 'world.sdf'), 'w') as world_file:
+            world_file.write('<sdf>saved</sdf>')
+        world_sdf, _, _ = SimulationResetStorage.reset_from_storage_all(
+            simulations[0], 'ExperimentId', None)
+        self.assertEqual(world_sdf, '<sdf>saved</sdf>')
+        with open(os.path.join(sim_dir, 'world.sdf'), 'w') as world_file:
+            world_file.write('<sdf>launched</sdf>')
+        world_sdf, _, _ = SimulationResetStorage.reset_from_storage_all(
+            simulations[0], 'ExperimentId', None)
+        self.assertEqual(world_sdf, '<sdf>launched</sdf>')
 
     @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage._get_brain_info_from_storage")
     def test_reset_brain(self, mock_get_brain_info):
@@ -371,6 +476,24 @@ class TestSimulationResetStorage(RestTest):
 
         SimulationResetStorage.reset_brain(simulations[0], 'expId', 'contextId')
         SimulationResetStorage._get_brain_info_from_storage.assert_called_with('expId', 'contextId')
+        simulations[0].cle.set_simulation_brain.assert_called_once()
+
+    def test_reset_brain_unchanged(self):
+        simulations[0].cle = mock.MagicMock()
+        brain_path = os.path.join(PATH, 'models/braitenberg.py')
+        with open(brain_path) as brain_file:
+            brain_data = brain_file.read()
+        simulations[0].cle.get_simulation_brain.return_value = mock.Mock(
+            brain_data=brain_data,
+            brain_populations=json.dumps({'record': {'from': 0, 'to': 2, 'step': 1}}))
+
+        SimulationResetStorage.reset_brain(simulations[0], 'expId', 'contextId',
+                                           (brain_path, None, {'record': slice(0, 2, 1)}))
+        simulations[0].cle.set_simulation_brain.assert_not_called()
+
+        SimulationResetStorage.reset_brain(simulations[0], 'expId', 'contextId',
+                                           (brain_path, None, {'record': slice(0, 3, 1)}))
+        simulations[0].cle.set_simulation_brain.assert_called_once()
 
     @patch("hbp_nrp_backend.rest_server.__SimulationResetStorage.SimulationResetStorage._get_brain_info_from_storage")
     def test_reset_brain_throw(self, mock_get_brain_info):
@@ -403,6 +526,31 @@ class TestSimulationResetStorage(RestTest):
         SimulationResetStorage.reset_transfer_functions(simulations[0], bibi, EXPERIMENT_DATA_PATH)
         simulations[0].cle.get_simulation_transfer_functions.assert_called()
         simulations[0].cle.delete_simulation_transfer_function.assert_called_with('grab_image')
+        self.assertEqual(simulations[0].cle.delete_simulation_transfer_function.call_count, 4)
+        # the transfer function with the same name is edited instead of deleted and added again
+        simulations[0].cle.edit_simulation_transfer_function.assert_called_once_with(
+            'all_neurons_spike_monitor', mock.ANY)
+        self.assertEqual(simulations[0].cle.add_simulation_transfer_function.call_count, 3)
+
+    def test_reset_transfer_functions_unchanged(self):
+        simulations[0].cle = mock.MagicMock()
+        with open(os.path.join(EXPERIMENT_DATA_PATH, "bibi_1.bibi")) as b_file:
+            bibi = bibi_api_gen.CreateFromDocument(b_file.read())
+        simulations[0].cle.get_simulation_transfer_functions.return_value = ([], [])
+        SimulationResetStorage.reset_transfer_functions(simulations[0], bibi, EXPERIMENT_DATA_PATH)
+        tf_sources = [call[0][0] for call in
+                      simulations[0].cle.add_simulation_transfer_function.call_args_list]
+
+        simulations[0].cle = mock.MagicMock()
+        simulations[0].cle.get_simulation_transfer_functions.return_value = (
+            tf_sources, [True, False, True, True])
+        SimulationResetStorage.reset_transfer_functions(simulations[0], bibi, EXPERIMENT_DATA_PATH)
+
+        simulations[0].cle.delete_simulation_transfer_function.assert_not_called()
+        simulations[0].cle.edit_simulation_transfer_function.assert_not_called()
+        simulations[0].cle.add_simulation_transfer_function.assert_not_called()
+        simulations[0].cle.activate_simulation_transfer_function.assert_called_once_with(
+            'left_wheel_neuron_rate_monitor', True)
 
 
 if __name__ == '__main__':
@@ -34,8 +34,11 @@ import datetime
 import threading
 import time
 from hbp_nrp_backend.rest_server.__SimulationService import SimulationService
-from mock import patch, MagicMock, PropertyMock
+from mock import patch, MagicMock, PropertyMock, call
 from hbp_nrp_backend.simulation_control import simulations
+from hbp_nrp_backend import NRPServicesGeneralException
+from hbp_nrp_backend.rest_server import app
+from hbp_nrp_backend.rest_server.RestSyncMiddleware import RestSyncMiddleware
 from hbp_nrp_backend.rest_server.tests import RestTest
 
 
@@ -46,7 +49,7 @@ class TestSimulationService(RestTest):
     def setUp(self):
         self.now = datetime.datetime.now()
         # Ensure that the patcher is cleaned up correctly even in exceptional cases
-        del simulations[:]
+        simulations.clear()
         self.patch_state = patch('hbp_nrp_backend.simulation_control.__Simulation.Simulation.state',
                                  new_callable=PropertyMock)
         self.mock_state = self.patch_state.start()
@@ -182,6 +185,60 @@ class TestSimulationService(RestTest):
         self.assertEqual(response.status_code, 405)
         self.assertEqual(len(simulations), 0)
 
+    @patch('hbp_nrp_backend.rest_server.__SimulationService.creation_jobs')
+    def test_simulation_service_post_async(self, mock_jobs):
+        rqdata = {
+            "experimentID": "my_cloned_experiment",
+            "gzserverHost": "local",
+            "async": True
+        }
+        response = self.client.post('/simulation', data=json.dumps(rqdata))
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers['Location'], 'http://localhost/simulation/0/creation')
+        self.assertEqual(len(simulations), 1)
+        sim_id, initialize = mock_jobs.submit.call_args[0]
+        self.assertEqual(sim_id, 0)
+        self.assertNotIn(call("initialized"), self.mock_state.call_args_list)
+
+        # the initialization runs with a copy of the request context
+        initialize()
+        self.mock_state.assert_called_with("initialized")
+
+    @patch('hbp_nrp_backend.rest_server.__SimulationService.creation_jobs')
+    def test_simulation_service_post_async_holds_the_simulation(self, mock_jobs):
+        sync = RestSyncMiddleware(app.wsgi_app, app)
+        sync.hold = MagicMock()
+        self.mock_state.side_effect = lambda *args: self.assertEqual(
+            sync.hold.return_value.__enter__.call_count, 1 if args else 0)
+        rqdata = {
+            "experimentID": "my_cloned_experiment",
+            "gzserverHost": "local",
+            "async": True
+        }
+        self.client.post('/simulation', data=json.dumps(rqdata))
+        _, initialize = mock_jobs.submit.call_args[0]
+
+        with patch.object(app, 'wsgi_app', sync):
+            initialize()
+        sync.hold.assert_called_once_with('simulation/0')
+        self.mock_state.assert_called_with("initialized")
+        self.assertEqual(sync.hold.return_value.__exit__.call_count, 1)
+
+    @patch('hbp_nrp_backend.rest_server.__SimulationService.creation_jobs')
+    def test_simulation_service_post_async_busy(self, mock_jobs):
+        mock_jobs.submit.side_effect = NRPServicesGeneralException("busy", "Server busy",
+                                                                   error_code=503)
+        rqdata = {
+            "experimentID": "my_cloned_experiment",
+            "gzserverHost": "local",
+            "async": True
+        }
+        response = self.client.post('/simulation', data=json.dumps(rqdata))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(simulations), 0)
+
 
 if __name__ == '__main__':
     unittest.main()
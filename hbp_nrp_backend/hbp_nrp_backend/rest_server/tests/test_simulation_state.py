@@ -52,7 +52,7 @@ class TestSimulationStateService(RestTest):
 
 
     def tearDown(self):
-        del simulations[:]
+        simulations.clear()
         self.patch_state.stop()
         self.path_can_view.stop()
 
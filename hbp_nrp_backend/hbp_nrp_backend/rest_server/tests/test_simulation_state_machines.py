@@ -80,7 +80,7 @@ class TestSimulationStateMachines(RestTest):
         simulation.state = "paused"
 
     def tearDown(self):
-        del simulations[:]
+        simulations.clear()
         self.path_can_view.stop()
         self.patch_state.stop()
         self.patch_sm.stop()
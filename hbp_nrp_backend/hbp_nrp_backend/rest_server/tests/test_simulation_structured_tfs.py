@@ -42,7 +42,7 @@ class MockObject(object):
 class TestSimulationTransferFunctions(RestTest):
 
     def setUp(self):
-        del simulations[:]
+        simulations.clear()
         simulations.append(Simulation(0, 'experiment_0', 'default-owner', 'local', 'created'))
         simulations.append(Simulation(1, 'experiment_1', 'untrusted-owner', 'local', 'created'))
         self.sim = simulations[0]
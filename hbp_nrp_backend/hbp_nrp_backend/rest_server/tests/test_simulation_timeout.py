@@ -37,14 +37,14 @@ import json
 class TestSimulationTimeout(RestTest):
 
     def setUp(self):
-        del simulations[:]
+        simulations.clear()
         simulations.append(Simulation(0, 'experiment_0', 'default-owner', 'local', 'created'))
         self.sim = simulations[0]
         self.sim.cle = MagicMock()
         self.sim.cle.extend_simulation_timeout = MagicMock(return_value=True)
 
     def tearDown(self):
-        del simulations[:]
+        simulations.clear()
 
     def test_extend_timeout_sucessful(self):
         initial_kill_timeout = self.sim.kill_datetime
@@ -0,0 +1,59 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Tests the simulation trace service
+"""
+
+import json
+from mock import patch
+from hbp_nrp_backend.rest_server.tests import RestTest
+from hbp_nrp_backend.simulation_control import simulations, Simulation
+
+
+@patch('hbp_nrp_backend.rest_server.__SimulationTrace.SpanTracer')
+class TestSimulationTrace(RestTest):
+
+    def setUp(self):
+        simulations.clear()
+        simulations.append(Simulation(0, 'experiment_0', 'default-owner', 'local', 'created'))
+
+    def tearDown(self):
+        simulations.clear()
+
+    def test_get_trace(self, mock_tracer):
+        timeline = {'traceEvents': [{'name': 'backend.initialize', 'ph': 'X', 'ts': 1, 'dur': 2}]}
+        mock_tracer.timeline.return_value = timeline
+        response = self.client.get('/simulation/0/trace')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), timeline)
+        mock_tracer.timeline.assert_called_once_with(0)
+
+    def test_get_trace_not_recorded(self, mock_tracer):
+        mock_tracer.timeline.return_value = None
+        response = self.client.get('/simulation/0/trace')
+        self.assertEqual(response.status_code, 204)
+
+    def test_get_trace_sim_not_found(self, mock_tracer):
+        response = self.client.get('/simulation/1/trace')
+        self.assertEqual(response.status_code, 404)
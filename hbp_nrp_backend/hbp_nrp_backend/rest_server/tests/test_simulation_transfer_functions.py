@@ -39,7 +39,7 @@ from hbp_nrp_backend.rest_server.tests import RestTest
 class TestSimulationTransferFunctions(RestTest):
 
     def setUp(self):
-        del simulations[:]
+        simulations.clear()
         simulations.append(Simulation(0, 'experiment_0', 'default-owner', 'local', 'created'))
         simulations.append(Simulation(1, 'experiment_1', 'untrusted-owner', 'local', 'created'))
         self.sim = simulations[0]
@@ -112,6 +112,32 @@ class TestSimulationTransferFunctions(RestTest):
                                     content_type='plain/text')
         self.assertIn('Adding a new Transfer Function failed',response.data )
 
+    def test_simulation_transfer_functions_put(self):
+        tfs = {'tf1': "def tf1(a):\n return", 'tf3': "def tf3(a):\n return"}
+        self.sim.cle.apply_simulation_transfer_functions.return_value = []
+        response = self.client.put('/simulation/0/transfer-functions', data=json.dumps(tfs))
+        self.assertEqual(response.status_code, 200)
+        self.sim.cle.apply_simulation_transfer_functions.assert_called_once_with(tfs)
+
+        self.sim.cle.apply_simulation_transfer_functions.return_value = [
+            {'name': 'tf3', 'message': 'duplicate Transfer Function name'}]
+        response = self.client.put('/simulation/0/transfer-functions', data=json.dumps(tfs))
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('tf3: duplicate', response.data)
+
+        self.sim.cle.apply_simulation_transfer_functions.return_value = [
+            {'name': 'tf1', 'message': 'Error while compiling'}]
+        response = self.client.put('/simulation/0/transfer-functions', data=json.dumps(tfs))
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.put('/simulation/0/transfer-functions',
+                                   data=json.dumps(["def tf1(a):\n return"]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.sim.cle.apply_simulation_transfer_functions.call_count, 3)
+
+        response = self.client.put('/simulation/1/transfer-functions', data=json.dumps(tfs))
+        self.assertEqual(response.status_code, 401)
+
     def test_simulation_transfer_function_delete(self):
         self.sim.cle.delete_simulation_transfer_function.return_value = True
         response = self.client.delete(
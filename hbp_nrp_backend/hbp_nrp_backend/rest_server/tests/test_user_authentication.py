@@ -107,6 +107,23 @@ class TestUserAuthentication(unittest.TestCase):
                 client.can_acess_experiment.side_effect = Exception('Test')
                 self.assertFalse(UserAuthentication.can_view(sim))
 
+    def test_cached_lookups(self):
+        UserAuthentication.token_owners.clear()
+        UserAuthentication.experiment_access.clear()
+        sim = FakeSimulation('Test')
+        with patch("hbp_nrp_backend.__UserAuthentication.UserAuthentication.client") as client:
+            client.get_user = MagicMock(return_value={'id': 'cached'})
+            client.can_acess_experiment = MagicMock(return_value=True)
+            with self.__app.test_request_context('/test', headers={'Authorization':'bearer cached_token'}):
+                self.assertEqual(UserAuthentication.get_user(), 'cached')
+                self.assertEqual(UserAuthentication.get_user(), 'cached')
+                self.assertTrue(UserAuthentication.can_view(sim))
+                self.assertTrue(UserAuthentication.can_view(sim))
+            client.get_user.assert_called_once_with('cached_token')
+            client.can_acess_experiment.assert_called_once_with('cached_token', None, None)
+        self.assertEqual(UserAuthentication.token_owners.stats['hits'], 1)
+        self.assertEqual(UserAuthentication.experiment_access.stats['hits'], 1)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -40,6 +40,8 @@ from hbp_nrp_backend import NRPServicesGeneralException
 from hbp_nrp_backend.__UserAuthentication import UserAuthentication
 from hbp_nrp_backend.simulation_control import timezone
 from hbp_nrp_commons.sim_config.SimConfig import ResourceType
+from hbp_nrp_commons.sim_config.DOMCache import DOMCache
+from hbp_nrp_commons.SpanTracer import SpanTracer
 from hbp_nrp_backend.storage_client_api.StorageClient import StorageClient, Model
 from hbp_nrp_cleserver.server.SimulationServer import TimeoutType
 from cle_ros_msgs.srv import SimulationRecorderRequest
@@ -47,7 +49,7 @@ from hbp_nrp_commons.ZipUtil import ZipUtil
 from hbp_nrp_commons.workspace.Settings import Settings
 from hbp_nrp_commons.workspace.SimUtil import SimUtil
 
-import tempfile
+import threading
 import time
 
 __author__ = 'Georg Hinkel, Manos Angelidis'
@@ -75,6 +77,7 @@ class BackendSimulationLifecycle(SimulationLifecycle):
         self.__experiment_path = None
         self.__textures_loaded = False
         self.__storageClient = StorageClient()
+        self.__clone_cancelled = threading.Event()
 
     @property
     def simulation(self):
@@ -143,82 +146,92 @@ class BackendSimulationLifecycle(SimulationLifecycle):
         :param state_change: The state change that caused the simulation to be initialized
         """
 
-        simulation = self.simulation
-        if not simulation.playback_path:
-            self._sim_dir = SimUtil.init_simulation_dir()
-
-        try:
-            if not simulation.private:
-                raise NRPServicesGeneralException(
-                    "Only private experiments are supported", "CLE error", 500)
-
-            self.__storageClient.clone_all_experiment_files(
-                token=UserAuthentication.get_header_token(),
-                experiment=simulation.experiment_id,
-                destination_dir=self._sim_dir,
-                exclude=['recordings/'] if not simulation.playback_path else []
-            )
-
-            # divine knowledge about the exc name
-            self.__experiment_path = os.path.join(self._sim_dir, 'experiment_configuration.exc')
-
-            with open(self.__experiment_path) as exd_file:
-                exc = exp_conf_api_gen.CreateFromDocument(exd_file.read())
-
-            self._load_state_machines(exc)
-            if exc.environmentModel.model:  # i.e., custom zipped environment
-                self._prepare_custom_environment(exc)
-
-            simulation.timeout_type = (TimeoutType.SIMULATION
-                                       if exc.timeout.time == TimeoutType.SIMULATION
-                                       else TimeoutType.REAL)
-
-            timeout = exc.timeout.value()
-
-            if simulation.timeout_type == TimeoutType.REAL:
-                timeout = datetime.datetime.now(timezone) + datetime.timedelta(seconds=timeout)
-                simulation.kill_datetime = timeout
-            else:
-                simulation.kill_datetime = None
-
-            logger.info("simulation timeout initialized")
-
-            simulation_factory_client = ROSCLESimulationFactoryClient()
-            simulation_factory_client.create_new_simulation(
-                self.__experiment_path,
-                simulation.gzserver_host, simulation.reservation, simulation.brain_processes,
-                simulation.sim_id, str(timeout), simulation.timeout_type,
-                simulation.playback_path,
-                UserAuthentication.get_header_token(),
-                self.simulation.ctx_id,
-                self.simulation.experiment_id
-            )
+        # the spans of the launch are recorded under the simulation id, the CLE server does the
+        # same with its own spans
+        SpanTracer.reset(self.simulation.sim_id)
+        with SpanTracer.span('backend.initialize', trace_id=self.simulation.sim_id,
+                             experiment=self.simulation.experiment_id):
+            simulation = self.simulation
             if not simulation.playback_path:
-                simulation.cle = ROSCLEClient(simulation.sim_id)
-            else:
-                simulation.cle = PlaybackClient(simulation.sim_id)
-            logger.info("simulation initialized")
-
-        except IOError as e:
-            raise NRPServicesGeneralException(
-                "Error while accessing simulation models (" +
-                repr(e.message) + ")",
-                "Models error")
-        except rospy.ROSException as e:
-            raise NRPServicesGeneralException(
-                "Error while communicating with the CLE (" + repr(e.message) + ")",
-                "CLE error")
-        except rospy.ServiceException as e:
-            raise NRPServicesGeneralException(
-                "Error starting the simulation. (" + repr(e.message) + ")",
-                "rospy.ServiceException",
-                data=e.message)
-        # pylint: disable=broad-except
-        except Exception as e:
-            raise NRPServicesGeneralException(
-                "Error starting the simulation. (" + repr(e) + ")",
-                "Unknown exception occured",
-                data=e.message)
+                self._sim_dir = SimUtil.init_simulation_dir()
+
+            try:
+                if not simulation.private:
+                    raise NRPServicesGeneralException(
+                        "Only private experiments are supported", "CLE error", 500)
+
+                with SpanTracer.span('storage.clone'):
+                    self.__storageClient.clone_all_experiment_files(
+                        token=UserAuthentication.get_header_token(),
+                        experiment=simulation.experiment_id,
+                        destination_dir=self._sim_dir,
+                        exclude=['recordings/'] if not simulation.playback_path else [],
+                        cancel_event=self.__clone_cancelled
+                    )
+
+                # divine knowledge about the exc name
+                self.__experiment_path = os.path.join(self._sim_dir, 'experiment_configuration.exc')
+
+                with SpanTracer.span('backend.parse_exc'), open(self.__experiment_path) as exd_file:
+                    exc = DOMCache.parse(exd_file.read(), exp_conf_api_gen)
+
+                with SpanTracer.span('backend.state_machines'):
+                    self._load_state_machines(exc)
+                if exc.environmentModel.model:  # i.e., custom zipped environment
+                    with SpanTracer.span('backend.custom_environment'):
+                        self._prepare_custom_environment(exc)
+
+                simulation.timeout_type = (TimeoutType.SIMULATION
+                                           if exc.timeout.time == TimeoutType.SIMULATION
+                                           else TimeoutType.REAL)
+
+                timeout = exc.timeout.value()
+
+                if simulation.timeout_type == TimeoutType.REAL:
+                    timeout = datetime.datetime.now(timezone) + datetime.timedelta(seconds=timeout)
+                    simulation.kill_datetime = timeout
+                else:
+                    simulation.kill_datetime = None
+
+                logger.info("simulation timeout initialized")
+
+                with SpanTracer.span('backend.create_new_simulation'):
+                    simulation_factory_client = ROSCLESimulationFactoryClient()
+                    simulation_factory_client.create_new_simulation(
+                        self.__experiment_path,
+                        simulation.gzserver_host, simulation.reservation,
+                        simulation.brain_processes, simulation.sim_id, str(timeout),
+                        simulation.timeout_type, simulation.playback_path,
+                        UserAuthentication.get_header_token(),
+                        self.simulation.ctx_id,
+                        self.simulation.experiment_id
+                    )
+                if not simulation.playback_path:
+                    simulation.cle = ROSCLEClient(simulation.sim_id)
+                else:
+                    simulation.cle = PlaybackClient(simulation.sim_id)
+                logger.info("simulation initialized")
+
+            except IOError as e:
+                raise NRPServicesGeneralException(
+                    "Error while accessing simulation models (" +
+                    repr(e.message) + ")",
+                    "Models error")
+            except rospy.ROSException as e:
+                raise NRPServicesGeneralException(
+                    "Error while communicating with the CLE (" + repr(e.message) + ")",
+                    "CLE error")
+            except rospy.ServiceException as e:
+                raise NRPServicesGeneralException(
+                    "Error starting the simulation. (" + repr(e.message) + ")",
+                    "rospy.ServiceException",
+                    data=e.message)
+            # pylint: disable=broad-except
+            except Exception as e:
+                raise NRPServicesGeneralException(
+                    "Error starting the simulation. (" + repr(e) + ")",
+                    "Unknown exception occured",
+                    data=e.message)
 
     def start(self, state_change):
         """
@@ -241,6 +254,9 @@ class BackendSimulationLifecycle(SimulationLifecycle):
 
         :param state_change: The state change that led to releasing simulation resources
         """
+        # abort a clone of the experiment files which may still be running, e.g. when the
+        # initialization failed
+        self.__clone_cancelled.set()
 
         if self.simulation.cle is not None:
 
@@ -276,6 +292,7 @@ class BackendSimulationLifecycle(SimulationLifecycle):
 
         :param state_change: The state change which resulted in failing the simulation
         """
+        self.__clone_cancelled.set()
         self.simulation.kill_datetime = None
         if self.simulation.cle is not None:
             self.simulation.cle.stop_communication("Simulation has failed")
@@ -296,7 +313,9 @@ class BackendSimulationLifecycle(SimulationLifecycle):
 
     def save_record_to_user_storage(self):
         """
-        Save the record to user storage
+        Save the record to user storage. The recording is zipped on the fly and streamed to
+        the storage, the progress of the upload is published on the status topic of the
+        simulation.
 
         """
 
@@ -308,26 +327,34 @@ class BackendSimulationLifecycle(SimulationLifecycle):
             timestamp=time.strftime('%Y-%m-%d_%H-%M-%S'),
             ext='zip')
 
-        temp_dest = os.path.join(tempfile.gettempdir(), file_name)
-        ZipUtil.create_from_path(record_path, temp_dest)
         client = StorageClient()
 
         client.create_folder(self.simulation.token,
                                 self.simulation.experiment_id,
                                 client_record_folder)
 
-        try:
-            with open(temp_dest, 'rb') as record_file:
-                zip_data = record_file.read()
-                client.create_or_update(
-                    self.simulation.token,
-                    self.simulation.experiment_id,
-                    os.path.join(client_record_folder, file_name),
-                    zip_data,
-                    "application/octet-stream")
+        task = 'Saving the recording'
+        reported = [-1]
+
+        def report_progress(done, total):
+            """
+            Notifies the progress of the upload, every 10%
+            """
+            percent = 100 * done // total if total else 100
+            if percent // 10 > reported[0]:
+                reported[0] = percent // 10
+                self.simulation.cle.publish_task_progress(
+                    task, 'Uploading {0} ({1}%)'.format(file_name, percent), reported[0], 10)
 
+        try:
+            client.create_or_update(
+                self.simulation.token,
+                self.simulation.experiment_id,
+                os.path.join(client_record_folder, file_name),
+                ZipUtil.stream_from_path(record_path, progress=report_progress),
+                "application/octet-stream")
         finally:
-            os.remove(temp_dest)
+            self.simulation.cle.publish_task_done(task)
 
         return file_name
 
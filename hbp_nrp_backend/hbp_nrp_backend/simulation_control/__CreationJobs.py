@@ -0,0 +1,174 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Runs the initialization of the simulations created asynchronously on a bounded pool of threads
+"""
+
+import sys
+import time
+import Queue
+import logging
+import threading
+import collections
+
+from hbp_nrp_backend import NRPServicesGeneralException
+from hbp_nrp_commons.workspace.Settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class CreationJob(object):
+    """
+    The initialization of a simulation, run in the background
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, sim_id, function):
+        """
+        :param sim_id: the id of the simulation being initialized
+        :param function: the function initializing the simulation
+        """
+        self.sim_id = sim_id
+        self.state = CreationJob.QUEUED
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.__function = function
+
+    @property
+    def queued_seconds(self):
+        """
+        Returns the time the job waited for a worker, in seconds
+        """
+        return (self.started or time.time()) - self.submitted
+
+    @property
+    def running_seconds(self):
+        """
+        Returns the time the job has been running, in seconds, None if it has not started
+        """
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+    def run(self):
+        """
+        Runs the initialization and records its outcome
+        """
+        self.started = time.time()
+        self.state = CreationJob.RUNNING
+        # pylint: disable=broad-except
+        try:
+            self.__function()
+            self.state = CreationJob.DONE
+        except Exception:
+            e = sys.exc_info()[1]
+            logger.exception("Initialization of simulation %s failed", self.sim_id)
+            self.error = getattr(e, 'message', None) or str(e)
+            self.state = CreationJob.FAILED
+        finally:
+            self.finished = time.time()
+
+
+class _CreationJobs(object):
+    """
+    A bounded executor of creation jobs. A fixed number of threads run the jobs, the jobs
+    submitted while all the threads are busy are queued up to a limit. The latest jobs are kept
+    to be polled, by simulation id.
+    """
+
+    def __init__(self, max_workers, max_queued, max_kept=100):
+        """
+        :param max_workers: the number of jobs run concurrently
+        :param max_queued: the number of jobs which may wait for a worker
+        :param max_kept: the number of finished jobs kept to be polled
+        """
+        self.__max_workers = max(1, max_workers)
+        self.__queue = Queue.Queue(max(1, max_queued))
+        self.__jobs = collections.OrderedDict()
+        self.__max_kept = max_kept
+        self.__lock = threading.Lock()
+        self.__workers = []
+
+    def submit(self, sim_id, function):
+        """
+        Queues the initialization of a simulation
+
+        :param sim_id: the id of the simulation
+        :param function: the function initializing the simulation
+        :return: the CreationJob
+        :raise NRPServicesGeneralException: if too many jobs are queued already
+        """
+        job = CreationJob(sim_id, function)
+        with self.__lock:
+            try:
+                self.__queue.put_nowait(job)
+            except Queue.Full:
+                raise NRPServicesGeneralException(
+                    "Too many simulations are being created, please try again later",
+                    "Server busy", error_code=503)
+            self.__jobs[sim_id] = job
+            self.__prune()
+            if len(self.__workers) < self.__max_workers:
+                worker = threading.Thread(target=self.__work,
+                                          name='creation-worker-%d' % len(self.__workers))
+                worker.daemon = True
+                worker.start()
+                self.__workers.append(worker)
+        return job
+
+    def get(self, sim_id):
+        """
+        Gets the creation job of a simulation
+
+        :param sim_id: the id of the simulation
+        :return: the CreationJob, None if the simulation was not created asynchronously
+        """
+        with self.__lock:
+            return self.__jobs.get(sim_id)
+
+    def __prune(self):
+        """
+        Forgets the oldest finished jobs beyond max_kept, the lock must be held
+        """
+        finished = [sim_id for sim_id, job in self.__jobs.iteritems()
+                    if job.finished is not None]
+        for sim_id in finished[:max(0, len(self.__jobs) - self.__max_kept)]:
+            del self.__jobs[sim_id]
+
+    def __work(self):
+        """
+        Worker loop
+        """
+        while True:
+            self.__queue.get().run()
+
+
+creation_jobs = _CreationJobs(Settings.simulation_creation_workers,
+                              Settings.simulation_creation_queue)
@@ -89,15 +89,11 @@ class PlaybackSimulationLifecycle(BackendSimulationLifecycle):
         try:
             if not os.path.exists(dest_path):
                 os.makedirs(dest_path)
-            with open(file_clone_destination, "w") as file_clone:
-
-                file_contents = client.get_file(
-                    UserAuthentication.get_header_token(),
-                    urllib.quote_plus(self.simulation.experiment_id + '/recordings'),
-                    os.path.basename(self.simulation.playback_path),  # zip name
-                    by_name=True, zipped=True)
-
-                file_clone.write(file_contents)
+            client.download_file(
+                UserAuthentication.get_header_token(),
+                urllib.quote_plus(self.simulation.experiment_id + '/recordings'),
+                os.path.basename(self.simulation.playback_path),  # zip name
+                file_clone_destination)
 
             ZipUtil.extractall(file_clone_destination, dest_path, True)
 
@@ -0,0 +1,220 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+The registry of the simulations of the backend
+"""
+
+import bisect
+import logging
+import datetime
+import threading
+import collections
+
+from hbp_nrp_backend.simulation_control import timezone
+from hbp_nrp_commons.workspace.Settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# the attributes of a simulation kept once it is compacted, those marshalled by the REST services
+# and those needed by the health checks
+SUMMARY_FIELDS = ('sim_id', 'state', 'environment_conf', 'owner', 'creation_date',
+                  'creation_datetime', 'gzserver_host', 'reservation', 'experiment_id',
+                  'brain_processes', 'creationUniqueID', 'playback_path', 'errors')
+
+SimulationSummary = collections.namedtuple('SimulationSummary', SUMMARY_FIELDS)
+
+
+class _SimulationRegistry(object):
+    """
+    The simulations of the backend, indexed by id.
+
+    The simulations which have not ended are tracked in an active set. A simulation which has
+    ended is kept whole for a while, so that its state can still be requested, and then compacted
+    into a summary. Only the latest summaries are kept. The error counters of the health checks
+    are updated once, when a simulation ends, so that no request is proportional to the number
+    of simulations run since the backend started.
+    """
+
+    FINISHED_STATES = ('stopped', 'failed')
+    # number of ended simulations kept whole before they are compacted
+    FINISHED_KEPT = 10
+    # the period of the recent errors
+    RECENT = datetime.timedelta(days=1)
+
+    def __init__(self, history):
+        """
+        :param history: the number of summaries of ended simulations kept
+        """
+        self.__history = max(0, history)
+        self.__lock = threading.RLock()
+        self.__simulations = None
+        self.__active = None
+        self.__finished = None
+        self.__summaries = None
+        self.__next_id = 0
+        self.__ended = 0
+        self.__ended_errors = 0
+        self.__recent = None
+        self.__recent_errors = 0
+        self.clear()
+
+    def clear(self):
+        """
+        Forgets all the simulations and resets the ids and the counters
+        """
+        with self.__lock:
+            self.__simulations = collections.OrderedDict()
+            self.__active = set()
+            self.__finished = collections.deque()
+            self.__summaries = collections.OrderedDict()
+            self.__next_id = 0
+            self.__ended = 0
+            self.__ended_errors = 0
+            # the creation datetime and the errors of the ended simulations, by creation datetime
+            self.__recent = []
+            self.__recent_errors = 0
+
+    @property
+    def next_id(self):
+        """
+        Returns the id of the next simulation
+        """
+        with self.__lock:
+            return self.__next_id
+
+    def append(self, simulation):
+        """
+        Registers a new simulation
+
+        :param simulation: the simulation
+        """
+        with self.__lock:
+            self.__refresh()
+            self.__simulations[simulation.sim_id] = simulation
+            self.__active.add(simulation.sim_id)
+            self.__next_id = max(self.__next_id, simulation.sim_id + 1)
+
+    def get(self, sim_id):
+        """
+        Gets a simulation, which is either active or ended recently
+
+        :param sim_id: the simulation id
+        :return: the simulation, None if it is unknown or has been compacted
+        """
+        with self.__lock:
+            return self.__simulations.get(sim_id)
+
+    def __getitem__(self, sim_id):
+        with self.__lock:
+            return self.__simulations[sim_id]
+
+    def __contains__(self, simulation):
+        with self.__lock:
+            return self.__simulations.get(simulation.sim_id) is simulation
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__simulations)
+
+    def __iter__(self):
+        with self.__lock:
+            return iter(self.__simulations.values())
+
+    def active(self):
+        """
+        Gets the simulations which have not ended
+
+        :return: a list of simulations, by id
+        """
+        with self.__lock:
+            self.__refresh()
+            return [self.__simulations[sim_id] for sim_id in sorted(self.__active)]
+
+    def listing(self):
+        """
+        Gets the summaries of the compacted simulations and the other simulations, by id
+
+        :return: a list of simulations and summaries
+        """
+        with self.__lock:
+            self.__refresh()
+            return sorted(self.__summaries.values() + self.__simulations.values(),
+                          key=lambda simulation: simulation.sim_id)
+
+    def errors(self, recent=False):
+        """
+        Counts the simulations and their errors
+
+        :param recent: (optional) count only the simulations created during the last day
+        :return: a tuple with the number of errors and the number of simulations
+        """
+        with self.__lock:
+            self.__refresh()
+            active = [self.__simulations[sim_id] for sim_id in self.__active]
+            if not recent:
+                errors, count = self.__ended_errors, self.__ended
+            else:
+                since = datetime.datetime.now(tz=timezone) - self.RECENT
+                self.__prune_recent(since)
+                errors, count = self.__recent_errors, len(self.__recent)
+                active = [simulation for simulation in active
+                          if simulation.creation_datetime > since]
+            return errors + sum(simulation.errors for simulation in active), count + len(active)
+
+    def __refresh(self):
+        """
+        Moves the simulations which have ended out of the active set, the lock must be held
+        """
+        ended = [sim_id for sim_id in self.__active
+                 if self.__simulations[sim_id].state in self.FINISHED_STATES]
+        for sim_id in ended:
+            simulation = self.__simulations[sim_id]
+            errors = simulation.errors
+            self.__active.remove(sim_id)
+            self.__finished.append(sim_id)
+            self.__ended += 1
+            self.__ended_errors += errors
+            bisect.insort(self.__recent, (simulation.creation_datetime, sim_id, errors))
+            self.__recent_errors += errors
+
+        while len(self.__finished) > self.FINISHED_KEPT:
+            simulation = self.__simulations.pop(self.__finished.popleft())
+            if self.__history:
+                self.__summaries[simulation.sim_id] = SimulationSummary(
+                    *[getattr(simulation, field, None) for field in SUMMARY_FIELDS])
+            logger.debug("Compacted simulation %s", simulation.sim_id)
+        while len(self.__summaries) > self.__history:
+            self.__summaries.popitem(last=False)
+
+    def __prune_recent(self, since):
+        """
+        Forgets the ended simulations created before a datetime, the lock must be held
+        """
+        index = bisect.bisect_left(self.__recent, (since,))
+        for _, _, errors in self.__recent[:index]:
+            self.__recent_errors -= errors
+        del self.__recent[:index]
+
+
+simulations = _SimulationRegistry(Settings.simulation_history)
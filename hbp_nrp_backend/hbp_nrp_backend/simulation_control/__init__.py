@@ -7,6 +7,7 @@ import pytz
 __author__ = 'GeorgHinkel'
 
 timezone = pytz.timezone('Europe/Zurich')
-simulations = []
 
+from hbp_nrp_backend.simulation_control.__SimulationRegistry import simulations
 from hbp_nrp_backend.simulation_control.__Simulation import Simulation
+from hbp_nrp_backend.simulation_control.__CreationJobs import creation_jobs, CreationJob
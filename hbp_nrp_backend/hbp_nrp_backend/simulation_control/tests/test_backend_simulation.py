@@ -67,6 +67,9 @@ class TestBackendSimulationLifecycle(unittest.TestCase):
         self.zip_util = MockUtil.fakeit(self, _base_path + 'ZipUtil')
         self.mocked_os = MockUtil.fakeit(self, _base_path + 'os')
         self.exp_mocked = MockUtil.fakeit(self, _base_path + 'exp_conf_api_gen')
+        self.dom_cache_mock = MockUtil.fakeit(self, _base_path + 'DOMCache')
+        self.dom_cache_mock.parse.side_effect = lambda content, parser: \
+            parser.CreateFromDocument(content)
         self.factory_mock = MockUtil.fakeit(self, _base_path + 'ROSCLESimulationFactoryClient')
         self.playback_mock = MockUtil.fakeit(self, 'hbp_nrp_backend.cle_interface.PlaybackClient.PlaybackClient')
 
@@ -181,3 +184,40 @@ class TestBackendSimulationLifecycle(unittest.TestCase):
         exp.environmentModel.model = 'myAwesomeModel'
         self.lifecycle._prepare_custom_environment(exp)
         self.zip_util.extractall.assert_called_once()
+
+    def test_save_record_to_user_storage(self):
+        self.simulation.cle.command_simulation_recorder.return_value.message = '/tmp/record'
+        client = self.storage_mock.return_value
+        file_name = self.lifecycle.save_record_to_user_storage()
+
+        self.assertTrue(file_name.startswith('recording_'))
+        client.create_folder.assert_called_once_with(
+            self.simulation.token, self.simulation.experiment_id, 'recordings')
+        self.zip_util.stream_from_path.assert_called_once()
+        self.assertEqual(self.zip_util.stream_from_path.call_args[0], ('/tmp/record',))
+        # the zip is streamed to the storage, never written to a temporary file
+        self.assertEqual(client.create_or_update.call_args[0][3],
+                         self.zip_util.stream_from_path.return_value)
+
+    def test_save_record_to_user_storage_progress(self):
+        self.simulation.cle.command_simulation_recorder.return_value.message = '/tmp/record'
+
+        def stream_from_path(path, progress):
+            for done in [0, 10, 15, 50, 100]:
+                progress(done, 100)
+            return 'zip'
+        self.zip_util.stream_from_path.side_effect = stream_from_path
+
+        file_name = self.lifecycle.save_record_to_user_storage()
+
+        # the progress is published every 10%, then the task is finished
+        cle = self.simulation.cle
+        self.assertEqual([c[0][2] for c in cle.publish_task_progress.call_args_list], [0, 1, 5, 10])
+        cle.publish_task_progress.assert_called_with(
+            'Saving the recording', 'Uploading {0} (100%)'.format(file_name), 10, 10)
+        cle.publish_task_done.assert_called_once_with('Saving the recording')
+
+        cle.publish_task_done.reset_mock()
+        self.storage_mock.return_value.create_or_update.side_effect = Exception
+        self.assertRaises(Exception, self.lifecycle.save_record_to_user_storage)
+        cle.publish_task_done.assert_called_once_with('Saving the recording')
@@ -0,0 +1,89 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Unit tests for the creation jobs of the simulations created asynchronously
+"""
+
+import time
+import threading
+import unittest
+from hbp_nrp_backend import NRPServicesGeneralException
+from hbp_nrp_backend.simulation_control.__CreationJobs import _CreationJobs, CreationJob
+
+
+class TestCreationJobs(unittest.TestCase):
+
+    def wait_for(self, job, state):
+        deadline = time.time() + 5
+        while (job.state != state or (state != CreationJob.RUNNING and job.finished is None)) \
+                and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(job.state, state)
+
+    def test_run_jobs(self):
+        jobs = _CreationJobs(max_workers=1, max_queued=2)
+
+        def fail():
+            raise Exception("No robot")
+
+        done = jobs.submit(0, lambda: None)
+        failed = jobs.submit(1, fail)
+        self.wait_for(done, CreationJob.DONE)
+        self.wait_for(failed, CreationJob.FAILED)
+
+        self.assertIsNone(done.error)
+        self.assertEqual(failed.error, "No robot")
+        self.assertGreaterEqual(failed.running_seconds, 0)
+        self.assertIs(jobs.get(0), done)
+        self.assertIsNone(jobs.get(2))
+
+    def test_queue_full(self):
+        jobs = _CreationJobs(max_workers=1, max_queued=1)
+        release = threading.Event()
+
+        running = jobs.submit(0, release.wait)
+        self.wait_for(running, CreationJob.RUNNING)
+        queued = jobs.submit(1, lambda: None)
+        with self.assertRaises(NRPServicesGeneralException) as context:
+            jobs.submit(2, lambda: None)
+        self.assertEqual(context.exception.error_code, 503)
+        self.assertEqual(queued.state, CreationJob.QUEUED)
+        self.assertIsNone(queued.running_seconds)
+        self.assertIsNone(jobs.get(2))
+
+        release.set()
+        self.wait_for(queued, CreationJob.DONE)
+
+    def test_finished_jobs_are_pruned(self):
+        jobs = _CreationJobs(max_workers=1, max_queued=1, max_kept=1)
+        first = jobs.submit(0, lambda: None)
+        self.wait_for(first, CreationJob.DONE)
+        second = jobs.submit(1, lambda: None)
+
+        self.assertIsNone(jobs.get(0))
+        self.assertIs(jobs.get(1), second)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -87,12 +87,10 @@ class TestPlaybackSimulationLifecycle(unittest.TestCase):
     def test_prepare_record_for_playback(self):
         self.m_os.path.exists.return_value = False
 
-        from mock import mock_open
-        with patch("__builtin__.open", mock_open()):
-            self.playback_lifecycle.prepare_record_for_playback()
+        self.playback_lifecycle.prepare_record_for_playback()
 
-        self.m_storage.return_value.get_file.assert_callled_once_with(
-            ANY, 'my_awesome_exp%2Frecordings', 'some.zip', by_name=True, zipped=True)
+        self.m_storage.return_value.download_file.assert_callled_once_with(
+            ANY, 'my_awesome_exp%2Frecordings', 'some.zip', ANY)
 
         self.m_os.makedirs.assert_callled_once_with('simulation/dir/a/path/to')
         self.m_ziputil.extractall.assert_callled_once_with('simulation/dir/a/path/to/some.zip',
@@ -0,0 +1,111 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Unit tests for the registry of the simulations
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from hbp_nrp_backend.simulation_control import timezone
+from hbp_nrp_backend.simulation_control.__SimulationRegistry import _SimulationRegistry
+
+
+class SimulationMock(object):
+
+    def __init__(self, sim_id, state='created', errors=0):
+        self.sim_id = sim_id
+        self.state = state
+        self.errors = errors
+        self.owner = 'default-owner'
+        self.creation_datetime = datetime.now(timezone)
+
+
+class TestSimulationRegistry(unittest.TestCase):
+
+    def setUp(self):
+        _SimulationRegistry.FINISHED_KEPT = 2
+        self.registry = _SimulationRegistry(history=3)
+
+    def tearDown(self):
+        _SimulationRegistry.FINISHED_KEPT = 10
+
+    def test_index(self):
+        first, second = SimulationMock(0), SimulationMock(1)
+        self.registry.append(first)
+        self.registry.append(second)
+
+        self.assertEqual(self.registry.next_id, 2)
+        self.assertIs(self.registry[1], second)
+        self.assertIs(self.registry.get(0), first)
+        self.assertIsNone(self.registry.get(2))
+        self.assertEqual(len(self.registry), 2)
+        self.assertEqual(list(self.registry), [first, second])
+        self.assertIn(first, self.registry)
+
+        self.registry.clear()
+        self.assertEqual(self.registry.next_id, 0)
+        self.assertEqual(len(self.registry), 0)
+
+    def test_active_and_compaction(self):
+        sims = [SimulationMock(sim_id) for sim_id in range(6)]
+        for sim in sims:
+            self.registry.append(sim)
+        for sim in sims[:5]:
+            sim.state = 'stopped'
+
+        self.assertEqual(self.registry.active(), [sims[5]])
+        # the last two ended simulations are kept whole
+        self.assertEqual(list(self.registry), sims[3:])
+        self.assertIsNone(self.registry.get(2))
+        listing = self.registry.listing()
+        self.assertEqual([sim.sim_id for sim in listing], range(6))
+        self.assertEqual(listing[0].owner, 'default-owner')
+        self.assertEqual(listing[0].state, 'stopped')
+        self.assertEqual(listing[0].experiment_id, None)
+
+        # only the last summaries are kept
+        sims[5].state = 'failed'
+        self.registry.append(SimulationMock(6))
+        self.assertEqual([sim.sim_id for sim in self.registry.listing()], range(1, 7))
+
+    def test_errors(self):
+        old = SimulationMock(0, state='failed', errors=1)
+        old.creation_datetime -= timedelta(days=1, seconds=1)
+        recent = SimulationMock(1, state='failed', errors=1)
+        halted = SimulationMock(2, state='halted', errors=1)
+        for sim in old, recent, halted, SimulationMock(3):
+            self.registry.append(sim)
+
+        self.assertEqual(self.registry.errors(), (3, 4))
+        self.assertEqual(self.registry.errors(recent=True), (2, 3))
+
+        # the counters survive the compaction of the simulations
+        for sim_id in range(4, 8):
+            self.registry.append(SimulationMock(sim_id, state='stopped'))
+        self.assertEqual(self.registry.errors(), (3, 8))
+        self.assertEqual(self.registry.errors(recent=True), (2, 7))
+
+
+if __name__ == '__main__':
+    unittest.main()
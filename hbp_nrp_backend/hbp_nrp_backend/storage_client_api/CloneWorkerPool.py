@@ -0,0 +1,161 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Bounded pool of worker threads used to clone experiment files concurrently
+"""
+
+import Queue
+import logging
+import threading
+from hbp_nrp_backend import NRPServicesGeneralException
+
+logger = logging.getLogger(__name__)
+
+
+class CloneWorkerPool(object):
+    """
+    Runs the listing and download tasks of a clone on a fixed number of worker threads.
+    Tasks may submit further tasks, e.g. listing a folder submits the download of its files.
+
+    The first failing task cancels all the tasks that have not started yet. When the pool is
+    joined, the error of the task with the smallest key is raised, so that errors are reported
+    in the same order regardless of the scheduling of the workers.
+
+    The pool is meant to be used as a context manager, leaving the block joins the pool.
+    """
+
+    def __init__(self, max_workers, cancel_event=None):
+        """
+        Creates the pool and starts its workers
+
+        :param max_workers: the maximum number of tasks run concurrently
+        :param cancel_event: an optional threading.Event, setting it cancels the pending tasks
+        """
+        self.__queue = Queue.Queue()
+        self.__cancelled = cancel_event if cancel_event is not None else threading.Event()
+        self.__errors = []
+        self.__pending = 0
+        self.__done = threading.Condition()
+
+        self.__workers = [threading.Thread(target=self.__work, name='clone-worker-%d' % i)
+                          for i in range(max(1, max_workers))]
+        for worker in self.__workers:
+            worker.daemon = True
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            # the submitting thread failed, drop whatever is still queued
+            self.cancel()
+            self.__wait()
+            return False
+        self.join()
+        return False
+
+    @property
+    def cancelled(self):
+        """
+        Whether the pool has been cancelled, either explicitly or by a failing task
+        """
+        return self.__cancelled.is_set()
+
+    def submit(self, key, func, *args, **kwargs):
+        """
+        Schedules a task
+
+        :param key: a sortable key identifying the task, used to order the reported errors
+        :param func: the function to run
+        :param args: the positional arguments of the function
+        :param kwargs: the keyword arguments of the function
+        """
+        with self.__done:
+            self.__pending += 1
+        self.__queue.put((key, func, args, kwargs))
+
+    def cancel(self):
+        """
+        Cancels the tasks that have not started yet
+        """
+        self.__cancelled.set()
+
+    def join(self):
+        """
+        Waits for all the tasks to complete and stops the workers
+
+        :raise: the error of the failed task with the smallest key, or an
+                NRPServicesGeneralException if the pool has been cancelled
+        """
+        self.__wait()
+
+        if self.__errors:
+            errors = sorted(self.__errors, key=lambda error: error[0])
+            for key, error in errors[1:]:
+                logger.error("Cloning of %s failed as well: %s", key, error)
+            raise errors[0][1]
+
+        if self.cancelled:
+            raise NRPServicesGeneralException("The cloning of the experiment files was cancelled",
+                                              "Clone cancelled")
+
+    def __wait(self):
+        """
+        Waits for the pending tasks, then terminates the workers
+        """
+        with self.__done:
+            while self.__pending:
+                # waiting with a timeout keeps the calling thread interruptible
+                self.__done.wait(0.5)
+
+        for _ in self.__workers:
+            self.__queue.put(None)
+        for worker in self.__workers:
+            worker.join()
+
+    def __work(self):
+        """
+        Worker loop
+        """
+        while True:
+            task = self.__queue.get()
+            if task is None:
+                return
+
+            key, func, args, kwargs = task
+            # pylint: disable=broad-except
+            try:
+                if not self.__cancelled.is_set():
+                    func(*args, **kwargs)
+            except Exception as e:
+                logger.exception("Cloning of %s failed", key)
+                self.__cancelled.set()
+                with self.__done:
+                    self.__errors.append((key, e))
+            finally:
+                with self.__done:
+                    self.__pending -= 1
+                    if not self.__pending:
+                        self.__done.notify_all()
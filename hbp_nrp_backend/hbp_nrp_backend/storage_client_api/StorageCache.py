@@ -0,0 +1,332 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Content-addressed, on-disk cache of the files downloaded from the storage
+"""
+
+import os
+import json
+import time
+import errno
+import fcntl
+import shutil
+import logging
+import collections
+import tempfile
+import threading
+import contextlib
+
+logger = logging.getLogger(__name__)
+
+# ioctl request cloning a file on copy-on-write file systems (btrfs, xfs)
+_FICLONE = 0x40049409
+
+
+class StorageCacheEntry(object):
+    """
+    A cached storage file
+    """
+
+    def __init__(self, digest, size, revision=None, etag=None, last_modified=None,
+                 mtime=None, last_access=None):
+        """
+        :param digest: the sha256 of the content, i.e. the name of the blob holding it
+        :param size: the size of the content in bytes
+        :param revision: the storage revision of the file, e.g. its modification date
+        :param etag: the ETag returned by the storage
+        :param last_modified: the Last-Modified header returned by the storage
+        :param mtime: the modification time of the blob when it was stored
+        :param last_access: the time of the last use of the entry
+        """
+        self.digest = digest
+        self.size = size
+        self.revision = revision
+        self.etag = etag
+        self.last_modified = last_modified
+        self.mtime = mtime
+        self.last_access = last_access or time.time()
+
+    def validators(self):
+        """
+        Returns the headers making a GET request conditional on the cached content
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class StorageCache(object):
+    """
+    Keeps the files downloaded from the storage across simulations. Entries are keyed by
+    storage folder and file name and remember the storage revision and the HTTP validators
+    of the content. The content itself is stored once per sha256 digest, so identical files
+    of different experiments share the same blob. When the cache is flushed, the least recently
+    used entries are evicted until the blobs fit in the maximum size.
+
+    Downloads hold the cache while they materialize blobs. Holds are counted, so that concurrent
+    clones pin every blob until the last of them is done, and the cache is flushed then.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, root, max_size, hardlinks=False):
+        """
+        :param root: the directory holding the cache, created on first use
+        :param max_size: the maximum total size of the cached content, in bytes
+        :param hardlinks: whether files are materialized as hard links to the blobs. This is
+                          the cheapest option, but the simulation must then never modify the
+                          files in place. Otherwise blobs are cloned (copy-on-write) if the file
+                          system supports it, or copied.
+        """
+        self.__root = root
+        self.__blobs = os.path.join(root, 'blobs')
+        self.__max_size = max_size
+        self.__hardlinks = hardlinks
+        self.__entries = None
+        self.__lock = threading.RLock()
+        self.__holds = 0
+        self.__stats = {'hits': 0, 'revalidations': 0, 'misses': 0, 'evictions': 0}
+
+    @property
+    def stats(self):
+        """
+        Returns a copy of the hit/miss counters of the cache
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats['size'] = self.size
+        return stats
+
+    @property
+    def size(self):
+        """
+        The total size of the cached content, in bytes
+        """
+        with self.__lock:
+            self.__load()
+            return sum(self.__blob_sizes().values())
+
+    @contextlib.contextmanager
+    def hold(self):
+        """
+        Holds the cache while files are downloaded through it: no blob is evicted until all
+        the holds are released, and the last release flushes the cache.
+        """
+        with self.__lock:
+            self.__holds += 1
+        try:
+            yield self
+        finally:
+            with self.__lock:
+                self.__holds -= 1
+                if not self.__holds:
+                    self.flush()
+
+    def lookup(self, key):
+        """
+        Returns the entry cached for the given key, if its blob is still intact
+
+        :param key: the key of the file, i.e. <storage folder>/<file name>
+        :return: a StorageCacheEntry or None
+        """
+        with self.__lock:
+            self.__load()
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            if not self.__is_intact(entry):
+                logger.info("Cached content of %s has been modified, dropping it", key)
+                del self.__entries[key]
+                return None
+            return entry
+
+    def hit(self, key, entry, destination, revision=None, revalidated=False):
+        """
+        Materializes a cached entry at the destination
+
+        :param key: the key of the file
+        :param entry: the entry returned by lookup
+        :param destination: the local path of the file
+        :param revision: the current storage revision of the file, if known
+        :param revalidated: whether the storage confirmed the content with a 304 status
+        """
+        with self.__lock:
+            self.__stats['revalidations' if revalidated else 'hits'] += 1
+            entry.last_access = time.time()
+            if revision is not None:
+                entry.revision = revision
+            self.__entries[key] = entry
+        self.__materialize(entry, destination)
+
+    def partial_file(self):
+        """
+        Returns the path of a new temporary file in the cache, to download content into
+        """
+        with self.__lock:
+            self.__load()
+        fd, path = tempfile.mkstemp(dir=self.__blobs, suffix='.part')
+        os.close(fd)
+        return path
+
+    # pylint: disable=too-many-arguments
+    def store(self, key, partial_file, digest, destination, revision=None, etag=None,
+              last_modified=None):
+        """
+        Adds a freshly downloaded file to the cache, then materializes it at the destination
+
+        :param key: the key of the file
+        :param partial_file: the temporary file holding the content, see partial_file
+        :param digest: the sha256 of the content
+        :param destination: the local path of the file
+        :param revision: the storage revision of the file
+        :param etag: the ETag returned by the storage
+        :param last_modified: the Last-Modified header returned by the storage
+        """
+        blob = os.path.join(self.__blobs, digest)
+        with self.__lock:
+            self.__load()
+            self.__stats['misses'] += 1
+            # replacing an existing blob with the same content also repairs it, in case it has
+            # been modified through a hard link
+            os.rename(partial_file, blob)
+            stat = os.stat(blob)
+            entry = StorageCacheEntry(digest, stat.st_size, revision, etag, last_modified,
+                                      stat.st_mtime)
+            for other in self.__entries.values():
+                if other.digest == digest:
+                    other.mtime = stat.st_mtime
+            self.__entries[key] = entry
+        self.__materialize(entry, destination)
+
+    def flush(self):
+        """
+        Evicts the least recently used entries exceeding the maximum size, then persists the
+        index of the cache. Nothing is evicted while the cache is held, so that blobs are never
+        removed while a clone is materializing them.
+        """
+        with self.__lock:
+            if self.__entries is None:
+                return
+            if not self.__holds:
+                self.__evict()
+            index = os.path.join(self.__root, self.INDEX_FILE)
+            with open(index + '.tmp', 'w') as index_file:
+                json.dump({key: entry.__dict__ for key, entry in self.__entries.iteritems()},
+                          index_file)
+            os.rename(index + '.tmp', index)
+
+    def __load(self):
+        """
+        Loads the index of the cache on first use and removes the blobs it does not reference
+        """
+        if self.__entries is not None:
+            return
+
+        self.__entries = {}
+        try:
+            os.makedirs(self.__blobs)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        # pylint: disable=broad-except
+        try:
+            with open(os.path.join(self.__root, self.INDEX_FILE)) as index_file:
+                for key, fields in json.load(index_file).iteritems():
+                    self.__entries[key] = StorageCacheEntry(**fields)
+        except IOError:
+            pass
+        except Exception:
+            logger.exception("Storage cache index is corrupted, starting from scratch")
+
+        referenced = set(entry.digest for entry in self.__entries.values())
+        for blob in os.listdir(self.__blobs):
+            if blob not in referenced:
+                os.remove(os.path.join(self.__blobs, blob))
+
+    def __blob_sizes(self):
+        """
+        Returns the size of every referenced blob
+        """
+        return {entry.digest: entry.size for entry in self.__entries.values()}
+
+    def __is_intact(self, entry):
+        """
+        Checks that the blob of an entry still holds the content that was downloaded
+        """
+        try:
+            stat = os.stat(os.path.join(self.__blobs, entry.digest))
+        except OSError:
+            return False
+        return stat.st_size == entry.size and stat.st_mtime == entry.mtime
+
+    def __evict(self):
+        """
+        Drops the least recently used entries until the cache fits in its maximum size
+        """
+        blob_sizes = self.__blob_sizes()
+        references = collections.Counter(entry.digest for entry in self.__entries.values())
+        total = sum(blob_sizes.values())
+        by_access = sorted(self.__entries.items(), key=lambda item: item[1].last_access)
+
+        for key, entry in by_access:
+            if total <= self.__max_size:
+                break
+            del self.__entries[key]
+            self.__stats['evictions'] += 1
+            references[entry.digest] -= 1
+            if not references[entry.digest]:
+                total -= blob_sizes[entry.digest]
+                try:
+                    os.remove(os.path.join(self.__blobs, entry.digest))
+                except OSError:
+                    pass
+
+    def __materialize(self, entry, destination):
+        """
+        Makes the content of an entry available at the destination path
+        """
+        blob = os.path.join(self.__blobs, entry.digest)
+        if os.path.lexists(destination):
+            os.remove(destination)
+
+        if self.__hardlinks:
+            try:
+                os.link(blob, destination)
+                return
+            except OSError:
+                # e.g. the simulation directory is on another device
+                pass
+
+        with open(blob, 'rb') as src, open(destination, 'wb') as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+                return
+            except IOError:
+                # the file system does not support copy-on-write clones
+                pass
+            shutil.copyfileobj(src, dst)
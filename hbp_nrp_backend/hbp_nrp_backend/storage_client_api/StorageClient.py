@@ -26,16 +26,21 @@ Wrapper around the storage API
 """
 
 import os
+import hashlib
 import logging
 import requests
-import shutil
 import urllib
 import re
+import shutil
 import textwrap
 import tempfile
+import contextlib
 from pyxb import ValidationError
 from xml.sax import SAXParseException
 from hbp_nrp_backend import NRPServicesGeneralException
+from hbp_nrp_backend.storage_client_api.StorageSession import StorageSession
+from hbp_nrp_backend.storage_client_api.CloneWorkerPool import CloneWorkerPool
+from hbp_nrp_backend.storage_client_api.StorageCache import StorageCache
 from hbp_nrp_commons.sim_config.SimConfig import ResourceType
 from hbp_nrp_commons.workspace.Settings import Settings
 from hbp_nrp_commons.workspace.SimUtil import SimUtil
@@ -98,6 +103,17 @@ class StorageClient(object):
             StorageClient.__instance._sim_dir = None
             # adding the resources folder into the created sim dir
             StorageClient.__instance.__resources_path = None
+            # keep-alive connection pool shared by all the threads using the client
+            StorageClient.__instance.__session = StorageSession(
+                pool_size=Settings.storage_pool_size,
+                max_retries=Settings.storage_max_retries,
+                backoff_factor=Settings.storage_retry_backoff,
+                timeout=Settings.storage_timeout)
+            # content of the cloned files, kept across simulations
+            StorageClient.__instance.__cache = StorageCache(
+                Settings.storage_cache_dir,
+                Settings.storage_cache_size,
+                Settings.storage_cache_hardlinks) if Settings.storage_cache_size else None
 
         return StorageClient.__instance
 
@@ -132,8 +148,8 @@ class StorageClient(object):
         """
 
         try:
-            res = requests.get(self.__proxy_url + '/identity/me',
-                               headers={'Authorization': 'Bearer ' + token})
+            res = self.__session.get(self.__proxy_url + '/identity/me',
+                                     headers={'Authorization': 'Bearer ' + token})
             if 200 <= res.status_code < 300:
                 return res.json()
             else:
@@ -172,7 +188,7 @@ class StorageClient(object):
             query_args['all'] = str(get_all).lower()
 
         try:
-            res = requests.get(
+            res = self.__session.get(
                 '{proxy_url}/storage/experiments?{params}'.format(
                     proxy_url=self.__proxy_url,
                     get_all=str(get_all).lower(),
@@ -206,16 +222,11 @@ class StorageClient(object):
         :return: if successful, the content of the file
         """
         try:
-            request_url = '{proxy_url}/storage/{experiment}/{filename}?byname={by_name}'.format(
-                proxy_url=self.__proxy_url,
-                experiment=experiment,
-                filename=filename,
-                by_name=str(by_name).lower()
-            )
+            request_url = self.__file_url(experiment, filename, by_name)
 
-            res = requests.get(request_url,
-                               headers={'Authorization': 'Bearer ' + token},
-                               stream=is_fileobject)
+            res = self.__session.get(request_url,
+                                     headers={'Authorization': 'Bearer ' + token},
+                                     stream=is_fileobject)
 
             # TODO what about missing files? i.e. 204
             if res.status_code < 200 or res.status_code >= 300:
@@ -233,6 +244,137 @@ class StorageClient(object):
             logger.exception(err)
             raise err
 
+    def download_file(self, token, experiment, filename, destination, by_name=True,
+                      checksum=None):
+        """
+        Streams a file under an experiment to a local file. The content is written chunk by
+        chunk, so the file is never held in memory. It goes to a temporary file next to the
+        destination first, which is moved into place once the download is complete.
+
+        :param token: a valid token to be used for the request
+        :param experiment: the name of the experiment, or the quoted uuid of a folder
+        :param filename: the name of the file to download
+        :param destination: the local path of the downloaded file
+        :param by_name: whether filename is a name or a uuid
+        :param checksum: optional name of a hashlib algorithm (e.g. 'md5') used to compute the
+                         checksum of the downloaded content
+        :return: the hexadecimal checksum of the content if requested, None otherwise
+        """
+        digest = hashlib.new(checksum) if checksum else None
+        partial_destination = destination + '.part'
+        try:
+            res = self.__session.get(self.__file_url(experiment, filename, by_name),
+                                     headers={'Authorization': 'Bearer ' + token},
+                                     stream=True)
+            try:
+                self.__write_content(res, partial_destination, digest)
+            finally:
+                res.close()
+
+            os.rename(partial_destination, destination)
+        except requests.exceptions.ConnectionError, err:
+            logger.exception(err)
+            raise err
+        finally:
+            if os.path.exists(partial_destination):
+                os.remove(partial_destination)
+
+        return digest.hexdigest() if digest is not None else None
+
+    def download_cached_file(self, token, experiment, filename, destination, revision=None):
+        """
+        Same as download_file, going through the local storage cache. Files whose storage
+        revision matches the cached one are served without any request. Otherwise the request
+        is made conditional on the cached content, and only the files which actually changed
+        are transferred.
+
+        :param token: a valid token to be used for the request
+        :param experiment: the name of the experiment, or the quoted uuid of a folder
+        :param filename: the name of the file to download
+        :param destination: the local path of the downloaded file
+        :param revision: the storage revision of the file, i.e. the modifiedOn field of its
+                         folder listing entry
+        """
+        if self.__cache is None:
+            self.download_file(token, experiment, filename, destination)
+            return
+
+        with self.__cache.hold():
+            self.__download_cached_file(token, experiment, filename, destination, revision)
+
+    def __download_cached_file(self, token, experiment, filename, destination, revision):
+        """
+        Downloads a file through the local storage cache, which must be held
+        """
+        key = '{0}/{1}'.format(experiment, filename)
+        entry = self.__cache.lookup(key)
+        if entry is not None and revision is not None and entry.revision == revision:
+            self.__cache.hit(key, entry, destination)
+            return
+
+        headers = {'Authorization': 'Bearer ' + token}
+        if entry is not None:
+            headers.update(entry.validators())
+
+        try:
+            res = self.__session.get(self.__file_url(experiment, filename, True),
+                                     headers=headers, stream=True)
+            try:
+                if res.status_code == 304 and entry is not None:
+                    self.__cache.hit(key, entry, destination, revision, revalidated=True)
+                    return
+
+                partial_file = self.__cache.partial_file()
+                try:
+                    digest = self.__write_content(res, partial_file, hashlib.sha256())
+                    self.__cache.store(key, partial_file, digest, destination, revision,
+                                       res.headers.get('ETag'), res.headers.get('Last-Modified'))
+                finally:
+                    if os.path.exists(partial_file):
+                        os.remove(partial_file)
+            finally:
+                res.close()
+        except requests.exceptions.ConnectionError, err:
+            logger.exception(err)
+            raise err
+
+    @staticmethod
+    def __write_content(res, path, digest=None):
+        """
+        Writes the content of a streamed response to a file, chunk by chunk
+
+        :param res: the response of a request made with stream=True
+        :param path: the path of the file to write
+        :param digest: an optional hashlib object updated with the content
+        :return: the hexadecimal digest of the content, None if no digest is given
+        """
+        if res.status_code < 200 or res.status_code >= 300:
+            raise Exception('Failed to communicate with the storage server, status code {}'
+                            .format(res.status_code))
+
+        with open(path, 'wb') as destination_file:
+            for chunk in res.iter_content(chunk_size=Settings.storage_chunk_size):
+                destination_file.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+
+        return digest.hexdigest() if digest is not None else None
+
+    def __file_url(self, experiment, filename, by_name):
+        """
+        Builds the url of a file under an experiment
+
+        :param experiment: the name of the experiment
+        :param filename: the name of the file
+        :param by_name: whether filename is a name or a uuid
+        """
+        return '{proxy_url}/storage/{experiment}/{filename}?byname={by_name}'.format(
+            proxy_url=self.__proxy_url,
+            experiment=experiment,
+            filename=filename,
+            by_name=str(by_name).lower()
+        )
+
     def delete_file(self, token, experiment, filename):
         """
         Deletes a file under under an experiment based on the
@@ -248,7 +390,7 @@ class StorageClient(object):
                 path=urllib.quote(os.path.join(experiment, filename), safe='')
             )
 
-            res = requests.delete(request_url, headers={'Authorization': 'Bearer ' + token})
+            res = self.__session.delete(request_url, headers={'Authorization': 'Bearer ' + token})
 
             if res.status_code < 200 or res.status_code >= 300:
                 raise Exception(
@@ -267,7 +409,8 @@ class StorageClient(object):
         :param token: a valid token to be used for the request
         :param experiment: the name of the experiment
         :param filename: the name of the file to update/create
-        :param content: the content of the file
+        :param content: the content of the file, or a generator of chunks of the content
+                        which is then streamed with a chunked transfer encoding
         :param content_type: the content type of the file i.e. text/plain or
                              application/octet-stream
         :param append: append to file or create new file
@@ -280,10 +423,10 @@ class StorageClient(object):
                 filename=filename,
                 appendquery=append_query)
 
-            res = requests.post(request_url,
-                                headers={'content-type': content_type,
-                                         'Authorization': 'Bearer ' + token},
-                                data=content)
+            res = self.__session.post(request_url,
+                                      headers={'content-type': content_type,
+                                               'Authorization': 'Bearer ' + token},
+                                      data=content)
 
             if res.status_code < 200 or res.status_code >= 300:
                 raise Exception('Failed to communicate with the storage server, status code ' +
@@ -308,7 +451,7 @@ class StorageClient(object):
                 name=name
             )
 
-            res = requests.post(request_url, headers={'Authorization': 'Bearer ' + token})
+            res = self.__session.post(request_url, headers={'Authorization': 'Bearer ' + token})
 
             if res.status_code == 400:
                 logger.info('The folder with the name {0} already exists in the storage,reusing'
@@ -342,7 +485,7 @@ class StorageClient(object):
                 experiment=experiment
             )
 
-            res = requests.get(request_url, headers={'Authorization': 'Bearer ' + token})
+            res = self.__session.get(request_url, headers={'Authorization': 'Bearer ' + token})
 
             if res.status_code < 200 or res.status_code >= 300:
                 raise Exception(
@@ -373,9 +516,9 @@ class StorageClient(object):
                 model_type=ModelType.types[model.type],
                 model_name=model.name
             )
-            res = requests.get(request_url,
-                               headers={'Authorization': 'Bearer ' + token,
-                                        'context-id': context_id})
+            res = self.__session.get(request_url,
+                                     headers={'Authorization': 'Bearer ' + token,
+                                              'context-id': context_id})
 
             if res.status_code < 200 or res.status_code >= 300:
                 raise Exception(
@@ -402,9 +545,9 @@ class StorageClient(object):
                 model_type=ModelType.types[model.type],
                 model_name=model.name
             )
-            res = requests.get(request_url,
-                               headers={'Authorization': 'Bearer ' + token,
-                                        'context-id': context_id})
+            res = self.__session.get(request_url,
+                                     headers={'Authorization': 'Bearer ' + token,
+                                              'context-id': context_id})
 
             if res.status_code < 200 or res.status_code >= 300:
                 raise Exception(
@@ -430,9 +573,9 @@ class StorageClient(object):
                 proxy_url=self.__proxy_url,
                 modelType=ModelType.types[model_type]
             )
-            res = requests.get(request_url,
-                               headers={'Authorization': 'Bearer ' + token,
-                                        'context-id': context_id})
+            res = self.__session.get(request_url,
+                                     headers={'Authorization': 'Bearer ' + token,
+                                              'context-id': context_id})
             if res.status_code < 200 or res.status_code >= 300:
                 raise Exception(
                     'Failed to communicate with the storage server, status code ' +
@@ -463,7 +606,7 @@ class StorageClient(object):
                 textures_path=urllib.quote_plus('/resources/textures')
             )
 
-            res = requests.get(request_url, headers={'Authorization': 'Bearer ' + token})
+            res = self.__session.get(request_url, headers={'Authorization': 'Bearer ' + token})
 
             if res.status_code < 200 or res.status_code >= 300:
                 raise Exception(
@@ -489,15 +632,16 @@ class StorageClient(object):
         for folder_entry in self.list_files(token, experiment):
             if filename in folder_entry['name']:
                 clone_destination = os.path.join(self._sim_dir, filename)
-                with open(clone_destination, "w") as f:
-                    f.write(self.get_file(token, experiment, filename, by_name=True))
+                self.download_file(token, experiment, filename, clone_destination)
                 break
         else:
             return None  # filename not found
 
         return clone_destination
 
-    def copy_file_content(self, token, src_folder, dest_folder, filename, is_fileobject=False):
+    # pylint: disable=unused-argument
+    def copy_file_content(self, token, src_folder, dest_folder, filename, is_fileobject=False,
+                          revision=None):
         """
         copy the content of file located in the Storage into the proper tmp folder
 
@@ -505,28 +649,12 @@ class StorageClient(object):
         :param src_folder: folder location where it will be copy from
         :param dest_folder: folder location where it will be copy to
         :param filename: name of the file to be copied.
-        :param is_fileobject: flag to signal an object file.
-        """
-        _, ext = os.path.splitext(filename)
-        # if the file is a texture we have to copy a file object, not a string
-        if is_fileobject:
-            with open(os.path.join(src_folder, filename), "wb") as texture_file:
-                shutil.copyfileobj(
-                    self.get_file(
-                        token,
-                        dest_folder, filename,
-                        by_name=True, zipped=False, is_fileobject=is_fileobject),
-                    texture_file
-                )
-        else:
-            with open(os.path.join(src_folder, filename), "w") as f:
-                f.write(
-                    self.get_file(
-                        token,
-                        dest_folder, filename,
-                        by_name=True, zipped=(ext.lower() == ".zip"), is_fileobject=is_fileobject
-                    )
-                )
+        :param is_fileobject: flag to signal an object file. Kept for compatibility, every
+                              file is now streamed to disk.
+        :param revision: the storage revision of the file, used to validate the local cache
+        """
+        self.download_cached_file(token, dest_folder, filename,
+                                  os.path.join(src_folder, filename), revision)
 
     # pylint: disable=no-self-use
     def check_file_extension(self, filename, extensions):
@@ -538,38 +666,52 @@ class StorageClient(object):
         """
         return os.path.splitext(filename)[1].lower() in extensions
 
-    def copy_folder_content_to_tmp(self, token, folder):
+    def copy_folder_content_to_tmp(self, token, folder, pool=None):
         """
         copy the content of the folder located in storage/experiment into sim_dir folder
 
         :param token: The token of the request
         :param folder: the folder in the storage folder to copy in tmp folder,
                        it has included the uuid of the experiment
+        :param pool: the CloneWorkerPool running the copy, if None the copy is run on a
+                     dedicated pool and this method returns once it is complete
         """
+        if pool is None:
+            with self.__hold_cache(), \
+                    CloneWorkerPool(Settings.storage_clone_workers) as folder_pool:
+                self.copy_folder_content_to_tmp(token, folder, folder_pool)
+            return
+
         folder['fullpath'] = folder['name']
-        child_folders = [folder]
-        folder_path = ''
-        while child_folders:
-            actual_folder = child_folders.pop()
-            folder_path = actual_folder['fullpath']
-            folder_uuid = urllib.quote_plus(actual_folder['uuid'])
-            for folder_entry in self.list_files(token, folder_uuid, True):
-                if folder_entry['type'] == 'folder' and folder_entry['name'] \
-                        not in self.__filtered_resources:
-                    folder_entry['fullpath'] = os.path.join(
-                        folder_path, folder_entry['name'])
-                    child_folders.append(folder_entry)
-                if folder_entry['type'] == 'file':
-                    folder_tmp_path = str(os.path.join(self._sim_dir, folder_path))
-                    SimUtil.makedirs(folder_tmp_path)
-                    is_fileobject = os.path.splitext(folder_entry['name'])[1].lower() == '.h5'
-                    self.copy_file_content(
-                        token,
-                        folder_tmp_path,
-                        folder_uuid,
-                        folder_entry['name'],
-                        is_fileobject=is_fileobject
-                    )
+        pool.submit(folder['fullpath'], self.__copy_folder_entries, token, folder, pool)
+
+    def __copy_folder_entries(self, token, folder, pool):
+        """
+        Lists a storage folder and schedules the copy of its files and sub-folders
+
+        :param token: The token of the request
+        :param folder: the storage folder entry, including its 'fullpath' in the sim_dir
+        :param pool: the CloneWorkerPool running the copy
+        """
+        folder_path = folder['fullpath']
+        folder_uuid = urllib.quote_plus(folder['uuid'])
+        for folder_entry in self.list_files(token, folder_uuid, True):
+            entry_path = os.path.join(folder_path, folder_entry['name'])
+            if folder_entry['type'] == 'folder' and folder_entry['name'] \
+                    not in self.__filtered_resources:
+                folder_entry['fullpath'] = entry_path
+                pool.submit(entry_path, self.__copy_folder_entries, token, folder_entry, pool)
+            if folder_entry['type'] == 'file':
+                folder_tmp_path = str(os.path.join(self._sim_dir, folder_path))
+                SimUtil.makedirs(folder_tmp_path)
+                is_fileobject = os.path.splitext(folder_entry['name'])[1].lower() == '.h5'
+                pool.submit(entry_path, self.copy_file_content,
+                            token,
+                            folder_tmp_path,
+                            folder_uuid,
+                            folder_entry['name'],
+                            is_fileobject=is_fileobject,
+                            revision=folder_entry.get('modifiedOn'))
 
     def copy_resources_folder(self, token, experiment):
         """
@@ -588,10 +730,14 @@ class StorageClient(object):
             logger.exception('An error happened trying to copy resources to tmp ')
             raise
 
-    def create_material_from_textures(self, textures):
+    # pylint: disable=no-self-use
+    def create_material_from_textures(self, textures, destination):
         """
         Algorithm to create a new material from the textures. For every texture
         we append a new default material which points to the texture.
+
+        :param textures: the texture entries of the resources/textures folder
+        :param destination: the path of the custom.material script to write
         """
         # The material script is a stripped down version of an OGRE material script
         # see http://wiki.ogre3d.org/Materials for the documentation
@@ -620,10 +766,8 @@ class StorageClient(object):
             for texture in textures
         ]
 
-        # Create a custom.material script and pass it to all the required directories
-        for directory in self.__texture_directories:
-            with open(os.path.join(directory, 'materials', 'scripts', 'custom.material'), 'w') as f:
-                f.write(''.join(material_scripts))
+        with open(destination, 'w') as f:
+            f.write(''.join(material_scripts))
 
     @staticmethod
     def filter_textures(textures):
@@ -652,7 +796,8 @@ class StorageClient(object):
     def generate_textures(self, experiment, token):
         """
         Clones all the contents of the textures folders to the temporary directory and
-        creates the structure required by gazebo and gzweb.
+        creates the structure required by gazebo and gzweb. Every texture is downloaded
+        once into a staging directory, then linked into all the texture directories.
 
         :param token: The token of the request
         :param experiment: The experiment which contains the textures folder
@@ -668,78 +813,135 @@ class StorageClient(object):
             # $NRP/gzweb/http/client/assets/media | custom_textures
             self.create_textures_paths()
 
-            # Generate a custom material file which points to all the textures
-            self.create_material_from_textures(textures)
+            staging_dir = tempfile.mkdtemp(prefix='nrp.textures.')
+            try:
+                # Download the textures concurrently, once
+                with self.__hold_cache(), \
+                        CloneWorkerPool(Settings.storage_clone_workers) as pool:
+                    for texture in textures:
+                        pool.submit(texture['name'], self.copy_file_content,
+                                    token,
+                                    staging_dir,
+                                    urllib.quote_plus(experiment + '/resources/textures'),
+                                    texture['name'],
+                                    is_fileobject=True,
+                                    revision=texture.get('modifiedOn'))
+
+                # Generate a custom material file which points to all the textures
+                material = os.path.join(staging_dir, 'custom.material')
+                self.create_material_from_textures(textures, material)
+
+                for directory in self.__texture_directories:
+                    materials_dir = os.path.join(directory, 'materials')
+                    self.__link_file(material,
+                                     os.path.join(materials_dir, 'scripts', 'custom.material'))
+                    for texture in textures:
+                        self.__link_file(os.path.join(staging_dir, texture['name']),
+                                         os.path.join(materials_dir, 'textures', texture['name']))
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+    @contextlib.contextmanager
+    def __hold_cache(self):
+        """
+        Holds the storage cache, if enabled, so that no blob is evicted before the files being
+        downloaded are materialized. The cache is flushed once the last hold is released.
+        """
+        if self.__cache is None:
+            yield
+        else:
+            with self.__cache.hold():
+                yield
 
-            # For the backend directories and for every texture copy over the textures
-            for directory in self.__texture_directories:
-                for texture in textures:
-                    self.copy_file_content(token,
-                                           os.path.join(directory, 'materials', 'textures'),
-                                           urllib.quote_plus(experiment + '/resources/textures'),
-                                           texture['name'],
-                                           is_fileobject=True)
+    @staticmethod
+    def __link_file(source, destination):
+        """
+        Hard links a file, or copies it if the destination is on another device
+
+        :param source: the path of the existing file
+        :param destination: the path of the link, replaced if it exists
+        """
+        if os.path.lexists(destination):
+            os.remove(destination)
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
 
     # pylint: disable=broad-except, dangerous-default-value
-    def clone_all_experiment_files(self, token, experiment, destination_dir=None, exclude=[]):
+    def clone_all_experiment_files(self, token, experiment, destination_dir=None, exclude=[],
+                                   cancel_event=None):
         """
         Clones all the experiment files to a simulation folder.
         The caller has then the responsibility of managing this folder.
+        Folders are listed and files are downloaded concurrently, by at most
+        Settings.storage_clone_workers threads.
 
         :param token: The token of the request
         :param experiment: The experiment to clone
         :param destination_dir: the directory in which to clone the files,
             if None is provided, clones in a temporary folder
         :param exclude: a list of folders of files not to clone (folder names ends with '/')
+        :param cancel_event: an optional threading.Event, setting it aborts the clone
         :return: A dictionary containing the paths to the experiment files
         """
 
-        # pylint: disable=too-many-locals
-        # if something goes wrong while generating textures we just log the error
-        # and continue like nothing happened
-        try:
-            self.generate_textures(experiment, token)
-        except Exception as e:
-            logger.info("Could not generate textures, error occurred : %s", (str(e)))
-
-        destination_dir = destination_dir if destination_dir else tempfile.mkdtemp(prefix='nrp.')
-        self._sim_dir = destination_dir
-        self.__resources_path = os.path.join(self._sim_dir, "resources")
-
-        exclude_files = [f for f in exclude if not f.endswith('/')]
-        exclude_dirs = [os.path.dirname(d) for d in exclude if d.endswith('/')]
-
-        for entry_to_clone in self.list_files(token, experiment, folder=True):
-            # Filter out excluded folders and files
-            if entry_to_clone['type'] == 'folder':
-                if entry_to_clone['name'] in exclude_dirs:
-                    continue
-            else:
-                if (entry_to_clone['name'] in exclude_files or
-                        os.path.dirname(entry_to_clone['name']) in exclude_dirs):
-                    continue
-
-            if entry_to_clone['type'] == 'folder':
-                self.copy_folder_content_to_tmp(token, entry_to_clone)
-            else:  # == 'file'
-                dest_file_path = os.path.join(destination_dir, entry_to_clone['name'])
-                with open(dest_file_path, "w") as file_clone:
-
-                    zipped = os.path.splitext(entry_to_clone['name'])[1].lower() == '.zip'
-                    is_fileobject = os.path.splitext(entry_to_clone['name'])[1].lower() == '.h5'
-                    file_contents = self.get_file(
-                        token,
-                        experiment,
-                        entry_to_clone['name'],
-                        by_name=True,
-                        zipped=zipped,
-                        is_fileobject=is_fileobject
-                    )
-
-                    file_clone.write(file_contents)
+        # hold the cache for the whole clone, textures included, so that none of the blobs
+        # is evicted before all the files are materialized
+        with self.__hold_cache():
+            # if something goes wrong while generating textures we just log the error
+            # and continue like nothing happened
+            try:
+                self.generate_textures(experiment, token)
+            except Exception as e:
+                logger.info("Could not generate textures, error occurred : %s", (str(e)))
+
+            if not destination_dir:
+                destination_dir = tempfile.mkdtemp(prefix='nrp.')
+            self._sim_dir = destination_dir
+            self.__resources_path = os.path.join(self._sim_dir, "resources")
+
+            exclude_files = [f for f in exclude if not f.endswith('/')]
+            exclude_dirs = [os.path.dirname(d) for d in exclude if d.endswith('/')]
+
+            with CloneWorkerPool(Settings.storage_clone_workers, cancel_event) as pool:
+                for entry_to_clone in self.list_files(token, experiment, folder=True):
+                    # Filter out excluded folders and files
+                    if entry_to_clone['type'] == 'folder':
+                        if entry_to_clone['name'] in exclude_dirs:
+                            continue
+                    else:
+                        if (entry_to_clone['name'] in exclude_files or
+                                os.path.dirname(entry_to_clone['name']) in exclude_dirs):
+                            continue
+
+                    if entry_to_clone['type'] == 'folder':
+                        self.copy_folder_content_to_tmp(token, entry_to_clone, pool)
+                    else:  # == 'file'
+                        pool.submit(entry_to_clone['name'], self.__clone_experiment_file,
+                                    token, experiment, entry_to_clone['name'], destination_dir,
+                                    entry_to_clone.get('modifiedOn'))
+
+        if self.__cache is not None:
+            logger.info("Storage cache statistics: %s", self.__cache.stats)
 
         return destination_dir
 
+    # pylint: disable=too-many-arguments
+    def __clone_experiment_file(self, token, experiment, filename, destination_dir,
+                                revision=None):
+        """
+        Clones a file located at the root of an experiment
+
+        :param token: The token of the request
+        :param experiment: The experiment containing the file
+        :param filename: The name of the file
+        :param destination_dir: The directory in which to clone the file
+        :param revision: The storage revision of the file
+        """
+        self.download_cached_file(token, experiment, filename,
+                                  os.path.join(destination_dir, filename), revision)
+
     @staticmethod
     def parse_and_check_file_is_valid(filepath, create_obj_function, instance_type):
         """
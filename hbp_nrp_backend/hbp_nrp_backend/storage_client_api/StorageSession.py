@@ -0,0 +1,77 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Pooled HTTP session used to talk to the storage proxy
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+
+class StorageSession(requests.Session):
+    """
+    A requests session holding a pool of keep-alive connections towards the storage proxy.
+    The underlying urllib3 pool is thread-safe, so a single instance can be shared by all the
+    threads of the backend. Idempotent requests are retried with an exponential backoff on
+    connection errors and on transient server errors.
+    """
+
+    # status codes for which it is worth retrying an idempotent request
+    RETRY_STATUS_CODES = (502, 503, 504)
+
+    def __init__(self, pool_size=10, max_retries=3, backoff_factor=0.3, timeout=None):
+        """
+        Creates the session and mounts the pooled adapters
+
+        :param pool_size: the maximum number of connections kept alive per host
+        :param max_retries: the number of times an idempotent request is retried
+        :param backoff_factor: backoff factor (in seconds) between two consecutive retries
+        :param timeout: the default timeout of a call, either a number of seconds or a
+                        (connect timeout, read timeout) tuple. None means no timeout.
+        """
+        super(StorageSession, self).__init__()
+        self.timeout = timeout
+
+        # raise_on_status=False: once the retries are exhausted, hand the last response back
+        # to the caller so that it can report the status code as it always did
+        retry = Retry(total=max_retries,
+                      backoff_factor=backoff_factor,
+                      status_forcelist=self.RETRY_STATUS_CODES,
+                      raise_on_status=False)
+
+        for prefix in ('http://', 'https://'):
+            self.mount(prefix, HTTPAdapter(pool_connections=pool_size,
+                                           pool_maxsize=pool_size,
+                                           max_retries=retry))
+
+    # pylint: disable=arguments-differ
+    def request(self, method, url, **kwargs):
+        """
+        Sends a request applying the default timeout when the caller does not specify one.
+        See requests.Session.request for the list of parameters.
+        """
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super(StorageSession, self).request(method, url, **kwargs)
@@ -0,0 +1,3 @@
+"""
+This module contains unit tests for the storage client
+"""
@@ -0,0 +1,228 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+A local stand-in for the storage proxy, used to test the storage client against a real
+HTTP server
+"""
+
+import json
+import hashlib
+import socket
+import time
+import urllib
+import urlparse
+import threading
+import BaseHTTPServer
+import SocketServer
+
+
+class _ThreadedHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    HTTP server handling every connection in its own thread
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        # connections dropped by the client or closed on shutdown are expected
+        pass
+
+
+class _FakeStorageHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Serves the folders and files of the owning FakeStorageServer. Keep-alive is supported
+    so that the number of opened connections can be observed.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.storage.connection_opened(self.connection)
+
+    # pylint: disable=redefined-builtin
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body='', content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).iteritems():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        storage = self.server.storage
+        path = urlparse.urlparse(self.path).path
+        length = int(self.headers.getheader('Content-Length') or 0)
+        body = self.rfile.read(length) if length else ''
+
+        self._reply(*storage.handle(self.command, path, body, self.headers))
+
+    # pylint: disable=invalid-name
+    def do_GET(self):
+        self._handle()
+
+    do_POST = do_GET
+    do_DELETE = do_GET
+
+
+class FakeStorageServer(object):
+    """
+    In-memory storage proxy. Folders are identified by their (unquoted) uuid, which for the
+    top level experiment folders is simply the experiment name.
+    """
+
+    def __init__(self, latency=0.):
+        """
+        :param latency: delay (in seconds) added to every request to emulate a remote server
+        """
+        self.latency = latency
+        self.folders = {}
+        self.files = {}
+        self.fail_next = 0
+        self.connections = 0
+        self.requests = []
+        self.__lock = threading.Lock()
+        self.__sockets = []
+        self.__server = None
+        self.__thread = None
+
+    @property
+    def url(self):
+        """
+        The base url of the server, to be used as storage proxy url
+        """
+        return 'http://127.0.0.1:{0}'.format(self.__server.server_address[1])
+
+    def add_folder(self, parent, name, uuid=None):
+        """
+        Adds a folder and returns its uuid
+
+        :param parent: the uuid of the parent folder, None for an experiment folder
+        :param name: the name of the folder
+        :param uuid: the uuid of the folder, defaults to <parent>/<name>
+        """
+        uuid = uuid or (name if parent is None else parent + '/' + name)
+        self.folders.setdefault(uuid, [])
+        if parent is not None:
+            self.folders.setdefault(parent, []).append(
+                {'uuid': uuid, 'name': name, 'parent': parent, 'type': 'folder'})
+        return uuid
+
+    def add_file(self, parent, name, content, modified_on=None):
+        """
+        Adds a file to a folder, or replaces it
+
+        :param parent: the uuid of the folder
+        :param name: the name of the file
+        :param content: the content of the file
+        :param modified_on: the modification date returned in the folder listing
+        """
+        entries = self.folders.setdefault(parent, [])
+        entries[:] = [e for e in entries if e['name'] != name]
+        entry = {'uuid': parent + '/' + name, 'name': name, 'parent': parent, 'type': 'file'}
+        if modified_on is not None:
+            entry['modifiedOn'] = modified_on
+        entries.append(entry)
+        self.files[(parent, name)] = content
+
+    def connection_opened(self, connection):
+        """
+        Called by the request handler for every accepted connection
+        """
+        with self.__lock:
+            self.connections += 1
+            self.__sockets.append(connection)
+
+    def count_requests(self, method=None, path=None):
+        """
+        Returns the number of requests received, optionally filtered by method and path
+        """
+        return len([r for r in self.requests
+                    if (method is None or r[0] == method) and (path is None or r[1] == path)])
+
+    def handle(self, method, path, body, headers):
+        """
+        Computes the reply of a request. Files are served with an ETag and the conditional
+        requests matching it are answered with a 304.
+
+        :return: a (status code, body, content type, headers) tuple
+        """
+        with self.__lock:
+            self.requests.append((method, path))
+            fail = self.fail_next > 0
+            self.fail_next -= 1 if fail else 0
+
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            return 503, '', 'text/plain', None
+
+        if path == '/identity/me':
+            return 200, json.dumps({'id': 'fake_id'}), 'application/json', None
+
+        segments = [urllib.unquote(s) for s in path.split('/')[2:]]
+        if len(segments) == 1 and method == 'GET':
+            if segments[0] not in self.folders:
+                return 404, '', 'text/plain', None
+            return 200, json.dumps(self.folders[segments[0]]), 'application/json', None
+        if len(segments) == 2 and method == 'GET':
+            if tuple(segments) not in self.files:
+                return 404, '', 'text/plain', None
+            content = self.files[tuple(segments)]
+            etag = '"{0}"'.format(hashlib.md5(content).hexdigest())
+            if headers.getheader('If-None-Match') == etag:
+                return 304, '', 'application/octet-stream', {'ETag': etag}
+            return 200, content, 'application/octet-stream', {'ETag': etag}
+        if len(segments) == 2 and method == 'POST':
+            self.add_file(segments[0], segments[1], body)
+            return 200, json.dumps({'uuid': '/'.join(segments)}), 'application/json', None
+        return 400, '', 'text/plain', None
+
+    def start(self):
+        """
+        Starts serving on an ephemeral port of the loopback interface
+        """
+        self.__server = _ThreadedHTTPServer(('127.0.0.1', 0), _FakeStorageHandler)
+        self.__server.storage = self
+        self.__thread = threading.Thread(target=self.__server.serve_forever)
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+        # close the kept-alive connections
+        for connection in self.__sockets:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
@@ -0,0 +1,134 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Clone worker pool unit test
+"""
+
+import time
+import unittest
+import threading
+from hbp_nrp_backend import NRPServicesGeneralException
+from hbp_nrp_backend.storage_client_api.CloneWorkerPool import CloneWorkerPool
+
+
+class TestCloneWorkerPool(unittest.TestCase):
+
+    def test_runs_nested_tasks(self):
+        done = []
+
+        def task(depth):
+            done.append(depth)
+            if depth < 3:
+                pool.submit(depth + 1, task, depth + 1)
+                pool.submit(depth + 1, task, depth + 1)
+
+        with CloneWorkerPool(4) as pool:
+            pool.submit(0, task, 0)
+
+        self.assertEqual(len(done), 15)
+
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def task():
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        with CloneWorkerPool(3) as pool:
+            for i in range(20):
+                pool.submit(i, task)
+
+        self.assertEqual(running[1], 3)
+
+    def test_errors_are_reported_in_key_order(self):
+        started = threading.Semaphore(0)
+        release = threading.Event()
+
+        def fail(message, delay):
+            started.release()
+            release.wait()
+            time.sleep(delay)
+            raise IOError(message)
+
+        pool = CloneWorkerPool(2)
+        pool.submit('b/file', fail, 'second', 0)
+        pool.submit('a/file', fail, 'first', 0.05)
+        # both tasks are running before any of them fails
+        started.acquire()
+        started.acquire()
+        release.set()
+
+        with self.assertRaises(IOError) as context:
+            pool.join()
+        self.assertEqual(str(context.exception), 'first')
+
+    def test_failure_cancels_pending_tasks(self):
+        done = []
+
+        def fail():
+            raise IOError()
+
+        with self.assertRaises(IOError):
+            with CloneWorkerPool(1) as pool:
+                pool.submit(0, fail)
+                for i in range(10):
+                    pool.submit(i + 1, done.append, i)
+
+        self.assertTrue(pool.cancelled)
+        self.assertEqual(done, [])
+
+    def test_cancel_event(self):
+        cancel_event = threading.Event()
+        started = threading.Event()
+        done = []
+
+        def block():
+            started.set()
+            time.sleep(0.05)
+
+        with self.assertRaises(NRPServicesGeneralException):
+            with CloneWorkerPool(1, cancel_event) as pool:
+                pool.submit(0, block)
+                pool.submit(1, done.append, 1)
+                started.wait()
+                cancel_event.set()
+
+        self.assertEqual(done, [])
+
+    def test_submitting_thread_failure(self):
+        with self.assertRaises(ValueError):
+            with CloneWorkerPool(2) as pool:
+                pool.submit(0, time.sleep, 0.05)
+                raise ValueError()
+
+        self.assertTrue(pool.cancelled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+StorageCache unit test
+"""
+
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import unittest
+from hbp_nrp_backend.storage_client_api.StorageCache import StorageCache
+
+
+class TestStorageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.root, 'cache')
+        self.sim_dir = os.path.join(self.root, 'sim')
+        os.mkdir(self.sim_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def store(self, cache, key, content, revision=None, etag=None):
+        partial_file = cache.partial_file()
+        with open(partial_file, 'wb') as f:
+            f.write(content)
+        destination = os.path.join(self.sim_dir, key.replace('/', '_'))
+        cache.store(key, partial_file, hashlib.sha256(content).hexdigest(), destination,
+                    revision, etag)
+        return destination
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_store_and_hit(self):
+        cache = StorageCache(self.cache_dir, 1024)
+        self.assertIsNone(cache.lookup('exp/file'))
+
+        destination = self.store(cache, 'exp/file', 'content', 'rev1', '"etag"')
+        self.assertEqual(self.read(destination), 'content')
+
+        entry = cache.lookup('exp/file')
+        self.assertEqual(entry.revision, 'rev1')
+        self.assertEqual(entry.validators(), {'If-None-Match': '"etag"'})
+
+        other_destination = os.path.join(self.sim_dir, 'copy')
+        cache.hit('exp/file', entry, other_destination, 'rev2', revalidated=True)
+        self.assertEqual(self.read(other_destination), 'content')
+        self.assertEqual(cache.lookup('exp/file').revision, 'rev2')
+
+        stats = cache.stats
+        self.assertEqual((stats['misses'], stats['hits'], stats['revalidations']), (1, 0, 1))
+        self.assertEqual(stats['size'], len('content'))
+
+    def test_identical_content_is_stored_once(self):
+        cache = StorageCache(self.cache_dir, 1024)
+        self.store(cache, 'exp1/file', 'content')
+        self.store(cache, 'exp2/file', 'content')
+        self.assertEqual(cache.size, len('content'))
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, 'blobs'))), 1)
+
+    def test_modified_blob_is_dropped(self):
+        cache = StorageCache(self.cache_dir, 1024, hardlinks=True)
+        destination = self.store(cache, 'exp/file', 'content')
+        entry = cache.lookup('exp/file')
+        self.assertEqual(os.stat(destination).st_ino,
+                         os.stat(os.path.join(self.cache_dir, 'blobs', entry.digest)).st_ino)
+
+        # the simulation writes to the hard linked file
+        with open(destination, 'ab') as f:
+            f.write('modified')
+        self.assertIsNone(cache.lookup('exp/file'))
+
+    def test_copies_are_independent(self):
+        cache = StorageCache(self.cache_dir, 1024)
+        destination = self.store(cache, 'exp/file', 'content')
+        with open(destination, 'ab') as f:
+            f.write('modified')
+        entry = cache.lookup('exp/file')
+        self.assertIsNotNone(entry)
+
+        cache.hit('exp/file', entry, destination)
+        self.assertEqual(self.read(destination), 'content')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = StorageCache(self.cache_dir, 10)
+        self.store(cache, 'exp/a', 'aaaa')
+        self.store(cache, 'exp/b', 'bbbb')
+        time.sleep(0.01)
+        cache.hit('exp/a', cache.lookup('exp/a'), os.path.join(self.sim_dir, 'a'))
+        self.store(cache, 'exp/c', 'cccc')
+
+        # nothing is evicted before the flush
+        self.assertEqual(cache.size, 12)
+        cache.flush()
+
+        self.assertIsNone(cache.lookup('exp/b'))
+        self.assertIsNotNone(cache.lookup('exp/a'))
+        self.assertIsNotNone(cache.lookup('exp/c'))
+        self.assertEqual(cache.size, 8)
+        self.assertEqual(cache.stats['evictions'], 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, 'blobs'))), 2)
+
+    def test_nothing_is_evicted_while_held(self):
+        cache = StorageCache(self.cache_dir, 10)
+        with cache.hold():
+            self.store(cache, 'exp/a', 'aaaa')
+            with cache.hold():
+                self.store(cache, 'exp/b', 'bbbb')
+                self.store(cache, 'exp/c', 'cccc')
+            # the inner hold does not flush
+            self.assertFalse(os.path.exists(os.path.join(self.cache_dir, 'index.json')))
+            cache.flush()
+            self.assertEqual(cache.size, 12)
+            self.assertIsNotNone(cache.lookup('exp/a'))
+
+        # the last release flushes the cache
+        self.assertEqual(cache.size, 8)
+        self.assertEqual(cache.stats['evictions'], 1)
+        self.assertEqual(StorageCache(self.cache_dir, 10).size, 8)
+
+    def test_index_is_persisted(self):
+        cache = StorageCache(self.cache_dir, 1024)
+        self.store(cache, 'exp/file', 'content', 'rev1')
+        # a download interrupted before being stored
+        cache.partial_file()
+        cache.flush()
+
+        cache = StorageCache(self.cache_dir, 1024)
+        self.assertEqual(cache.lookup('exp/file').revision, 'rev1')
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, 'blobs'))), 1)
+
+    def test_corrupted_index_is_ignored(self):
+        os.makedirs(os.path.join(self.cache_dir, 'blobs'))
+        with open(os.path.join(self.cache_dir, StorageCache.INDEX_FILE), 'w') as f:
+            f.write('{not json')
+        cache = StorageCache(self.cache_dir, 1024)
+        self.assertIsNone(cache.lookup('exp/file'))
+        self.store(cache, 'exp/file', 'content')
+        cache.flush()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,10 +28,16 @@ import inspect
 import unittest
 import shutil
 import os
+import hashlib
+import tempfile
+import threading
+import time
 import requests
-from mock import patch, MagicMock, mock_open, Mock
+from mock import patch, MagicMock, mock_open, Mock, ANY
 from hbp_nrp_commons.generated import exp_conf_api_gen
 from hbp_nrp_backend.storage_client_api import StorageClient
+from hbp_nrp_backend.storage_client_api.StorageCache import StorageCache
+from hbp_nrp_backend.storage_client_api.tests.fake_storage_server import FakeStorageServer
 from hbp_nrp_backend import NRPServicesGeneralException
 from hbp_nrp_commons.sim_config.SimConfig import ResourceType
 from hbp_nrp_commons.workspace.SimUtil import SimUtil
@@ -189,6 +195,11 @@ class TestStorageClient(unittest.TestCase):
         )
         self.temporary_directory_to_clean = []
 
+        # never use the cache of the user running the tests
+        cache_dir = tempfile.mkdtemp()
+        self.temporary_directory_to_clean.append(cache_dir)
+        StorageClient.StorageClient()._StorageClient__cache = StorageCache(cache_dir, 1024 ** 2)
+
     def tearDown(self):
         for dir in self.temporary_directory_to_clean:
             if dir.startswith('/tmp'):
@@ -196,13 +207,13 @@ class TestStorageClient(unittest.TestCase):
         self.temporary_directory_to_clean = []
 
     # GET USER
-    @patch('requests.get', side_effect=mocked_get_user_ok)
+    @patch('requests.Session.get', side_effect=mocked_get_user_ok)
     def test_get_user_successfully(self, mocked_get):
         client = StorageClient.StorageClient()
         res = client.get_user("faketoken")
         self.assertEqual(res, {"id": "fake_id"})
 
-    @patch('requests.get', side_effect=mocked_request_not_ok)
+    @patch('requests.Session.get', side_effect=mocked_request_not_ok)
     def test_get_user_not_ok(self, mocked_get):
         client = StorageClient.StorageClient()
         with self.assertRaises(Exception) as context:
@@ -211,7 +222,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(
             'Could not verify auth token, status code 404' in context.exception)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_user_connection_error(self, mocked_get):
         client = StorageClient.StorageClient()
         mocked_get.side_effect = requests.exceptions.ConnectionError()
@@ -220,7 +231,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertEqual(requests.exceptions.ConnectionError, context.expected)
 
     # LIST EXPERIMENTS
-    @patch('requests.get', side_effect=mocked_get_experiments_ok)
+    @patch('requests.Session.get', side_effect=mocked_get_experiments_ok)
     def test_get_experiments_successfully(self, mocked_get):
         client = StorageClient.StorageClient()
         res = client.list_experiments("fakeToken", 'ctx')
@@ -228,7 +239,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertEqual(
             res[1]['uuid'], "b246cc8e-d844-4826-ae5b-d2c023b893d8")
 
-    @patch('requests.get', side_effect=mocked_request_not_ok)
+    @patch('requests.Session.get', side_effect=mocked_request_not_ok)
     def test_get_experiments_failed(self, mocked_get):
         client = StorageClient.StorageClient()
         with self.assertRaises(Exception) as context:
@@ -237,7 +248,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(
             'Failed to communicate with the storage server, status code 404' in context.exception)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_experiment_connection_error(self, mocked_get):
         client = StorageClient.StorageClient()
         mocked_get.side_effect = requests.exceptions.ConnectionError()
@@ -246,7 +257,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertEqual(requests.exceptions.ConnectionError, context.expected)
 
     # GET FILE
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_file_by_name_successfully(self, mocked_get):
         client = StorageClient.StorageClient()
 
@@ -261,7 +272,7 @@ class TestStorageClient(unittest.TestCase):
 
         self.assertEqual(res.name, "Baseball tutorial experiment - Exercise")
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_texture_by_name_successfully(self, mocked_get):
         client = StorageClient.StorageClient()
 
@@ -278,7 +289,7 @@ class TestStorageClient(unittest.TestCase):
             "fakeToken", "fakeExperiment", "fake.png", by_name=True, is_fileobject=True)
         self.assertIsInstance(res, Object)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_zip_by_name_successfully(self, mocked_get):
         client = StorageClient.StorageClient()
 
@@ -294,7 +305,7 @@ class TestStorageClient(unittest.TestCase):
             "fakeToken", "fakeExperiment", "fake.zip", by_name=True, zipped=True)
         self.assertIsInstance(res, Object)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_file_name_successfully(self, mocked_get):
         client = StorageClient.StorageClient()
 
@@ -308,7 +319,7 @@ class TestStorageClient(unittest.TestCase):
             "fakeToken", "fakeExperiment", "experiment_configuration.exc")
         self.assertEqual(res.maturity, "production")
 
-    @patch('requests.get', side_effect=mocked_request_not_ok)
+    @patch('requests.Session.get', side_effect=mocked_request_not_ok)
     def test_get_file_fail(self, mocked_put):
         client = StorageClient.StorageClient()
         with self.assertRaises(Exception) as context:
@@ -318,7 +329,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(
             'Failed to communicate with the storage server, status code 404' in context.exception)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_file_connection_error(self, mocked_put):
         client = StorageClient.StorageClient()
         mocked_put.side_effect = requests.exceptions.ConnectionError()
@@ -329,14 +340,14 @@ class TestStorageClient(unittest.TestCase):
         self.assertEqual(requests.exceptions.ConnectionError, context.expected)
 
     # DELETE FILE
-    @patch('requests.delete', side_effect=mocked_delete_experiment_ok)
+    @patch('requests.Session.delete', side_effect=mocked_delete_experiment_ok)
     def test_delete_file_successfully(self, mocked_delete):
         client = StorageClient.StorageClient()
         res = client.delete_file(
             "fakeToken", "fakeExperiment", "experiment_configuration.exc")
         self.assertEqual(res, "Success")
 
-    @patch('requests.delete', side_effect=mocked_request_not_ok)
+    @patch('requests.Session.delete', side_effect=mocked_request_not_ok)
     def test_delete_file_failed(self, mocked_delete):
         client = StorageClient.StorageClient()
         with self.assertRaises(Exception) as context:
@@ -346,7 +357,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(
             'Failed to communicate with the storage server, status code 404' in context.exception)
 
-    @patch('requests.delete')
+    @patch('requests.Session.delete')
     def test_delete_file_connection_error(self, mocked_put):
         client = StorageClient.StorageClient()
         mocked_put.side_effect = requests.exceptions.ConnectionError()
@@ -373,7 +384,7 @@ class TestStorageClient(unittest.TestCase):
 
 
     # CREATE OR UPDATE
-    @patch('requests.post', side_effect=mocked_create_or_update_ok)
+    @patch('requests.Session.post', side_effect=mocked_create_or_update_ok)
     def test_create_or_update_successfully(self, mocked_post):
         client = StorageClient.StorageClient()
         res = client.create_or_update(
@@ -384,7 +395,7 @@ class TestStorageClient(unittest.TestCase):
             "text/plain")
         self.assertEqual(res, 200)
 
-    @patch('requests.post', side_effect=mocked_request_not_ok)
+    @patch('requests.Session.post', side_effect=mocked_request_not_ok)
     def test_create_or_update_failed(self, mocked_post):
         client = StorageClient.StorageClient()
         with self.assertRaises(Exception) as context:
@@ -398,7 +409,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(
             'Failed to communicate with the storage server, status code 404' in context.exception)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_create_or_update_connection_error(self, mocked_post):
         client = StorageClient.StorageClient()
         mocked_post.side_effect = requests.exceptions.ConnectionError()
@@ -412,7 +423,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertEqual(requests.exceptions.ConnectionError, context.expected)
 
     # CREATE FOLDER
-    @patch('requests.post', side_effect=mocked_create_folder_ok)
+    @patch('requests.Session.post', side_effect=mocked_create_folder_ok)
     def test_create_folder_successfully(self, mocked_post):
         client = StorageClient.StorageClient()
         res = client.create_folder(
@@ -422,7 +433,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertEqual(res['uuid'], '5b1a2363-1529-40cd-a8b7-94bfd6dea23d')
         self.assertEqual(res['name'], 'fakeFolder')
 
-    @patch('requests.post', side_effect=mocked_request_not_ok)
+    @patch('requests.Session.post', side_effect=mocked_request_not_ok)
     def test_create_folder_failed(self, mocked_post):
         client = StorageClient.StorageClient()
         with self.assertRaises(Exception) as context:
@@ -434,7 +445,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(
             'Failed to communicate with the storage server, status code 404' in context.exception)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_create_folder_connection_error(self, mocked_post):
         client = StorageClient.StorageClient()
         mocked_post.side_effect = requests.exceptions.ConnectionError()
@@ -446,7 +457,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertEqual(requests.exceptions.ConnectionError, context.expected)
 
     # GET CUSTOM MODELS
-    @patch('requests.get', side_effect=mocked_get_models_ok)
+    @patch('requests.Session.get', side_effect=mocked_get_models_ok)
     def test_get_models_successfully(self, mocked_get):
         client = StorageClient.StorageClient()
         res = client.get_models(
@@ -455,7 +466,7 @@ class TestStorageClient(unittest.TestCase):
             ResourceType.ROBOT)
         self.assertEqual(res[0].name, 'testZip1')
 
-    @patch('requests.get', side_effect=mocked_request_not_ok)
+    @patch('requests.Session.get', side_effect=mocked_request_not_ok)
     def test_get_models_failed(self, mocked_get):
         client = StorageClient.StorageClient()
         with self.assertRaises(Exception) as context:
@@ -467,7 +478,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(
             'Failed to communicate with the storage server, status code 404' in context.exception)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_models_connection_error(self, mocked_get):
         client = StorageClient.StorageClient()
         mocked_get.side_effect = requests.exceptions.ConnectionError()
@@ -479,7 +490,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertEqual(requests.exceptions.ConnectionError, context.expected)
 
     # GET CUSTOM MODEL
-    @patch('requests.get', side_effect=mocked_get_model_ok)
+    @patch('requests.Session.get', side_effect=mocked_get_model_ok)
     def test_get_model_successfully(self, mocked_get):
         client = StorageClient.StorageClient()
         model = MagicMock()
@@ -491,7 +502,7 @@ class TestStorageClient(unittest.TestCase):
             model)
         self.assertEqual(res, 'Test')
 
-    @patch('requests.get', side_effect=mocked_request_not_ok)
+    @patch('requests.Session.get', side_effect=mocked_request_not_ok)
     def test_get_custom_model_failed(self, mocked_get):
         client = StorageClient.StorageClient()
         model = MagicMock()
@@ -507,7 +518,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(
             'Failed to communicate with the storage server, status code 404' in context.exception)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_model_connection_error(self, mocked_get):
         client = StorageClient.StorageClient()
         mocked_get.side_effect = requests.exceptions.ConnectionError()
@@ -523,7 +534,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertEqual(requests.exceptions.ConnectionError, context.expected)
 
     # GET TEXTURES
-    @patch('requests.get', side_effect=mocked_get_texture_ok)
+    @patch('requests.Session.get', side_effect=mocked_get_texture_ok)
     def test_get_texture_successfully(self, mocked_get):
         client = StorageClient.StorageClient()
         res = client.get_textures(
@@ -531,7 +542,7 @@ class TestStorageClient(unittest.TestCase):
             "fakeExperiment")
         self.assertEqual(res, {"name": 'texture.png'})
 
-    @patch('requests.get', side_effect=mocked_request_not_ok)
+    @patch('requests.Session.get', side_effect=mocked_request_not_ok)
     def test_get_texture_failed(self, mocked_get):
         client = StorageClient.StorageClient()
         with self.assertRaises(Exception) as context:
@@ -542,7 +553,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(
             'Failed to communicate with the storage server, status code 404' in context.exception)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_texture_connection_error(self, mocked_get):
         client = StorageClient.StorageClient()
         mocked_get.side_effect = requests.exceptions.ConnectionError()
@@ -585,7 +596,7 @@ class TestStorageClient(unittest.TestCase):
         client.copy_folder_content_to_tmp("fakeToken", resources_item)
 
         self.assertTrue(client.list_files.called)
-        mocked_copy_file_content.assert_called_once_with('fakeToken', '/tmp/resources', '89857775-6215-4d53-94ee-fb6c18b9e2f8', 'fakeFileName', is_fileobject=False)
+        mocked_copy_file_content.assert_called_once_with('fakeToken', '/tmp/resources', '89857775-6215-4d53-94ee-fb6c18b9e2f8', 'fakeFileName', is_fileobject=False, revision=None)
 
     @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.list_files')
     @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.copy_folder_content_to_tmp')
@@ -608,7 +619,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(client.copy_folder_content_to_tmp.called)
 
     # LIST FILES
-    @patch('requests.get', side_effect=mocked_list_files_ok)
+    @patch('requests.Session.get', side_effect=mocked_list_files_ok)
     def test_list_files_successfully(self, mocked_post):
         client = StorageClient.StorageClient()
         res = client.list_files(
@@ -618,7 +629,7 @@ class TestStorageClient(unittest.TestCase):
             res[0]['uuid'], '07b35b8f-67cd-4e94-8bec-5ede8049590d')
         self.assertEqual(res[1]['name'], 'simple_move_robot.py')
 
-    @patch('requests.get', side_effect=mocked_request_not_ok)
+    @patch('requests.Session.get', side_effect=mocked_request_not_ok)
     def test_list_files_failed(self, mocked_post):
         client = StorageClient.StorageClient()
         with self.assertRaises(Exception) as context:
@@ -629,7 +640,7 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(
             'Failed to communicate with the storage server, status code 404' in context.exception)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_list_files_connection_error(self, mocked_post):
         client = StorageClient.StorageClient()
         mocked_post.side_effect = requests.exceptions.ConnectionError()
@@ -694,10 +705,9 @@ class TestStorageClient(unittest.TestCase):
 
     # CLONE ALL EXPERIMENT FILES
     @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.list_files')
-    @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.get_file')
+    @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.download_cached_file')
     @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.generate_textures')
-    def test_clone_all_experiment_files(self, mocked_gen_texture, mocked_get, mocked_list):
-        mocked_get.side_effect = None
+    def test_clone_all_experiment_files(self, mocked_gen_texture, mocked_download, mocked_list):
 
         experiment_name = "fakeExperiment"
 
@@ -757,14 +767,20 @@ class TestStorageClient(unittest.TestCase):
 
         client = StorageClient.StorageClient()
 
-        with patch("__builtin__.open", mock_open(read_data="data")) as mocked_open, \
-                patch('hbp_nrp_backend.storage_client_api.StorageClient.SimUtil') as mocked_sim_util:
+        with patch('hbp_nrp_backend.storage_client_api.StorageClient.SimUtil') as mocked_sim_util:
             sim_dir = '/some/path/over/the/rainbow'
             client.clone_all_experiment_files("fakeToken", experiment_name, destination_dir=sim_dir)
 
-            mocked_open.assert_any_call(os.path.join(sim_dir, env_editor_name), 'w')
-            mocked_open.assert_any_call(os.path.join(sim_dir, exp_conf_name), 'w')
-            mocked_open.assert_any_call(os.path.join(sim_dir, tfs_dir_name, simple_robot_name), 'w')
+            mocked_download.assert_any_call(
+                "fakeToken", experiment_name, env_editor_name,
+                os.path.join(sim_dir, env_editor_name), "2017-08-31T13:56:34.306090Z")
+            mocked_download.assert_any_call(
+                "fakeToken", experiment_name, exp_conf_name,
+                os.path.join(sim_dir, exp_conf_name), "2017-08-30T11:23:47.842214Z")
+            mocked_download.assert_any_call(
+                "fakeToken", tfs_dir_uuid, simple_robot_name,
+                os.path.join(sim_dir, tfs_dir_name, simple_robot_name),
+                "2017-08-30T12:32:47.842214Z")
 
     @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.list_experiments')
     def test_get_folder_uuid_by_name_ok(self, mocked_get):
@@ -777,11 +793,12 @@ class TestStorageClient(unittest.TestCase):
         mocked_get.assert_called_with(
             'fakeToken', 'fake_context_id', name='Experiment_0', get_all=True)
 
+    @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient._StorageClient__link_file')
     @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.copy_file_content')
     @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.create_material_from_textures')
     @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.create_textures_paths')
     @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.get_textures')
-    def test_generate_textures_ok(self, mocked_get_textures, mock_create_textures, mock_create_material_from_textures, mock_copy_file_content):
+    def test_generate_textures_ok(self, mocked_get_textures, mock_create_textures, mock_create_material_from_textures, mock_copy_file_content, mock_link_file):
         mocked_get_textures.return_value = [
             {"name": 'test1.png'}, {"name": "test2.gif"}]
         client = StorageClient.StorageClient()
@@ -789,16 +806,62 @@ class TestStorageClient(unittest.TestCase):
         client.generate_textures('fakeExperiment', 'fake_token')
         mocked_get_textures.assert_called_with('fakeExperiment', 'fake_token')
         mock_create_textures.assert_called()
-        mock_create_material_from_textures.assert_called()
-        mock_copy_file_content.assert_called_with(
-            'fake_token', '/somewhere/near/the/rainbow/materials/textures', 'fakeExperiment%2Fresources%2Ftextures', 'test2.gif', is_fileobject=True)
+        mock_create_material_from_textures.assert_called_once()
+
+        # the textures are downloaded once into the staging directory...
+        staging_dir = mock_copy_file_content.call_args[0][1]
+        mock_copy_file_content.assert_any_call(
+            'fake_token', staging_dir, 'fakeExperiment%2Fresources%2Ftextures', 'test2.gif', is_fileobject=True, revision=None)
+        self.assertEqual(mock_copy_file_content.call_count, 2)
+        mock_create_material_from_textures.assert_called_with(
+            ANY, os.path.join(staging_dir, 'custom.material'))
+
+        # ...then linked into the texture directory
+        mock_link_file.assert_any_call(
+            os.path.join(staging_dir, 'test2.gif'), '/somewhere/near/the/rainbow/materials/textures/test2.gif')
+        mock_link_file.assert_any_call(
+            os.path.join(staging_dir, 'custom.material'), '/somewhere/near/the/rainbow/materials/scripts/custom.material')
+        self.assertEqual(mock_link_file.call_count, 3)
+        self.assertFalse(os.path.exists(staging_dir))
+
+    def test_generate_textures_downloads_once(self):
+        server = FakeStorageServer().start()
+        try:
+            server.add_folder(None, 'fakeExperiment')
+            textures_folder = server.add_folder('fakeExperiment', 'resources/textures')
+            server.add_file(textures_folder, 'test1.png', 'png data')
+            server.add_file(textures_folder, 'test2.gif', 'gif data')
+            server.add_file(textures_folder, 'readme.txt', 'not a texture')
+
+            directories = [tempfile.mkdtemp() for _ in range(3)]
+            self.temporary_directory_to_clean.extend(directories)
+            client = StorageClient.StorageClient()
+            client._StorageClient__proxy_url = server.url
+            client._StorageClient__texture_directories = directories
+
+            client.generate_textures('fakeExperiment', 'fake_token')
+
+            for texture in ['test1.png', 'test2.gif']:
+                self.assertEqual(server.count_requests(
+                    'GET', '/storage/fakeExperiment%2Fresources%2Ftextures/' + texture), 1)
+            self.assertEqual(server.count_requests(), 3)
+
+            for directory in directories:
+                with open(os.path.join(directory, 'materials', 'textures', 'test2.gif')) as f:
+                    self.assertEqual(f.read(), 'gif data')
+                with open(os.path.join(directory, 'materials', 'scripts', 'custom.material')) as f:
+                    self.assertIn('texture test1.png', f.read())
+                self.assertEqual(sorted(os.listdir(os.path.join(directory, 'materials', 'textures'))),
+                                 ['test1.png', 'test2.gif'])
+        finally:
+            server.stop()
 
     def test_create_material_from_textures_ok(self):
         with patch("__builtin__.open", mock_open(read_data="data")) as mocked_open:
             client = StorageClient.StorageClient()
-            client._StorageClient__texture_directories = ['/somewhere/near/the/rainbow']
-            client.create_material_from_textures([{"name": 'texture1.png'}, {"name": 'texture2.jpeg'}])
-            mocked_open.assert_called_with('/somewhere/near/the/rainbow/materials/scripts/custom.material', 'w')
+            client.create_material_from_textures([{"name": 'texture1.png'}, {"name": 'texture2.jpeg'}], '/tmp/custom.material')
+            mocked_open.assert_called_with('/tmp/custom.material', 'w')
+            self.assertIn('material texture2.jpeg', mocked_open().write.call_args[0][0])
 
     def test_check_file_extension(self):
         example1 = [{u'uiid': u'/test_folder/experiment_configuration.exc', u'name': u'experiment_configuration.exc'},
@@ -813,6 +876,198 @@ class TestStorageClient(unittest.TestCase):
         self.assertTrue(client.check_file_extension(
             example1[0]['name'], ['.exc']))
 
+    # CONNECTION POOL
+    def test_connections_are_reused_across_calls(self):
+        server = FakeStorageServer().start()
+        try:
+            server.add_folder(None, 'fakeExperiment')
+            server.add_file('fakeExperiment', 'experiment_configuration.exc', 'exc')
+            client = StorageClient.StorageClient()
+            client._StorageClient__proxy_url = server.url
+
+            for _ in range(10):
+                client.list_files('fakeToken', 'fakeExperiment')
+                client.get_file('fakeToken', 'fakeExperiment',
+                                'experiment_configuration.exc', by_name=True)
+            self.assertEqual(client.get_user('fakeToken'), {'id': 'fake_id'})
+
+            self.assertEqual(server.count_requests(), 21)
+            self.assertEqual(server.connections, 1)
+        finally:
+            server.stop()
+
+    # STREAMED DOWNLOAD
+    def test_download_file(self):
+        server = FakeStorageServer().start()
+        content = os.urandom(1024 * 1024 + 17)
+        try:
+            server.add_folder(None, 'fakeExperiment')
+            server.add_file('fakeExperiment', 'brain.h5', content)
+            client = StorageClient.StorageClient()
+            client._StorageClient__proxy_url = server.url
+
+            destination_dir = tempfile.mkdtemp()
+            self.temporary_directory_to_clean.append(destination_dir)
+            destination = os.path.join(destination_dir, 'brain.h5')
+
+            with patch.object(StorageClient.Settings, 'storage_chunk_size', 4096):
+                digest = client.download_file('fakeToken', 'fakeExperiment', 'brain.h5',
+                                              destination, checksum='md5')
+
+            with open(destination, 'rb') as f:
+                self.assertEqual(f.read(), content)
+            self.assertEqual(digest, hashlib.md5(content).hexdigest())
+            self.assertEqual(os.listdir(destination_dir), ['brain.h5'])
+
+            # a failed download leaves nothing behind
+            self.assertRaises(Exception, client.download_file, 'fakeToken', 'fakeExperiment',
+                              'missing.h5', os.path.join(destination_dir, 'missing.h5'))
+            self.assertEqual(os.listdir(destination_dir), ['brain.h5'])
+        finally:
+            server.stop()
+
+    @patch('requests.Session.get')
+    def test_download_file_writes_chunks(self, mocked_get):
+        mocked_response = MagicMock(status_code=200)
+        mocked_response.iter_content.return_value = iter(['chunk1', 'chunk2'])
+        mocked_get.return_value = mocked_response
+        client = StorageClient.StorageClient()
+
+        with patch("__builtin__.open", mock_open()) as mocked_open, \
+                patch('hbp_nrp_backend.storage_client_api.StorageClient.os') as mocked_os:
+            mocked_os.path.exists.return_value = False
+            self.assertIsNone(client.download_file('fakeToken', 'fakeExperiment', 'fakeFile',
+                                                   '/some/where/fakeFile'))
+
+        self.assertTrue(mocked_get.call_args[1]['stream'])
+        mocked_response.iter_content.assert_called_once_with(
+            chunk_size=StorageClient.Settings.storage_chunk_size)
+        mocked_open.assert_called_once_with('/some/where/fakeFile.part', 'wb')
+        mocked_open().write.assert_any_call('chunk1')
+        mocked_open().write.assert_any_call('chunk2')
+        mocked_os.rename.assert_called_once_with('/some/where/fakeFile.part',
+                                                 '/some/where/fakeFile')
+        mocked_response.close.assert_called_once()
+
+    # CONCURRENT CLONE
+    @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.generate_textures')
+    def test_clone_all_experiment_files_benchmark(self, mocked_gen_textures):
+        server = FakeStorageServer(latency=0.02).start()
+        try:
+            server.add_folder(None, 'fakeExperiment')
+            server.add_file('fakeExperiment', 'experiment_configuration.exc', 'exc')
+            for i in range(3):
+                folder = server.add_folder('fakeExperiment', 'folder%d' % i)
+                for j in range(10):
+                    server.add_file(folder, 'file%d' % j, 'content %d %d' % (i, j))
+
+            client = StorageClient.StorageClient()
+            client._StorageClient__proxy_url = server.url
+            client._StorageClient__cache = None
+
+            def timed_clone(workers):
+                sim_dir = tempfile.mkdtemp()
+                self.temporary_directory_to_clean.append(sim_dir)
+                with patch.object(StorageClient.Settings, 'storage_clone_workers', workers):
+                    start = time.time()
+                    client.clone_all_experiment_files('fakeToken', 'fakeExperiment', sim_dir)
+                    elapsed = time.time() - start
+                with open(os.path.join(sim_dir, 'folder2', 'file9')) as f:
+                    self.assertEqual(f.read(), 'content 2 9')
+                return elapsed
+
+            serial = timed_clone(1)
+            parallel = timed_clone(8)
+            # 35 round trips of 20ms each, mostly overlapped when run concurrently
+            self.assertLess(parallel * 2, serial)
+        finally:
+            server.stop()
+
+    @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.generate_textures')
+    @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.list_files')
+    @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.get_file')
+    def test_clone_all_experiment_files_cancelled(self, mocked_get, mocked_list,
+                                                  mocked_gen_textures):
+        mocked_list.return_value = [{'name': 'file%d' % i, 'type': 'file'} for i in range(5)]
+        cancel_event = threading.Event()
+        cancel_event.set()
+
+        client = StorageClient.StorageClient()
+        sim_dir = tempfile.mkdtemp()
+        self.temporary_directory_to_clean.append(sim_dir)
+        with self.assertRaises(NRPServicesGeneralException):
+            client.clone_all_experiment_files('fakeToken', 'fakeExperiment', sim_dir,
+                                              cancel_event=cancel_event)
+        mocked_get.assert_not_called()
+
+    # LOCAL CACHE
+    @patch('hbp_nrp_backend.storage_client_api.StorageClient.StorageClient.generate_textures')
+    def test_clone_all_experiment_files_cached(self, mocked_gen_textures):
+        server = FakeStorageServer().start()
+        try:
+            server.add_folder(None, 'fakeExperiment')
+            server.add_file('fakeExperiment', 'experiment_configuration.exc', 'exc', 'rev1')
+            server.add_file('fakeExperiment', 'brain.py', 'brain', 'rev1')
+            folder = server.add_folder('fakeExperiment', 'resources')
+            server.add_file(folder, 'robot.sdf', 'robot')
+
+            client = StorageClient.StorageClient()
+            client._StorageClient__proxy_url = server.url
+            cache = client._StorageClient__cache
+
+            def clone():
+                sim_dir = tempfile.mkdtemp()
+                self.temporary_directory_to_clean.append(sim_dir)
+                del server.requests[:]
+                client.clone_all_experiment_files('fakeToken', 'fakeExperiment', sim_dir)
+                with open(os.path.join(sim_dir, 'resources', 'robot.sdf')) as f:
+                    self.assertEqual(f.read(), 'robot')
+                return sim_dir
+
+            clone()
+            self.assertEqual(cache.stats['misses'], 3)
+
+            # files with an unchanged revision are not requested at all, the others are
+            # revalidated with their ETag
+            sim_dir = clone()
+            self.assertEqual(server.count_requests('GET'), 3)
+            self.assertEqual(cache.stats['hits'], 2)
+            self.assertEqual(cache.stats['revalidations'], 1)
+
+            # only the modified file is transferred
+            server.add_file('fakeExperiment', 'brain.py', 'new brain', 'rev2')
+            sim_dir = clone()
+            self.assertEqual(cache.stats['misses'], 4)
+            with open(os.path.join(sim_dir, 'brain.py')) as f:
+                self.assertEqual(f.read(), 'new brain')
+
+            # the index survives the client
+            client._StorageClient__cache = StorageCache(cache._StorageCache__root, 1024 ** 2)
+            clone()
+            self.assertEqual(client._StorageClient__cache.stats['hits'], 2)
+        finally:
+            server.stop()
+
+
+    def test_download_cached_file_flushes_cache(self):
+        server = FakeStorageServer().start()
+        try:
+            server.add_folder(None, 'fakeExperiment')
+            server.add_file('fakeExperiment', 'brain.py', 'brain', 'rev1')
+
+            client = StorageClient.StorageClient()
+            client._StorageClient__proxy_url = server.url
+            cache_dir = client._StorageClient__cache._StorageCache__root
+            sim_dir = tempfile.mkdtemp()
+            self.temporary_directory_to_clean.append(sim_dir)
+
+            # a download outside of a clone persists the index on its own
+            client.download_cached_file('fakeToken', 'fakeExperiment', 'brain.py',
+                                        os.path.join(sim_dir, 'brain.py'), 'rev1')
+            self.assertIsNotNone(StorageCache(cache_dir, 1024 ** 2).lookup(
+                'fakeExperiment/brain.py'))
+        finally:
+            server.stop()
 
 if __name__ == '__main__':
     unittest.main()
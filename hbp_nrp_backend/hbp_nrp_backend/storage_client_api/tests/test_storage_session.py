@@ -0,0 +1,106 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Storage session unit test
+"""
+
+import unittest
+import threading
+from mock import patch
+from hbp_nrp_backend.storage_client_api.StorageSession import StorageSession
+from hbp_nrp_backend.storage_client_api.tests.fake_storage_server import FakeStorageServer
+
+
+class TestStorageSession(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeStorageServer().start()
+        self.server.add_folder(None, 'fakeExperiment')
+        self.server.add_file('fakeExperiment', 'fakeFile', 'fakeContent')
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_connections_are_kept_alive(self):
+        session = StorageSession(pool_size=2, backoff_factor=0)
+        for _ in range(20):
+            res = session.get(self.server.url + '/storage/fakeExperiment/fakeFile')
+            self.assertEqual(res.content, 'fakeContent')
+
+        self.assertEqual(self.server.count_requests(), 20)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_pool_is_shared_between_threads(self):
+        session = StorageSession(pool_size=4, backoff_factor=0)
+
+        def download():
+            for _ in range(10):
+                session.get(self.server.url + '/storage/fakeExperiment')
+
+        threads = [threading.Thread(target=download) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self.server.count_requests(), 40)
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_idempotent_requests_are_retried(self):
+        session = StorageSession(max_retries=3, backoff_factor=0)
+        self.server.fail_next = 2
+
+        res = session.get(self.server.url + '/storage/fakeExperiment')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.server.count_requests('GET'), 3)
+
+    def test_retries_exhausted_returns_last_response(self):
+        session = StorageSession(max_retries=1, backoff_factor=0)
+        self.server.fail_next = 5
+
+        res = session.get(self.server.url + '/storage/fakeExperiment')
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(self.server.count_requests('GET'), 2)
+
+    def test_post_is_not_retried(self):
+        session = StorageSession(max_retries=3, backoff_factor=0)
+        self.server.fail_next = 1
+
+        res = session.post(self.server.url + '/storage/fakeExperiment/newFile', data='data')
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(self.server.count_requests('POST'), 1)
+
+    @patch('requests.Session.request')
+    def test_default_timeout(self, mocked_request):
+        session = StorageSession(timeout=(1, 2))
+
+        session.get('http://somewhere')
+        self.assertEqual(mocked_request.call_args[1]['timeout'], (1, 2))
+
+        session.get('http://somewhere', timeout=5)
+        self.assertEqual(mocked_request.call_args[1]['timeout'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
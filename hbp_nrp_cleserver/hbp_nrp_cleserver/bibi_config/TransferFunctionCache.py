@@ -0,0 +1,157 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Memoizes the code generation and the restricted compilation of the transfer functions
+"""
+
+import os
+import hashlib
+import logging
+import threading
+import collections
+
+from hbp_nrp_cleserver.bibi_config.bibi_configuration_script import generate_tf, get_tf_name
+
+logger = logging.getLogger(__name__)
+
+
+class _TransferFunctionCache(object):
+    """
+    Process-wide cache of the generated and compiled transfer functions, keyed by the hash of
+    their source. Resetting or relaunching an experiment thus only generates and compiles the
+    transfer functions which have been modified.
+    """
+
+    def __init__(self, max_entries=512):
+        """
+        :param max_entries: the number of generated and of compiled transfer functions kept
+        """
+        self.__max_entries = max_entries
+        self.__generated = collections.OrderedDict()
+        self.__compiled = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.__stats = {'generated': 0, 'generation_hits': 0, 'compiled': 0, 'compilation_hits': 0}
+
+    @property
+    def stats(self):
+        """
+        Returns a copy of the hit/miss counters of the cache
+        """
+        with self.__lock:
+            return dict(self.__stats)
+
+    def clear(self):
+        """
+        Forgets every cached transfer function
+        """
+        with self.__lock:
+            self.__generated.clear()
+            self.__compiled.clear()
+
+    def generate(self, tf, external_tf_path=None):
+        """
+        Generates the code of a transfer function of the BIBI, see generate_tf
+
+        :param tf: the transfer function DOM object
+        :param external_tf_path: base folder where external python TFs are stored
+        :return: a (code, name) tuple, the name being None if the code defines no function
+        """
+        if hasattr(tf, "src") and tf.src:
+            with open(os.path.join(external_tf_path, tf.src)) as f:
+                source = f.read()
+        else:
+            source = u'\0'.join(cont.value for cont in tf.orderedContent())
+        key = self.__hash(source)
+
+        with self.__lock:
+            entry = self.__lookup(self.__generated, key)
+            if entry is not None:
+                self.__stats['generation_hits'] += 1
+        if entry is not None:
+            if hasattr(tf, "src") and tf.src:
+                # like generate_tf, drop the embedded code overridden by the external file
+                del tf.orderedContent()[:]
+            return entry
+
+        code = generate_tf(tf, external_tf_path)
+        entry = code, get_tf_name(code)
+        logger.debug("Generated the code of the transfer function %s", entry[1])
+        with self.__lock:
+            self.__stats['generated'] += 1
+            self.__remember(self.__generated, key, entry)
+        return entry
+
+    def compile(self, code, compiler):
+        """
+        Compiles the code of a transfer function. Compilation errors are not cached, they are
+        raised again on every call.
+
+        :param code: the generated code of the transfer function
+        :param compiler: the function compiling the code, e.g. compile_restricted
+        :return: the code object returned by the compiler
+        """
+        key = '{0}.{1}-{2}'.format(compiler.__module__, compiler.__name__, self.__hash(code))
+
+        with self.__lock:
+            compiled = self.__lookup(self.__compiled, key)
+            if compiled is not None:
+                self.__stats['compilation_hits'] += 1
+                return compiled
+
+        compiled = compiler(code, '<string>', 'exec')
+        with self.__lock:
+            self.__stats['compiled'] += 1
+            self.__remember(self.__compiled, key, compiled)
+        return compiled
+
+    @staticmethod
+    def __hash(text):
+        """
+        Hashes a source text
+        """
+        if isinstance(text, unicode):
+            text = text.encode('utf-8')
+        return hashlib.sha256(text).hexdigest()
+
+    @staticmethod
+    def __lookup(entries, key):
+        """
+        Returns the entry cached under a key and marks it as recently used
+        """
+        entry = entries.pop(key, None)
+        if entry is not None:
+            entries[key] = entry
+        return entry
+
+    def __remember(self, entries, key, entry):
+        """
+        Caches an entry, evicting the least recently used ones
+        """
+        entries[key] = entry
+        while len(entries) > self.__max_entries:
+            entries.popitem(last=False)
+
+
+# Instantiate the singleton
+TransferFunctionCache = _TransferFunctionCache()
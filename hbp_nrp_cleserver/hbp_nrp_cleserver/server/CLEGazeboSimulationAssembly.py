@@ -39,6 +39,8 @@ from hbp_nrp_commons.workspace.SimUtil import SimUtil
 from hbp_nrp_cleserver.server.GazeboSimulationAssembly import GazeboSimulationAssembly
 from hbp_nrp_cle.externalsim.ExternalModuleManager import ExternalModuleManager
 from hbp_nrp_commons.ZipUtil import ZipUtil
+from hbp_nrp_cleserver.bibi_config.TransferFunctionCache import TransferFunctionCache
+from hbp_nrp_cleserver.server.StartupGraph import StartupGraph
 
 # These imports start NEST.
 from hbp_nrp_cleserver.server.ROSCLEServer import ROSCLEServer
@@ -59,6 +61,7 @@ class CLEGazeboSimulationAssembly(GazeboSimulationAssembly):
         """
         super(CLEGazeboSimulationAssembly, self).__init__(sim_config)
         self.cle_server = None
+        self.__startup = None
         self.simAssetsDir = os.path.join(sim_config.sim_dir, 'assets')
         self._simResourcesDir = os.path.join(sim_config.sim_dir, 'resources')
 
@@ -99,37 +102,47 @@ class CLEGazeboSimulationAssembly(GazeboSimulationAssembly):
             logger.info("Failed to setup resource directory due to {err}".format(err=err))
         sys.path.insert(0, self._simResourcesDir)
 
-        # start Gazebo simulator and bridge
-        self._start_gazebo(extra_models=self.simAssetsDir + ':' + self.sim_dir)
-
+        # the world and the robots are loaded into Gazebo while the CLE builds the neural network.
+        # The CLE only needs a running Gazebo for the robot adapters. The brain and the CLE are
+        # loaded on this thread, the neural simulators are not meant to be set up and driven from
+        # different threads. The notifications of both chains interleave,
+        # ROSNotificator.update_task is thread safe.
+        self.__startup = StartupGraph(self.__notify_stage_done)
+        self.__startup.add('gazebo', lambda: self._start_gazebo(
+            extra_models=self._gazebo_models_path()))
         # load user textures in Gazebo
-        self._load_textures()
-
+        self.__startup.add('textures', lambda _: self._load_textures(), depends_on=('gazebo',))
         # load environment and robot models
-        models, lights = self._load_environment(self.sim_config.world_model.resource_path.abs_path)
-
-        # find robot
-        self.robotManager.set_robot_dict(self.sim_config.robot_models)
-        self._load_robot()
-
-        robot_poses = {}
-        for rid, robot in self.robotManager.get_robot_dict().iteritems():
-            robot_poses[rid] = robot.pose
-
+        self.__startup.add('environment', lambda _: self._load_environment(
+            self.sim_config.world_model.resource_path.abs_path), depends_on=('textures',))
+        self.__startup.add('robots', lambda _: self.__load_robots(), depends_on=('environment',))
         # load robot adapters
-        robotcomm, robotcontrol = self._create_robot_adapters()
-
+        self.__startup.add('robot adapters', lambda _: self._create_robot_adapters(),
+                           depends_on=('gazebo',))
         # load the brain
-        braincontrol, braincomm, brainfile, brainconf = self._load_brain()
+        self.__startup.add('brain', self._load_brain, on_caller_thread=True)
+        # initialize the CLE, which builds the neural network
+        self.__startup.add('cle', self.__load_cle, depends_on=('robot adapters', 'brain'),
+                           on_caller_thread=True)
+        try:
+            stages = self.__startup.run()
+        finally:
+            self.__startup = None
 
-        #load external modules
-        externalmodulearray = ExternalModuleManager()
+        models, lights = stages['environment']
+        _, robotcontrol = stages['robot adapters']
+        robotcontrol.set_robots(self.robotManager.get_robot_dict())
+
+        cle = stages['cle']
+        # Set initial pose
+        cle.initial_robot_poses = stages['robots']
+        # Set initial models and lights
+        cle.initial_models = models
+        cle.initial_lights = lights
 
         # initialize the cle server and services
         logger.info("Preparing CLE Server")
-        self.cle_server.cle = self.__load_cle(robotcontrol, robotcomm, braincontrol, braincomm,
-                                              brainfile, brainconf, externalmodulearray,
-                                              robot_poses, models, lights)
+        self.cle_server.cle = cle
         self.cle_server.prepare_simulation(except_hook)
 
         # load transfer functions
@@ -142,6 +155,41 @@ class CLEGazeboSimulationAssembly(GazeboSimulationAssembly):
         # pylint: disable=protected-access
         self.cle_server._csv_logger.initialize()
 
+    def _notify(self, message):
+        """
+        Checks whether the simulation should abort immediately, including when a concurrent
+        startup stage has failed
+        """
+        startup = self.__startup
+        if startup is not None:
+            startup.check_cancelled()
+        super(CLEGazeboSimulationAssembly, self)._notify(message)
+
+    def __notify_stage_done(self, stage, elapsed):
+        """
+        Reports the duration of a startup stage to the frontend
+
+        :param stage: the name of the stage
+        :param elapsed: the duration of the stage, in seconds
+        """
+        self.ros_notificator.update_task(
+            "Loaded {stage} in {elapsed:.1f}s".format(stage=stage, elapsed=elapsed), False, True)
+
+    def __load_robots(self):
+        """
+        Loads the robots of the simulation config
+
+        :return: the initial pose of every robot, by robot id
+        """
+        # find robot
+        self.robotManager.set_robot_dict(self.sim_config.robot_models)
+        self._load_robot()
+
+        robot_poses = {}
+        for rid, robot in self.robotManager.get_robot_dict().iteritems():
+            robot_poses[rid] = robot.pose
+        return robot_poses
+
     def _prepare_simconfig_robots(self):
         """
         Reads robot list from bibi and poses from exc and populates robot manager
@@ -192,6 +240,9 @@ class CLEGazeboSimulationAssembly(GazeboSimulationAssembly):
         :param world_file_abs_path Path to the world sdf
         """
         self._notify("Loading experiment environment")
+        # a gzserver kept running by the previous simulation was not started with the world file
+        if self._gazebo_resumed:
+            return self.robotManager.scene_handler().load_gazebo_world_file(world_file_abs_path)
         return self.robotManager.scene_handler().parse_gazebo_world_file(world_file_abs_path)
 
     def _load_textures(self):
@@ -347,23 +398,19 @@ class CLEGazeboSimulationAssembly(GazeboSimulationAssembly):
         """
         raise NotImplementedError("This method must be overridden in an implementation")
 
-    # pylint: disable=too-many-arguments
-    def __load_cle(self, roscontrol, roscomm, braincontrol, braincomm,
-                   brain_file_path, neurons_config, externalmodulearray,
-                   robot_poses, models, lights):
+    def __load_cle(self, robot_adapters, brain):
         """
-        Load the ClosedLoopEngine and initializes all interfaces
+        Load the ClosedLoopEngine and initializes all interfaces, building the neural network
 
-        :param roscontrol Robot Control Adapter to use
-        :param roscomm Robot Communication Adapter to use
-        :param braincontrol Brain Control Adapter to use
-        :param braincomm Brain Communication Adapter to use
-        :param brain_file_path Accessible path to brain file
-        :param neurons_config Neuron configuration specified in the BIBI
-        :param robot_post Initial robot pose
-        :param models Initial models loaded into the environment
-        :param lights Initial lights loaded into the environment
+        :param robot_adapters The Robot Communication and Control Adapters to use
+        :param brain The Brain Control and Communication Adapters to use, the accessible path to
+                     the brain file and the neuron configuration specified in the BIBI
         """
+        roscomm, roscontrol = robot_adapters
+        braincontrol, braincomm, brain_file_path, neurons_config = brain
+
+        #load external modules
+        externalmodulearray = ExternalModuleManager()
 
         # Needed in order to cleanup global static variables
         self._notify("Connecting brain simulator to robot")
@@ -380,8 +427,6 @@ class CLEGazeboSimulationAssembly(GazeboSimulationAssembly):
         timestep = (ClosedLoopEngine.DEFAULT_TIMESTEP
                     if self.sim_config.timestep is None else self.sim_config.timestep)
 
-        roscontrol.set_robots(self.robotManager.get_robot_dict())
-
         # initialize CLE
         self._notify("Initializing CLE")
 
@@ -394,12 +439,6 @@ class CLEGazeboSimulationAssembly(GazeboSimulationAssembly):
         else:
             cle.initialize()
 
-        # Set initial pose
-        cle.initial_robot_poses = robot_poses
-        # Set initial models and lights
-        cle.initial_models = models
-        cle.initial_lights = lights
-
         return cle
 
     def __load_tfs(self):
@@ -415,7 +454,7 @@ class CLEGazeboSimulationAssembly(GazeboSimulationAssembly):
             logger.debug("TF: " + tf.name + "\n" + tf.code + '\n')
 
             try:
-                new_code = compile_restricted(tf.code, '<string>', 'exec')
+                new_code = TransferFunctionCache.compile(tf.code, compile_restricted)
             # pylint: disable=broad-except
             except Exception as e:
                 logger.error("Error while compiling the transfer function {name} in restricted "
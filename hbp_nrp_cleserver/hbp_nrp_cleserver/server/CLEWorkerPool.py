@@ -0,0 +1,352 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+A pool of pre-forked CLE worker processes, each running at most one simulation
+"""
+
+import os
+import time
+import errno
+import select
+import signal
+import logging
+import importlib
+import threading
+import collections
+from multiprocessing.connection import Listener, Client
+
+logger = logging.getLogger(__name__)
+
+# the fields of the CreateNewSimulation service request forwarded to the workers
+REQUEST_FIELDS = ('exd_config_file', 'gzserver_host', 'reservation', 'sim_id', 'timeout',
+                  'timeout_type', 'playback_path', 'token', 'ctx_id', 'experiment_id',
+                  'brain_processes')
+
+SimulationRequest = collections.namedtuple('SimulationRequest', REQUEST_FIELDS)
+
+# the brain simulators imported lazily by the server configurations, imported before forking
+# the zygote so that the workers inherit them
+PRELOADED_MODULES = ('pyNN.nest', 'nest')
+
+_INITIALIZED = 'initialized'
+_FAILED = 'failed'
+_FINISHED = 'finished'
+
+
+class CLEWorkerPool(object):
+    """
+    Hands every new simulation to an idle, warm CLE worker process.
+
+    The pool is started before the ROS node of the factory is initialized: it imports the brain
+    simulators and forks a zygote process, which inherits the modules imported so far (the CLE,
+    the brain simulators, rospy) but no ROS state, and keeps forking workers from it so that size
+    workers are always alive. An idle worker waits for a simulation request, runs the simulation
+    in its own process and ROS node, and exits when the simulation ends since a brain simulator
+    cannot be reset.
+    Requests arriving while all the workers are busy are queued until one is available.
+    """
+
+    # maximum time a request waits for an idle worker, in seconds
+    QUEUE_TIMEOUT = 60
+
+    def __init__(self, size, factory_class, queue_timeout=QUEUE_TIMEOUT):
+        """
+        :param size: the number of worker processes, i.e. of concurrent simulations
+        :param factory_class: the simulation factory, instantiated in every worker to create its
+                              simulation
+        :param queue_timeout: the maximum time a request waits for an idle worker, in seconds
+        """
+        if size < 1:
+            raise ValueError("The CLE worker pool needs at least one worker")
+        self.__size = size
+        self.__factory_class = factory_class
+        self.__queue_timeout = queue_timeout
+        self.__condition = threading.Condition()
+        self.__idle = collections.deque()
+        self.__busy = {}
+        self.__starting = 0
+        self.__queued = 0
+        self.__listener = None
+        self.__control_fd = None
+        self.__zygote = None
+        self.__closed = False
+
+    @property
+    def size(self):
+        """
+        Returns the number of worker processes of the pool
+        """
+        return self.__size
+
+    def status(self):
+        """
+        Returns the number of workers and of queued requests
+
+        :return: a dictionary with the size of the pool, the number of idle workers, the number
+                 of workers running or initializing a simulation and the number of requests
+                 waiting for a worker
+        """
+        with self.__condition:
+            return {'size': self.__size, 'idle': len(self.__idle), 'busy': len(self.__busy),
+                    'starting': self.__starting, 'queued': self.__queued}
+
+    def is_full(self):
+        """
+        Checks whether every worker runs or initializes a simulation, a new simulation would
+        then wait for one of them to end. Workers which are still being forked are not busy.
+        """
+        with self.__condition:
+            return len(self.__busy) + self.__starting >= self.__size
+
+    def start(self):
+        """
+        Forks the zygote process and starts accepting the workers it forks.
+        Must be called before the ROS node is initialized.
+        """
+        for module in PRELOADED_MODULES:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                logger.info("%s is not available, the CLE workers import it if needed", module)
+
+        authkey = os.urandom(32)
+        self.__listener = Listener(family='AF_UNIX', authkey=authkey)
+        read_fd, self.__control_fd = os.pipe()
+
+        address = self.__listener.address
+        factory_class = self.__factory_class
+
+        def worker():
+            """
+            The body of a worker process
+            """
+            _worker(address, authkey, factory_class)
+
+        self.__zygote = os.fork()
+        if self.__zygote == 0:  # pragma: no cover
+            os.close(self.__control_fd)
+            _zygote(self.__size, read_fd, worker)
+        os.close(read_fd)
+
+        thread = threading.Thread(target=self.__accept, name='cle-worker-pool')
+        thread.daemon = True
+        thread.start()
+        logger.info("Started a pool of %d CLE workers", self.__size)
+
+    def shutdown(self):
+        """
+        Stops the zygote, which terminates the workers, and closes the connections to the idle
+        workers
+        """
+        with self.__condition:
+            self.__closed = True
+            idle, self.__idle = list(self.__idle), collections.deque()
+            self.__condition.notify_all()
+        if self.__control_fd is not None:
+            # the zygote stops when the pipe is closed
+            os.close(self.__control_fd)
+            self.__control_fd = None
+            try:
+                os.waitpid(self.__zygote, 0)
+            except OSError:
+                pass
+        for _, conn in idle:
+            conn.close()
+        if self.__listener is not None:
+            self.__listener.close()
+            self.__listener = None
+
+    def create_new_simulation(self, service_request):
+        """
+        Hands a new simulation to an idle worker, waiting for one if all of them are busy, and
+        waits for the simulation to be initialized
+
+        :param service_request: the CreateNewSimulation ROS service request
+        :raise: an Exception if no worker became available in time or the initialization failed
+        """
+        sim_id = service_request.sim_id
+        job = dict((field, getattr(service_request, field)) for field in REQUEST_FIELDS)
+
+        pid, conn = self.__acquire(sim_id)
+        logger.info("Handing simulation %s to CLE worker %d", sim_id, pid)
+        result = None
+        try:
+            conn.send(job)
+            result, message = conn.recv()
+        except (IOError, EOFError):
+            conn.close()
+            raise Exception("CLE worker {0} died while initializing simulation {1}"
+                            .format(pid, sim_id))
+        finally:
+            with self.__condition:
+                self.__starting -= 1
+                if result == _INITIALIZED:
+                    self.__busy[pid] = sim_id
+
+        if result != _INITIALIZED:
+            # the worker exits after a failed initialization, the zygote replaces it
+            conn.close()
+            raise Exception(message)
+        thread = threading.Thread(target=self.__watch, args=(pid, conn),
+                                  name='cle-worker-{0}'.format(pid))
+        thread.daemon = True
+        thread.start()
+        return []
+
+    def __acquire(self, sim_id):
+        """
+        Takes an idle worker, waiting for one at most queue_timeout seconds
+        """
+        deadline = time.time() + self.__queue_timeout
+        with self.__condition:
+            self.__queued += 1
+            try:
+                while not self.__idle:
+                    remaining = deadline - time.time()
+                    if self.__closed or remaining <= 0:
+                        raise Exception("No CLE worker available for simulation {0}, {1} "
+                                        "simulations are running".format(sim_id,
+                                                                         len(self.__busy)))
+                    if self.__queued == 1:
+                        logger.info("Simulation %s waits for a CLE worker", sim_id)
+                    self.__condition.wait(remaining)
+                self.__starting += 1
+                return self.__idle.popleft()
+            finally:
+                self.__queued -= 1
+
+    def __accept(self):
+        """
+        Accepts the connections of the workers forked by the zygote and marks them idle
+        """
+        # pylint: disable=broad-except
+        while True:
+            try:
+                conn = self.__listener.accept()
+                pid = conn.recv()
+            except Exception:
+                if self.__closed:
+                    return
+                logger.exception("Could not accept a CLE worker")
+                continue
+            logger.debug("CLE worker %d is ready", pid)
+            with self.__condition:
+                if self.__closed:
+                    conn.close()
+                    return
+                self.__idle.append((pid, conn))
+                self.__condition.notify_all()
+
+    def __watch(self, pid, conn):
+        """
+        Waits for the simulation of a worker to end
+        """
+        try:
+            conn.recv()
+        except (IOError, EOFError):
+            logger.warning("CLE worker %d exited before the end of its simulation", pid)
+        finally:
+            conn.close()
+            with self.__condition:
+                sim_id = self.__busy.pop(pid, None)
+            logger.info("Simulation %s of CLE worker %d ended", sim_id, pid)
+
+
+def _zygote(size, control_fd, worker):  # pragma: no cover
+    """
+    Keeps size workers alive until the control pipe is closed, then terminates them
+
+    :param size: the number of workers
+    :param control_fd: the read end of the control pipe
+    :param worker: the body of a worker process
+    """
+    children = set()
+    while True:
+        while len(children) < size:
+            pid = os.fork()
+            if pid == 0:
+                os.close(control_fd)
+                worker()
+            children.add(pid)
+
+        # the pipe becomes readable when the pool shuts down or its process exits
+        readable, _, _ = select.select([control_fd], [], [], 0.5)
+        if readable:
+            break
+
+        while children:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except OSError as e:
+                if e.errno != errno.ECHILD:
+                    raise
+                pid = 0
+            if pid == 0:
+                break
+            children.discard(pid)
+
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    os._exit(0)  # pylint: disable=protected-access
+
+
+def _worker(address, authkey, factory_class):  # pragma: no cover
+    """
+    Waits for a simulation request, runs the simulation and exits
+
+    :param address: the address of the pool
+    :param authkey: the authentication key of the pool
+    :param factory_class: the simulation factory
+    """
+    code = 0
+    # pylint: disable=broad-except
+    try:
+        conn = Client(address, family='AF_UNIX', authkey=authkey)
+        conn.send(os.getpid())
+        try:
+            job = conn.recv()
+        except EOFError:
+            # the pool is shut down
+            return
+
+        factory = factory_class()
+        try:
+            factory.create_new_simulation(SimulationRequest(**job))
+        except Exception as e:
+            conn.send((_FAILED, str(e)))
+            return
+        conn.send((_INITIALIZED, None))
+
+        thread = factory.running_simulation_thread
+        if thread is not None:
+            thread.join()
+        conn.send((_FINISHED, None))
+    except Exception:
+        logger.exception("CLE worker %d failed", os.getpid())
+        code = 1
+    finally:
+        os._exit(code)  # pylint: disable=protected-access
@@ -27,47 +27,164 @@ for saving to the storage
 the content of the CSV recorders of the simulation.
 """
 import time
-import os
+import gzip
+import logging
 import threading
+from StringIO import StringIO
+from collections import OrderedDict
 from cle_ros_msgs.msg import CSVRecordedFile
 from hbp_nrp_backend import get_date_and_time_string
 from hbp_nrp_backend.storage_client_api.StorageClient import StorageClient
-from hbp_nrp_commons.workspace.SimUtil import SimUtil
+from hbp_nrp_commons.workspace.Settings import Settings
 import hbp_nrp_cle.tf_framework as tf_framework
 
 __author__ = 'Manos Angelidis'
+logger = logging.getLogger(__name__)
+
+
+class CSVFlushPolicy(object):
+    """
+    Decides how often the CSV recorders are collected and when their content is uploaded.
+
+    The recorders are collected every poll_interval seconds, which keeps the memory held by
+    the recorders of the CLE bounded. Collections returning nothing are idle, and every idle
+    collection doubles the delay until the next one, up to max_interval. The collected content
+    is uploaded when it is older than max_interval seconds, or as soon as it exceeds max_bytes
+    or max_rows.
+
+    The policy is not thread-safe, its users synchronize the accesses.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, max_interval=5, max_bytes=1024 * 1024, max_rows=10000, poll_interval=1):
+        """
+        :param max_interval: the maximum time the collected content waits for upload, and
+                             the maximum delay between two collections, in seconds
+        :param max_bytes: the size of collected content triggering an upload
+        :param max_rows: the number of collected rows triggering an upload
+        :param poll_interval: the delay between two collections when data is being recorded
+        """
+        self.max_interval = max_interval
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.__poll_interval = min(poll_interval, max_interval)
+        self.__idle_collections = 0
+        self.__bytes = 0
+        self.__rows = 0
+        self.__oldest = None
+
+    def collected(self, nbytes, nrows, now=None):
+        """
+        Accounts a collection of the recorders
+
+        :param nbytes: the size of the collected content
+        :param nrows: the number of collected rows
+        :param now: the time of the collection, defaults to the current time
+        """
+        if not nbytes:
+            self.__idle_collections += 1
+            return
+        self.__idle_collections = 0
+        self.__bytes += nbytes
+        self.__rows += nrows
+        if self.__oldest is None:
+            self.__oldest = now if now is not None else time.time()
+
+    def flushed(self):
+        """
+        Accounts the upload of all the collected content
+        """
+        self.__bytes = 0
+        self.__rows = 0
+        self.__oldest = None
+
+    def flush_delay(self, now=None):
+        """
+        Returns the time until the collected content has to be uploaded, in seconds
+
+        :param now: the current time, defaults to time.time()
+        :return: 0 if the content is due, None if there is nothing to upload
+        """
+        if self.__oldest is None:
+            return None
+        if self.__bytes >= self.max_bytes or self.__rows >= self.max_rows:
+            return 0.
+        now = now if now is not None else time.time()
+        return max(0., self.__oldest + self.max_interval - now)
+
+    def poll_interval(self):
+        """
+        Returns the delay until the next collection of the recorders, in seconds
+        """
+        return min(self.max_interval,
+                   self.__poll_interval * 2 ** min(self.__idle_collections, 16))
 
 
 class CSVLogger(object):
     """
     Class that logs CSV data to the storage,
-    received from the CLE every n seconds
-    Runs in a separate killable thread
+    received from the CLE every n seconds.
+
+    The recorders are dumped by a collecting thread, which appends their content to an
+    in-memory buffer holding a single entry per file. A separate uploading thread sends the
+    buffer to the storage, so that a slow storage never delays the collection and the content
+    of several collections is coalesced into a single request per file. When the buffer is
+    full, the collection waits for the upload instead of growing the buffer further: the data
+    then stays in the recorders until the storage catches up. A CSVFlushPolicy decides when
+    the recorders are collected and when the buffer is uploaded.
+
+    Optionally, the uploaded chunks are compressed. Every chunk is then a gzip member appended
+    to a .gz file, and the concatenation of the members is a valid gzip file.
     """
 
-    def __init__(self, assembly, interval=5, folder_name=None):
+    # maximum size of the content buffered for upload, in bytes
+    MAX_PENDING_BYTES = 16 * 1024 * 1024
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, assembly, interval=5, folder_name=None,
+                 max_pending_bytes=MAX_PENDING_BYTES, flush_policy=None, compress=None):
         """
         The assembly object contains all the necessary information
         to save the csv data, the token, experiment_id
 
         :param SimulationAssembly assembly: contains all the
         information tied to the running simulation
-        :param optional int interval: the interval between consequent saves
+        :param optional int interval: the maximum interval between consequent saves
         :param optional string folder_name: user-defined name for csv_data
+        :param optional int max_pending_bytes: the size of the upload buffer
+        :param optional CSVFlushPolicy flush_policy: when to collect and upload the recorders,
+        defaults to a CSVFlushPolicy with interval as max_interval
+        :param optional bool compress: whether to upload gzip compressed files,
+        defaults to Settings.csv_compress
         """
         self._log_csv_thread = None
+        self._upload_thread = None
         self._creation_time = get_date_and_time_string()
         self._interval = interval
         self._assembly = assembly
         self._folder_name = folder_name
         self._storage_client = StorageClient()
+        self._max_pending_bytes = max_pending_bytes
+        self._flush_policy = flush_policy if flush_policy is not None \
+            else CSVFlushPolicy(max_interval=interval)
+        self._compress = Settings.csv_compress if compress is None else compress
+
+        # state of the storage folder, kept in memory for the lifetime of the folder
+        self._folder_uuid = None
+        self._headers = {}
+        self._headers_written = set()
+
+        # content waiting to be uploaded, per file
+        self._pending = OrderedDict()
+        self._pending_bytes = 0
+        self._pending_condition = threading.Condition()
 
         self.stop_flag = threading.Event()
 
     def initialize(self):
         """
-        Initializes a killable thread which runs the log_csv function
-        every interval seconds, and starts the thread
+        Initializes the threads collecting the recorders every interval seconds and
+        uploading their content, and starts them
         """
 
         self.stop_flag.clear()
@@ -78,73 +195,162 @@ class CSVLogger(object):
             """
             while not self.stop_flag.isSet():
                 self._log_csv()
-                time.sleep(self._interval)
+                with self._pending_condition:
+                    delay = self._flush_policy.poll_interval()
+                self.stop_flag.wait(delay)
+
+        def _upload_job():  # pragma: no cover
+            """
+            Uploads the collected content until the logger is stopped and the buffer is empty
+            """
+            while True:
+                with self._pending_condition:
+                    while not self.stop_flag.isSet():
+                        delay = self._flush_policy.flush_delay()
+                        if delay == 0:
+                            break
+                        self._pending_condition.wait(delay if delay is not None
+                                                     else self._interval)
+                    if not self._pending:
+                        return
+                if not self._upload_pending():
+                    if self.stop_flag.isSet():
+                        # the last attempt is made by shutdown
+                        return
+                    self.stop_flag.wait(self._interval)
 
         self._log_csv_thread = threading.Thread(target=_log_csv_job)
         self._log_csv_thread.start()
+        self._upload_thread = threading.Thread(target=_upload_job)
+        self._upload_thread.start()
 
     def shutdown(self):
         """
-        Terminates the killable thread that saves the csv data
+        Stops the collection, then waits for the collected content to be uploaded
         """
-        if self._log_csv_thread:
-            self.stop_flag.set()
-            self._log_csv()
+        if not self._log_csv_thread:
+            return
 
-        if self._log_csv_thread:
-            self._log_csv_thread.join()  # wait till thread returns
-            self._log_csv_thread = None
+        self.stop_flag.set()
+        with self._pending_condition:
+            self._pending_condition.notify_all()
+        self._log_csv_thread.join()  # wait till threads return
+        self._upload_thread.join()
+        self._log_csv_thread = None
+        self._upload_thread = None
+
+        # flush the content collected since the last upload
+        self._log_csv()
+        if self._pending and not self._upload_pending():
+            logger.error("Discarding the content of the CSV recorders which could not be "
+                         "uploaded to the storage")
 
     def reset(self):
         """
-        Resets the killable thread that saves the csv data and updates
+        Resets the threads that save the csv data and updates
         the creation time. This is done to create a new folder after reset
         """
         self.shutdown()
         # update the creation time to store the data in a separate folder upon reset
         self._creation_time = get_date_and_time_string()
+        self._folder_uuid = None
+        self._headers_written.clear()
         self.initialize()
 
     def _log_csv(self):
         """
-        Appends the simulation CSV recorders' content to the storage
+        Appends the simulation CSV recorders' content to the upload buffer
+        """
+        with self._pending_condition:
+            # backpressure, leave the data in the recorders while the storage is slow
+            while self._pending_bytes >= self._max_pending_bytes and \
+                    not self.stop_flag.isSet():
+                self._pending_condition.wait(self._interval)
+
+            csv_files = [CSVRecordedFile(recorded_file[0], recorded_file[1], recorded_file[2])
+                         for recorded_file in tf_framework.dump_csv_recorder_to_files()]
+            nbytes, nrows = 0, 0
+            for csv_file in csv_files:
+                self._headers.setdefault(csv_file.name, ''.join(csv_file.headers))
+                content = ''.join(csv_file.values)
+                self._pending[csv_file.name] = self._pending.get(csv_file.name, '') + content
+                nbytes += len(content)
+                nrows += len(csv_file.values)
+            self._pending_bytes += nbytes
+
+            self._flush_policy.collected(nbytes, nrows)
+            if self._flush_policy.flush_delay() == 0:
+                self._pending_condition.notify_all()
+
+    def _get_folder_uuid(self):
+        """
+        Returns the uuid of the storage folder of the CSV files, creating it on first use
         """
-        csv_files = [CSVRecordedFile(recorded_file[0], recorded_file[1], recorded_file[2])
-                     for recorded_file in tf_framework.dump_csv_recorder_to_files()]
-        if csv_files:
+        if self._folder_uuid is None:
             time_string = self._creation_time if self._creation_time \
                 else get_date_and_time_string()
             subfolder_name = self._folder_name if self._folder_name \
                 else '_'.join(['csv_records', time_string])
             # no harm calling the function since the create_folder does
             # nothing if the folder exists
-            folder_uuid = self._storage_client.create_folder(
+            self._folder_uuid = self._storage_client.create_folder(
                 self._assembly.sim_config.token,
                 self._assembly.sim_config.experiment_id,
                 subfolder_name
             )['uuid']
+        return self._folder_uuid
 
-            for csv_file in csv_files:
-                # if there is no lock file it means that for the currently running sim
-                # no csv files have been created, thus we create them in the storage and
-                # append the headers. To make sure that we don't do it every time in the
-                # context of the current simulation, we check if a lock file exists,
-                # if not, we create it
-                lock_filename = csv_file.name + '.lock'
-                lock_full_path = os.path.join(
-                    self._assembly.sim_dir, subfolder_name, lock_filename)
-                dirname = os.path.dirname(lock_full_path)
-                lock = (SimUtil.find_file_in_paths(lock_filename, [dirname])
-                        or SimUtil.find_file_in_paths(csv_file.name, [dirname]))
-                if not lock:
-                    content = ''.join(csv_file.headers) + \
-                        ''.join(csv_file.values)
-                    if not os.path.exists(dirname):
-                        os.makedirs(dirname)
-                    with open(os.path.join(dirname, lock_filename), 'a'):
-                        pass
+    def _upload_pending(self):
+        """
+        Uploads the content of the buffer, with one request per file. The headers are
+        written with the first content of every file. If the upload fails, the content
+        which has not been uploaded goes back to the buffer.
+
+        :return: True if everything has been uploaded, False otherwise
+        """
+        with self._pending_condition:
+            batch, self._pending = self._pending, OrderedDict()
+            self._pending_bytes = 0
+            self._flush_policy.flushed()
+            self._pending_condition.notify_all()
+
+        # pylint: disable=broad-except
+        try:
+            for name, content in batch.items():
+                append = name in self._headers_written
+                if not append:
+                    content = self._headers[name] + content
+                if self._compress:
+                    self._storage_client.create_or_update(
+                        self._assembly.sim_config.token, self._get_folder_uuid(), name + '.gz',
+                        self._gzip(content), 'application/gzip', append=append)
                 else:
-                    content = ''.join(csv_file.values)
-                self._storage_client.create_or_update(
-                    self._assembly.sim_config.token, folder_uuid, csv_file.name,
-                    content, 'text/plain', append=lock)
+                    self._storage_client.create_or_update(
+                        self._assembly.sim_config.token, self._get_folder_uuid(), name,
+                        content, 'text/plain', append=append)
+                self._headers_written.add(name)
+                del batch[name]
+        except Exception:
+            logger.exception("Failed to upload the CSV recorders to the storage")
+            with self._pending_condition:
+                for name, content in self._pending.iteritems():
+                    batch[name] = batch.get(name, '') + content
+                self._pending = batch
+                self._pending_bytes = sum(len(content) for content in batch.itervalues())
+                # retried on the next flush
+                self._flush_policy.collected(self._pending_bytes, 0)
+            return False
+
+        return True
+
+    @staticmethod
+    def _gzip(content):
+        """
+        Compresses a chunk of CSV content into a gzip member
+
+        :param content: the content to compress
+        """
+        compressed = StringIO()
+        with gzip.GzipFile(fileobj=compressed, mode='wb') as gzip_file:
+            gzip_file.write(content)
+        return compressed.getvalue()
@@ -25,6 +25,8 @@
 Interface for gzserver and gzbridge spawning classes.
 """
 
+from hbp_nrp_watchdog.Timer import DetachedRunner
+
 __author__ = 'Alessandro Ambrosano'
 
 
@@ -37,6 +39,7 @@ class IGazeboServerInstance(object):
 
     def __init__(self):
         self.__gazebo_died_callback = None
+        self.__gazebo_died_runner = DetachedRunner('GazeboDied')
 
     @property
     def gazebo_died_callback(self):  # pragma: no cover
@@ -56,10 +59,11 @@ class IGazeboServerInstance(object):
 
     def _raise_gazebo_died(self):
         """
-        Informs clients that Gazebo has died
+        Informs clients that Gazebo has died. The watchdogs call it from their timers, the
+        callback runs on a dedicated thread since it shuts the simulation down.
         """
         if self.__gazebo_died_callback is not None:
-            self.__gazebo_died_callback()
+            self.__gazebo_died_runner.run(self.__gazebo_died_callback)
 
     def start(self, ros_master_uri, models_path=None, gzserver_args=None):   # pragma: no cover
         """
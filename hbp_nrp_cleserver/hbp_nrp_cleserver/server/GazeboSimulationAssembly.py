@@ -32,6 +32,7 @@ import os
 import subprocess
 import rospy
 import rosnode
+from std_srvs.srv import Empty
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +46,8 @@ from hbp_nrp_cleserver.server.GazeboSimulationRecorder import GazeboSimulationRe
 from hbp_nrp_cle.robotsim.RobotManager import RobotManager
 
 from hbp_nrp_commons.workspace.SimUtil import SimUtil
+from hbp_nrp_commons.workspace.Settings import Settings
+from hbp_nrp_commons.SpanTracer import SpanTracer
 
 
 class GazeboSimulationAssembly(SimulationAssembly):     # pragma: no cover
@@ -71,11 +74,14 @@ class GazeboSimulationAssembly(SimulationAssembly):     # pragma: no cover
                             self.sim_config.gzserver_host)
 
         self.gzweb = None
+        self._gazebo_standby_key = None
+        self._gazebo_resumed = False
         self._initial_ros_params = None
         self._initial_ros_nodes = None
         self.ros_launcher = None
         self.gazebo_recorder = None
 
+    @SpanTracer.traced('gazebo.start')
     def _start_gazebo(self, extra_models):
         """
         Configures and starts the Gazebo simulator and backend services
@@ -95,6 +101,8 @@ class GazeboSimulationAssembly(SimulationAssembly):     # pragma: no cover
         ros_master_uri = os.environ.get("ROS_MASTER_URI").replace('localhost', local_ip)
 
         self.gzserver.gazebo_died_callback = self._handle_gazebo_shutdown
+        self.__set_env_for_gzbridge()
+        self._gazebo_standby_key = self.__get_gazebo_standby_key(extra_models)
 
         # experiment specific gzserver command line arguments
         gzserver_args = '--seed {rng_seed} -e {engine} {world_file}'.format(
@@ -115,8 +123,12 @@ class GazeboSimulationAssembly(SimulationAssembly):     # pragma: no cover
                 self.ros_launcher = ROSLaunch(self.sim_config.ros_launch_abs_path)
 
         try:
-            logger.info("gzserver arguments: " + gzserver_args)
-            self.gzserver.start(ros_master_uri, extra_models, gzserver_args)
+            # a gzserver kept running has an empty world, the world is spawned into it later on
+            self._gazebo_resumed = (self._gazebo_standby_key is not None and
+                                    self.gzserver.resume(self._gazebo_standby_key))
+            if not self._gazebo_resumed:
+                logger.info("gzserver arguments: " + gzserver_args)
+                self.gzserver.start(ros_master_uri, extra_models, gzserver_args)
         except XvfbXvnError as exception:
             logger.error(exception)
             error = "Recoverable error occurred. Please try again. Reason: {0}".format(exception)
@@ -131,11 +143,57 @@ class GazeboSimulationAssembly(SimulationAssembly):     # pragma: no cover
         self._notify("Starting Gazebo web client")
         os.environ['GAZEBO_MASTER_URI'] = self.gzserver.gazebo_master_uri
 
-        self.__set_env_for_gzbridge()
-
-        # We do not know here in which state the previous user did let us gzweb.
+        # We do not know here in which state the previous user did let us gzweb, unless it was
+        # kept running together with a clean gzserver.
         self.gzweb = LocalGazeboBridgeInstance()
-        self.gzweb.restart()
+        if not self._gazebo_resumed:
+            self.gzweb.restart()
+
+    def _gazebo_models_path(self):
+        """
+        Gets the additional models path of gzserver, the assets and the simulation directory.
+        It goes through Settings.sim_dir_symlink when that links to the simulation directory,
+        so that it stays the same from one simulation to the next one.
+
+        :return: The models path
+        """
+        sim_dir = self.sim_dir
+        if os.path.realpath(Settings.sim_dir_symlink) == os.path.realpath(sim_dir):
+            sim_dir = Settings.sim_dir_symlink
+        return os.path.join(sim_dir, 'assets') + ':' + sim_dir
+
+    def __get_gazebo_standby_key(self, extra_models):
+        """
+        Gets the settings of the gzserver and gzbridge this simulation can keep running for the
+        next one and take over from the previous one
+
+        :param extra_models: The additional models path of gzserver
+        :return: The settings, or None if they must be restarted
+        """
+        if (not Settings.gazebo_standby or self.sim_config.gzserver_host != 'local' or
+                self.sim_config.playback_path):
+            return None
+        # a seed chosen by the experiment needs a fresh gzserver, any other one is random anyway
+        if self.sim_config.rng_seed is not None:
+            return None
+        # gzserver keeps the models path it was started with, it must not depend on the simulation
+        link = Settings.sim_dir_symlink
+        if extra_models is not None and not all(
+                path == link or path.startswith(link + os.sep) for path in extra_models.split(':')):
+            return None
+        gzbridge_settings = tuple(os.environ[variable] for variable in (
+            'GZBRIDGE_POSE_FILTER_DELTA_TRANSLATION', 'GZBRIDGE_POSE_FILTER_DELTA_ROTATION',
+            'GZBRIDGE_UPDATE_EARLY_THRESHOLD'))
+        return self.sim_config.physics_engine, gzbridge_settings
+
+    def __reset_gazebo_world(self):
+        """
+        Empties the world of gzserver and resets its time, as if it had just been started
+        without a world file
+        """
+        self.robotManager.scene_handler().empty_gazebo_world()
+        rospy.wait_for_service('/gazebo/reset_simulation', timeout=10)
+        rospy.ServiceProxy('/gazebo/reset_simulation', Empty)()
 
     # pylint: disable=missing-docstring
     def __set_env_for_gzbridge(self):
@@ -171,6 +229,7 @@ class GazeboSimulationAssembly(SimulationAssembly):     # pragma: no cover
         if self.sim_config.ext_robot_controller is not None:
             number_of_subtasks += 1
 
+        gazebo_released = False
         try:
 
             # Check if notifications to clients are currently working
@@ -195,8 +254,16 @@ class GazeboSimulationAssembly(SimulationAssembly):     # pragma: no cover
 
             self._shutdown(notifications)
 
+            # Keep a clean gzserver and gzbridge running for the next simulation if possible
+            if self._gazebo_standby_key is not None and self.gzserver is not None:
+                if notifications:
+                    self.ros_notificator.update_task("Resetting Gazebo robotic simulator",
+                                                     update_progress=True, block_ui=False)
+                gazebo_released = self.gzserver.release(self._gazebo_standby_key,
+                                                        self.__reset_gazebo_world)
+
             # Shutdown gzweb before shutting down Gazebo
-            if self.gzweb is not None:
+            if self.gzweb is not None and not gazebo_released:
                 try:
                     if notifications:
                         self.ros_notificator.update_task("Shutting down Gazebo web client",
@@ -206,7 +273,7 @@ class GazeboSimulationAssembly(SimulationAssembly):     # pragma: no cover
                     logger.warning("gzweb could not be stopped successfully")
                     logger.exception(e)
 
-            if self.gzserver is not None:
+            if self.gzserver is not None and not gazebo_released:
                 try:
                     if notifications:
                         self.ros_notificator.update_task("Shutting down Gazebo robotic simulator",
@@ -254,27 +321,32 @@ class GazeboSimulationAssembly(SimulationAssembly):     # pragma: no cover
         # instant and exit, but wrap it in a timeout since it's semi-officially supported)
         logger.info("Cleaning up ROS nodes and services")
 
+        # the parameters and the node of a gzserver kept running are preserved
+        preserved = ('/gazebo', '/use_sim_time') if gazebo_released else ()
+
         for param in rospy.get_param_names():
-            if param not in self._initial_ros_params:
+            if param not in self._initial_ros_params and not param.startswith(preserved):
                 rospy.delete_param(param)
 
         for node in rosnode.get_node_names():
-            if node not in self._initial_ros_nodes:
+            if node not in self._initial_ros_nodes and not node.startswith(preserved):
                 os.system('rosnode kill ' + str(node))
 
-        try:
-            res = subprocess.check_output(["rosnode", "list"])
+        # the node of a gzserver kept running must not be killed
+        if not gazebo_released:
+            try:
+                res = subprocess.check_output(["rosnode", "list"])
 
-            if res.find("/gazebo") > -1 and res.find("/Watchdog") > -1:
-                os.system('rosnode kill /gazebo /Watchdog')
+                if res.find("/gazebo") > -1 and res.find("/Watchdog") > -1:
+                    os.system('rosnode kill /gazebo /Watchdog')
 
-            elif res.find("/gazebo") > -1:
-                os.system('rosnode kill /gazebo >/dev/null 2>&1')
+                elif res.find("/gazebo") > -1:
+                    os.system('rosnode kill /gazebo >/dev/null 2>&1')
 
-            elif res.find("/Watchdog") > -1:
-                os.system('rosnode kill /Watchdog >/dev/null 2>&1')
-        except Exception, e:
-            logger.exception(e)
+                elif res.find("/Watchdog") > -1:
+                    os.system('rosnode kill /Watchdog >/dev/null 2>&1')
+            except Exception, e:
+                logger.exception(e)
 
         os.system("echo 'y' | timeout -s SIGKILL 10s rosnode cleanup >/dev/null 2>&1")
 
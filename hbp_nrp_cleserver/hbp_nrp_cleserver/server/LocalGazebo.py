@@ -30,6 +30,7 @@ from hbp_nrp_watchdog.Watchdog import Watchdog
 import os
 from hbp_nrp_cle import config
 import logging
+import threading
 
 __author__ = 'Alessandro Ambrosano'
 
@@ -37,6 +38,51 @@ __author__ = 'Alessandro Ambrosano'
 logger = logging.getLogger('hbp_nrp_cle.user_notifications')
 
 
+class _GazeboStandby(object):
+    """
+    The clean gzserver and gzbridge left running by the last simulation of this process, kept
+    with the settings they were started with
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__key = None
+        self.__pid = None
+
+    def put(self, key, pid):
+        """
+        Registers the running gzserver
+
+        :param key: the settings gzserver and gzbridge were started with
+        :param pid: the process id of gzserver
+        """
+        with self.__lock:
+            self.__key = key
+            self.__pid = pid
+
+    def take(self, key):
+        """
+        Takes the running gzserver, if it was started with the given settings
+
+        :param key: the settings the next simulation needs
+        :return: the process id of gzserver, None if there is no suitable gzserver
+        """
+        with self.__lock:
+            pid = self.__pid if self.__key == key else None
+            self.__key = None
+            self.__pid = None
+            return pid
+
+    def clear(self):
+        """
+        Forgets the running gzserver, when it is restarted or stopped
+        """
+        self.take(None)
+
+
+_standby = _GazeboStandby()
+
+
 class LocalGazeboServerInstance(IGazeboServerInstance):
     """
     Represents a local instance of gzserver.
@@ -64,6 +110,7 @@ class LocalGazeboServerInstance(IGazeboServerInstance):
         if gzserver_args is not None:
             prefix += 'export GZSERVER_ARGS="{0}" && '.format(gzserver_args)
 
+        _standby.clear()
         os.system(prefix + config.config.get('gazebo', 'restart-cmd'))
         self.__ensure_watchdog_running()
 
@@ -80,6 +127,7 @@ class LocalGazeboServerInstance(IGazeboServerInstance):
         Stops the gzserver instance.
         """
         logger.info("Stopping gzserver")
+        _standby.clear()
         os.system(config.config.get('gazebo', 'stop-cmd'))
         if self.__watchdog is not None:
             self.__watchdog.stop()
@@ -90,9 +138,65 @@ class LocalGazeboServerInstance(IGazeboServerInstance):
         Restarts the gzserver instance.
         """
         logger.info("Restarting gzserver")
+        _standby.clear()
         os.system(config.config.get('gazebo', 'restart-cmd'))
         self.__ensure_watchdog_running()
 
+    def resume(self, standby_key):
+        """
+        Takes over the gzserver kept running by the previous simulation, if it was started with
+        the same settings and is still alive. Its world is empty.
+
+        :param standby_key: the settings gzserver must have been started with
+        :return: True if gzserver was taken over, False if it has to be started
+        """
+        pid = _standby.take(standby_key)
+        if pid is None:
+            return False
+
+        # the watchdog forgets a pid which is not a gzserver process anymore
+        watchdog = Watchdog("gzserver", self._raise_gazebo_died, pid=pid)
+        if watchdog.pid is None or not watchdog.is_alive():
+            return False
+
+        logger.info("Reusing the running gzserver")
+        if self.__watchdog is not None:
+            self.__watchdog.stop()
+        self.__watchdog = watchdog
+        self.__watchdog.start()
+        return True
+
+    def release(self, standby_key, reset_world):
+        """
+        Keeps gzserver running for the next simulation, with an empty world. gzserver is stopped
+        instead if the reset fails or gzserver is not healthy afterwards.
+
+        :param standby_key: the settings gzserver was started with
+        :param reset_world: empties the world of gzserver, raises on failure
+        :return: True if gzserver was kept running, False if it was stopped
+        """
+        watchdog = self.__watchdog
+        if watchdog is None:
+            return False
+
+        # pylint: disable=broad-except
+        try:
+            reset_world()
+            healthy = watchdog.is_alive()
+        except Exception:
+            logger.warning("Could not reset the world of gzserver", exc_info=True)
+            healthy = False
+
+        if not healthy:
+            self.stop()
+            return False
+
+        watchdog.stop()
+        self.__watchdog = None
+        _standby.put(standby_key, watchdog.pid)
+        logger.info("Keeping gzserver running for the next simulation")
+        return True
+
     # pylint: disable=R0201
     def try_extend(self, new_timeout): # pylint: disable=unused-argument
         """
@@ -30,10 +30,9 @@ ROS wrapper around the CLE
 __author__ = "Lorenzo Vannucci, Stefan Deser, Daniel Peppicelli, Georg Hinkel, Hossain Mahmud"
 
 import json
+import collections
 import logging
-import rospy
 import numpy
-import time
 import sys
 from std_srvs.srv import Empty
 import textwrap
@@ -42,8 +41,6 @@ import re
 from ._ExcBibiHandler import ExcBibiHandler
 from ._RobotCallHandler import RobotCallHandler
 
-from RestrictedPython.RCompile import RModule, RestrictionMutator
-
 # This package comes from the catkin package ROSCLEServicesDefinitions
 # in the GazeboRosPackages folder at the root of this CLE repository.
 from hbp_nrp_cleserver.server.SimulationServer import SimulationServer
@@ -56,7 +53,7 @@ from . import SERVICE_GET_TRANSFER_FUNCTIONS, SERVICE_EDIT_TRANSFER_FUNCTION, \
     SERVICE_GET_CSV_RECORDERS_FILES, SERVICE_CLEAN_CSV_RECORDERS_FILES, \
     SERVICE_ACTIVATE_TRANSFER_FUNCTION, SERVICE_CONVERT_TRANSFER_FUNCTION_RAW_TO_STRUCTURED, \
     SERVICE_ADD_ROBOT, SERVICE_GET_ROBOTS, SERVICE_DEL_ROBOT, SERVICE_SET_EXC_ROBOT_POSE, \
-    SERVICE_PREPARE_CUSTOM_MODEL
+    SERVICE_PREPARE_CUSTOM_MODEL, SERVICE_APPLY_TRANSFER_FUNCTIONS
 from . import ros_handler
 import hbp_nrp_cleserver.bibi_config.StructuredTransferFunction as StructuredTransferFunction
 import hbp_nrp_cle.tf_framework as tf_framework
@@ -67,6 +64,8 @@ from hbp_nrp_cleserver.bibi_config.notificator import Notificator, NotificatorHa
 from hbp_nrp_cleserver.server.SimulationServerLifecycle import SimulationServerLifecycle
 from hbp_nrp_commons.bibi_functions import find_changed_strings
 from hbp_nrp_cleserver.server.CSVLogger import CSVLogger
+from hbp_nrp_cleserver.server.ROSServiceRegistry import ROSServiceRegistry
+from hbp_nrp_cleserver.server.TransferFunctionCompiler import TransferFunctionCompiler
 
 logger = logging.getLogger(__name__)
 
@@ -119,24 +118,8 @@ class ROSCLEServer(SimulationServer):
         self._robotHandler = None
         self._excBibiHandler = None
         self._csv_logger = None
-        self.__service_get_transfer_functions = None
-        self.__service_add_transfer_function = None
-        self.__service_edit_transfer_function = None
-        self.__service_activate_transfer_function = None
-        self.__service_convert_transfer_function_raw_to_structured = None
-        self.__service_delete_transfer_function = None
-        self.__service_get_brain = None
-        self.__service_set_brain = None
-        self.__service_set_populations = None
-        self.__service_get_populations = None
-        self.__service_get_CSV_recorders_files = None
-        self.__service_clean_CSV_recorders_files = None
-        self.__service_get_robots = None
-        self.__service_add_robot = None
-        self.__service_del_robot = None
-        self.__service_set_exc_robot_pose = None
-
-        self.__service_prepare_custom_model = None
+        self.__services = ROSServiceRegistry()
+        self.__tf_compiler = TransferFunctionCompiler()
 
         self._tuple2slice = (lambda x: slice(*x) if isinstance(x, tuple) else x)
 
@@ -233,91 +216,46 @@ class ROSCLEServer(SimulationServer):
 
         logger.info("Registering ROS Service handlers")
 
-        self.__service_get_transfer_functions = rospy.Service(
-            SERVICE_GET_TRANSFER_FUNCTIONS(self.simulation_id), srv.GetTransferFunctions,
-            self.__get_transfer_function_sources_and_activation
-        )
-
-        self.__service_add_transfer_function = rospy.Service(
-            SERVICE_ADD_TRANSFER_FUNCTION(self.simulation_id), srv.AddTransferFunction,
-            self.__add_transfer_function
-        )
-
-        self.__service_edit_transfer_function = rospy.Service(
-            SERVICE_EDIT_TRANSFER_FUNCTION(self.simulation_id), srv.EditTransferFunction,
-            self.__edit_transfer_function
-        )
-
-        self.__service_activate_transfer_function = rospy.Service(
-            SERVICE_ACTIVATE_TRANSFER_FUNCTION(self.simulation_id), srv.ActivateTransferFunction,
-            self.__activate_transfer_function
-        )
-
-        self.__service_convert_transfer_function_raw_to_structured = rospy.Service(
-            SERVICE_CONVERT_TRANSFER_FUNCTION_RAW_TO_STRUCTURED(self.simulation_id),
-            srv.ConvertTransferFunctionRawToStructured,
-            self.__convert_transfer_function_raw_to_structured
-        )
-
-        self.__service_delete_transfer_function = rospy.Service(
-            SERVICE_DELETE_TRANSFER_FUNCTION(self.simulation_id), srv.DeleteTransferFunction,
-            self.__delete_transfer_function
-        )
-
-        self.__service_get_brain = rospy.Service(
-            SERVICE_GET_BRAIN(self.simulation_id), srv.GetBrain,
-            self.__get_brain
-        )
-
-        self.__service_set_brain = rospy.Service(
-            SERVICE_SET_BRAIN(self.simulation_id), srv.SetBrain,
-            self.__try_set_brain
-        )
-
-        self.__service_get_populations = rospy.Service(
-            SERVICE_GET_POPULATIONS(self.simulation_id), srv.GetPopulations,
-            self.__get_populations
-        )
-
-        self.__service_set_populations = rospy.Service(
-            SERVICE_SET_POPULATIONS(self.simulation_id), srv.SetPopulations,
-            self.__try_set_populations
-        )
-
-        self.__service_get_CSV_recorders_files = rospy.Service(
-            SERVICE_GET_CSV_RECORDERS_FILES(self.simulation_id), srv.GetCSVRecordersFiles,
-            self.__get_CSV_recorders_files
-        )
-
-        self.__service_clean_CSV_recorders_files = rospy.Service(
-            SERVICE_CLEAN_CSV_RECORDERS_FILES(self.simulation_id), Empty,
-            self.__clean_CSV_recorders_files
-        )
-
-        self.__service_get_robots = rospy.Service(
-            SERVICE_GET_ROBOTS(self.simulation_id), srv.GetRobots,
-            self.__get_robots
-        )
-
-        self.__service_add_robot = rospy.Service(
-            SERVICE_ADD_ROBOT(self.simulation_id), srv.AddRobot,
-            self.__add_robot
-        )
-
-        self.__service_del_robot = rospy.Service(
-            SERVICE_DEL_ROBOT(self.simulation_id), srv.DeleteRobot,
-            self.__delete_robot
-        )
-
-        self.__service_set_exc_robot_pose = rospy.Service(
-            SERVICE_SET_EXC_ROBOT_POSE(self.simulation_id), srv.ChangePose,
-            self.__set_robot_initial_pose
-        )
-
-        self.__service_prepare_custom_model = rospy.Service(
-            SERVICE_PREPARE_CUSTOM_MODEL(self.simulation_id), srv.Resource,
-            self.__prepare_custom_model
-        )
+        sim_id = self.simulation_id
+        self.__services.register([
+            (SERVICE_GET_TRANSFER_FUNCTIONS(sim_id), srv.GetTransferFunctions,
+             self.__get_transfer_function_sources_and_activation),
+            (SERVICE_ADD_TRANSFER_FUNCTION(sim_id), srv.AddTransferFunction,
+             self.__add_transfer_function),
+            (SERVICE_EDIT_TRANSFER_FUNCTION(sim_id), srv.EditTransferFunction,
+             self.__edit_transfer_function),
+            (SERVICE_ACTIVATE_TRANSFER_FUNCTION(sim_id), srv.ActivateTransferFunction,
+             self.__activate_transfer_function),
+            (SERVICE_CONVERT_TRANSFER_FUNCTION_RAW_TO_STRUCTURED(sim_id),
+             srv.ConvertTransferFunctionRawToStructured,
+             self.__convert_transfer_function_raw_to_structured),
+            (SERVICE_DELETE_TRANSFER_FUNCTION(sim_id), srv.DeleteTransferFunction,
+             self.__delete_transfer_function),
+            (SERVICE_APPLY_TRANSFER_FUNCTIONS(sim_id), srv.AddTransferFunction,
+             self.__apply_transfer_functions),
+            (SERVICE_GET_BRAIN(sim_id), srv.GetBrain,
+             self.__get_brain),
+            (SERVICE_SET_BRAIN(sim_id), srv.SetBrain,
+             self.__try_set_brain),
+            (SERVICE_GET_POPULATIONS(sim_id), srv.GetPopulations,
+             self.__get_populations),
+            (SERVICE_SET_POPULATIONS(sim_id), srv.SetPopulations,
+             self.__try_set_populations),
+            (SERVICE_GET_CSV_RECORDERS_FILES(sim_id), srv.GetCSVRecordersFiles,
+             self.__get_CSV_recorders_files),
+            (SERVICE_CLEAN_CSV_RECORDERS_FILES(sim_id), Empty,
+             self.__clean_CSV_recorders_files),
+            (SERVICE_GET_ROBOTS(sim_id), srv.GetRobots,
+             self.__get_robots),
+            (SERVICE_ADD_ROBOT(sim_id), srv.AddRobot,
+             self.__add_robot),
+            (SERVICE_DEL_ROBOT(sim_id), srv.DeleteRobot,
+             self.__delete_robot),
+            (SERVICE_SET_EXC_ROBOT_POSE(sim_id), srv.ChangePose,
+             self.__set_robot_initial_pose),
+            (SERVICE_PREPARE_CUSTOM_MODEL(sim_id), srv.Resource,
+             self.__prepare_custom_model)
+        ])
 
         tf_framework.TransferFunction.excepthook = self.__tf_except_hook
         tf_framework.TF_API.set_ros_cle_server(self)
@@ -770,23 +708,7 @@ class ROSCLEServer(SimulationServer):
         """
         Compiles code source with customized rules
         """
-
-        class FileRestrictionMutator(RestrictionMutator):
-            """
-            Custom RestrictionMutator
-            ie: accepts accessing to private attribute '__file__'
-            """
-            ALLOWED_ATTRS = set(['__file__'])
-
-            def checkAttrName(self, node):
-                if node.attrname in self.ALLOWED_ATTRS:
-                    return
-                return RestrictionMutator.checkAttrName(self, node)
-
-        gen = RModule(source, '<string>')
-        gen.rm = FileRestrictionMutator()
-        gen.compile()
-        return gen.getCode()
+        return self.__tf_compiler.compile(source)
 
     # pylint: disable=R0911,too-many-branches,too-many-statements,too-many-locals
     def __set_transfer_function(self, request, new):
@@ -945,6 +867,161 @@ class ROSCLEServer(SimulationServer):
             self.__cle.start()
         return ret
 
+    def __apply_transfer_functions(self, request):
+        """
+        Adds or modifies a set of transfer functions at once. The names are checked against an
+        index of the loaded transfer functions, the sources are compiled concurrently and the CLE
+        is stopped once to swap all of them in. If any transfer function fails, none is applied.
+
+        :param request: The ROS Service request message (cle_ros_msgs.srv.AddTransferFunction),
+                        its source is a JSON object mapping the names of the transfer functions
+                        to modify, or of the new ones, to their source code
+        :return: empty string if all the transfer functions were applied, otherwise a JSON list
+                 of the errors, each with the name of the transfer function and a message
+        """
+        try:
+            sources = json.loads(request.transfer_function_source)
+            if not isinstance(sources, dict) or \
+                    not all(isinstance(source, basestring) for source in sources.itervalues()):
+                raise ValueError("expected an object mapping names to sources")
+        except ValueError as e:
+            return json.dumps([{'name': None,
+                                'message': "Invalid set of transfer functions: " + str(e)}])
+
+        loaded = dict((tf.name, tf) for tf in tf_framework.get_transfer_functions())
+        flawed = set(name for name in loaded if tf_framework.get_flawed_transfer_function(name))
+
+        entries, errors = self.__check_transfer_function_names(sources, loaded, flawed)
+
+        codes = []
+        results = self.__tf_compiler.compile_all([source for _, _, source in entries])
+        for (key, new_name, _), (code, e) in zip(entries, results):
+            if e is not None:
+                self._publish_error_from_exception(e, new_name)
+                errors.append({'name': key,
+                               'message': "Error while compiling the updated transfer function "
+                                          "named " + new_name + " in restricted mode.\n" + str(e)})
+            codes.append(code)
+
+        if errors:
+            return json.dumps(errors)
+
+        running = self.__cle.running
+        if running:
+            self.__cle.stop()
+        try:
+            error = self.__swap_transfer_functions(entries, codes, loaded, flawed)
+        finally:
+            if running:
+                self.__cle.start()
+
+        if error is not None:
+            return json.dumps([error])
+        logger.info("Applied %d transfer functions", len(entries))
+        return ""
+
+    def __check_transfer_function_names(self, sources, loaded, flawed):
+        """
+        Extracts the names of a set of transfer functions and checks them against the index of
+        the loaded ones: a new name must be unique in the set and must not be taken by a loaded
+        transfer function, unless it is flawed or replaced by the set.
+
+        :param sources: the sources of the transfer functions, by original name
+        :param loaded: the loaded transfer functions, by name
+        :param flawed: the names of the loaded transfer functions which are flawed
+        :return: the (original name, new name, source) tuples of the valid transfer functions
+                 and the list of errors
+        """
+        entries = []
+        errors = []
+        for key in sorted(sources):
+            source = textwrap.dedent(sources[key])
+            found, value = self.get_tf_name(source)
+            if not found:
+                self.publish_error(CLEError.SOURCE_TYPE_TRANSFER_FUNCTION, "NoOrMultipleNames",
+                                   value, severity=CLEError.SEVERITY_ERROR, function_name=key)
+                errors.append({'name': key, 'message': value})
+            else:
+                entries.append((key, value, source))
+
+        taken = set(loaded) - flawed - set(key for key, _, _ in entries)
+        count = collections.Counter(new_name for _, new_name, _ in entries)
+
+        valid = []
+        for key, new_name, source in entries:
+            if new_name in taken or count[new_name] > 1:
+                self._publish_error_from_exception(ValueError("Duplicate definition name"),
+                                                   new_name)
+                errors.append({'name': key, 'message': "duplicate Transfer Function name"})
+            else:
+                valid.append((key, new_name, source))
+        return valid, errors
+
+    def __swap_transfer_functions(self, entries, codes, loaded, flawed):
+        """
+        Replaces the loaded transfer functions with the compiled ones, the CLE must be stopped.
+        If a transfer function cannot be loaded, the ones already loaded are deleted and the
+        replaced ones are restored.
+
+        :param entries: the (original name, new name, source) tuples of the transfer functions,
+                        the transfer functions whose original name is not loaded are new
+        :param codes: the compiled code of the transfer functions
+        :param loaded: the loaded transfer functions, by name
+        :param flawed: the names of the loaded transfer functions which are flawed
+        :return: None if all the transfer functions were loaded, the error otherwise
+        """
+        removed = []
+        added = []
+        new_name = None
+        try:
+            for original_name, _, _ in entries:
+                if original_name in flawed:
+                    tf_framework.delete_flawed_transfer_function(original_name)
+                elif original_name in loaded:
+                    tf_framework.delete_transfer_function(original_name)
+                else:
+                    continue
+                removed.append(loaded[original_name])
+
+            for (original_name, new_name, source), code in zip(entries, codes):
+                # like a single edit, a patched flawed transfer function is activated
+                activation = original_name not in loaded or original_name in flawed or \
+                    loaded[original_name].active
+                tf_framework.set_transfer_function(source, code, new_name, activation=activation)
+                added.append(new_name)
+            return None
+        except TFLoadingException as e:
+            message = e.message
+        # pylint: disable=broad-except
+        except Exception as e:
+            logger.exception("Could not apply the transfer functions")
+            message = str(e)
+
+        self.publish_error(CLEError.SOURCE_TYPE_TRANSFER_FUNCTION, "Loading", message,
+                           severity=CLEError.SEVERITY_ERROR, function_name=new_name or "")
+        for name in reversed(added):
+            tf_framework.delete_transfer_function(name)
+        self.__restore_transfer_functions(removed, flawed)
+        return {'name': new_name, 'message': message}
+
+    def __restore_transfer_functions(self, transfer_functions, flawed):
+        """
+        Loads again transfer functions deleted by a failed set of transfer functions
+
+        :param transfer_functions: the deleted transfer functions
+        :param flawed: the names of the transfer functions which were flawed
+        """
+        for tf in reversed(transfer_functions):
+            # pylint: disable=broad-except
+            try:
+                if tf.name in flawed:
+                    tf_framework.set_flawed_transfer_function(tf.source, tf.name, tf.error)
+                else:
+                    tf_framework.set_transfer_function(tf.source, self.__compile(tf.source),
+                                                       tf.name, activation=tf.active)
+            except Exception:
+                logger.exception("Could not restore the transfer function %s", tf.name)
+
     def _create_state_message(self):
         return {
             'realTime': int(self.__cle.real_time),
@@ -968,40 +1045,9 @@ class ROSCLEServer(SimulationServer):
         if self.__cle is not None:
             logger.info("Shutting down the closed loop service")
             self.__cle.shutdown()
-            time.sleep(2)
-            logger.info("Shutting down get_transfer_functions service")
-            self.__service_get_transfer_functions.shutdown()
-            self.__service_convert_transfer_function_raw_to_structured.shutdown()
-            logger.info("Shutting down activate_transfer_function service")
-            self.__service_activate_transfer_function.shutdown()
-            logger.info("Shutting down add_transfer_function service")
-            self.__service_add_transfer_function.shutdown()
-            logger.info("Shutting down set_transfer_function services")
-            self.__service_edit_transfer_function.shutdown()
-            logger.info("Shutting down delete_transfer_function services")
-            self.__service_delete_transfer_function.shutdown()
-            logger.info("Shutting down get_brain service")
-            self.__service_get_brain.shutdown()
-            logger.info("Shutting down set_brain service")
-            self.__service_set_brain.shutdown()
-            logger.info("Shutting down get_populations service")
-            self.__service_set_populations.shutdown()
-            logger.info("Shutting down get_populations service")
-            self.__service_get_populations.shutdown()
-            logger.info("Shutting down get_CSV_recorders_files service")
-            self.__service_get_CSV_recorders_files.shutdown()
-            logger.info("Shutting down clean_CSV_recorders_files service")
-            self.__service_clean_CSV_recorders_files.shutdown()
-            logger.info("Shutting down get_robots service")
-            self.__service_get_robots.shutdown()
-            logger.info("Shutting down add_robot service")
-            self.__service_add_robot.shutdown()
-            logger.info("Shutting down delete_robot service")
-            self.__service_del_robot.shutdown()
-            logger.info("Shutting down set_robot_initial_pose service")
-            self.__service_set_exc_robot_pose.shutdown()
-            logger.info("Shutting down prepare_custom_model service")
-            self.__service_prepare_custom_model.shutdown()
+            # cle.shutdown returns once the CLE is stopped, only the service calls still in
+            # progress are waited for
+            self.__services.shutdown()
 
     def _reset_world(self, request):
         """
@@ -1047,24 +1093,15 @@ class ROSCLEServer(SimulationServer):
         """
 
         self.__cle.reset_robot_pose()
-        if request.world_sdf is not None and request.world_sdf is not "":
-            sdf_world_string = request.world_sdf
-            brain_temp_path = request.brain_path
-            neurons_conf = request.populations
-            network_conf_orig = {
-                p.name: self._get_population_value(p) for p in neurons_conf
-            }
-            with self._notificator.task_notifier("Resetting the simulation", ""):
-                self._notificator.update_task("Restoring the 3D world", False, True)
-                self.__cle.reset_world(sdf_world_string)
-                self._notificator.update_task("Restoring the brain", False, True)
-                self.__cle.reset_brain(brain_temp_path, network_conf_orig)
-        else:
-            with self._notificator.task_notifier("Resetting the simulation", ""):
-                self._notificator.update_task("Restoring the 3D world", False, True)
+        with self._notificator.task_notifier("Resetting the simulation", ""):
+            self._notificator.update_task("Restoring the 3D world", False, True)
+            if request.world_sdf is not None and request.world_sdf is not "":
+                self.__cle.reset_world(request.world_sdf)
+            else:
                 self.__cle.reset_world()
-                self._notificator.update_task("Restoring the brain", False, True)
-                self.__cle.reset_brain()
+            # the brain is sent even when the world is not, e.g. when it has been replaced since
+            self._notificator.update_task("Restoring the brain", False, True)
+            self._reset_brain(request)
 
         # Member added by transitions library
         # pylint: disable=no-member
@@ -39,14 +39,17 @@ import dateutil.parser as datetime_parser
 # in the GazeboRosPackage folder at the root of this CLE repository.
 from cle_ros_msgs import srv
 from hbp_nrp_cleserver.server import ROS_CLE_NODE_NAME, SERVICE_CREATE_NEW_SIMULATION, \
-    SERVICE_VERSION, SERVICE_IS_SIMULATION_RUNNING
+    SERVICE_VERSION, SERVICE_IS_SIMULATION_RUNNING, PARAM_POOL_STATUS
 from hbp_nrp_cleserver.server.PlaybackServer import PlaybackSimulationAssembly
+from hbp_nrp_cleserver.server.CLEWorkerPool import CLEWorkerPool
 
 from hbp_nrp_cleserver.server import ServerConfigurations
 import gc
 from hbp_nrp_cleserver.server.__signal_patch import patch_signal
 from hbp_nrp_cleserver.server.SimulationServer import TimeoutType
 from hbp_nrp_commons.sim_config.SimConfig import SimConfig, SimulationType
+from hbp_nrp_commons.SpanTracer import SpanTracer
+from hbp_nrp_commons.workspace.Settings import Settings
 
 __author__ = "Lorenzo Vannucci, Stefan Deser, Daniel Peppicelli, Hossain Mahmud"
 
@@ -58,11 +61,14 @@ logger = logging.getLogger('hbp_nrp_cleserver')
 class ROSCLESimulationFactory(object):
     """
     The purpose of this class is to start simulation thread and to
-    provide a ROS service for that. Only one simulation can run at a time.
+    provide a ROS service for that. Only one simulation can run at a time, unless the simulations
+    are handed to a pool of worker processes.
     """
-    def __init__(self):
+    def __init__(self, pool=None):
         """
         Create a CLE simulation factory.
+
+        :param pool: an optional, started CLEWorkerPool running the simulations
         """
         logger.debug("Creating new CLE server.")
         self.running_simulation_thread = None
@@ -70,6 +76,7 @@ class ROSCLESimulationFactory(object):
         self.simulation_terminate_event = threading.Event()
 
         self.__create_simulation_service = None
+        self.__pool = pool
 
     def initialize(self):
         """
@@ -92,7 +99,9 @@ class ROSCLESimulationFactory(object):
         """
         logger.exception(e)
         logger.info("Giving up the simulation server")
-        self.__create_simulation_service.shutdown()
+        # the factories of the pool workers do not offer the service
+        if self.__create_simulation_service is not None:
+            self.__create_simulation_service.shutdown()
 
     @staticmethod
     def run():
@@ -119,9 +128,18 @@ class ROSCLESimulationFactory(object):
         """
         Handler for the ROS service to retrieve information whether there is a simulation running
 
+        In pool mode, the status of the pool is published as a ROS parameter.
+
         :param request: The ROS Service message
-        :return: True, if a simulation is running, otherwise False
+        :return: True, if a simulation is running, otherwise False. In pool mode, True if all the
+                 workers run or initialize a simulation, i.e. a new simulation would be queued
         """
+        if self.__pool is not None:
+            status = self.__pool.status()
+            rospy.set_param(PARAM_POOL_STATUS, status)
+            logger.debug("CLE worker pool status: %s", status)
+            return self.__pool.is_full()
+
         return (self.running_simulation_thread is not None and
                 self.running_simulation_thread.is_alive())
 
@@ -135,6 +153,9 @@ class ROSCLESimulationFactory(object):
         """
         logger.info("Create new simulation request")
 
+        if self.__pool is not None:
+            return self.__pool.create_new_simulation(service_request)
+
         if self.__is_running_simulation_terminating:
             logger.info("Waiting for previous simulation to terminate")
             self.simulation_terminate_event.wait()
@@ -158,6 +179,11 @@ class ROSCLESimulationFactory(object):
         experiment_id = service_request.experiment_id
         brain_processes = service_request.brain_processes
 
+        # the spans of the launch are recorded under the simulation id, the only context shared
+        # with the backend, which returns them together with its own
+        SpanTracer.reset(sim_id)
+        SpanTracer.set_default_trace(sim_id)
+
         sim_config = SimConfig(exc_config_file,
                                sim_id=sim_id,
                                gzserver_host=gzserver_host,
@@ -202,7 +228,8 @@ class ROSCLESimulationFactory(object):
 
             try:
                 logger.info("Starting the experiment closed loop engine.")
-                launcher.initialize(self.except_hook)
+                with SpanTracer.span('cle.initialize', assembly=assembly.__name__):
+                    launcher.initialize(self.except_hook)
             # pylint: disable=broad-except
             except Exception:
                 launcher.shutdown()
@@ -213,6 +240,8 @@ class ROSCLESimulationFactory(object):
             logger.exception("Initialization failed")
             print sys.exc_info()
             raise
+        finally:
+            SpanTracer.flush(sim_id)
 
         logger.info("Initialization done")
 
@@ -355,6 +384,9 @@ def main():
                         dest='pycharm',
                         help='debug with pyCharm. IP adress and port are needed.',
                         nargs='+')
+    parser.add_argument('--pool-size', dest='pool_size', type=int,
+                        default=Settings.cle_pool_size,
+                        help='run the simulations in a pool of that many warm worker processes')
     args = parser.parse_args()
 
     if args.vsdebug:  # pragma: no cover
@@ -371,10 +403,20 @@ def main():
                         stderrToServer=True,
                         suspend=False)
 
-    server = ROSCLESimulationFactory()
+    pool = None
+    if args.pool_size > 0:
+        # the workers are forked before the ROS node is initialized and log to the same file
+        set_up_logger(args.logfile, args.verbose)
+        pool = CLEWorkerPool(args.pool_size, ROSCLESimulationFactory)
+        pool.start()
+
+    server = ROSCLESimulationFactory(pool)
     server.initialize()
-    set_up_logger(args.logfile, args.verbose)
+    if pool is None:
+        set_up_logger(args.logfile, args.verbose)
     server.run()
+    if pool is not None:
+        pool.shutdown()
     logger.info("CLE Server exiting.")
 
 
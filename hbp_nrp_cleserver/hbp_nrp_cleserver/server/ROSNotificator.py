@@ -26,14 +26,18 @@ This module implements a ROS Notificator interface for status/error messages.
 """
 
 import contextlib
+import collections
 import json
 import logging
+import threading
+import time
 import rospy
 
 from std_msgs.msg import String
 from cle_ros_msgs.msg import CLEError
 
 from hbp_nrp_cleserver.server import ROS_CLE_NODE_NAME, TOPIC_STATUS, TOPIC_CLE_ERROR
+from hbp_nrp_commons.workspace.Settings import Settings
 
 logger = logging.getLogger(__name__)
 
@@ -41,9 +45,19 @@ logger = logging.getLogger(__name__)
 class ROSNotificator(object):
     """
     This class encapsulates publishing of state/errors/task status to the frontend/clients.
+
+    Only the latest progress of a task and the latest simulation state matter to the clients, so
+    these status messages are coalesced: each kind is published at most max_rate times per
+    second, and a message superseded while it waits for its turn is merged into the newer one.
+    The start and the end of a task, the other status messages and the errors are published
+    right away, after the coalesced messages still waiting, to keep their order.
     """
 
-    def __init__(self):
+    def __init__(self, max_rate=None):
+        """
+        :param max_rate: the maximum number of status messages of a kind published per second,
+                         defaults to Settings.notification_max_rate, 0 disables coalescing
+        """
 
         # ROS allows multiple calls to init_node, as long as the arguments are the same.
         # Allow multiple distributed processes to spawn nodes of the same name.
@@ -60,8 +74,25 @@ class ROSNotificator(object):
         self.__current_subtask_count = 0
         self.__current_subtask_index = 0
 
+        # coalescing of the status messages
+        self.__max_rate = Settings.notification_max_rate if max_rate is None else max_rate
+        self.__condition = threading.Condition()
+        self.__pending = collections.OrderedDict()
+        self.__last_published = {}
+        self.__flusher = None
+        self.__counters = {'published': 0, 'merged': 0, 'dropped': 0}
+
         logger.info('ROS notificator initialized')
 
+    @property
+    def counters(self):
+        """
+        Returns the number of status messages published, merged into a newer message and
+        dropped because the notificator was shut down
+        """
+        with self.__condition:
+            return dict(self.__counters)
+
     def shutdown(self):
         """
         Shutdown all publishers, notification will no longer function after called.
@@ -74,21 +105,93 @@ class ROSNotificator(object):
         self.__ros_cle_error_pub = None
 
         logger.info('Unregister status topic')
-        self.__ros_status_pub.unregister()
-        self.__ros_status_pub = None
+        with self.__condition:
+            self.__flush_pending()
+            self.__ros_status_pub.unregister()
+            self.__ros_status_pub = None
+            # stops the flusher
+            self.__condition.notify_all()
+        logger.info('Status messages published: %(published)d, merged: %(merged)d, '
+                    'dropped: %(dropped)d', self.counters)
 
-    def publish_state(self, state_msg):
+    def publish_state(self, state_msg, coalesce_key=None):
         """
         Publishes a state message
 
         :param state_msgs A string of formatted JSON to publish.
+        :param coalesce_key: The kind of the message, only the latest message of a kind is
+                             published when they come faster than the maximum rate. None to
+                             publish the message right away.
         """
-        if self.__ros_status_pub is None:
-            logger.error('Attempting to publish state after shutdown!')
-            return
+        with self.__condition:
+            if self.__ros_status_pub is None:
+                self.__counters['dropped'] += 1
+                logger.error('Attempting to publish state after shutdown!')
+                return
 
+            if coalesce_key is None or not self.__max_rate:
+                self.__flush_pending()
+                self.__publish(state_msg)
+                return
+
+            if coalesce_key in self.__pending:
+                self.__pending[coalesce_key] = state_msg
+                self.__counters['merged'] += 1
+            elif time.time() >= self.__due(coalesce_key):
+                self.__publish(state_msg, coalesce_key)
+            else:
+                self.__pending[coalesce_key] = state_msg
+                self.__start_flusher()
+                self.__condition.notify_all()
+
+    def __due(self, coalesce_key):
+        """
+        Gets the earliest time the next message of a kind may be published
+        """
+        return self.__last_published.get(coalesce_key, 0) + 1. / self.__max_rate
+
+    def __publish(self, state_msg, coalesce_key=None):
+        """
+        Publishes a state message, the condition must be held
+        """
+        if coalesce_key is not None:
+            self.__last_published[coalesce_key] = time.time()
+        self.__counters['published'] += 1
         self.__ros_status_pub.publish(state_msg)
 
+    def __flush_pending(self):
+        """
+        Publishes the coalesced messages waiting for their turn, the condition must be held
+        """
+        while self.__pending:
+            coalesce_key, state_msg = self.__pending.popitem(last=False)
+            self.__publish(state_msg, coalesce_key)
+
+    def __start_flusher(self):
+        """
+        Starts the thread publishing the coalesced messages when they are due
+        """
+        if self.__flusher is None:
+            self.__flusher = threading.Thread(target=self.__flush, name='ROSNotificator')
+            self.__flusher.daemon = True
+            self.__flusher.start()
+
+    def __flush(self):
+        """
+        Publishes the coalesced messages when they are due, until shutdown
+        """
+        with self.__condition:
+            while self.__ros_status_pub is not None:
+                if not self.__pending:
+                    self.__condition.wait()
+                    continue
+                coalesce_key = min(self.__pending, key=self.__due)
+                remaining = self.__due(coalesce_key) - time.time()
+                if remaining > 0:
+                    self.__condition.wait(remaining)
+                    continue
+                self.__publish(self.__pending.pop(coalesce_key), coalesce_key)
+
     def publish_error(self, error_msg):
         """
         Publishes an error message
@@ -96,6 +199,8 @@ class ROSNotificator(object):
         :param error_msg and cle_ros_msgs.CLEError message to publish.
         """
         if self.__ros_cle_error_pub is None:
+            with self.__condition:
+                self.__counters['dropped'] += 1
             logger.error('Attempting to publish error after shutdown!')
             return
 
@@ -137,17 +242,20 @@ class ROSNotificator(object):
                 should be updated (usually yes).
         :param: block_ui: Indicate that the client should block any user interaction.
         """
-        if self.__current_task is None:
-            logger.warn("Can't update a non existing task.")
-            return
-        if update_progress:
-            self.__current_subtask_index += 1
-        message = {'progress': {'task': self.__current_task,
-                                'subtask': new_subtask_name,
-                                'number_of_subtasks': self.__current_subtask_count,
-                                'subtask_index': self.__current_subtask_index,
-                                'block_ui': block_ui}}
-        self.publish_state(json.dumps(message))
+        # the stages of the simulation startup update the task from several threads, the
+        # progress is counted and published in one go to keep the messages in order
+        with self.__condition:
+            if self.__current_task is None:
+                logger.warn("Can't update a non existing task.")
+                return
+            if update_progress:
+                self.__current_subtask_index += 1
+            message = {'progress': {'task': self.__current_task,
+                                    'subtask': new_subtask_name,
+                                    'number_of_subtasks': self.__current_subtask_count,
+                                    'subtask_index': self.__current_subtask_index,
+                                    'block_ui': block_ui}}
+            self.publish_state(json.dumps(message), coalesce_key='progress')
 
     def finish_task(self):
         """
@@ -0,0 +1,200 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Registers and shuts down the ROS services of a simulation server concurrently
+"""
+
+import sys
+import time
+import logging
+import threading
+import collections
+import rospy
+
+from hbp_nrp_commons.SpanTracer import SpanTracer
+
+logger = logging.getLogger(__name__)
+
+
+class ROSServiceRegistry(object):
+    """
+    A table of the ROS services offered by a simulation server.
+
+    Every registration and unregistration is a round trip to the ROS master, so they are all
+    issued concurrently. The registry also counts the service calls in progress: shutting down
+    waits for them to complete instead of for a fixed delay, then removes all the services.
+    The duration of both phases is logged, traced and available in timings.
+    """
+
+    # maximum time to wait for the service calls in progress on shutdown, in seconds
+    CALLS_TIMEOUT = 10
+
+    def __init__(self):
+        self.__services = collections.OrderedDict()
+        self.__calls = threading.Condition()
+        self.__active_calls = 0
+        self.__local = threading.local()
+        self.__timings = {}
+
+    @property
+    def names(self):
+        """
+        Returns the names of the registered services, in registration order
+        """
+        return list(self.__services)
+
+    @property
+    def timings(self):
+        """
+        Returns the duration, in seconds, of the last registration and shutdown
+        """
+        return dict(self.__timings)
+
+    def __contains__(self, name):
+        return name in self.__services
+
+    def __getitem__(self, name):
+        return self.__services[name]
+
+    def register(self, definitions):
+        """
+        Registers services with the ROS master, concurrently. A service already registered under
+        the same name is shut down first.
+
+        :param definitions: a list of (service name, service class, handler) tuples
+        :raise: the error of the first service which could not be registered
+        """
+        start = time.time()
+        with SpanTracer.span('ros.register_services', count=len(definitions)):
+            replaced = [name for name, _, _ in definitions if name in self.__services]
+            if replaced:
+                self.__shutdown_services(replaced)
+
+            def register(definition):
+                """
+                Registers one service
+                """
+                name, service_class, handler = definition
+                return name, rospy.Service(name, service_class, self.__track(handler))
+
+            results, errors = self.__concurrently(register, definitions)
+
+        for index, result in enumerate(results):
+            if index not in errors:
+                self.__services[result[0]] = result[1]
+        self.__timings['register'] = time.time() - start
+        logger.info("Registered %d ROS services in %.3fs", len(definitions) - len(errors),
+                    self.__timings['register'])
+
+        if errors:
+            exc_info = errors[min(errors)]
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+    def shutdown(self, calls_timeout=CALLS_TIMEOUT):
+        """
+        Waits for the service calls in progress, then shuts down all the services concurrently.
+        Errors are logged, since shutdown continues anyway.
+
+        :param calls_timeout: the maximum time to wait for the calls in progress, in seconds
+        """
+        start = time.time()
+        with SpanTracer.span('ros.shutdown_services', count=len(self.__services)):
+            deadline = start + calls_timeout
+            # a service handler may shut the server down, it must not wait for itself
+            own_calls = getattr(self.__local, 'calls', 0)
+            with self.__calls:
+                while self.__active_calls > own_calls and time.time() < deadline:
+                    self.__calls.wait(deadline - time.time())
+                if self.__active_calls > own_calls:
+                    logger.warning("Shutting down the ROS services while %d calls are in progress",
+                                   self.__active_calls - own_calls)
+            self.__shutdown_services(list(self.__services))
+        self.__timings['shutdown'] = time.time() - start
+        logger.info("Shut down the ROS services in %.3fs", self.__timings['shutdown'])
+
+    def __shutdown_services(self, names):
+        """
+        Shuts down and forgets the given services, concurrently
+        """
+        services = [(name, self.__services.pop(name)) for name in names]
+
+        def shutdown(item):
+            """
+            Shuts down one service
+            """
+            logger.debug("Shutting down %s service", item[0])
+            item[1].shutdown()
+
+        _, errors = self.__concurrently(shutdown, services)
+        for index, exc_info in sorted(errors.iteritems()):
+            logger.error("Could not shut down the %s service", names[index], exc_info=exc_info)
+
+    def __track(self, handler):
+        """
+        Wraps a service handler to count the calls in progress
+        """
+        def tracked(*args, **kwargs):
+            """
+            Calls the handler while counting it as in progress
+            """
+            with self.__calls:
+                self.__active_calls += 1
+            self.__local.calls = getattr(self.__local, 'calls', 0) + 1
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                self.__local.calls -= 1
+                with self.__calls:
+                    self.__active_calls -= 1
+                    self.__calls.notify_all()
+        return tracked
+
+    @staticmethod
+    def __concurrently(function, items):
+        """
+        Calls a function on every item, each in its own thread, and waits for all of them
+
+        :return: the results in the order of the items, None for the failed calls, and the
+                 exc_info tuples of the failed calls by item index
+        """
+        results = [None] * len(items)
+        errors = {}
+
+        def run(index, item):
+            """
+            Stores the result of one call
+            """
+            # pylint: disable=broad-except
+            try:
+                results[index] = function(item)
+            except Exception:
+                errors[index] = sys.exc_info()
+
+        threads = [threading.Thread(target=run, args=(index, item))
+                   for index, item in enumerate(items)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
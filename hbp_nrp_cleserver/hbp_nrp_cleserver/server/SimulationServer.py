@@ -93,6 +93,8 @@ class SimulationServer(object):
 
         self.__timer = Timer.Timer(SimulationServer.STATUS_UPDATE_INTERVAL,
                                    self.publish_state_update)
+        # the simulation is stopped on timeout off the timer, since it shuts everything down
+        self.__timeout_runner = Timer.DetachedRunner('SimulationTimeout')
         self.__timeout = timeout
         self.__timeout_type = (TimeoutType.SIMULATION
                                if timeout_type == TimeoutType.SIMULATION
@@ -198,7 +200,7 @@ class SimulationServer(object):
             message['state'] = self.__lifecycle.state
             message['timeout'] = self.__get_remaining()
             logger.debug(json.dumps(message))
-            self._notificator.publish_state(json.dumps(message))
+            self._notificator.publish_state(json.dumps(message), coalesce_key='state')
         # pylint: disable=broad-except
         except Exception as e:
             logger.exception(e)
@@ -218,7 +220,7 @@ class SimulationServer(object):
                     .total_seconds()
 
             if remaining < 0:
-                self.__lifecycle.stopped()
+                self.__timeout_runner.run(self.__lifecycle.stopped)
             return max(0, int(remaining))
         else:
             return 0
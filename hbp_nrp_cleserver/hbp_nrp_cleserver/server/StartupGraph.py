@@ -0,0 +1,224 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Runs the stages of the simulation startup concurrently, according to their dependencies
+"""
+
+import sys
+import time
+import logging
+import threading
+import collections
+
+from hbp_nrp_commons.SpanTracer import SpanTracer
+
+logger = logging.getLogger(__name__)
+
+
+class StartupCancelledException(Exception):
+    """
+    Raised by the stages still running when another stage of the startup has failed
+    """
+    pass
+
+
+class StartupGraph(object):
+    """
+    A graph of startup stages. Every stage runs in its own thread as soon as the stages it
+    depends on are done, so independent stages, e.g. loading the brain and spawning the world,
+    overlap and the startup takes as long as its longest chain of stages.
+
+    Stages which must not leave the thread running the graph, e.g. because they set up a
+    neural simulator that is only safe to drive from the main thread, run on that thread.
+    Meanwhile the other stages keep going: a stage completing in its thread starts the stages
+    which were waiting for it.
+
+    When a stage fails, the stages which have not started yet are skipped and the running ones
+    are expected to stop at their next call to check_cancelled. The graph then waits for them
+    and raises the exception of the failed stage.
+    """
+
+    def __init__(self, stage_done_callback=None):
+        """
+        :param stage_done_callback: called with the name and the duration, in seconds, of every
+                                    stage which completed successfully
+        """
+        self.__stages = collections.OrderedDict()
+        self.__stage_done_callback = stage_done_callback
+        self.__condition = threading.Condition()
+        self.__cancelled = threading.Event()
+        self.__results = {}
+        self.__timings = {}
+        self.__running = set()
+        self.__pending = []
+        self.__failure = None
+
+    @property
+    def timings(self):
+        """
+        Returns a copy of the duration, in seconds, of the completed stages
+        """
+        with self.__condition:
+            return dict(self.__timings)
+
+    @property
+    def cancelled(self):
+        """
+        Whether a stage of the startup has failed
+        """
+        return self.__cancelled.is_set()
+
+    def check_cancelled(self):
+        """
+        Raises if another stage has failed, to be called by long running stages
+
+        :raise StartupCancelledException: if the startup is cancelled
+        """
+        if self.__cancelled.is_set():
+            raise StartupCancelledException("The startup has been cancelled")
+
+    def add(self, name, function, depends_on=(), on_caller_thread=False):
+        """
+        Adds a stage to the graph
+
+        :param name: the unique name of the stage
+        :param function: the function running the stage, called with the results of the stages
+                         it depends on, in the order of depends_on
+        :param depends_on: the names of the stages which must be done before this one starts
+        :param on_caller_thread: whether the stage runs on the thread calling run rather than in
+                                 a thread of its own
+        """
+        if name in self.__stages:
+            raise ValueError("Duplicate startup stage: {0}".format(name))
+        for dependency in depends_on:
+            if dependency not in self.__stages:
+                # stages are added after their dependencies, which also rules out cycles
+                raise ValueError("Startup stage {0} depends on the unknown stage {1}"
+                                 .format(name, dependency))
+        self.__stages[name] = (function, tuple(depends_on), on_caller_thread)
+
+    def run(self):
+        """
+        Runs all the stages and waits for them
+
+        :return: a dictionary of the results of the stages, by name
+        :raise: the exception of the first stage which failed
+        """
+        with self.__condition:
+            self.__pending = list(self.__stages)
+        while True:
+            inline = None
+            with self.__condition:
+                if self.__failure is None:
+                    self.__start_ready()
+                    ready = [name for name in self.__pending
+                             if self.__stages[name][2] and self.__is_ready(name)]
+                    if ready:
+                        name = ready[0]
+                        self.__pending.remove(name)
+                        self.__running.add(name)
+                        inline = (name, self.__stages[name][0], self.__arguments(name))
+                if inline is None:
+                    if not self.__running:
+                        break
+                    self.__condition.wait()
+                    continue
+            # the condition is released while the stage runs on this thread
+            self.__run_stage(*inline)
+
+        if self.__failure is not None:
+            skipped = ', '.join(self.__pending)
+            if skipped:
+                logger.info("Skipped the startup stages %s", skipped)
+            # re-raise with the traceback of the failed stage
+            raise self.__failure[0], self.__failure[1], self.__failure[2]
+        return dict(self.__results)
+
+    def __is_ready(self, name):
+        """
+        Checks whether all the dependencies of a stage are done
+        """
+        return all(dependency in self.__results for dependency in self.__stages[name][1])
+
+    def __arguments(self, name):
+        """
+        Gets the results of the dependencies of a stage, in the order of its dependencies
+        """
+        return [self.__results[dependency] for dependency in self.__stages[name][1]]
+
+    def __start_ready(self):
+        """
+        Starts the threaded stages whose dependencies are done, the condition must be held
+        """
+        for name in [n for n in self.__pending if not self.__stages[n][2] and self.__is_ready(n)]:
+            self.__pending.remove(name)
+            self.__start(name)
+
+    def __start(self, name):
+        """
+        Starts a stage in its own thread, the condition must be held
+        """
+        function = self.__stages[name][0]
+        self.__running.add(name)
+        thread = threading.Thread(target=self.__run_stage,
+                                  args=(name, function, self.__arguments(name)),
+                                  name='startup-' + name)
+        thread.daemon = True
+        thread.start()
+
+    def __run_stage(self, name, function, arguments):
+        """
+        Runs a stage and records its result or its failure
+        """
+        start = time.time()
+        # pylint: disable=broad-except
+        try:
+            with SpanTracer.span('startup.' + name):
+                result = function(*arguments)
+        except BaseException:
+            exc_info = sys.exc_info()
+            with self.__condition:
+                if self.__failure is None:
+                    logger.error("Startup stage %s failed after %.3fs", name, time.time() - start)
+                    self.__failure = exc_info
+                    self.__cancelled.set()
+                self.__running.discard(name)
+                self.__condition.notify_all()
+            return
+
+        elapsed = time.time() - start
+        logger.info("Startup stage %s done in %.3fs", name, elapsed)
+        if self.__stage_done_callback is not None and not self.__cancelled.is_set():
+            try:
+                self.__stage_done_callback(name, elapsed)
+            except Exception:
+                logger.exception("Could not report the timing of the startup stage %s", name)
+        with self.__condition:
+            self.__results[name] = result
+            self.__timings[name] = elapsed
+            self.__running.discard(name)
+            # the thread calling run may be busy with a stage of its own
+            if self.__failure is None:
+                self.__start_ready()
+            self.__condition.notify_all()
@@ -0,0 +1,98 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Compiles the transfer functions edited at runtime in restricted mode
+"""
+
+from RestrictedPython.RCompile import RModule, RestrictionMutator
+
+
+class FileRestrictionMutator(RestrictionMutator):
+    """
+    Custom RestrictionMutator
+    ie: accepts accessing to private attribute '__file__'
+    """
+    ALLOWED_ATTRS = set(['__file__'])
+
+    def checkAttrName(self, node):
+        if node.attrname in self.ALLOWED_ATTRS:
+            return
+        return RestrictionMutator.checkAttrName(self, node)
+
+
+def compile_transfer_function(source):
+    """
+    Compiles the source of a transfer function with customized rules
+
+    :param source: the python source of the transfer function
+    :return: the compiled code object
+    """
+    gen = RModule(source, '<string>')
+    gen.rm = FileRestrictionMutator()
+    gen.compile()
+    return gen.getCode()
+
+
+class TransferFunctionCompiler(object):
+    """
+    Compiles sets of transfer functions in the calling process. The compilation is not spread
+    over worker processes: the compiler is used from ROS service handler threads of a process
+    which has loaded the brain simulator, where forking is unsafe.
+    """
+
+    def __init__(self, compiler=compile_transfer_function):
+        """
+        :param compiler: a function compiling a source into a code object
+        """
+        self.__compiler = compiler
+
+    def compile(self, source):
+        """
+        Compiles one source
+
+        :param source: the python source of the transfer function
+        :return: the compiled code object
+        :raise: the compilation error
+        """
+        return self.__compiler(source)
+
+    def compile_all(self, sources):
+        """
+        Compiles a list of sources, every one of them even if some fail
+
+        :param sources: the python sources of the transfer functions
+        :return: a list of (code, error) tuples in the order of the sources, code being None
+                 when the compilation failed with error
+        """
+        return [self.__compile_one(source) for source in sources]
+
+    def __compile_one(self, source):
+        """
+        Compiles one source, returning the error instead of raising it
+        """
+        # pylint: disable=broad-except
+        try:
+            return self.__compiler(source), None
+        except Exception as e:
+            return None, e
@@ -40,6 +40,7 @@ TOPIC_LIFECYCLE = lambda sim_id: '/%s/%d/lifecycle' % (ROS_CLE_NODE_NAME, sim_id
 TOPIC_CLE_ERROR = '/%s/cle_error' % ROS_CLE_NODE_NAME
 SERVICE_CREATE_NEW_SIMULATION = '/%s/create_new_simulation' % ROS_CLE_NODE_NAME
 SERVICE_IS_SIMULATION_RUNNING = '/%s/is_simulation_running' % ROS_CLE_NODE_NAME
+PARAM_POOL_STATUS = '/%s/pool_status' % ROS_CLE_NODE_NAME
 SERVICE_SIM_START_ID = lambda sim_id: '/%s/%d/start' % (ROS_CLE_NODE_NAME, sim_id)
 SERVICE_SIM_STOP_ID = lambda sim_id: '/%s/%d/stop' % (ROS_CLE_NODE_NAME, sim_id)
 SERVICE_SIM_PAUSE_ID = lambda sim_id: '/%s/%d/pause' % (ROS_CLE_NODE_NAME, sim_id)
@@ -57,6 +58,8 @@ SERVICE_ACTIVATE_TRANSFER_FUNCTION = lambda sim_id: \
     '/%s/%d/activate_transfer_function' % (ROS_CLE_NODE_NAME, sim_id)
 SERVICE_DELETE_TRANSFER_FUNCTION = lambda sim_id: \
     '/%s/%d/delete_transfer_function' % (ROS_CLE_NODE_NAME, sim_id)
+SERVICE_APPLY_TRANSFER_FUNCTIONS = lambda sim_id: \
+    '/%s/%d/apply_transfer_functions' % (ROS_CLE_NODE_NAME, sim_id)
 
 SERVICE_GET_BRAIN = lambda sim_id: '/%s/%d/get_brain' % (ROS_CLE_NODE_NAME, sim_id)
 SERVICE_SET_BRAIN = lambda sim_id: '/%s/%d/set_brain' % (ROS_CLE_NODE_NAME, sim_id)
@@ -0,0 +1,113 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Tests for the cache of the generated and compiled transfer functions
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from mock import patch, MagicMock
+
+from hbp_nrp_cleserver.bibi_config import TransferFunctionCache as tf_cache
+from hbp_nrp_cleserver.bibi_config.TransferFunctionCache import _TransferFunctionCache
+
+_base_path = 'hbp_nrp_cleserver.bibi_config.TransferFunctionCache.'
+
+
+class TestTransferFunctionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = _TransferFunctionCache()
+
+    def embedded_tf(self, code):
+        tf = MagicMock(src=None)
+        tf.orderedContent.return_value = [MagicMock(value=code)]
+        return tf
+
+    def test_generate_embedded(self):
+        with patch(_base_path + 'generate_tf', wraps=tf_cache.generate_tf) as generate:
+            code, name = self.cache.generate(self.embedded_tf(u'def tf1():\n    return 1\n'))
+            self.assertEqual(name, 'tf1')
+            self.assertEqual(self.cache.generate(self.embedded_tf(u'def tf1():\n    return 1\n')),
+                             (code, name))
+            self.assertEqual(generate.call_count, 1)
+
+            self.assertEqual(self.cache.generate(self.embedded_tf(u'def tf2():\n    pass\n'))[1],
+                             'tf2')
+            self.assertEqual(generate.call_count, 2)
+
+        stats = self.cache.stats
+        self.assertEqual((stats['generated'], stats['generation_hits']), (2, 1))
+
+    def test_generate_external(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, 'tf.py'), 'w') as f:
+            f.write('def tf1():\n    pass\n')
+
+        tf = MagicMock(src='tf.py')
+        embedded = [MagicMock(value=u'def ignored():\n    pass\n')]
+        tf.orderedContent.return_value = embedded
+
+        with patch(_base_path + 'generate_tf', return_value=u'def tf1():\n    pass\n') as generate:
+            self.cache.generate(tf, directory)
+            embedded.append(MagicMock())
+            self.assertEqual(self.cache.generate(tf, directory)[1], 'tf1')
+            self.assertEqual(generate.call_count, 1)
+            # the embedded code is dropped on a hit too
+            self.assertEqual(embedded, [])
+
+            # modifying the file invalidates the cached code
+            with open(os.path.join(directory, 'tf.py'), 'w') as f:
+                f.write('def tf2():\n    pass\n')
+            self.cache.generate(tf, directory)
+            self.assertEqual(generate.call_count, 2)
+
+    def test_compile(self):
+        compiler = MagicMock(side_effect=compile, __module__='builtins', __name__='compile')
+        first = self.cache.compile('x = 1\n', compiler)
+        self.assertIs(self.cache.compile('x = 1\n', compiler), first)
+        self.assertEqual(compiler.call_count, 1)
+
+        self.cache.compile('x = 2\n', compiler)
+        self.assertEqual(compiler.call_count, 2)
+
+        # errors are raised on every call
+        self.assertRaises(SyntaxError, self.cache.compile, 'def (:\n', compiler)
+        self.assertRaises(SyntaxError, self.cache.compile, 'def (:\n', compiler)
+        self.assertEqual(compiler.call_count, 4)
+
+    def test_least_recently_used_are_evicted(self):
+        cache = _TransferFunctionCache(max_entries=1)
+        compiler = MagicMock(side_effect=compile, __module__='builtins', __name__='compile')
+        cache.compile('x = 1\n', compiler)
+        cache.compile('x = 2\n', compiler)
+        cache.compile('x = 1\n', compiler)
+        self.assertEqual(compiler.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,9 +26,12 @@ Unit tests for the simulation csv logger
 """
 __author__ = 'Manos Angelidis'
 
+import gzip
+import threading
 import unittest
+from StringIO import StringIO
 from mock import patch, MagicMock, Mock
-from hbp_nrp_cleserver.server.CSVLogger import CSVLogger
+from hbp_nrp_cleserver.server.CSVLogger import CSVLogger, CSVFlushPolicy
 
 
 class MockKillable(object):
@@ -100,36 +103,162 @@ class TestSimulationCSVLogger(unittest.TestCase):
         csv_logger.shutdown()
         self.assertTrue(to_be_killed_thread.join.called)
 
-    @patch('__builtin__.open')
-    @patch('os.makedirs')
-    @patch('os.path.exists')
-    @patch("hbp_nrp_cleserver.server.CSVLogger.SimUtil")
-    @patch('hbp_nrp_cleserver.server.CSVLogger.threading.Thread')
     @patch('hbp_nrp_cleserver.server.CSVLogger.tf_framework')
     @patch('hbp_nrp_cleserver.server.CSVLogger.get_date_and_time_string')
-    def test_CSV_logger_log(self, mock_get_date_and_time_string, mock_tf_framework,
-                            mock_killable, mock_sim_util, mock_os_exists, mock_os_makedirs,
-                            mock_open):
-        time = 'fakeTime'
-        mock_get_date_and_time_string.return_value = time
+    def test_CSV_logger_log(self, mock_get_date_and_time_string, mock_tf_framework):
+        mock_get_date_and_time_string.return_value = 'fakeTime'
         mock_tf_framework.dump_csv_recorder_to_files = MockTFFramework().dump_csv_recorder_to_files
-        mock_killable = MockKillable()
-        mock_os_exists.return_value = False
         self.mock_recorded.return_value = CSVRecordedMock("bar1", ["bar1 header\n"], ['data1', 'data2\n'])
         csv_logger = CSVLogger(self.mock_assembly, 5, 'testFolder')
-        self.mock_storageClient_instance.create_or_update.side_effect = None
         self.mock_storageClient_instance.create_folder.return_value = {"uuid": "mockUUID"}
-        csv_logger.initialize()
+
+        # nothing is uploaded before the upload thread runs
         csv_logger._log_csv()
-        self.mock_storageClient_instance.create_or_update.assert_called_once()
+        self.mock_storageClient_instance.create_or_update.assert_not_called()
+
+        self.assertTrue(csv_logger._upload_pending())
         self.mock_storageClient_instance.create_folder.assert_called_once_with('token', 'expId', 'testFolder')
-        mock_sim_util.find_file_in_paths.return_value = False
+        self.mock_storageClient_instance.create_or_update.assert_called_once_with(
+            'token', 'mockUUID', 'bar1', 'bar1 header\ndata1data2\n', 'text/plain', append=False)
+
+        # the content of several collections is coalesced, the headers and the folder are
+        # only written once
         csv_logger._log_csv()
+        csv_logger._log_csv()
+        self.assertTrue(csv_logger._upload_pending())
         self.mock_storageClient_instance.create_or_update.assert_called_with(
-            'token', 'mockUUID', 'bar1', 'bar1 header\ndata1data2\n', 'text/plain', append=False)
-        self.mock_storageClient_instance.create_folder.assert_called_with('token', 'expId', 'testFolder')
-        mock_sim_util.find_file_in_paths.assert_called_once()
-        mock_sim_util.find_file_in_paths.return_value = True
+            'token', 'mockUUID', 'bar1', 'data1data2\ndata1data2\n', 'text/plain', append=True)
+        self.assertEqual(self.mock_storageClient_instance.create_or_update.call_count, 2)
+        self.mock_storageClient_instance.create_folder.assert_called_once()
+
+        # a new folder is created after a reset
+        with patch('hbp_nrp_cleserver.server.CSVLogger.threading.Thread'):
+            csv_logger.initialize()
+            csv_logger.reset()
         csv_logger._log_csv()
+        csv_logger._upload_pending()
+        self.assertEqual(self.mock_storageClient_instance.create_folder.call_count, 2)
         self.mock_storageClient_instance.create_or_update.assert_called_with(
-            'token', 'mockUUID', 'bar1', 'data1data2\n', 'text/plain', append=True)
+            'token', 'mockUUID', 'bar1', 'bar1 header\ndata1data2\n', 'text/plain', append=False)
+
+    @patch('hbp_nrp_cleserver.server.CSVLogger.tf_framework')
+    def test_CSV_logger_upload_failure(self, mock_tf_framework):
+        mock_tf_framework.dump_csv_recorder_to_files.return_value = [MagicMock(), MagicMock()]
+        self.mock_recorded.side_effect = [CSVRecordedMock("bar1", ["h1\n"], ['a\n']),
+                                          CSVRecordedMock("bar2", ["h2\n"], ['b\n']),
+                                          CSVRecordedMock("bar1", ["h1\n"], ['c\n']),
+                                          CSVRecordedMock("bar2", ["h2\n"], ['d\n'])]
+        self.mock_storageClient_instance.create_folder.return_value = {"uuid": "mockUUID"}
+        self.mock_storageClient_instance.create_or_update.side_effect = [None, Exception()]
+        csv_logger = CSVLogger(self.mock_assembly, 5, 'testFolder')
+
+        csv_logger._log_csv()
+        self.assertFalse(csv_logger._upload_pending())
+
+        # the content which could not be uploaded is kept, in order
+        csv_logger._log_csv()
+        self.mock_storageClient_instance.create_or_update.side_effect = None
+        self.assertTrue(csv_logger._upload_pending())
+        self.mock_storageClient_instance.create_or_update.assert_any_call(
+            'token', 'mockUUID', 'bar2', 'h2\nb\nd\n', 'text/plain', append=False)
+        self.mock_storageClient_instance.create_or_update.assert_any_call(
+            'token', 'mockUUID', 'bar1', 'c\n', 'text/plain', append=True)
+
+    @patch('hbp_nrp_cleserver.server.CSVLogger.tf_framework')
+    def test_CSV_logger_backpressure(self, mock_tf_framework):
+        mock_tf_framework.dump_csv_recorder_to_files.return_value = [MagicMock()]
+        self.mock_recorded.return_value = CSVRecordedMock("bar1", [], ['0123456789'])
+        self.mock_storageClient_instance.create_folder.return_value = {"uuid": "mockUUID"}
+        csv_logger = CSVLogger(self.mock_assembly, 0.01, 'testFolder', max_pending_bytes=10)
+
+        csv_logger._log_csv()
+        collector = threading.Thread(target=csv_logger._log_csv)
+        collector.start()
+        collector.join(0.1)
+        # the buffer is full, the recorders are not dumped
+        self.assertTrue(collector.is_alive())
+        self.assertEqual(mock_tf_framework.dump_csv_recorder_to_files.call_count, 1)
+
+        csv_logger._upload_pending()
+        collector.join(1)
+        self.assertFalse(collector.is_alive())
+        self.assertEqual(mock_tf_framework.dump_csv_recorder_to_files.call_count, 2)
+
+    @patch('hbp_nrp_cleserver.server.CSVLogger.tf_framework')
+    def test_CSV_logger_flushes_on_shutdown(self, mock_tf_framework):
+        mock_tf_framework.dump_csv_recorder_to_files.return_value = [MagicMock()]
+        self.mock_recorded.return_value = CSVRecordedMock("bar1", ["h\n"], ['a\n'])
+        self.mock_storageClient_instance.create_folder.return_value = {"uuid": "mockUUID"}
+        csv_logger = CSVLogger(self.mock_assembly, 60, 'testFolder')
+
+        csv_logger.initialize()
+        csv_logger.shutdown()
+
+        self.assertIsNone(csv_logger._log_csv_thread)
+        self.assertIsNone(csv_logger._upload_thread)
+        uploaded = ''.join(c[0][3] for c in
+                           self.mock_storageClient_instance.create_or_update.call_args_list)
+        self.assertEqual(uploaded, 'h\n' + 'a\n' * mock_tf_framework.dump_csv_recorder_to_files.call_count)
+
+    @patch('hbp_nrp_cleserver.server.CSVLogger.tf_framework')
+    def test_CSV_logger_compress(self, mock_tf_framework):
+        mock_tf_framework.dump_csv_recorder_to_files.return_value = [MagicMock()]
+        self.mock_recorded.return_value = CSVRecordedMock("bar1", ["h\n"], ['a\n'])
+        self.mock_storageClient_instance.create_folder.return_value = {"uuid": "mockUUID"}
+        csv_logger = CSVLogger(self.mock_assembly, 5, 'testFolder', compress=True)
+
+        for _ in range(2):
+            csv_logger._log_csv()
+            csv_logger._upload_pending()
+
+        calls = self.mock_storageClient_instance.create_or_update.call_args_list
+        self.assertEqual([c[0][2] for c in calls], ['bar1.gz', 'bar1.gz'])
+        self.assertEqual([c[0][4] for c in calls], ['application/gzip', 'application/gzip'])
+        self.assertEqual([c[1]['append'] for c in calls], [False, True])
+        # the appended members form a single gzip file
+        content = ''.join(c[0][3] for c in calls)
+        self.assertEqual(gzip.GzipFile(fileobj=StringIO(content)).read(), 'h\na\na\n')
+
+    @patch('hbp_nrp_cleserver.server.CSVLogger.Settings')
+    def test_CSV_logger_compress_setting(self, mock_settings):
+        mock_settings.csv_compress = True
+        self.assertTrue(CSVLogger(self.mock_assembly)._compress)
+        self.assertFalse(CSVLogger(self.mock_assembly, compress=False)._compress)
+        mock_settings.csv_compress = False
+        self.assertFalse(CSVLogger(self.mock_assembly)._compress)
+
+
+class TestCSVFlushPolicy(unittest.TestCase):
+
+    def test_flush_on_interval(self):
+        policy = CSVFlushPolicy(max_interval=5, max_bytes=100, max_rows=10)
+        self.assertIsNone(policy.flush_delay(now=0))
+        policy.collected(10, 1, now=100)
+        policy.collected(10, 1, now=102)
+        self.assertEqual(policy.flush_delay(now=103), 2)
+        self.assertEqual(policy.flush_delay(now=106), 0)
+        policy.flushed()
+        self.assertIsNone(policy.flush_delay(now=106))
+
+    def test_flush_on_size(self):
+        policy = CSVFlushPolicy(max_interval=5, max_bytes=100, max_rows=10)
+        policy.collected(99, 1, now=0)
+        self.assertGreater(policy.flush_delay(now=0), 0)
+        policy.collected(1, 1, now=0)
+        self.assertEqual(policy.flush_delay(now=0), 0)
+
+        policy = CSVFlushPolicy(max_interval=5, max_bytes=100, max_rows=10)
+        policy.collected(10, 10, now=0)
+        self.assertEqual(policy.flush_delay(now=0), 0)
+
+    def test_idle_backoff(self):
+        policy = CSVFlushPolicy(max_interval=5, poll_interval=1)
+        self.assertEqual(policy.poll_interval(), 1)
+        policy.collected(0, 0)
+        self.assertEqual(policy.poll_interval(), 2)
+        policy.collected(0, 0)
+        policy.collected(0, 0)
+        self.assertEqual(policy.poll_interval(), 5)
+        # recording again
+        policy.collected(10, 1)
+        self.assertEqual(policy.poll_interval(), 1)
@@ -25,6 +25,9 @@
 This module contains the unit tests for the cle launcher
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 from mock import patch, MagicMock, Mock, mock_open, ANY
 from hbp_nrp_cle.robotsim.RobotManager import Robot
@@ -32,6 +35,7 @@ from hbp_nrp_cleserver.server.ServerConfigurations import SynchronousNestSimulat
 from hbp_nrp_cle.mocks.robotsim import MockRobotControlAdapter, MockRobotCommunicationAdapter
 from hbp_nrp_backend import NRPServicesGeneralException
 from hbp_nrp_commons.MockUtil import MockUtil
+from hbp_nrp_commons.workspace.Settings import Settings
 
 def robot_value():
     return "robots/this_is_a_robot.sdf"
@@ -109,6 +113,24 @@ class TestCLEGazeboSimulationAssembly(unittest.TestCase):
 
         self.m_ziputil.extractall.assert_called_once()
 
+    @patch("hbp_nrp_cleserver.server.CLEGazeboSimulationAssembly.tfm")
+    @patch("hbp_nrp_cleserver.server.CLEGazeboSimulationAssembly.ExternalModuleManager")
+    @patch("hbp_nrp_cleserver.server.CLEGazeboSimulationAssembly.DeterministicClosedLoopEngine")
+    def test_load_cle_builds_the_network(self, mock_cle_class, _, __):
+        braincomm, braincontrol = Mock(), Mock()
+        load_cle = self.launcher._CLEGazeboSimulationAssembly__load_cle
+
+        cle = load_cle((Mock(), Mock()), (braincontrol, braincomm, '/my/experiment/brain.py',
+                                          {'record': slice(0, 2)}))
+        self.assertIs(cle, mock_cle_class.return_value)
+        cle.initialize.assert_called_once_with('/my/experiment/brain.py', record=slice(0, 2))
+        # the network is only built by the CLE
+        self.assertFalse(braincontrol.initialize.called)
+        self.assertFalse(braincontrol.load_brain.called)
+
+        cle = load_cle((Mock(), Mock()), (braincontrol, braincomm, None, None))
+        cle.initialize.assert_called_with()
+
     def test_invalid_simulation(self):
         self.m_simconf.physics_engine = None
         try:
@@ -144,5 +166,68 @@ class TestCLEGazeboSimulationAssemblyRobot(TestCLEGazeboSimulationAssembly):
         self.assertIsNotNone(ctrl)
 
 
+@patch("hbp_nrp_cleserver.server.LocalGazebo.os")
+@patch("hbp_nrp_cleserver.server.LocalGazebo.Watchdog")
+@patch("hbp_nrp_cleserver.server.GazeboSimulationAssembly.GazeboSimulationRecorder", new=Mock())
+@patch("hbp_nrp_cleserver.server.GazeboSimulationAssembly.LocalGazeboBridgeInstance")
+@patch("hbp_nrp_cleserver.server.GazeboSimulationAssembly.config", new=MagicMock())
+@patch("hbp_nrp_cleserver.server.GazeboSimulationAssembly.rosnode", new=MagicMock())
+@patch("hbp_nrp_cleserver.server.GazeboSimulationAssembly.rospy", new=MagicMock())
+class TestGazeboStandby(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.link = os.path.join(tmp_dir, 'simulation')
+        patcher = patch.multiple(Settings, sim_dir_symlink=self.link, gazebo_standby=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        environ = patch.dict(os.environ, {'ROS_MASTER_URI': 'http://localhost:11311'})
+        environ.start()
+        self.addCleanup(environ.stop)
+        netifaces_patcher = patch("hbp_nrp_cleserver.server.GazeboSimulationAssembly.netifaces")
+        netifaces = netifaces_patcher.start()
+        self.addCleanup(netifaces_patcher.stop)
+        netifaces.ifaddresses.return_value = {netifaces.AF_INET: [{'addr': '127.0.0.1'}]}
+        self.tmp_dir = tmp_dir
+
+    def launch(self, name):
+        """
+        Creates a simulation directory as the backend does and starts Gazebo
+        """
+        sim_dir = os.path.join(self.tmp_dir, name)
+        os.mkdir(sim_dir)
+        if os.path.lexists(self.link):
+            os.unlink(self.link)
+        os.symlink(sim_dir, self.link)
+
+        sim_config = MagicMock(sim_dir=sim_dir, gzserver_host='local', playback_path=None,
+                               ros_launch_abs_path=None, rng_seed=None, physics_engine='ode')
+        sim_config.gzbridge_setting.side_effect = lambda name, default: str(default)
+        with patch("hbp_nrp_cleserver.server.CLEGazeboSimulationAssembly.StorageClient"):
+            assembly = SynchronousNestSimulation(sim_config)
+        assembly.robotManager = Mock()
+        assembly._start_gazebo(assembly._gazebo_models_path())
+        return assembly
+
+    def test_next_simulation_resumes_gazebo(self, bridge, watchdog, gazebo_os):
+        gazebo_os.environ = os.environ
+        watchdog.return_value.pid = 42
+        watchdog.return_value.is_alive.return_value = True
+
+        first = self.launch('nrp.first')
+        self.assertFalse(first._gazebo_resumed)
+        self.assertEqual(gazebo_os.system.call_count, 1)
+        self.assertIn('GAZEBO_MODELS_PATH={0}/assets:{0}:'.format(self.link),
+                      gazebo_os.system.call_args[0][0])
+        self.assertTrue(first.gzserver.release(first._gazebo_standby_key, Mock()))
+
+        # another simulation directory, behind the same link
+        second = self.launch('nrp.second')
+        self.assertTrue(second._gazebo_resumed)
+        self.assertEqual(gazebo_os.system.call_count, 1)
+        bridge.return_value.restart.assert_called_once_with()
+
+
 if __name__ == '__main__':
     unittest.main()
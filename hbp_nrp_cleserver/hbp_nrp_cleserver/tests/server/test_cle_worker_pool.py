@@ -0,0 +1,127 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+CLEWorkerPool unit test
+"""
+
+import time
+import threading
+import unittest
+from mock import patch
+
+from hbp_nrp_cleserver.server.CLEWorkerPool import CLEWorkerPool, REQUEST_FIELDS
+
+
+class FakeFactory(object):
+    """
+    Runs a simulation of the given duration in the worker process
+    """
+
+    def __init__(self):
+        self.running_simulation_thread = None
+
+    def create_new_simulation(self, request):
+        if request.exd_config_file == 'broken.exc':
+            raise Exception("Invalid experiment configuration")
+        self.running_simulation_thread = threading.Thread(target=time.sleep,
+                                                          args=(float(request.timeout),))
+        self.running_simulation_thread.start()
+        return []
+
+
+class Request(object):
+
+    def __init__(self, sim_id, exd_config_file='experiment.exc', timeout='0.5'):
+        for field in REQUEST_FIELDS:
+            setattr(self, field, None)
+        self.sim_id = sim_id
+        self.exd_config_file = exd_config_file
+        self.timeout = timeout
+
+
+class TestCLEWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = CLEWorkerPool(1, FakeFactory, queue_timeout=0.2)
+        self.pool.start()
+        self.addCleanup(self.pool.shutdown)
+
+    def wait_for(self, **expected):
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            status = self.pool.status()
+            if all(status[key] == value for key, value in expected.iteritems()):
+                return
+            time.sleep(0.05)
+        self.fail("The pool did not reach {0}, last status {1}".format(expected, status))
+
+    def test_simulations_run_in_workers(self):
+        self.wait_for(idle=1)
+        self.assertFalse(self.pool.is_full())
+
+        self.assertEqual(self.pool.create_new_simulation(Request(1)), [])
+        self.assertEqual(self.pool.status(),
+                         {'size': 1, 'idle': 0, 'busy': 1, 'starting': 0, 'queued': 0})
+        self.assertTrue(self.pool.is_full())
+
+        # a fresh worker replaces the one whose simulation ended
+        self.wait_for(idle=1, busy=0)
+        self.assertEqual(self.pool.create_new_simulation(Request(2)), [])
+        self.wait_for(busy=0)
+
+    def test_queue_timeout(self):
+        self.wait_for(idle=1)
+        self.pool.create_new_simulation(Request(1, timeout='1'))
+        self.assertRaises(Exception, self.pool.create_new_simulation, Request(2))
+        self.assertEqual(self.pool.status()['queued'], 0)
+        self.wait_for(busy=0)
+
+    def test_failed_initialization(self):
+        self.wait_for(idle=1)
+        with self.assertRaises(Exception) as context:
+            self.pool.create_new_simulation(Request(1, exd_config_file='broken.exc'))
+        self.assertEqual(str(context.exception), "Invalid experiment configuration")
+        self.wait_for(idle=1, busy=0)
+
+    def test_not_full_while_the_workers_start(self):
+        pool = CLEWorkerPool(2, FakeFactory)
+        self.assertFalse(pool.is_full())
+        self.assertEqual(pool.status()['idle'], 0)
+
+    def test_brain_simulators_preloaded(self):
+        pool = CLEWorkerPool(1, FakeFactory)
+        with patch('hbp_nrp_cleserver.server.CLEWorkerPool.importlib') as importlib, \
+                patch('hbp_nrp_cleserver.server.CLEWorkerPool.os.fork') as fork:
+            importlib.import_module.side_effect = [None, ImportError()]
+            fork.side_effect = OSError('fork')
+            self.assertRaises(OSError, pool.start)
+        self.assertEqual([c[0][0] for c in importlib.import_module.call_args_list],
+                         ['pyNN.nest', 'nest'])
+
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, CLEWorkerPool, 0, FakeFactory)
+
+
+if __name__ == '__main__':
+    unittest.main()
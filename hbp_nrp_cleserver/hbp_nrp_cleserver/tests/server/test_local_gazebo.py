@@ -101,8 +101,53 @@ class TestLocalGazeboServerInstance(unittest.TestCase):
         self.instance.gazebo_died_callback = self.died_callback
         callback = mocked_watchdog.call_args[0][1]
         callback()
+        # the callback shuts the simulation down off the watchdog timer
+        self.instance._IGazeboServerInstance__gazebo_died_runner.join(1)
         self.assertTrue(self.has_died)
 
+    @patch('hbp_nrp_cleserver.server.LocalGazebo.os')
+    @patch('hbp_nrp_cleserver.server.LocalGazebo.Watchdog')
+    def test_release_and_resume(self, mocked_watchdog, mocked_os):
+        self.instance.start('')
+        mocked_watchdog.return_value.pid = 42
+        mocked_watchdog.return_value.is_alive.return_value = True
+        reset_world = MagicMock()
+
+        self.assertTrue(self.instance.release('key', reset_world))
+        reset_world.assert_called_once_with()
+        self.assertEqual(mocked_os.system.call_count, 1)
+
+        # gzserver is only reused with the same settings, and only once
+        other = LocalGazeboServerInstance()
+        self.assertTrue(other.resume('key'))
+        mocked_watchdog.assert_called_with('gzserver', other._raise_gazebo_died, pid=42)
+        self.assertFalse(LocalGazeboServerInstance().resume('key'))
+
+        self.assertTrue(other.release('key', reset_world))
+        self.assertFalse(LocalGazeboServerInstance().resume('other key'))
+        self.assertEqual(mocked_os.system.call_count, 1)
+
+    @patch('hbp_nrp_cleserver.server.LocalGazebo.os')
+    @patch('hbp_nrp_cleserver.server.LocalGazebo.Watchdog')
+    def test_release_stops_gazebo_when_reset_fails(self, mocked_watchdog, mocked_os):
+        self.instance.start('')
+        reset_world = MagicMock(side_effect=Exception("Could not delete model"))
+
+        self.assertFalse(self.instance.release('key', reset_world))
+        mocked_os.system.assert_called_with(config.config.get('gazebo', 'stop-cmd'))
+        self.assertFalse(LocalGazeboServerInstance().resume('key'))
+
+    @patch('hbp_nrp_cleserver.server.LocalGazebo.os')
+    @patch('hbp_nrp_cleserver.server.LocalGazebo.Watchdog')
+    def test_resume_dead_gazebo(self, mocked_watchdog, mocked_os):
+        self.instance.start('')
+        mocked_watchdog.return_value.pid = 42
+        self.assertTrue(self.instance.release('key', MagicMock()))
+
+        # the process is not gzserver anymore
+        mocked_watchdog.return_value.pid = None
+        self.assertFalse(LocalGazeboServerInstance().resume('key'))
+
     def test_can_extend(self):
         self.assertTrue(self.instance.try_extend("does not matter"))
 
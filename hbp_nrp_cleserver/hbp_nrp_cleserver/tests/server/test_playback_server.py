@@ -57,6 +57,7 @@ class TestPlaybackServer(unittest.TestCase):
         self.__mocked_notificator = Mock()
         self.__mocked_notificator.task_notifier = mock_open()
 
+        self.__mocked_timer = mock_timer
         self.__playback_server = PlaybackServer(0, None, None, None, self.__mocked_notificator, 'foo')
         self.assertEqual(mock_timer.Timer.call_count, 1)
         self.__playback_server.prepare_simulation(None)
@@ -124,6 +125,17 @@ class TestPlaybackServer(unittest.TestCase):
         res, _ = self.__playback_server.reset_simulation(None)
         self.assertEqual(False, res)
 
+    def test_timeout_stops_off_the_timer(self):
+        ps = self.__playback_server
+        ps._SimulationServer__timeout = 5
+        ps._SimulationServer__timeout_type = 'simulation'
+        ps._PlaybackServer__sim_clock = 10
+        ps.publish_state_update()
+
+        runner = self.__mocked_timer.DetachedRunner.return_value
+        runner.run.assert_called_once_with(ps.lifecycle.stopped)
+        self.assertFalse(ps.lifecycle.stopped.called)
+
     def test_shutdown(self):
 
         ps = self.__playback_server
@@ -82,7 +82,7 @@ class TestROSCLEServer(unittest.TestCase):
         # Also have a look at the following link:
         # https://docs.python.org/3.5/library/unittest.mock-examples.html#applying-the-same-patch-to-every-test-method
         cle_patcher = patch('hbp_nrp_cle.cle.CLEInterface.IClosedLoopControl')
-        rospy_patcher = patch('hbp_nrp_cleserver.server.ROSCLEServer.rospy')
+        rospy_patcher = patch('hbp_nrp_cleserver.server.ROSServiceRegistry.rospy')
         base_rospy_patcher = patch('hbp_nrp_cleserver.server.SimulationServer.rospy')
 
         # Ensure that the patchers are cleaned up correctly even in exceptional cases
@@ -118,7 +118,7 @@ class TestROSCLEServer(unittest.TestCase):
 
     def test_prepare_initialization(self):
         self.__mocked_cle.is_initialized = False
-        self.assertEqual(17, self.__mocked_rospy.Service.call_count)
+        self.assertEqual(18, self.__mocked_rospy.Service.call_count)
         self.assertEqual(2, self.__mock_base_rospy.Service.call_count)
 
     def test_reset_simulation(self):
@@ -186,6 +186,19 @@ class TestROSCLEServer(unittest.TestCase):
                            ExperimentPopulationInfo(name="population2", type=ExperimentPopulationInfo.TYPE_POPULATION_SLICE,
                                                     ids=[], start=5, stop=10, step=1)]
         response, message = self.__ros_cle_server.reset_simulation(msg)
+        self.__mocked_cle.reset_world.assert_called_once_with("<a valid sdf string>")
+        self.__mocked_cle.reset_brain.assert_called_once_with(
+            "/random/tmp/file.brain", {'population1': slice(0, 5, 1), 'population2': slice(5, 10, 1)})
+        self.__mocked_cle.reset_mock()
+
+        # Reset Full to the loaded world, with the brain of the storage
+        msg.world_sdf = ""
+        response, message = self.__ros_cle_server.reset_simulation(msg)
+        self.assertEqual("", message)
+        self.assertTrue(response)
+        self.__mocked_cle.reset_world.assert_called_once_with()
+        self.__mocked_cle.reset_brain.assert_called_once_with(
+            "/random/tmp/file.brain", {'population1': slice(0, 5, 1), 'population2': slice(5, 10, 1)})
 
     def __get_handlers_for_testing_main(self):
         self.__mocked_cle.is_initialized = True
@@ -548,6 +561,97 @@ class TestROSCLEServer(unittest.TestCase):
         response = delete_transfer_function_handler(request)
         self.assertEqual(True, response)
 
+    def __mock_loaded_transfer_functions(self, mocked_tf_framework):
+        tf_a = MagicMock(source="def tf_a(): \n return 0", active=False)
+        tf_a.configure_mock(name='tf_a')
+        tf_b = MagicMock(source="def tf_b(): \n return 0", active=True)
+        tf_b.configure_mock(name='tf_b')
+        mocked_tf_framework.get_transfer_functions.return_value = [tf_a, tf_b]
+        mocked_tf_framework.get_flawed_transfer_function.return_value = None
+        compiler = MagicMock()
+        compiler.compile_all.side_effect = lambda sources: [('code', None) for _ in sources]
+        compiler.compile.return_value = 'restored code'
+        self.__ros_cle_server._ROSCLEServer__tf_compiler = compiler
+        return compiler
+
+    @patch('hbp_nrp_cleserver.server.ROSCLEServer.tf_framework')
+    def test_apply_transfer_functions(self, mocked_tf_framework):
+        compiler = self.__mock_loaded_transfer_functions(mocked_tf_framework)
+        apply_handler = self.__get_handlers_for_testing_main()['apply_transfer_functions']
+        self.__mocked_cle.running = True
+
+        # tf_a is renamed and tf_c is added, with a single pause of the CLE
+        request = MagicMock(transfer_function_source=json.dumps({
+            'tf_a': "def tf_a2(): \n return 1",
+            'tf_c': "    def tf_c(): \n     return 2"}))
+        self.assertEqual("", apply_handler(request))
+
+        compiler.compile_all.assert_called_once_with(["def tf_a2(): \n return 1",
+                                                      "def tf_c(): \n return 2"])
+        mocked_tf_framework.delete_transfer_function.assert_called_once_with('tf_a')
+        self.assertEqual(mocked_tf_framework.set_transfer_function.call_args_list, [
+            ((("def tf_a2(): \n return 1", 'code', 'tf_a2'), {'activation': False})),
+            ((("def tf_c(): \n return 2", 'code', 'tf_c'), {'activation': True}))])
+        self.__mocked_cle.stop.assert_called_once_with()
+        self.__mocked_cle.start.assert_called_once_with()
+
+    @patch('hbp_nrp_cleserver.server.ROSCLEServer.tf_framework')
+    def test_apply_transfer_functions_invalid(self, mocked_tf_framework):
+        compiler = self.__mock_loaded_transfer_functions(mocked_tf_framework)
+        apply_handler = self.__get_handlers_for_testing_main()['apply_transfer_functions']
+
+        response = apply_handler(MagicMock(transfer_function_source="[]"))
+        self.assertIn("Invalid set of transfer functions", json.loads(response)[0]['message'])
+
+        # tf_b is taken, unless it is replaced too
+        request = MagicMock(transfer_function_source=json.dumps({
+            'tf_a': "def tf_b(): \n return 1",
+            'tf_c': "def tf_c(): \n return 2",
+            'tf_d': "def tf_c(): \n return 3",
+            'tf_e': "tf_e = 1"}))
+        errors = json.loads(apply_handler(request))
+        self.assertEqual([error['name'] for error in errors], ['tf_e', 'tf_a', 'tf_c', 'tf_d'])
+        self.assertIn("no definition name", errors[0]['message'])
+        self.assertIn("duplicate", errors[1]['message'])
+
+        request = MagicMock(transfer_function_source=json.dumps({
+            'tf_a': "def tf_b(): \n return 1",
+            'tf_b': "def tf_a(): \n return 2"}))
+        compiler.compile_all.side_effect = None
+        compiler.compile_all.return_value = [('code', None),
+                                             (None, SyntaxError('invalid syntax',
+                                                                ('<string>', 2, 1, 'return 2')))]
+        errors = json.loads(apply_handler(request))
+        self.assertEqual([error['name'] for error in errors], ['tf_b'])
+        self.assertIn("restricted mode", errors[0]['message'])
+
+        self.assertEqual(mocked_tf_framework.delete_transfer_function.call_count, 0)
+        self.assertEqual(mocked_tf_framework.set_transfer_function.call_count, 0)
+        self.assertEqual(mocked_tf_framework.set_flawed_transfer_function.call_count, 0)
+
+    @patch('hbp_nrp_cleserver.server.ROSCLEServer.tf_framework')
+    def test_apply_transfer_functions_rollback(self, mocked_tf_framework):
+        self.__mock_loaded_transfer_functions(mocked_tf_framework)
+        apply_handler = self.__get_handlers_for_testing_main()['apply_transfer_functions']
+        self.__mocked_cle.running = True
+        mocked_tf_framework.set_transfer_function.side_effect = [
+            None, TFLoadingException('tf_c', 'cannot load tf_c'), None]
+
+        request = MagicMock(transfer_function_source=json.dumps({
+            'tf_a': "def tf_a2(): \n return 1",
+            'tf_c': "def tf_c(): \n return 2"}))
+        errors = json.loads(apply_handler(request))
+
+        self.assertEqual(errors, [{'name': 'tf_c', 'message': 'cannot load tf_c'}])
+        # the added transfer function is deleted and the replaced one restored
+        self.assertEqual(mocked_tf_framework.delete_transfer_function.call_args_list,
+                         [(('tf_a',),), (('tf_a2',),)])
+        self.assertEqual(mocked_tf_framework.set_transfer_function.call_args_list[-1],
+                         (("def tf_a(): \n return 0", 'restored code', 'tf_a'),
+                          {'activation': False}))
+        self.__mocked_cle.stop.assert_called_once_with()
+        self.__mocked_cle.start.assert_called_once_with()
+
 
     def test_simulation_time(self):
         self.__ros_cle_server.cle.simulation_time = 123
@@ -590,38 +694,28 @@ class TestROSCLEServer(unittest.TestCase):
 
     def test_shutdown(self):
         self.__ros_cle_server._ROSCLEServer__current_task = None
+        services = self.__ros_cle_server._ROSCLEServer__services
+        # register the services again, each with its own mock since they are shut down concurrently
+        self.__mocked_rospy.Service.reset_mock()
+        self.__mocked_rospy.Service.side_effect = lambda name, service_class, handler: MagicMock()
+        self.__ros_cle_server.prepare_simulation(None)
+        registered = [services[name] for name in services.names]
+        self.assertEqual(self.__mocked_rospy.Service.call_count, len(registered))
 
         z = self.__ros_cle_server._ROSCLEServer__cle = MagicMock()
         a = self.__ros_cle_server._SimulationServer__service_reset = \
             MagicMock(name="service_reset")
-        c = self.__ros_cle_server._ROSCLEServer__service_get_transfer_functions = \
-            MagicMock(name="service_get_transfer_functions")
         d = self.__ros_cle_server._SimulationServer__service_extend_timeout = \
             MagicMock(name="service_extend_timeout")
-        e = self.__ros_cle_server._ROSCLEServer__service_add_transfer_function = \
-            MagicMock(name="service_add_transfer_function")
-        f = self.__ros_cle_server._ROSCLEServer__service_edit_transfer_function = \
-            MagicMock(name="service_edit_transfer_function")
-        g = self.__ros_cle_server._ROSCLEServer__service_get_brain = \
-            MagicMock(name="service_get_brain")
-        h = self.__ros_cle_server._ROSCLEServer__service_set_brain = \
-            MagicMock(name="service_set_brain")
-        i = self.__ros_cle_server._ROSCLEServer__service_get_populations = \
-            MagicMock(name="service_get_populations")
-        j = self.__ros_cle_server._ROSCLEServer__service_get_CSV_recorders_files =\
-            MagicMock(name="service_get_CSV_recorders_files")
-        k = self.__ros_cle_server._ROSCLEServer__service_clean_CSV_recorders_files = \
-            MagicMock(name="service_clean_CSV_recorders_files")
-        n = self.__ros_cle_server._ROSCLEServer__service_delete_transfer_function = \
-            MagicMock(name="service_delete_transfer_function")
-        o = self.__ros_cle_server._ROSCLEServer__service_activate_transfer_function = \
-            MagicMock(name="service_activate_transfer_function")
-        p = self.__ros_cle_server._ROSCLEServer__service_set_populations = \
-            MagicMock(name="service_set_populations")
 
         self.__ros_cle_server.shutdown()
-        for x in [a, c, d, e, f, g, h, i, j, k, n, o, p, z]:
+        for x in [a, d, z]:
             self.assertEquals(x.shutdown.call_count, 1, repr(x) + " not shutdown")
+        # every service registered in prepare_simulation is shut down
+        for service in registered:
+            service.shutdown.assert_called_once_with()
+        self.assertEqual([], services.names)
+        self.assertIn('shutdown', services.timings)
 
 
 if __name__ == '__main__':
@@ -222,6 +222,24 @@ class TestROSCLESimulationFactory(unittest.TestCase):
             "Unhandled exception of type <type 'exceptions.Exception'>: Something really bad happened"
         ))
 
+    def test_pool_mode(self):
+        pool = MagicMock()
+        pool.status.return_value = {'size': 2, 'idle': 0, 'busy': 2, 'starting': 0, 'queued': 1}
+        pool.is_full.return_value = True
+        factory = ROSCLESimulationFactory.ROSCLESimulationFactory(pool)
+
+        self.assertEqual(factory.create_new_simulation(self.mocked_service_request),
+                         pool.create_new_simulation.return_value)
+        pool.create_new_simulation.assert_called_once_with(self.mocked_service_request)
+
+        self.assertTrue(factory.is_simulation_running(None))
+        self.__mocked_rospy.set_param.assert_called_once_with(
+            ROSCLESimulationFactory.PARAM_POOL_STATUS, pool.status.return_value)
+        # the workers still being forked are neither idle nor busy
+        pool.status.return_value = {'size': 2, 'idle': 0, 'busy': 0, 'starting': 0, 'queued': 0}
+        pool.is_full.return_value = False
+        self.assertFalse(factory.is_simulation_running(None))
+
     def test_get_version(self):
         cle_version = str(self.__ros_cle_simulation_factory.get_version(None))
         self.assertEqual(cle_version, hbp_nrp_cle.__version__)
@@ -249,6 +267,7 @@ class Args(object):
     pycharm = False
     verbose = False
     vsdebug = False
+    pool_size = 0
 
 class TestSimulationFactoryMain(unittest.TestCase):
     @patch("hbp_nrp_cleserver.server.ROSCLESimulationFactory.argparse.ArgumentParser.parse_args")
@@ -258,7 +277,7 @@ class TestSimulationFactoryMain(unittest.TestCase):
         argparse.return_value = Args
         ROSCLESimulationFactory.main()
         self.assertTrue(signal.signal.called)
-        factory.assert_called_once_with()
+        factory.assert_called_once_with(None)
         factory().initialize.assert_called_once_with()
         factory().run.assert_called_once_with()
         argparse.assert_called_with()
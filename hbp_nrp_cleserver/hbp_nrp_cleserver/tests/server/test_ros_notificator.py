@@ -33,6 +33,8 @@ from testfixtures import log_capture
 
 import json
 import logging
+import threading
+import time
 
 
 class TestROSNotificator(unittest.TestCase):
@@ -109,6 +111,58 @@ class TestROSNotificator(unittest.TestCase):
         self.__ros_notificator.finish_task()
         self.assertEquals(mock_publisher.publish.call_count, 3)
 
+    def test_coalescing(self):
+        notificator = ROSNotificator(max_rate=20)
+        publisher = Mock()
+        notificator._ROSNotificator__ros_status_pub = publisher
+        published = lambda: [json.loads(c[0][0]) for c in publisher.publish.call_args_list]
+
+        notificator.start_task('task', 'subtask', 3, False)
+        for i in range(100):
+            notificator.update_task('line {0}'.format(i), False, True)
+        # the first update is published right away, the last one when it is due
+        self.assertEqual(len(published()), 2)
+        time.sleep(0.2)
+        self.assertEqual([m['progress']['subtask'] for m in published()[1:]],
+                         ['line 0', 'line 99'])
+        self.assertEqual(notificator.counters, {'published': 3, 'merged': 98, 'dropped': 0})
+
+        # finishing a task publishes the pending update first
+        notificator.update_task('last', True, True)
+        notificator.update_task('very last', True, True)
+        self.assertEqual(len(published()), 4)
+        notificator.finish_task()
+        self.assertEqual([m['progress'].get('subtask') for m in published()[3:]],
+                         ['last', 'very last', None])
+        self.assertTrue(published()[-1]['progress']['done'])
+
+        notificator.publish_state('{}', coalesce_key='state')
+        notificator.publish_state('{"state": "paused"}', coalesce_key='state')
+        notificator.shutdown()
+        self.assertEqual(publisher.publish.call_args[0][0], '{"state": "paused"}')
+        notificator.publish_state('{}')
+        self.assertEqual(notificator.counters['dropped'], 1)
+
+    def test_update_task_from_threads(self):
+        notificator = ROSNotificator(max_rate=0)
+        publisher = Mock()
+        notificator._ROSNotificator__ros_status_pub = publisher
+        notificator.start_task('task', 'subtask', 400, False)
+
+        def update():
+            for i in range(100):
+                notificator.update_task('line {0}'.format(i), True, True)
+
+        threads = [threading.Thread(target=update) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        indices = [json.loads(c[0][0])['progress']['subtask_index']
+                   for c in publisher.publish.call_args_list[1:]]
+        # every update is counted and the progress is published in order
+        self.assertEqual(indices, range(1, 401))
+
     def test_start_task(self):
         self.__mocked_pub.reset_mock()
 
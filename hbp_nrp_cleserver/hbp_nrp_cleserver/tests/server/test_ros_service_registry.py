@@ -0,0 +1,105 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+ROSServiceRegistry unit test
+"""
+
+import threading
+import unittest
+from mock import patch, MagicMock
+
+from hbp_nrp_cleserver.server.ROSServiceRegistry import ROSServiceRegistry
+
+
+@patch('hbp_nrp_cleserver.server.ROSServiceRegistry.rospy')
+class TestROSServiceRegistry(unittest.TestCase):
+
+    def test_register_and_shutdown(self, mock_rospy):
+        mock_rospy.Service.side_effect = lambda name, service_class, handler: MagicMock(name=name)
+        handler = MagicMock(return_value='response')
+        registry = ROSServiceRegistry()
+        registry.register([('/ros_cle_simulation/0/a', 'A', handler),
+                           ('/ros_cle_simulation/0/b', 'B', handler)])
+
+        self.assertEqual(registry.names, ['/ros_cle_simulation/0/a', '/ros_cle_simulation/0/b'])
+        # the handlers are wrapped to track the calls in progress
+        tracked_handler = mock_rospy.Service.call_args_list[0][0][2]
+        self.assertEqual(tracked_handler('request'), 'response')
+        handler.assert_called_once_with('request')
+
+        services = [registry[name] for name in registry.names]
+        registry.shutdown()
+        for service in services:
+            service.shutdown.assert_called_once_with()
+        self.assertEqual(registry.names, [])
+        self.assertEqual(sorted(registry.timings), ['register', 'shutdown'])
+
+    def test_failed_registration(self, mock_rospy):
+        def service(name, service_class, handler):
+            if name == 'b':
+                raise ValueError('master unreachable')
+            return MagicMock()
+        mock_rospy.Service.side_effect = service
+        registry = ROSServiceRegistry()
+
+        self.assertRaises(ValueError, registry.register,
+                          [('a', 'A', MagicMock()), ('b', 'B', MagicMock())])
+        self.assertEqual(registry.names, ['a'])
+
+    def test_shutdown_waits_for_calls_in_progress(self, mock_rospy):
+        call_started, release_call = threading.Event(), threading.Event()
+
+        def slow_handler(request):
+            call_started.set()
+            release_call.wait(5)
+        registry = ROSServiceRegistry()
+        registry.register([('a', 'A', slow_handler)])
+        service = registry['a']
+        tracked_handler = mock_rospy.Service.call_args[0][2]
+
+        call = threading.Thread(target=tracked_handler, args=('request',))
+        call.start()
+        call_started.wait(5)
+        shutdown = threading.Thread(target=registry.shutdown)
+        shutdown.start()
+        shutdown.join(0.1)
+        self.assertTrue(shutdown.is_alive())
+        service.shutdown.assert_not_called()
+
+        release_call.set()
+        shutdown.join(5)
+        call.join(5)
+        service.shutdown.assert_called_once_with()
+
+    def test_shutdown_from_a_service_call(self, mock_rospy):
+        registry = ROSServiceRegistry()
+        registry.register([('a', 'A', lambda request: registry.shutdown(calls_timeout=5))])
+        service = registry['a']
+        mock_rospy.Service.call_args[0][2]('request')
+        service.shutdown.assert_called_once_with()
+        self.assertLess(registry.timings['shutdown'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
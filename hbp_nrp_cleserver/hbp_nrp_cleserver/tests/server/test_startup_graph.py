@@ -0,0 +1,140 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+StartupGraph unit test
+"""
+
+import time
+import threading
+import unittest
+from mock import Mock
+
+from hbp_nrp_cleserver.server.StartupGraph import StartupGraph, StartupCancelledException
+
+
+class TestStartupGraph(unittest.TestCase):
+
+    def test_dependencies_are_passed_in_order(self):
+        callback = Mock()
+        graph = StartupGraph(callback)
+        graph.add('world', lambda: 'world')
+        graph.add('robots', lambda world: world + '+robots', depends_on=('world',))
+        graph.add('brain', lambda: 'brain')
+        graph.add('cle', lambda robots, brain: (robots, brain), depends_on=('robots', 'brain'))
+
+        results = graph.run()
+        self.assertEqual(results['cle'], ('world+robots', 'brain'))
+        self.assertEqual(sorted(graph.timings), ['brain', 'cle', 'robots', 'world'])
+        self.assertEqual(callback.call_count, 4)
+
+    def test_independent_stages_overlap(self):
+        barrier = threading.Event()
+
+        def brain():
+            # only returns if the world stage runs at the same time
+            self.assertTrue(barrier.wait(5))
+
+        graph = StartupGraph()
+        graph.add('world', barrier.set)
+        graph.add('brain', brain)
+        graph.run()
+
+    def test_stage_on_caller_thread(self):
+        barrier = threading.Event()
+        threads = {}
+
+        def brain():
+            threads['brain'] = threading.current_thread()
+            # the world stage still runs in its own thread
+            self.assertTrue(barrier.wait(5))
+            return 'brain'
+
+        graph = StartupGraph()
+        graph.add('world', lambda: (threads.setdefault('world', threading.current_thread()),
+                                    barrier.set()))
+        graph.add('brain', brain, on_caller_thread=True)
+        graph.add('cle', lambda brain: brain + '+cle', depends_on=('brain',),
+                  on_caller_thread=True)
+
+        self.assertEqual(graph.run()['cle'], 'brain+cle')
+        self.assertIs(threads['brain'], threading.current_thread())
+        self.assertIsNot(threads['world'], threading.current_thread())
+
+    def test_chain_overlaps_stage_on_caller_thread(self):
+        robots_done = threading.Event()
+
+        def brain():
+            time.sleep(0.5)
+            # the whole gazebo chain completes while the brain is built on this thread
+            self.assertTrue(robots_done.wait(5))
+
+        def stage(duration):
+            return lambda *_: time.sleep(duration)
+
+        graph = StartupGraph()
+        graph.add('gazebo', stage(0.1))
+        graph.add('textures', stage(0.1), depends_on=('gazebo',))
+        graph.add('environment', stage(0.2), depends_on=('textures',))
+        graph.add('robots', lambda _: (time.sleep(0.2), robots_done.set()),
+                  depends_on=('environment',))
+        graph.add('brain', brain, on_caller_thread=True)
+
+        start = time.time()
+        graph.run()
+        # the longest chain, not the sum of both chains
+        self.assertLess(time.time() - start, 0.9)
+
+    def test_failure_cancels_the_other_stages(self):
+        never_started = Mock()
+        graph = StartupGraph()
+        started = threading.Event()
+
+        def world():
+            started.wait(5)
+            raise ValueError('gazebo died')
+
+        def brain():
+            started.set()
+            while True:
+                time.sleep(0.01)
+                graph.check_cancelled()
+
+        graph.add('world', world)
+        graph.add('robots', never_started, depends_on=('world',))
+        graph.add('brain', brain)
+
+        self.assertRaisesRegexp(ValueError, 'gazebo died', graph.run)
+        self.assertTrue(graph.cancelled)
+        self.assertRaises(StartupCancelledException, graph.check_cancelled)
+        never_started.assert_not_called()
+
+    def test_invalid_stages(self):
+        graph = StartupGraph()
+        graph.add('world', Mock())
+        self.assertRaises(ValueError, graph.add, 'world', Mock())
+        self.assertRaises(ValueError, graph.add, 'robots', Mock(), depends_on=('unknown',))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+TransferFunctionCompiler unit test
+"""
+
+import unittest
+
+from hbp_nrp_cleserver.server.TransferFunctionCompiler import TransferFunctionCompiler
+
+
+def compile_exec(source):
+    """
+    Compiles without restrictions
+    """
+    if 'fail' in source:
+        raise ValueError('cannot compile ' + source)
+    return compile(source, '<string>', 'exec')
+
+
+def run(code):
+    namespace = {}
+    exec code in namespace
+    return namespace
+
+
+class TestTransferFunctionCompiler(unittest.TestCase):
+
+    def test_compile_all(self):
+        compiler = TransferFunctionCompiler(compiler=compile_exec)
+
+        results = compiler.compile_all(["def tf_a():\n    return 1",
+                                        "def tf_b(:\n    return 2",
+                                        "def fail():\n    return 3"])
+
+        code, error = results[0]
+        self.assertIsNone(error)
+        self.assertEqual(run(code)['tf_a'](), 1)
+
+        code, error = results[1]
+        self.assertIsNone(code)
+        self.assertIsInstance(error, SyntaxError)
+        self.assertEqual(error.lineno, 1)
+
+        code, error = results[2]
+        self.assertIsNone(code)
+        self.assertIsInstance(error, ValueError)
+
+    def test_compile(self):
+        compiler = TransferFunctionCompiler(compiler=compile_exec)
+        self.assertEqual(run(compiler.compile("def tf_a():\n    return 1"))['tf_a'](), 1)
+        self.assertRaises(ValueError, compiler.compile, "def fail():\n    pass")
+
+
+if __name__ == '__main__':
+    unittest.main()
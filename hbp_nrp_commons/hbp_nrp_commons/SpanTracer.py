@@ -0,0 +1,268 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Traces the phases of the simulation launch as nested spans, exported as a Chrome trace
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import errno
+import logging
+import tempfile
+import resource
+import threading
+import functools
+import contextlib
+import collections
+
+from hbp_nrp_commons.workspace.Settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# getrusage target measuring the calling thread only, Linux specific
+_RUSAGE_THREAD = getattr(resource, 'RUSAGE_THREAD', 1)
+
+
+def _cpu_time():
+    """
+    Returns the CPU time consumed by the calling thread, in seconds
+    """
+    try:
+        usage = resource.getrusage(_RUSAGE_THREAD)
+    except (ValueError, resource.error):
+        return time.clock()
+    return usage.ru_utime + usage.ru_stime
+
+
+class _SpanTracer(object):
+    """
+    Records timed spans of work. Spans nest per thread, and every span belongs to a trace,
+    which is the id of the simulation being launched. The backend and the CLE server run in
+    different processes and only share the simulation id, so each process flushes its spans of
+    a trace to a shared directory, from which the backend assembles the timeline of a launch.
+
+    The timeline uses the Chrome trace event format, it can be opened in chrome://tracing or
+    https://ui.perfetto.dev
+    """
+
+    def __init__(self, directory=None, max_traces=16, max_spans=10000):
+        """
+        :param directory: the directory the spans are flushed to, None to keep them in memory
+        :param max_traces: the number of traces kept in memory
+        :param max_spans: the maximum number of spans recorded per trace
+        """
+        self.__directory = directory
+        self.__max_traces = max_traces
+        self.__max_spans = max_spans
+        self.__traces = collections.OrderedDict()
+        self.__default_trace = None
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+
+    def set_default_trace(self, trace_id):
+        """
+        Sets the trace of the spans opened outside of any other span without an explicit trace,
+        e.g. in the threads started by a launch
+
+        :param trace_id: the id of the trace, usually the simulation id, or None
+        """
+        self.__default_trace = trace_id
+
+    def current_trace(self):
+        """
+        Returns the trace of the innermost span open in the calling thread, or the default trace
+        """
+        stack = self.__stack()
+        return stack[-1] if stack else self.__default_trace
+
+    @contextlib.contextmanager
+    def span(self, name, trace_id=None, **args):
+        """
+        Times the enclosed block of code. The span is recorded even if the block raises, in which
+        case the error is added to its arguments.
+
+        :param name: the name of the span, e.g. 'storage.clone'
+        :param trace_id: the trace of the span, by default the one of the enclosing span
+        :param args: additional values shown with the span
+        """
+        if trace_id is None:
+            trace_id = self.current_trace()
+        if trace_id is None:
+            # nothing is being traced
+            yield
+            return
+
+        stack = self.__stack()
+        stack.append(trace_id)
+        start, cpu_start = time.time(), _cpu_time()
+        try:
+            yield
+        except BaseException as e:
+            args['error'] = repr(e)
+            raise
+        finally:
+            stack.pop()
+            args['cpu_ms'] = round((_cpu_time() - cpu_start) * 1000., 3)
+            self.__record(trace_id, {
+                'name': name,
+                'cat': name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': int(start * 1e6),
+                'dur': int((time.time() - start) * 1e6),
+                'pid': os.getpid(),
+                'tid': threading.current_thread().ident,
+                'args': args
+            })
+
+    def traced(self, name):
+        """
+        Decorator timing every call of a function as a span of the current trace
+
+        :param name: the name of the span
+        """
+        def decorator(function):
+            """
+            Wraps the function into a span
+            """
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                """
+                Calls the function inside a span
+                """
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self, trace_id):
+        """
+        Forgets the spans of a trace, including the ones flushed by other processes. To be called
+        before a launch, since simulation ids are reused.
+
+        :param trace_id: the id of the trace
+        """
+        with self.__lock:
+            self.__traces.pop(trace_id, None)
+        for path in self.__files(trace_id):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def flush(self, trace_id):
+        """
+        Writes the spans of a trace recorded by this process to the shared directory
+
+        :param trace_id: the id of the trace
+        """
+        if self.__directory is None:
+            return
+        with self.__lock:
+            events = list(self.__traces.get(trace_id, ()))
+        if not events:
+            return
+
+        try:
+            try:
+                os.makedirs(self.__directory)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            fd, partial = tempfile.mkstemp(dir=self.__directory, suffix='.part')
+            with os.fdopen(fd, 'w') as trace_file:
+                json.dump(events, trace_file)
+            os.rename(partial, self.__file(trace_id, os.getpid()))
+        except (IOError, OSError):
+            logger.exception("Could not flush the trace %s to %s", trace_id, self.__directory)
+
+    def timeline(self, trace_id):
+        """
+        Returns the spans of a trace, of this process and of the other processes that flushed
+        them, in the Chrome trace event format
+
+        :param trace_id: the id of the trace
+        :return: a dictionary serializable to JSON, None if the trace is unknown
+        """
+        with self.__lock:
+            events = list(self.__traces.get(trace_id, ()))
+        own_file = self.__file(trace_id, os.getpid())
+        for path in self.__files(trace_id):
+            if path == own_file:
+                continue
+            try:
+                with open(path) as trace_file:
+                    events.extend(json.load(trace_file))
+            except (IOError, ValueError):
+                logger.warning("Could not read the trace file %s", path)
+
+        if not events:
+            return None
+        events.sort(key=lambda event: event.get('ts', 0))
+        return {'traceEvents': events, 'displayTimeUnit': 'ms',
+                'otherData': {'trace_id': str(trace_id)}}
+
+    def __stack(self):
+        """
+        Returns the traces of the spans open in the calling thread
+        """
+        stack = getattr(self.__local, 'stack', None)
+        if stack is None:
+            stack = self.__local.stack = []
+        return stack
+
+    def __record(self, trace_id, event):
+        """
+        Adds a finished span to its trace
+        """
+        with self.__lock:
+            events = self.__traces.pop(trace_id, None)
+            if events is None:
+                events = [{'name': 'process_name', 'ph': 'M', 'pid': event['pid'],
+                           'args': {'name': os.path.basename(sys.argv[0] or 'python')}}]
+            self.__traces[trace_id] = events
+            while len(self.__traces) > self.__max_traces:
+                self.__traces.popitem(last=False)
+            if len(events) <= self.__max_spans:
+                events.append(event)
+
+    def __file(self, trace_id, pid):
+        """
+        Returns the path of the file holding the spans of a trace flushed by a process
+        """
+        return os.path.join(self.__directory, '{0}-{1}.json'.format(trace_id, pid))
+
+    def __files(self, trace_id):
+        """
+        Returns the files holding the spans of a trace flushed by any process
+        """
+        if self.__directory is None:
+            return []
+        return glob.glob(os.path.join(self.__directory, '{0}-*.json'.format(trace_id)))
+
+
+# Instantiate the singleton
+SpanTracer = _SpanTracer(Settings.trace_dir)
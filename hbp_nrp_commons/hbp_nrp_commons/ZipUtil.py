@@ -29,12 +29,51 @@ This module provides helper functions to handle zip
 __author__ = 'Hossain Mahmud'
 
 import os
+import time
+import zlib
 import zipfile
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class _ZipStream(object):
+    """
+    Write-only file object buffering what a ZipFile writes, so that it can be streamed
+    """
+
+    def __init__(self):
+        self.__chunks = []
+        self.__position = 0
+
+    def write(self, data):
+        """
+        Buffers written data
+        """
+        self.__chunks.append(data)
+        self.__position += len(data)
+
+    def tell(self):
+        """
+        Returns the number of bytes written so far
+        """
+        return self.__position
+
+    def flush(self):
+        """
+        Nothing to flush, the data is popped by the reader
+        """
+        pass
+
+    def pop(self):
+        """
+        Returns and forgets the data buffered since the last call
+        """
+        data = ''.join(self.__chunks)
+        self.__chunks = []
+        return data
+
+
 class ZipUtil(object):
     """
     This class provides helper functions to handle zip
@@ -89,6 +128,78 @@ class ZipUtil(object):
                     zf.write(os.path.join(root, f),
                              os.path.relpath(os.path.join(root, f), os.path.join(path, '..')))
 
+    @staticmethod
+    def stream_from_path(path, chunk_size=1024 * 1024, progress=None):
+        """
+        Generates a zip of a path chunk by chunk, with the same content as create_from_path,
+        without ever writing the archive to disk nor holding a whole file in memory.
+
+        A zip stores the size and the checksum of a file before its content. Since the
+        archive cannot be rewritten afterwards, every file is read twice: a first pass
+        computes its checksum and compressed size, the second one generates the content.
+
+        :param path: path to be compressed
+        :param chunk_size: the number of bytes read from the files at once
+        :param progress: optional function called with the number of bytes of the files
+                         processed so far and the total number of bytes to process
+        :return: a generator of the chunks of the archive
+        """
+        files = []
+        for root, _, filenames in os.walk(path):
+            for f in filenames:
+                files.append((os.path.join(root, f),
+                              os.path.relpath(os.path.join(root, f), os.path.join(path, '..'))))
+        total = sum(os.path.getsize(filename) for filename, _ in files)
+        done = 0
+
+        stream = _ZipStream()
+        last_yield = 0
+        zf = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+        for filename, arcname in files:
+            st = os.stat(filename)
+            zinfo = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[0:6])
+            zinfo.external_attr = (st.st_mode & 0xFFFF) << 16L
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            zinfo.file_size = st.st_size
+            zinfo.CRC, zinfo.compress_size = 0, 0
+            for data, raw in ZipUtil.__deflate(filename, chunk_size):
+                zinfo.CRC = zlib.crc32(raw, zinfo.CRC)
+                zinfo.compress_size += len(data)
+            zinfo.CRC &= 0xffffffff
+
+            zinfo.header_offset = stream.tell()
+            stream.write(zinfo.FileHeader(max(zinfo.file_size, zinfo.compress_size) >
+                                          zipfile.ZIP64_LIMIT))
+            for data, raw in ZipUtil.__deflate(filename, chunk_size):
+                stream.write(data)
+                # the deflated data is gathered in chunks of similar size, an empty chunk
+                # would moreover end a chunked transfer encoding
+                if stream.tell() - last_yield >= chunk_size:
+                    last_yield = stream.tell()
+                    yield stream.pop()
+                done += len(raw)
+                if progress is not None:
+                    progress(done, total)
+            zf.filelist.append(zinfo)
+            zf.NameToInfo[zinfo.filename] = zinfo
+
+        # writes the central directory
+        zf.close()
+        yield stream.pop()
+
+    @staticmethod
+    def __deflate(filename, chunk_size):
+        """
+        Generates the raw deflated content of a file, as stored in a zip
+
+        :return: a generator of (deflated data, original data) tuples
+        """
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), ''):
+                yield compressor.compress(chunk), chunk
+        yield compressor.flush(), ''
+
     @staticmethod
     def get_rootname(zip_abs_path):  # pragma: no cover
         """
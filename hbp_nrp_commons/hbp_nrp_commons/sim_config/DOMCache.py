@@ -0,0 +1,210 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module caches the DOM objects parsed from the experiment and bibi configurations
+"""
+
+import os
+import time
+import errno
+import hashlib
+import logging
+import tempfile
+import threading
+import collections
+import cPickle as pickle
+
+from hbp_nrp_commons.workspace.Settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class _DOMCache(object):
+    """
+    Process-wide cache of the DOM objects created by the generated PyXB parsers.
+
+    Parsing and validating a configuration is slow, while unpickling the resulting DOM is
+    cheap. Entries are keyed by a hash of the document and of the generated parser, hence a
+    modified file or a regenerated parser never hits a stale entry. The pickled DOMs are kept
+    in memory and written to a directory shared by the backend and the CLE server processes.
+    Every call returns a new DOM object, so callers may modify it.
+    """
+
+    def __init__(self, directory=None, max_entries=64):
+        """
+        :param directory: the directory holding the pickled DOMs, None to only cache in memory.
+                          It must not be writable by other users, since the pickles are trusted.
+        :param max_entries: the number of pickled DOMs kept in memory
+        """
+        self.__directory = directory
+        self.__max_entries = max_entries
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.__stats = {'parsed': 0, 'memory_hits': 0, 'disk_hits': 0,
+                        'parse_time': 0., 'load_time': 0.}
+
+    @property
+    def stats(self):
+        """
+        Returns a copy of the counters of the cache. The parse and load times, in seconds,
+        compare the cold parsing of the documents to their loading from the cache.
+        """
+        with self.__lock:
+            return dict(self.__stats)
+
+    def clear(self):
+        """
+        Forgets the DOMs cached in memory, the directory is left untouched
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+    def parse(self, content, parser):
+        """
+        Returns the DOM object of a document, parsing it only if it is not cached yet
+
+        :param content: the content of the document
+        :param parser: the generated module parsing the document, e.g. bibi_api_gen
+        :return: the DOM object, as returned by parser.CreateFromDocument
+        :raise: the exceptions of the parser, failed parses are not cached
+        """
+        key = self.__key(content, parser)
+
+        start = time.time()
+        data = self.__load(key)
+        if data is not None:
+            # pylint: disable=broad-except
+            try:
+                dom = pickle.loads(data)
+                self.__count('load_time', time.time() - start)
+                return dom
+            except Exception:
+                # e.g. a truncated file or a pickle of classes which do not exist anymore
+                logger.warning("Dropping the corrupted cached DOM %s", key)
+                self.__forget(key)
+            start = time.time()
+
+        dom = parser.CreateFromDocument(content)
+        elapsed = time.time() - start
+        self.__count('parsed')
+        self.__count('parse_time', elapsed)
+        logger.debug("Parsed a %s document in %.3fs", parser.__name__, elapsed)
+
+        # pylint: disable=broad-except
+        try:
+            data = pickle.dumps(dom, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            logger.warning("Could not pickle a %s DOM, it is not cached", parser.__name__)
+            return dom
+        self.__store(key, data)
+        return dom
+
+    def __count(self, counter, value=1):
+        """
+        Increments a counter of the stats
+        """
+        with self.__lock:
+            self.__stats[counter] += value
+
+    @staticmethod
+    def __key(content, parser):
+        """
+        Hashes a document together with the identity of the generated parser
+        """
+        if isinstance(content, unicode):
+            content = content.encode('utf-8')
+        digest = hashlib.sha256(str(getattr(parser, '_GenerationUID', '')))
+        digest.update(content)
+        return '{0}-{1}'.format(parser.__name__.rsplit('.', 1)[-1], digest.hexdigest())
+
+    def __load(self, key):
+        """
+        Returns the pickled DOM cached under a key, in memory or on disk
+        """
+        with self.__lock:
+            data = self.__entries.pop(key, None)
+            if data is not None:
+                self.__entries[key] = data
+                self.__stats['memory_hits'] += 1
+                return data
+
+        if self.__directory is None:
+            return None
+        try:
+            with open(os.path.join(self.__directory, key + '.pickle'), 'rb') as pickle_file:
+                data = pickle_file.read()
+        except IOError:
+            return None
+
+        self.__remember(key, data)
+        self.__count('disk_hits')
+        return data
+
+    def __store(self, key, data):
+        """
+        Caches a pickled DOM in memory and on disk
+        """
+        self.__remember(key, data)
+        if self.__directory is None:
+            return
+
+        try:
+            try:
+                os.makedirs(self.__directory, 0700)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            fd, partial = tempfile.mkstemp(dir=self.__directory, suffix='.part')
+            with os.fdopen(fd, 'wb') as pickle_file:
+                pickle_file.write(data)
+            # other processes never see a partially written pickle
+            os.rename(partial, os.path.join(self.__directory, key + '.pickle'))
+        except (IOError, OSError):
+            logger.exception("Could not write the DOM cache to %s", self.__directory)
+
+    def __forget(self, key):
+        """
+        Removes a pickled DOM from the cache
+        """
+        with self.__lock:
+            self.__entries.pop(key, None)
+        if self.__directory is not None:
+            try:
+                os.remove(os.path.join(self.__directory, key + '.pickle'))
+            except OSError:
+                pass
+
+    def __remember(self, key, data):
+        """
+        Keeps a pickled DOM in memory, evicting the least recently used ones
+        """
+        with self.__lock:
+            self.__entries.pop(key, None)
+            self.__entries[key] = data
+            while len(self.__entries) > self.__max_entries:
+                self.__entries.popitem(last=False)
+
+
+# Instantiate the singleton
+DOMCache = _DOMCache(Settings.dom_cache_dir)
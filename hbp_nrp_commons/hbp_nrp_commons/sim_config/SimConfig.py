@@ -27,16 +27,19 @@ This module represents the configuration of a running simulation
 """
 
 import os
+import time
 import logging
 from enum import Enum
 from pyxb import ValidationError, NamespaceError
 
 from hbp_nrp_cle.robotsim.RobotManager import Robot
 from hbp_nrp_commons.sim_config.SimConfUtil import SimConfUtil
+from hbp_nrp_commons.sim_config.DOMCache import DOMCache
+from hbp_nrp_commons.SpanTracer import SpanTracer
 from hbp_nrp_commons.workspace.Settings import Settings
 from hbp_nrp_commons.generated import bibi_api_gen as bibi_parser, exp_conf_api_gen as exc_parser
 from hbp_nrp_cleserver.bibi_config.bibi_configuration_script import (get_all_neurons_as_dict)
-from hbp_nrp_cleserver.bibi_config.bibi_configuration_script import (generate_tf, get_tf_name)
+from hbp_nrp_cleserver.bibi_config.TransferFunctionCache import TransferFunctionCache
 
 __author__ = 'Hossain Mahmud'
 
@@ -206,8 +209,10 @@ class SimConfig(object):
         """
         Initialize data members of the sim config
         """
-        self._read_exc_and_bibi_dom_objects()
-        self._read_dom_data()
+        with SpanTracer.span('sim_config.parse'):
+            self._read_exc_and_bibi_dom_objects()
+        with SpanTracer.span('sim_config.read'):
+            self._read_dom_data()
 
         self._model_paths.append(os.path.join(self._sim_dir, 'robots'))
         if Settings.nrp_models_directory is not None:
@@ -215,12 +220,15 @@ class SimConfig(object):
 
     def _read_exc_and_bibi_dom_objects(self):
         """
-        Parse experiment and bibi and return the DOM objects
+        Parse experiment and bibi and return the DOM objects. The DOM objects of documents
+        which have already been parsed, by this or another process, are loaded from the cache.
         """
+        start = time.time()
+
         # Read exc
         with open(self._exc_path.abs_path) as excFile:
             try:
-                self._exc_dom = exc_parser.CreateFromDocument(excFile.read())
+                self._exc_dom = DOMCache.parse(excFile.read(), exc_parser)
             except ValidationError as ve:
                 raise Exception("Could not parse experiment config {0} due to validation "
                                 "error: {1}".format(self._exc_path.abs_path, str(ve)))
@@ -231,7 +239,7 @@ class SimConfig(object):
         # Read bibi
         with open(self._bibi_path.abs_path) as bibiFile:
             try:
-                self._bibi_dom = bibi_parser.CreateFromDocument(bibiFile.read())
+                self._bibi_dom = DOMCache.parse(bibiFile.read(), bibi_parser)
             except ValidationError as ve:
                 raise Exception("Could not parse brain configuration {0:s} due to validation "
                                 "error: {1:s}".format(self._bibi_path.abs_path, str(ve)))
@@ -253,6 +261,8 @@ class SimConfig(object):
 
         # set config version based of something
         self.exc_version = Version.CURRENT
+        logger.info("Experiment and bibi configurations read in {0:.3f}s, DOM cache: {1}"
+                    .format(time.time() - start, DOMCache.stats))
 
     def get_world_model(self):
         """
@@ -333,10 +343,9 @@ class SimConfig(object):
         if self._bibi_dom.brainModel and self._bibi_dom.brainModel.populations:
             self._populations_dict = get_all_neurons_as_dict(self._bibi_dom.brainModel.populations)
 
-        # Transfer functions
+        # Transfer functions, only the ones modified since the last load are generated
         for _tf in self._bibi_dom.transferFunction:
-            code = generate_tf(_tf, self.sim_dir)
-            name = get_tf_name(code)
+            code, name = TransferFunctionCache.generate(_tf, self.sim_dir)
             src = _tf.src if _tf.src else None  # must be not None and not ""
             priority = _tf.priority if _tf.priority else 0
             active = bool(_tf.active) if _tf.active else False
@@ -0,0 +1,129 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Unit tests for the DOM cache
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from mock import MagicMock
+from pyxb import ValidationError
+
+from hbp_nrp_commons.sim_config.DOMCache import _DOMCache
+
+
+class FakeDOM(object):
+    """
+    Stands for the DOM objects of the generated parsers
+    """
+
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeParser(object):
+    """
+    Stands for a generated parser module
+    """
+    __name__ = 'hbp_nrp_commons.generated.fake_api_gen'
+    _GenerationUID = 'urn:uuid:1'
+
+    def __init__(self):
+        self.CreateFromDocument = MagicMock(side_effect=FakeDOM)
+
+
+class TestDOMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = os.path.join(tempfile.mkdtemp(), 'dom')
+        self.parser = FakeParser()
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.directory))
+
+    def test_parse_once(self):
+        cache = _DOMCache(self.directory)
+        first = cache.parse('<exc/>', self.parser)
+        second = cache.parse('<exc/>', self.parser)
+
+        self.assertEqual(self.parser.CreateFromDocument.call_count, 1)
+        self.assertEqual(second.content, '<exc/>')
+        # callers may modify their DOM
+        self.assertIsNot(first, second)
+        stats = cache.stats
+        self.assertEqual((stats['parsed'], stats['memory_hits'], stats['disk_hits']), (1, 1, 0))
+
+    def test_modified_document_is_parsed(self):
+        cache = _DOMCache(self.directory)
+        cache.parse('<exc/>', self.parser)
+        self.assertEqual(cache.parse('<exc name="new"/>', self.parser).content,
+                         '<exc name="new"/>')
+        self.assertEqual(self.parser.CreateFromDocument.call_count, 2)
+
+        # a regenerated parser does not reuse the DOMs of the previous one
+        self.parser._GenerationUID = 'urn:uuid:2'
+        cache.parse('<exc/>', self.parser)
+        self.assertEqual(self.parser.CreateFromDocument.call_count, 3)
+
+    def test_shared_between_processes(self):
+        _DOMCache(self.directory).parse('<exc/>', self.parser)
+
+        other_process = _DOMCache(self.directory)
+        self.assertEqual(other_process.parse('<exc/>', self.parser).content, '<exc/>')
+        self.assertEqual(self.parser.CreateFromDocument.call_count, 1)
+        self.assertEqual(other_process.stats['disk_hits'], 1)
+
+    def test_corrupted_pickle_is_dropped(self):
+        _DOMCache(self.directory).parse('<exc/>', self.parser)
+        for name in os.listdir(self.directory):
+            with open(os.path.join(self.directory, name), 'wb') as f:
+                f.write('truncated')
+
+        self.assertEqual(_DOMCache(self.directory).parse('<exc/>', self.parser).content,
+                         '<exc/>')
+        self.assertEqual(self.parser.CreateFromDocument.call_count, 2)
+
+    def test_invalid_document_is_not_cached(self):
+        cache = _DOMCache(self.directory)
+        self.parser.CreateFromDocument.side_effect = ValidationError
+        self.assertRaises(ValidationError, cache.parse, '<exc/>', self.parser)
+        self.assertRaises(ValidationError, cache.parse, '<exc/>', self.parser)
+        self.assertFalse(os.path.exists(self.directory))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = _DOMCache(None, max_entries=2)
+        cache.parse('a', self.parser)
+        cache.parse('b', self.parser)
+        cache.parse('a', self.parser)
+        cache.parse('c', self.parser)
+        cache.parse('a', self.parser)
+        self.assertEqual(self.parser.CreateFromDocument.call_count, 3)
+        cache.parse('b', self.parser)
+        self.assertEqual(self.parser.CreateFromDocument.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
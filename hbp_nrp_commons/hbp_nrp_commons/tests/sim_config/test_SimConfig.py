@@ -49,10 +49,12 @@ class TestSimConfig(unittest.TestCase):
         self.m_robot = MockUtil.fakeit(self, _base_path + 'Robot')
         self.m_exc_parser = MockUtil.fakeit(self, _base_path + 'exc_parser')
         self.m_bibi_parser = MockUtil.fakeit(self, _base_path + 'bibi_parser')
+        self.m_dom_cache = MockUtil.fakeit(self, _base_path + 'DOMCache')
+        self.m_dom_cache.parse.side_effect = lambda content, parser: \
+            parser.CreateFromDocument(content)
 
         self.m_sconf_util = MockUtil.fakeit(self, _base_path + 'SimConfUtil')
-        self.m_gentf = MockUtil.fakeit(self, _base_path + 'generate_tf')
-        self.m_gettfname = MockUtil.fakeit(self, _base_path + 'get_tf_name')
+        self.m_tf_cache = MockUtil.fakeit(self, _base_path + 'TransferFunctionCache')
 
         self.m_exc = MagicMock()
         self.m_exc_parser.CreateFromDocument.return_value = self.m_exc
@@ -0,0 +1,112 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Unit tests for the span tracer
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from hbp_nrp_commons.SpanTracer import _SpanTracer
+
+
+class TestSpanTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.tracer = _SpanTracer(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def spans(self, trace_id):
+        return [e for e in self.tracer.timeline(trace_id)['traceEvents'] if e['ph'] == 'X']
+
+    def test_nested_spans(self):
+        with self.tracer.span('backend.initialize', trace_id=3, experiment='exp'):
+            with self.tracer.span('storage.clone'):
+                pass
+        # outside of a trace spans are not recorded
+        with self.tracer.span('storage.clone'):
+            pass
+
+        outer, inner = self.spans(3)
+        self.assertEqual(outer['name'], 'backend.initialize')
+        self.assertEqual(outer['cat'], 'backend')
+        self.assertEqual(outer['args']['experiment'], 'exp')
+        self.assertIn('cpu_ms', outer['args'])
+        self.assertEqual(inner['name'], 'storage.clone')
+        self.assertGreaterEqual(inner['ts'], outer['ts'])
+        self.assertLessEqual(inner['ts'] + inner['dur'], outer['ts'] + outer['dur'])
+        self.assertIsNone(self.tracer.timeline(4))
+
+    def test_failed_span_is_recorded(self):
+        def fail():
+            with self.tracer.span('gazebo.start', trace_id=3):
+                raise ValueError('no display')
+
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(self.spans(3)[0]['args']['error'], "ValueError('no display',)")
+
+    def test_default_trace_and_decorator(self):
+        @self.tracer.traced('startup.brain')
+        def load_brain():
+            return 'brain'
+
+        self.tracer.set_default_trace(5)
+        thread = threading.Thread(target=load_brain)
+        thread.start()
+        thread.join()
+        self.tracer.set_default_trace(None)
+        self.assertEqual(load_brain(), 'brain')
+
+        self.assertEqual([span['name'] for span in self.spans(5)], ['startup.brain'])
+
+    def test_spans_of_other_processes(self):
+        other_process = [{'name': 'cle.initialize', 'ph': 'X', 'ts': 1, 'dur': 1, 'pid': -1}]
+        with open(os.path.join(self.directory, '3--1.json'), 'w') as f:
+            json.dump(other_process, f)
+        with self.tracer.span('backend.initialize', trace_id=3):
+            pass
+
+        self.assertEqual([span['name'] for span in self.spans(3)],
+                         ['cle.initialize', 'backend.initialize'])
+
+        # flushing does not duplicate the spans of this process
+        self.tracer.flush(3)
+        self.assertEqual(len(self.spans(3)), 2)
+        with open(os.path.join(self.directory, '3-{0}.json'.format(os.getpid()))) as f:
+            self.assertEqual([span['name'] for span in json.load(f) if span['ph'] == 'X'],
+                             ['backend.initialize'])
+
+        self.tracer.reset(3)
+        self.assertIsNone(self.tracer.timeline(3))
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Unit tests for the zip helpers
+"""
+
+import os
+import shutil
+import zipfile
+import tempfile
+import unittest
+from StringIO import StringIO
+from hbp_nrp_commons.ZipUtil import ZipUtil
+
+
+class TestZipUtil(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.record = os.path.join(self.root, 'record')
+        os.makedirs(os.path.join(self.record, 'sub'))
+        with open(os.path.join(self.record, 'big.bin'), 'wb') as f:
+            f.write(os.urandom(300 * 1024) + 'a' * 300 * 1024)
+        with open(os.path.join(self.record, 'sub', 'small.txt'), 'w') as f:
+            f.write('small')
+        open(os.path.join(self.record, 'sub', 'empty'), 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_stream_from_path(self):
+        progress = []
+        chunks = list(ZipUtil.stream_from_path(self.record, chunk_size=64 * 1024,
+                                               progress=lambda d, t: progress.append((d, t))))
+        self.assertTrue(len(chunks) > 1)
+        self.assertTrue(all(chunks))
+
+        streamed = zipfile.ZipFile(StringIO(''.join(chunks)))
+        self.assertIsNone(streamed.testzip())
+
+        dest_zip = os.path.join(self.root, 'record.zip')
+        ZipUtil.create_from_path(self.record, dest_zip)
+        created = zipfile.ZipFile(dest_zip)
+        self.assertEqual(sorted(streamed.namelist()), sorted(created.namelist()))
+        for name in created.namelist():
+            self.assertEqual(streamed.read(name), created.read(name))
+
+        total = 600 * 1024 + len('small')
+        self.assertEqual(progress[-1], (total, total))
+        self.assertEqual(progress, sorted(progress))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -80,6 +80,54 @@ class _Settings(object):
 
         self.storage_uri = 'http://localhost:9000/storage'
 
+        # connection pool and retry policy of the storage client
+        self.storage_pool_size = int(os.environ.get('NRP_STORAGE_POOL_SIZE', 16))
+        self.storage_max_retries = 3
+        self.storage_retry_backoff = 0.3  # seconds
+        self.storage_timeout = (10, 120)  # seconds, (connect, read)
+        self.storage_chunk_size = 64 * 1024  # bytes written at once when downloading a file
+        # number of files downloaded concurrently when cloning an experiment
+        self.storage_clone_workers = int(os.environ.get('NRP_STORAGE_CLONE_WORKERS', 8))
+        # local cache of the cloned files, a size of 0 disables it
+        self.storage_cache_dir = os.environ.get(
+            'NRP_STORAGE_CACHE_DIR', os.path.join(os.environ['HOME'], '.cache', 'nrp', 'storage'))
+        self.storage_cache_size = int(os.environ.get('NRP_STORAGE_CACHE_SIZE', 2 * 1024 ** 3))
+        # materialize cached files as hard links, only safe if they are never modified in place
+        self.storage_cache_hardlinks = False
+
+        # pickled DOMs of the parsed experiment and bibi configurations, shared by the processes
+        self.dom_cache_dir = os.environ.get(
+            'NRP_DOM_CACHE_DIR', os.path.join(os.environ['HOME'], '.cache', 'nrp', 'dom'))
+
+        # spans of the simulation launches, flushed by the CLE server and read by the backend
+        self.trace_dir = os.environ.get(
+            'NRP_TRACE_DIR', os.path.join(os.environ['HOME'], '.cache', 'nrp', 'traces'))
+
+        # keep a clean local gzserver and gzbridge running between simulations
+        self.gazebo_standby = os.environ.get('NRP_GAZEBO_STANDBY', '').lower() in ('1', 'true')
+
+        # upload the CSV recordings of the simulations as gzip files
+        self.csv_compress = os.environ.get('NRP_CSV_COMPRESS', '').lower() in ('1', 'true')
+
+        # maximum number of task progress or simulation state messages sent per second
+        self.notification_max_rate = float(os.environ.get('NRP_NOTIFICATION_MAX_RATE', 10))
+
+        # warm CLE worker processes running the simulations, 0 to run one simulation at a time
+        self.cle_pool_size = int(os.environ.get('NRP_CLE_POOL_SIZE', 0))
+
+        # simulations initialized concurrently and waiting, when created asynchronously. Both are
+        # bounded by the single active simulation, since the backend refuses any other one
+        self.simulation_creation_workers = int(os.environ.get('NRP_SIMULATION_CREATION_WORKERS', 2))
+        self.simulation_creation_queue = int(os.environ.get('NRP_SIMULATION_CREATION_QUEUE', 8))
+
+        # finished simulations listed by the backend, as summaries
+        self.simulation_history = int(os.environ.get('NRP_SIMULATION_HISTORY', 100))
+
+        # answers of the storage server to the authentication requests, cached for seconds
+        self.auth_cache_ttl = float(os.environ.get('NRP_AUTH_CACHE_TTL', 60))
+        self.auth_cache_negative_ttl = float(os.environ.get('NRP_AUTH_CACHE_NEGATIVE_TTL', 5))
+        self.auth_cache_size = int(os.environ.get('NRP_AUTH_CACHE_SIZE', 1024))
+
         self.MAX_SIMULATION_TIMEOUT = 24 * 60 * 60   # seconds
 
 
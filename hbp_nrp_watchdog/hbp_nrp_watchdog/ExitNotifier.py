@@ -0,0 +1,147 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module notifies the exit of processes as soon as it happens, without polling
+"""
+
+from threading import Thread, Lock
+import ctypes
+import errno
+import logging
+import os
+import select
+
+logger = logging.getLogger(__name__)
+
+# number of the pidfd_open system call, shared by all the architectures but alpha
+_SYS_PIDFD_OPEN = 434
+
+
+class ExitNotifier(object):
+    """
+    Calls back when a watched process exits. A single thread blocks on the pidfds of all the
+    watched processes, which become readable when the processes terminate. pidfds are
+    available on Linux 5.3 or later, elsewhere nothing can be watched and the callers have to
+    keep polling.
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__watched = {}
+        self.__epoll = None
+        self.__libc = None
+        self.__supported = hasattr(select, 'epoll')
+
+    def watch(self, pid, callback):
+        """
+        Watches a process
+
+        :param pid: the id of the process
+        :param callback: the function called with the pid once the process exited
+        :return: True if the process is watched, False if it does not exist anymore or if
+                 notifications are not supported
+        """
+        with self.__lock:
+            if not self.__supported:
+                return False
+            fd = self.__pidfd_open(pid)
+            if fd is None:
+                return False
+            if self.__epoll is None:
+                self.__epoll = select.epoll()
+                thread = Thread(target=self.__run, name='ExitNotifier')
+                thread.setDaemon(True)
+                thread.start()
+            self.__watched[fd] = (pid, callback)
+            self.__epoll.register(fd, select.EPOLLIN)
+        return True
+
+    def unwatch(self, pid):
+        """
+        Stops watching a process, its callback is not called anymore
+
+        :param pid: the id of the process
+        """
+        with self.__lock:
+            for fd, (watched_pid, _) in self.__watched.items():
+                if watched_pid == pid:
+                    self.__close(fd)
+
+    def __pidfd_open(self, pid):
+        """
+        Opens a pidfd referring to a process
+
+        :return: the file descriptor, None if the process does not exist or if pidfds are not
+                 supported (in which case they are never used again)
+        """
+        if self.__libc is None:
+            self.__libc = ctypes.CDLL(None, use_errno=True)
+        fd = self.__libc.syscall(_SYS_PIDFD_OPEN, ctypes.c_int(pid), ctypes.c_uint(0))
+        if fd >= 0:
+            return fd
+
+        error = ctypes.get_errno()
+        if error != errno.ESRCH:
+            logger.info("Process exit notifications are not supported ({0}), the watchdogs "
+                        "poll the processes".format(os.strerror(error)))
+            self.__supported = False
+        return None
+
+    def __close(self, fd):
+        """
+        Forgets a pidfd, the lock must be held
+        """
+        del self.__watched[fd]
+        self.__epoll.unregister(fd)
+        os.close(fd)
+
+    def __run(self):
+        """
+        Waits for the watched processes to exit, forever
+        """
+        while True:
+            try:
+                events = self.__epoll.poll()
+            except IOError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+
+            exited = []
+            with self.__lock:
+                for fd, _ in events:
+                    if fd in self.__watched:
+                        exited.append(self.__watched[fd])
+                        self.__close(fd)
+
+            for pid, callback in exited:
+                # pylint: disable=broad-except
+                try:
+                    callback(pid)
+                except Exception:
+                    logger.exception("Exit callback of process {0} failed".format(pid))
+
+
+# the notifier shared by all the watchdogs
+default_notifier = ExitNotifier()
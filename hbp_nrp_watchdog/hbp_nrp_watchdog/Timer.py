@@ -23,48 +23,253 @@
 # ---LICENSE-END
 """
 This module contains an implementation to run a certain function repeatedly until a timeout is
-reached
+reached. The timers of a process share a single scheduler thread and a small pool of workers
+running their callbacks, instead of owning one thread each. The callbacks hand their long or
+blocking work to a DetachedRunner, so that they do not hold the shared workers.
 """
 
-from threading import Thread, Event
+from threading import Thread, Event, Condition, Lock
+import Queue
+import heapq
+import itertools
 import logging
+import time
 
 __author__ = 'Lorenzo Vannucci, Stefan Deser, Daniel Peppicelli'
 
 logger = logging.getLogger(__name__)
 
 
-# from http://stackoverflow.com/questions/12435211/
-#             python-threading-timer-repeat-function-every-n-seconds
-class Timer(Thread):
+class Scheduler(object):
     """
-    Timer that runs two functions, one every n1 seconds and the other
-    every n2 seconds, using only one thread
+    Runs the callbacks of periodic timers. A single thread waits for the earliest deadline of
+    a heap and hands the due callbacks to a pool of worker threads, so that a slow callback
+    does not delay the other timers. The threads are started with the first timer.
+
+    Deadlines are computed from the start of a timer rather than from the end of the previous
+    call, hence the calls do not drift. A timer whose previous call is still running when it
+    is due again overruns: the call is skipped and the overrun is logged.
+    """
+
+    def __init__(self, workers=2):
+        """
+        :param workers: the number of threads running the callbacks
+        """
+        self.__workers = workers
+        self.__heap = []
+        self.__sequence = itertools.count()
+        self.__condition = Condition()
+        self.__tasks = Queue.Queue()
+        self.__started = False
+
+    def add(self, timer):
+        """
+        Schedules a timer, its callback is first called after one interval
+
+        :param timer: the Timer to schedule
+        """
+        with self.__condition:
+            if not self.__started:
+                self.__start()
+            self.__push(time.time() + timer.interval, timer)
+            self.__condition.notify()
+
+    def remove(self, timer):
+        """
+        Unschedules a timer. A call which is already running is not interrupted.
+
+        :param timer: the Timer to unschedule
+        """
+        with self.__condition:
+            heap = [entry for entry in self.__heap if entry[2] is not timer]
+            if len(heap) != len(self.__heap):
+                heapq.heapify(heap)
+                self.__heap = heap
+                self.__condition.notify()
+
+    def __push(self, deadline, timer):
+        """
+        Adds a deadline to the heap, the sequence number keeps timers from being compared
+        """
+        heapq.heappush(self.__heap, (deadline, next(self.__sequence), timer))
+
+    def __start(self):
+        """
+        Starts the scheduler and the worker threads
+        """
+        self.__started = True
+        threads = [Thread(target=self.__schedule, name='TimerScheduler')]
+        threads += [Thread(target=self.__work, name='TimerWorker-{0}'.format(i))
+                    for i in range(self.__workers)]
+        for thread in threads:
+            thread.setDaemon(True)
+            thread.start()
+
+    def __schedule(self):
+        """
+        Hands the due timers to the workers, forever
+        """
+        while True:
+            with self.__condition:
+                if not self.__heap:
+                    self.__condition.wait()
+                    continue
+                deadline, _, timer = self.__heap[0]
+                now = time.time()
+                if deadline > now:
+                    self.__condition.wait(deadline - now)
+                    continue
+                heapq.heappop(self.__heap)
+
+                # ticks missed, e.g. because of a clock change, are not caught up
+                missed = int((now - deadline) // timer.interval)
+                self.__push(deadline + (missed + 1) * timer.interval, timer)
+
+            if timer.dispatch():
+                self.__tasks.put(timer)
+
+    def __work(self):
+        """
+        Runs the callbacks of the due timers, forever
+        """
+        while True:
+            self.__tasks.get().run()
+
+
+# the scheduler of the timers which do not specify one
+default_scheduler = Scheduler()
+
+
+class Timer(object):
+    """
+    Timer that runs a function every n seconds until it is cancelled
     """
 
-    def __init__(self, interval, callback):
+    def __init__(self, interval, callback, scheduler=None):
         """
         Construct the timer.
 
         :param interval: the time interval
         :param callback: the function to be called
+        :param scheduler: the Scheduler running the timer, defaults to the shared one
         """
-        Thread.__init__(self)
-        self.setDaemon(True)
         self.interval = interval
         self.callback = callback
+        self.overruns = 0
+        self.__scheduler = scheduler or default_scheduler
+        self.__lock = Lock()
+        self.__running = False
+        self.__started = False
         self.stopped = Event()
-        self.stopped.clear()
 
-    def run(self):
+    def start(self):
         """
-        Exec the function and restart the timer.
+        Schedules the timer.
         """
-        while not self.stopped.wait(self.interval):
-            self.callback()
+        with self.__lock:
+            if self.__started:
+                raise RuntimeError("timers can only be started once")
+            self.__started = True
+        self.__scheduler.add(self)
 
     def cancel_all(self):
         """
         Cancel the timer.
         """
         self.stopped.set()
+        self.__scheduler.remove(self)
+
+    def is_alive(self):
+        """
+        Whether the timer has been started and not cancelled yet
+        """
+        return self.__started and not self.stopped.is_set()
+
+    # same name as Thread, which the timers used to be
+    isAlive = is_alive
+
+    def dispatch(self):
+        """
+        Called by the scheduler when the timer is due
+
+        :return: True if the callback must be run, False if the timer has been cancelled or
+                 if its previous call is still running
+        """
+        with self.__lock:
+            if self.stopped.is_set():
+                return False
+            if self.__running:
+                self.overruns += 1
+                logger.warning("%s has not returned within its %ss interval, skipping a call "
+                               "(%d overruns)", self.callback, self.interval, self.overruns)
+                return False
+            self.__running = True
+            return True
+
+    def run(self):
+        """
+        Runs the callback, unless the timer has been cancelled in the meantime
+        """
+        # pylint: disable=broad-except
+        try:
+            if not self.stopped.is_set():
+                self.callback()
+        except Exception:
+            logger.exception("Timer callback %s failed", self.callback)
+        finally:
+            with self.__lock:
+                self.__running = False
+
+
+class DetachedRunner(object):
+    """
+    Runs the long or blocking work triggered by timer callbacks, e.g. the shutdown of a
+    simulation, on a dedicated thread. The callbacks then return right away and do not hold one
+    of the few workers shared by all the timers of the process. A runner runs a single call at a
+    time, the calls requested while one is running are dropped.
+    """
+
+    def __init__(self, name):
+        """
+        :param name: the name of the threads running the calls
+        """
+        self.__name = name
+        self.__lock = Lock()
+        self.__thread = None
+
+    def run(self, func, *args):
+        """
+        Starts a call of the given function, unless a previous call is still running
+
+        :param func: the function to call
+        :param args: the arguments of the call
+        :return: True if the call was started
+        """
+        with self.__lock:
+            if self.__thread is not None and self.__thread.is_alive():
+                return False
+            self.__thread = Thread(target=self.__call, args=(func,) + args, name=self.__name)
+            self.__thread.setDaemon(True)
+            self.__thread.start()
+            return True
+
+    @staticmethod
+    def __call(func, *args):
+        """
+        Calls the function, logging its failure
+        """
+        # pylint: disable=broad-except
+        try:
+            func(*args)
+        except Exception:
+            logger.exception("Detached call of %s failed", func)
+
+    def join(self, timeout=None):
+        """
+        Waits for the running call, if any
+
+        :param timeout: the maximum time to wait, in seconds
+        """
+        thread = self.__thread
+        if thread is not None:
+            thread.join(timeout)
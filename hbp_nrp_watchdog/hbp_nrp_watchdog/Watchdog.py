@@ -26,6 +26,8 @@ This module contains a small python program that checks the availability of a lo
 """
 
 from hbp_nrp_watchdog.Timer import Timer
+from hbp_nrp_watchdog.ExitNotifier import default_notifier
+from threading import Lock
 import psutil
 import logging
 
@@ -36,9 +38,72 @@ __author__ = "Georg Hinkel"
 logger = logging.getLogger(__name__)
 
 
+class _ProcessIndex(object):
+    """
+    Name to pid index of the processes of the host. It is shared by the watchdogs of a process,
+    so that looking up several processes only scans the processes of the host once.
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__entries = []
+
+    def lookup(self, process, exclude=()):
+        """
+        Looks up a process by name
+
+        :param process: a part of the name of the process
+        :param exclude: the ids of processes which must not be returned
+        :return: the id of the first process whose name contains the given name, or None
+        """
+        with self.__lock:
+            pid = self.__find(process, exclude)
+            if pid is not None and self.__is_running(pid, process):
+                return pid
+            # the process is unknown or the index is outdated
+            self.__entries = self.__scan()
+            return self.__find(process, exclude)
+
+    def __find(self, process, exclude):
+        """
+        Finds a process in the index
+        """
+        for name, pid in self.__entries:
+            if process in name and pid not in exclude:
+                return pid
+        return None
+
+    @staticmethod
+    def __is_running(pid, process):
+        """
+        Checks whether an indexed process is still running
+        """
+        try:
+            return process in psutil.Process(pid).name()
+        except psutil.NoSuchProcess:
+            return False
+
+    @staticmethod
+    def __scan():
+        """
+        Lists the name and id of every process of the host
+        """
+        entries = []
+        for p in psutil.process_iter():
+            try:
+                entries.append((p.name(), p.pid))
+            except psutil.NoSuchProcess:
+                pass
+        return entries
+
+
+_process_index = _ProcessIndex()
+
+
 class Watchdog(object):
     """
-    This class implements a watchdog that regularly checks whether a given process is still alive
+    This class implements a watchdog that regularly checks whether a given process is still alive.
+    Once started, it is moreover notified as soon as the watched process exits, where supported.
     """
     def __init__(self, process, callback, pid=None, interval=1):
         """
@@ -53,6 +118,11 @@ class Watchdog(object):
         self.__process = process
         self.__callback = callback
         self.__timer = Timer(interval, self._watch)
+        self.__started = False
+        self.__notified_pid = None
+        self.__exited = set()
+        # the process is watched both from the timer and from the exit notifier
+        self.__watch_lock = Lock()
 
         if pid is not None:
             try:
@@ -70,14 +140,41 @@ class Watchdog(object):
         """
         Watches the process
         """
-        if not self._is_alive():
-            self.__callback()
+        with self.__watch_lock:
+            if not self._is_alive():
+                self.__callback()
+
+    def __watch_exit(self):
+        """
+        Asks to be notified when the watched process exits
+        """
+        pid = self.__pid
+        if not self.__started or pid is None or pid == self.__notified_pid:
+            return
+        if self.__notified_pid is not None:
+            default_notifier.unwatch(self.__notified_pid)
+            self.__notified_pid = None
+        if default_notifier.watch(pid, self.__process_exited):
+            self.__notified_pid = pid
+
+    def __process_exited(self, pid):
+        """
+        Called by the exit notifier when the watched process exited
+        """
+        logger.info("Process {0} ({1}) exited".format(self.__process, pid))
+        self.__exited.add(pid)
+        if self.__notified_pid == pid:
+            self.__notified_pid = None
+        if self.__started:
+            self._watch()
 
     def reset(self):
         """
         Resets the watched pid
         """
         self.__pid = None
+        # the ids of exited processes may be reused by the next process
+        self.__exited.clear()
 
     @property
     def pid(self):
@@ -88,15 +185,27 @@ class Watchdog(object):
 
     def start(self):
         """
-        Starts the watchdog in a new thread
+        Starts the watchdog
         """
+        self.__started = True
         self.__timer.start()
+        self.__watch_exit()
 
     def stop(self):
         """
         Stops the watchdog
         """
+        self.__started = False
         self.__timer.cancel_all()
+        if self.__notified_pid is not None:
+            default_notifier.unwatch(self.__notified_pid)
+            self.__notified_pid = None
+
+    def is_alive(self):
+        """
+        Checks right away whether the watched process is alive, e.g. to verify its health
+        """
+        return self._is_alive()
 
     def _is_alive(self):
         """
@@ -105,11 +214,14 @@ class Watchdog(object):
         :return:
         """
         if self.__pid is None:
-            for p in psutil.process_iter():
-                if self.__process in p.name():
-                    self.__pid = p.pid
-                    return True
+            # exited processes may still be listed, as zombies, until they are reaped
+            self.__exited = set(pid for pid in self.__exited if psutil.pid_exists(pid))
+            self.__pid = _process_index.lookup(self.__process, self.__exited)
             if self.__pid is None:
                 logger.info("Process {0} could not be found".format(self.__process))
                 return False
+            self.__watch_exit()
+            return True
+        if self.__pid in self.__exited:
+            return False
         return psutil.pid_exists(self.__pid)
@@ -0,0 +1,89 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Unit tests for the process exit notifications
+"""
+
+import subprocess
+import threading
+import unittest
+from mock import patch, Mock
+
+from hbp_nrp_watchdog.ExitNotifier import ExitNotifier
+from hbp_nrp_watchdog.Watchdog import Watchdog
+
+
+class TestExitNotifier(unittest.TestCase):
+
+    def setUp(self):
+        self.process = subprocess.Popen(['sleep', '30'])
+        self.addCleanup(self.terminate)
+        self.exited = threading.Event()
+        self.notifier = ExitNotifier()
+
+    def terminate(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+    def watch(self, callback):
+        if not self.notifier.watch(self.process.pid, callback):
+            self.skipTest("process exit notifications are not supported")
+
+    def test_exit_is_notified(self):
+        pids = []
+        self.watch(lambda pid: (pids.append(pid), self.exited.set()))
+        self.assertFalse(self.exited.wait(0.1))
+        self.terminate()
+        self.assertTrue(self.exited.wait(1))
+        self.assertEqual(pids, [self.process.pid])
+
+    def test_unwatch(self):
+        callback = Mock()
+        self.watch(callback)
+        self.notifier.unwatch(self.process.pid)
+        self.terminate()
+        self.assertFalse(self.exited.wait(0.2))
+        self.assertFalse(callback.called)
+
+    def test_missing_process(self):
+        self.terminate()
+        self.assertFalse(self.notifier.watch(self.process.pid, Mock()))
+
+    def test_watchdog_notified_immediately(self):
+        self.watch(Mock())
+        callback = Mock(side_effect=lambda: self.exited.set())
+        # the timer alone would only notice the exit after a minute
+        watchdog = Watchdog('sleep', callback, self.process.pid, interval=60)
+        watchdog.start()
+        self.addCleanup(watchdog.stop)
+
+        self.terminate()
+        self.assertTrue(self.exited.wait(1))
+        # the notified pid is not polled anymore
+        self.assertFalse(watchdog._is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,7 +27,7 @@ Unit tests for the double timer used for the state publishing and the timeout
 
 __author__ = 'Lorenzo Vannucci, Alessandro Ambrosano'
 
-from hbp_nrp_watchdog.Timer import Timer
+from hbp_nrp_watchdog.Timer import Timer, Scheduler, DetachedRunner
 import time
 import threading
 
@@ -53,6 +53,80 @@ class TestTimer(unittest.TestCase):
         time.sleep(0.2)
         self.assertFalse(dt.isAlive())
 
+    def test_timers_share_threads(self):
+        scheduler = Scheduler(workers=2)
+        threads = threading.active_count()
+        callbacks = [mock.Mock() for _ in range(20)]
+        timers = [Timer(0.05, f, scheduler) for f in callbacks]
+        for t in timers:
+            t.start()
+        time.sleep(0.3)
+        # one scheduler and two workers
+        self.assertEqual(threading.active_count(), threads + 3)
+        for t in timers:
+            t.cancel_all()
+        for f in callbacks:
+            self.assertGreaterEqual(f.call_count, 4)
+
+        # no call after cancellation
+        counts = [f.call_count for f in callbacks]
+        time.sleep(0.15)
+        self.assertEqual([f.call_count for f in callbacks], counts)
+
+    def test_no_drift(self):
+        calls = []
+        callback = lambda: (calls.append(time.time()), time.sleep(0.02))
+        dt = Timer(0.05, callback, Scheduler())
+        start = time.time()
+        dt.start()
+        time.sleep(0.53)
+        dt.cancel_all()
+        # a timer rescheduled after each call would only run 7 times
+        self.assertEqual(len(calls), 10)
+        self.assertAlmostEqual(calls[-1] - start, 0.5, delta=0.03)
+
+    def test_overrun(self):
+        f = mock.Mock(side_effect=lambda: time.sleep(0.25))
+        dt = Timer(0.1, f, Scheduler())
+        dt.start()
+        time.sleep(0.55)
+        dt.cancel_all()
+        self.assertEqual(f.call_count, 2)
+        self.assertGreaterEqual(dt.overruns, 2)
+
+    def test_failing_callback(self):
+        f = mock.Mock(side_effect=Exception)
+        dt = Timer(0.05, f, Scheduler())
+        dt.start()
+        time.sleep(0.18)
+        dt.cancel_all()
+        self.assertGreaterEqual(f.call_count, 3)
+        self.assertRaises(RuntimeError, dt.start)
+
+    def test_blocking_work_is_detached(self):
+        scheduler = Scheduler(workers=1)
+        release = threading.Event()
+        blocking = mock.Mock(side_effect=lambda: release.wait(5))
+        runner = DetachedRunner('Blocking')
+        slow = Timer(0.05, lambda: runner.run(blocking), scheduler)
+        fast = mock.Mock()
+        timers = [slow, Timer(0.05, fast, scheduler)]
+        for timer in timers:
+            timer.start()
+        time.sleep(0.3)
+
+        # the single worker is not held by the blocking work, which runs once at a time
+        self.assertGreaterEqual(fast.call_count, 4)
+        self.assertEqual(blocking.call_count, 1)
+        self.assertEqual(slow.overruns, 0)
+
+        for timer in timers:
+            timer.cancel_all()
+        release.set()
+        runner.join(1)
+        self.assertTrue(runner.run(mock.Mock(side_effect=Exception)))
+        runner.join(1)
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestTimer)
     unittest.TextTestRunner(verbosity=2).run(suite)